@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+from typing import List
+
 from lisa.executable import Tool
 
 
@@ -30,6 +32,21 @@ class Cat(Tool):
         result.assert_exit_code(message=f"Error : {result.stdout}")
         return result.stdout
 
+    def read_many(
+        self,
+        files: List[str],
+        sudo: bool = False,
+        no_debug_log: bool = False,
+    ) -> List[str]:
+        """
+        Reads files in one shell session, and returns contents in the same
+        order. Like read, it fails if any file cannot be read.
+        """
+        results = self.run_many(files, sudo=sudo, no_debug_log=no_debug_log)
+        for result in results:
+            result.assert_exit_code(message=f"Error : {result.stdout}")
+        return [x.stdout for x in results]
+
     # Returns string composed of lines in file that contain grep_string
     def read_with_filter(
         self,
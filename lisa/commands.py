@@ -4,9 +4,11 @@
 import asyncio
 import functools
 from argparse import Namespace
+from pathlib import Path
 from typing import Iterable, Optional, cast
 
 from lisa import messages, notifier, schema
+from lisa.notifiers.result_store import ResultStore, get_default_result_store_path
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.runner import RootRunner
 from lisa.testselector import select_testcases
@@ -95,6 +97,34 @@ def list_start(args: Namespace) -> int:
     return 0
 
 
+def query(args: Namespace) -> int:
+    log = _get_init_logger("query")
+    path = cast(Optional[Path], args.db) or get_default_result_store_path()
+    if not path.exists():
+        raise LisaException(f"result store doesn't exist: {path}")
+
+    filters = {
+        "run_id": args.run_id,
+        "name": args.name,
+        "platform": args.platform,
+        "vmsize": args.vmsize,
+        "kernel_version": args.kernel_version,
+    }
+    store = ResultStore(path)
+    try:
+        if args.type == constants.QUERY_PERF:
+            rows = store.query_perf(limit=args.limit, metric=args.metric, **filters)
+        else:
+            rows = store.query_results(limit=args.limit, status=args.status, **filters)
+    finally:
+        store.close()
+
+    for row in rows:
+        log.info(", ".join(f"{key}: {value}" for key, value in row.items()))
+    log.info(f"{len(rows)} rows are found in {path}")
+    return 0
+
+
 class CommandHookSpec:
     @hookspec
     def on_run_finalize(self) -> None:
@@ -366,6 +366,16 @@ class Environment(ContextMixin, InitializableMixin):
         self.log.debug("mark environment to dirty")
         self._is_dirty = True
 
+    def reset_state(self) -> None:
+        """
+        Called after the platform reverts the environment to its snapshot, so
+        it's clean and new again.
+        """
+        self.log.debug("reset environment state")
+        self._is_dirty = False
+        self.is_new = True
+        self._information_cache = None
+
     def get_guest_environment(self) -> "Environment":
         # It adds guests from different parent nodes. The order is to add first
         # guest from each node, and then add second and more similar. So, it can
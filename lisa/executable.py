@@ -244,10 +244,12 @@ class Tool(InitializableMixin):
         # node uses for guest nodes.
         node: Optional["Node"] = None,
         encoding: str = "",
+        buffer_lines: bool = False,
     ) -> Process:
         """
         Run a command async and return the Process. The process is used for async, or
-        kill directly.
+        kill directly. Set buffer_lines to read lines of the output before it
+        exits.
         """
         if parameters:
             command = f"{self.command} {parameters}"
@@ -272,6 +274,7 @@ class Tool(InitializableMixin):
                 cwd=cwd,
                 update_envs=update_envs,
                 encoding=encoding,
+                buffer_lines=buffer_lines,
             )
             self.__cached_results[command_key] = process
         else:
@@ -315,6 +318,39 @@ class Tool(InitializableMixin):
             expected_exit_code_failure_message=expected_exit_code_failure_message,
         )
 
+    def run_many(
+        self,
+        parameters_list: List[str],
+        sudo: bool = False,
+        no_error_log: bool = False,
+        no_info_log: bool = True,
+        no_debug_log: bool = False,
+        cwd: Optional[pathlib.PurePath] = None,
+        update_envs: Optional[Dict[str, str]] = None,
+        encoding: str = "",
+        timeout: int = 600,
+        expected_exit_code: Optional[int] = None,
+        expected_exit_code_failure_message: str = "",
+    ) -> List[ExecutableResult]:
+        """
+        Run the tool with each parameters in one shell session, and return
+        results in the same order. Results are not cached.
+        """
+        sudo = sudo or self._use_sudo
+        return self.node.execute_many(
+            [f"{self.command} {parameters}" for parameters in parameters_list],
+            sudo=sudo,
+            no_error_log=no_error_log,
+            no_info_log=no_info_log,
+            no_debug_log=no_debug_log,
+            cwd=cwd,
+            timeout=timeout,
+            update_envs=update_envs,
+            encoding=encoding,
+            expected_exit_code=expected_exit_code,
+            expected_exit_code_failure_message=expected_exit_code_failure_message,
+        )
+
     def get_tool_path(self, use_global: bool = False) -> pathlib.PurePath:
         """
         compose a path, if the tool need to be installed
@@ -392,6 +428,7 @@ class CustomScript(Tool):
         update_envs: Optional[Dict[str, str]] = None,
         node: Optional["Node"] = None,
         encoding: str = "",
+        buffer_lines: bool = False,
     ) -> Process:
         if cwd is not None:
             raise LisaException("don't set cwd for script")
@@ -408,6 +445,7 @@ class CustomScript(Tool):
             update_envs=update_envs,
             node=node,
             encoding=encoding,
+            buffer_lines=buffer_lines,
         )
 
     @property
@@ -437,11 +475,12 @@ class CustomScript(Tool):
         if self.node.is_remote:
             # copy to remote
             node_script_path = self.get_tool_path()
+            # files are uploaded in one stream.
+            self.node.shell.copy_directory(
+                self._local_path, node_script_path, files=self._files
+            )
             for file in self._files:
-                remote_path = node_script_path.joinpath(file)
-                source_path = self._local_path.joinpath(file)
-                self.node.shell.copy(source_path, remote_path)
-                self.node.shell.chmod(remote_path, 0o755)
+                self.node.shell.chmod(node_script_path.joinpath(file), 0o755)
             self._cwd = node_script_path
         else:
             self._cwd = self._local_path
@@ -124,6 +124,18 @@ class PerfMessage(MessageBase):
     test_date: datetime = datetime.utcnow()
     role: str = ""
     test_result_id: str = ""
+    # the raw samples of repeated measurements by metric names. The metric
+    # fields are set by the sample closest to medians.
+    samples: Optional[Dict[str, List[float]]] = None
+    # the statistics of samples by metric names, like median and confidence
+    # interval.
+    statistics: Optional[Dict[str, Dict[str, float]]] = None
+    # the topology of multi-pair measurements, like the kind, the count of
+    # pairs and the pair index or "aggregate". It's None for a single pair.
+    topology: Optional[Dict[str, Any]] = None
+    # the histograms of latency distributions by metric names. They are
+    # serialized LatencyHistogram, which can be merged across runs.
+    histograms: Optional[Dict[str, Dict[str, Any]]] = None
 
 
 T = TypeVar("T", bound=PerfMessage)
@@ -24,6 +24,7 @@ from lisa.feature import Features
 from lisa.nic import Nics, NicsBSD
 from lisa.operating_system import BSD, OperatingSystem
 from lisa.secret import add_secret
+from lisa.telemetry import TelemetrySampler
 from lisa.tools import Chmod, Df, Echo, Lsblk, Mkfs, Mount, Reboot, Uname, Wsl
 from lisa.tools.mkfs import FileSystem
 from lisa.util import (
@@ -31,6 +32,7 @@ from lisa.util import (
     InitializableMixin,
     LisaException,
     RequireUserPasswordException,
+    agent_server,
     constants,
     fields_to_dict,
     generate_strong_password,
@@ -40,10 +42,11 @@ from lisa.util import (
     plugin_manager,
     subclasses,
 )
+from lisa.util.agent import RemoteAgent
 from lisa.util.constants import PATH_REMOTE_ROOT
 from lisa.util.logger import Logger, create_file_handler, get_logger, remove_handler
 from lisa.util.parallel import run_in_parallel
-from lisa.util.process import ExecutableResult, Process, process_command
+from lisa.util.process import CommandBatch, ExecutableResult, Process, process_command
 from lisa.util.shell import LocalShell, Shell, SshShell, WslShell
 
 T = TypeVar("T")
@@ -94,6 +97,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
 
         # to be initialized when it's first used.
         self._nics: Optional[Nics] = None
+        self._telemetry: Optional[TelemetrySampler] = None
 
         # The working path will be created in remote node, when it's used.
         self._working_path: Optional[PurePath] = None
@@ -112,6 +116,8 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         self.capture_boot_time: bool = False
         self.capture_azure_information: bool = False
         self.capture_kernel_config: bool = False
+        self.use_remote_agent: bool = False
+        self._is_remote_agent_failed: bool = False
         self.has_checked_bash_prompt: bool = False
 
     @property
@@ -275,6 +281,73 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
             expected_exit_code_failure_message=expected_exit_code_failure_message,
         )
 
+    def execute_many(
+        self,
+        cmds: List[str],
+        sudo: bool = False,
+        no_error_log: bool = False,
+        no_info_log: bool = True,
+        no_debug_log: bool = False,
+        cwd: Optional[PurePath] = None,
+        timeout: int = 600,
+        update_envs: Optional[Dict[str, str]] = None,
+        encoding: str = "",
+        expected_exit_code: Optional[int] = None,
+        expected_exit_code_failure_message: str = "",
+    ) -> List[ExecutableResult]:
+        """
+        Runs commands in one shell session, and returns a result of each
+        command in the same order. It saves the round trips of starting a
+        session for each short command. Commands run by the shell one by one,
+        and failed commands don't stop others. The stderr is merged into the
+        stdout, and the elapsed is the time of all commands. The timeout is
+        for all commands, too.
+        """
+        if not cmds:
+            return []
+        if not self.is_posix:
+            # there is no posix shell to split outputs, so run one by one.
+            return [
+                self.execute(
+                    cmd,
+                    shell=True,
+                    sudo=sudo,
+                    no_error_log=no_error_log,
+                    no_info_log=no_info_log,
+                    no_debug_log=no_debug_log,
+                    cwd=cwd,
+                    timeout=timeout,
+                    update_envs=update_envs,
+                    encoding=encoding,
+                    expected_exit_code=expected_exit_code,
+                    expected_exit_code_failure_message=(
+                        expected_exit_code_failure_message
+                    ),
+                )
+                for cmd in cmds
+            ]
+
+        batch = CommandBatch(cmds)
+        result = self.execute(
+            batch.script,
+            shell=True,
+            sudo=sudo,
+            no_error_log=no_error_log,
+            no_info_log=no_info_log,
+            no_debug_log=no_debug_log,
+            cwd=cwd,
+            timeout=timeout,
+            update_envs=update_envs,
+            encoding=encoding,
+        )
+        results = batch.split_result(result)
+        if expected_exit_code is not None:
+            for item in results:
+                item.assert_exit_code(
+                    expected_exit_code, expected_exit_code_failure_message
+                )
+        return results
+
     def execute_async(
         self,
         cmd: str,
@@ -287,10 +360,12 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         cwd: Optional[PurePath] = None,
         update_envs: Optional[Dict[str, str]] = None,
         encoding: str = "",
+        buffer_lines: bool = False,
     ) -> Process:
         self.initialize()
         if isinstance(self, RemoteNode):
             self._check_bash_prompt()
+            self._check_remote_agent()
 
         return self._execute(
             cmd,
@@ -303,6 +378,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
             cwd=cwd,
             update_envs=update_envs,
             encoding=encoding,
+            buffer_lines=buffer_lines,
         )
 
     def cleanup(self) -> None:
@@ -313,11 +389,27 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
 
     def close(self) -> None:
         self.log.debug("closing node connection...")
+        if self._telemetry:
+            # the sampler uses the connection, so stop it first.
+            self._telemetry.stop()
         if self._shell:
             self._shell.close()
         if self._nics:
             self._nics = None
 
+    def get_telemetry(
+        self, interval: float = 1, capacity: int = 86400
+    ) -> TelemetrySampler:
+        """
+        returns the telemetry sampler of the node. The interval and capacity
+        are used, when it's created.
+        """
+        if not self._telemetry:
+            self._telemetry = TelemetrySampler(
+                self, interval=interval, capacity=capacity
+            )
+        return self._telemetry
+
     def get_pure_path(self, path: str) -> PurePath:
         # spurplus doesn't support PurePath, so it needs to resolve by the
         # node's os here.
@@ -469,6 +561,21 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         self.log.debug("mark node to dirty")
         self._is_dirty = True
 
+    def reset_state(self) -> None:
+        """
+        Discards states cached from the node, like installed tools. It's called
+        after the platform reverts the node to a snapshot, and the node is
+        initialized again on next use.
+        """
+        self.log.debug("reset node state")
+        self.close()
+        self.tools = Tools(self)
+        self._nics = None
+        self._telemetry = None
+        self._working_path = None
+        self._is_dirty = False
+        self._is_initialized = False
+
     def test_connection(self) -> bool:
         assert self._shell
         if not self._shell.is_remote:
@@ -530,6 +637,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         update_envs: Optional[Dict[str, str]] = None,
         encoding: str = "",
         command_splitter: Callable[..., List[str]] = process_command,
+        buffer_lines: bool = False,
     ) -> Process:
         cmd_id = str(randint(0, 10000))
         if not encoding:
@@ -547,6 +655,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
             cwd=cwd,
             update_envs=update_envs,
             command_splitter=command_splitter,
+            buffer_lines=buffer_lines,
         )
         return process
 
@@ -762,6 +871,49 @@ class RemoteNode(Node):
                     ssh_shell.bash_prompt = bash_prompt
             self.has_checked_bash_prompt = True
 
+    def _check_remote_agent(self) -> None:
+        # The agent is started before the first command, and it's started
+        # again, if the connection is closed, like after reboot. If it cannot
+        # be started, commands are run by ssh.
+        if not self.use_remote_agent or self._is_remote_agent_failed:
+            return
+        ssh_shell = cast(SshShell, self.shell)
+        if ssh_shell.agent and ssh_shell.agent.is_alive:
+            return
+        if not self.is_posix:
+            self._is_remote_agent_failed = True
+            return
+        try:
+            ssh_shell.agent = self._start_remote_agent()
+        except Exception as identifier:
+            self._is_remote_agent_failed = True
+            self.log.debug(f"commands run by ssh, failed to start agent: {identifier}")
+
+    def _start_remote_agent(self) -> RemoteAgent:
+        # use _execute, because execute checks the agent again.
+        result = self._execute(
+            "command -v python3", shell=True, no_info_log=True
+        ).wait_result(10)
+        if result.exit_code != 0:
+            raise LisaException("python3 is not found on the node")
+
+        ssh_shell = cast(SshShell, self.shell)
+        remote_path = self.working_path / "lisa_agent.py"
+        ssh_shell.copy(PurePath(agent_server.__file__), remote_path)
+        channel = ssh_shell.open_channel(f"python3 -u {remote_path}")
+        agent = RemoteAgent(
+            reader=channel.makefile("rb"),
+            writer=channel.makefile("wb"),
+            log=self.log,
+            close=channel.close,
+        )
+        if self.support_sudo:
+            # some distros need a tty to run sudo.
+            process = agent.spawn(["sudo", "-n", "true"])
+            agent.support_sudo = process.wait_for_result().return_code == 0
+        self.log.debug(f"the remote agent is started, sudo: {agent.support_sudo}")
+        return agent
+
     def _reset_password(self) -> bool:
         from lisa.features import PasswordExtension
 
@@ -973,6 +1125,7 @@ class WslContainerNode(GuestNode):
         update_envs: Optional[Dict[str, str]] = None,
         encoding: str = "",
         command_splitter: Callable[..., List[str]] = process_command,
+        buffer_lines: bool = False,
     ) -> Process:
         assert self.parent, self.__PARENT_ASSERT_MESSAGE
 
@@ -1052,6 +1205,7 @@ class WslContainerNode(GuestNode):
             update_envs=update_envs,
             encoding=encoding,
             command_splitter=_get_wsl_cmd,
+            buffer_lines=buffer_lines,
         )
 
 
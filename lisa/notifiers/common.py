@@ -1,6 +1,26 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-from lisa.messages import MessageBase, TestResultMessage
+import atexit
+import itertools
+import os
+from dataclasses import fields
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import IO, Any, Callable, Dict, Optional, Tuple
+
+from lisa.messages import MessageBase, PerfMessage, TestResultMessage
+from lisa.util.logger import get_logger
+
+# the default seconds between writes of buffered content.
+DEFAULT_FLUSH_INTERVAL = 1.0
+# the max count of pending entries. When it's reached, the entries are written
+# by the caller, so the memory is bounded, if the file is slower than messages.
+DEFAULT_MAX_PENDING = 1000
+
+# the common fields of perf messages, like the platform and the vm size.
+PERF_COMMON_FIELDS = set(x.name for x in fields(PerfMessage))
 
 
 def simplify_message(message: MessageBase) -> None:
@@ -12,3 +32,205 @@ def simplify_message(message: MessageBase) -> None:
         # log readability.
         description = message.information.get("description", "")
         message.information["description"] = f"<{len(description)} bytes>"
+
+
+def get_perf_fields(message: PerfMessage) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """
+    split fields of a perf message subclass to numbers and attributes. The
+    common fields of perf messages are not included.
+    """
+    numbers: Dict[str, float] = {}
+    attributes: Dict[str, Any] = {}
+    for item in fields(message):
+        if item.name in PERF_COMMON_FIELDS:
+            continue
+        value = getattr(message, item.name)
+        if isinstance(value, Enum):
+            attributes[item.name] = value.name
+        elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            numbers[item.name] = float(value)
+        else:
+            attributes[item.name] = value
+    return numbers, attributes
+
+
+class _PeriodicWriter:
+    """
+    The base of writers, which write pending content in a background thread
+    every flush interval, instead of on every message. Pending content is also
+    written on close, and on exit of the process, if the run is cancelled
+    before notifiers are finalized.
+    """
+
+    def __init__(self, path: Path, flush_interval: float) -> None:
+        self._path = path
+        self._flush_interval = flush_interval
+        self._log = get_logger("notifier", self.__class__.__name__)
+        # protects pending content
+        self._lock = Lock()
+        # serializes writing to the file
+        self._write_lock = Lock()
+        self._closed = Event()
+        self._thread: Optional[Thread] = None
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def flush(self) -> None:
+        with self._write_lock:
+            self._write_pending()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        finally:
+            with self._write_lock:
+                self._close_file()
+            atexit.unregister(self.close)
+
+    def _start(self) -> None:
+        if self._closed.is_set():
+            # A late write after close, like a message from another thread, is
+            # written immediately, and the file is closed again, so it's not
+            # left open.
+            with self._write_lock:
+                try:
+                    self._write_pending()
+                finally:
+                    self._close_file()
+            return
+        if self._flush_interval <= 0:
+            # write immediately, if it's not buffered.
+            self.flush()
+            return
+        if self._thread:
+            return
+        with self._lock:
+            if not self._thread:
+                self._thread = Thread(
+                    target=self._run, name=f"{self.__class__.__name__}_flusher"
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._closed.wait(self._flush_interval):
+            try:
+                self.flush()
+            except Exception as identifier:
+                # keep pending content, and retry in next interval.
+                self._log.debug(f"failed to write '{self._path}': {identifier}")
+
+    def _write_pending(self) -> None:
+        raise NotImplementedError()
+
+    def _close_file(self) -> None:
+        pass
+
+
+class BufferedWriter(_PeriodicWriter):
+    """
+    Appends text to a file in batches, and keeps the file open. If an entry is
+    written with a key, it supersedes the pending entry with the same key, so
+    only the latest state is written.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        super().__init__(path=path, flush_interval=flush_interval)
+        self._max_pending = max_pending
+        self._pending: Dict[Any, str] = {}
+        self._sequence = itertools.count()
+        self._file: Optional[IO[str]] = None
+
+    def write(self, text: str, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._pending[next(self._sequence)] = text
+            else:
+                # the superseded entry is removed, and the latest entry is
+                # written in the order of the latest update.
+                self._pending.pop(key, None)
+                self._pending[key] = text
+            is_full = len(self._pending) >= self._max_pending
+
+        if is_full and not self._closed.is_set():
+            self.flush()
+        else:
+            self._start()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            if not self._file:
+                self._file = open(self._path, "a")
+            self._file.write("".join(pending.values()))
+            self._file.flush()
+        except Exception:
+            # put back, so they are written in next time.
+            with self._lock:
+                pending.update(self._pending)
+                self._pending = pending
+            raise
+
+    def _close_file(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class SnapshotWriter(_PeriodicWriter):
+    """
+    Rewrites a file with the latest state. Updates between two writes are
+    coalesced into one write, and the content is rendered only when it's
+    written. The file is replaced atomically, so readers never see a partial
+    file.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        render: Callable[[], str],
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        super().__init__(path=path, flush_interval=flush_interval)
+        # Threading: render is called in the flusher thread, so it must be
+        # thread safe with updates.
+        self._render = render
+        self._is_dirty = False
+
+    def update(self) -> None:
+        with self._lock:
+            self._is_dirty = True
+        self._start()
+
+    def _write_pending(self) -> None:
+        with self._lock:
+            if not self._is_dirty:
+                return
+            self._is_dirty = False
+        try:
+            content = self._render()
+            temp_path = self._path.with_name(f"{self._path.name}.tmp")
+            with open(temp_path, "w") as f:
+                f.write(content)
+            os.replace(temp_path, self._path)
+        except Exception:
+            with self._lock:
+                self._is_dirty = True
+            raise
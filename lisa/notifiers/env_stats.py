@@ -3,13 +3,16 @@
 
 from dataclasses import dataclass, field
 from datetime import datetime
+from io import StringIO
+from threading import Lock
 from typing import Any, Dict, List, Optional, TextIO, Type
 
 from lisa import messages, notifier, schema
 from lisa.environment import EnvironmentMessage, EnvironmentStatus
 from lisa.messages import TestResultMessage
 from lisa.util import LisaException, constants
-from lisa.util.perf_timer import create_timer
+
+from .common import SnapshotWriter
 
 
 @dataclass
@@ -54,15 +57,19 @@ class EnvironmentStats(notifier.Notifier):
         return schema.Notifier
 
     def finalize(self) -> None:
-        self._update_information(True)
+        self._writer.close()
 
     def _received_message(self, message: messages.MessageBase) -> None:
-        if isinstance(message, TestResultMessage):
-            self._process_test_result_message(message)
-        elif isinstance(message, EnvironmentMessage):
-            self._process_environment_message(message)
-        else:
-            raise LisaException(f"unsupported message received, {type(message)}")
+        with self._lock:
+            if isinstance(message, TestResultMessage):
+                self._process_test_result_message(message)
+            elif isinstance(message, EnvironmentMessage):
+                self._process_environment_message(message)
+            else:
+                raise LisaException(f"unsupported message received, {type(message)}")
+        # the file is rewritten at most once per flush interval, no matter how
+        # many messages are received.
+        self._writer.update()
 
     def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
         return [TestResultMessage, EnvironmentMessage]
@@ -72,9 +79,9 @@ class EnvironmentStats(notifier.Notifier):
         env_path.mkdir(exist_ok=True, parents=True)
         self._file_path = env_path / "environment_stats.log"
 
-        self._last_updated_time = create_timer()
-        # result update at most 1 time per second
-        self._update_frequency = 1
+        # protects the information, which is rendered in the writer thread.
+        self._lock = Lock()
+        self._writer = SnapshotWriter(self._file_path, render=self._render)
         self._test_results: Dict[str, TestResultInformation] = {}
         self._environments: Dict[str, EnvironmentInformation] = {}
 
@@ -96,8 +103,6 @@ class EnvironmentStats(notifier.Notifier):
             if result_info not in environment_info.results:
                 environment_info.results.append(result_info)
 
-        self._update_information()
-
     def _process_environment_message(self, environment: EnvironmentMessage) -> None:
         env_info = self._environments.get(environment.name, None)
         if not env_info:
@@ -116,13 +121,11 @@ class EnvironmentStats(notifier.Notifier):
         elif environment.status == EnvironmentStatus.Deleted:
             env_info.deleted_time = datetime.now()
 
-        self._update_information(force=True)
-
-    def _update_information(self, force: bool = False) -> None:
-        if self._last_updated_time.elapsed(False) > self._update_frequency or force:
-            with open(self._file_path, "w") as f:
-                self._dump_environments(f)
-            self._last_updated_time = create_timer()
+    def _render(self) -> str:
+        with self._lock:
+            content = StringIO()
+            self._dump_environments(content)
+            return content.getvalue()
 
     def _dump_environments(self, f: TextIO) -> None:
         f.write(
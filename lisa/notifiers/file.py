@@ -10,13 +10,15 @@ from dataclasses_json import dataclass_json
 from lisa import messages, notifier, schema
 from lisa.util import constants
 
-from .common import simplify_message
+from .common import DEFAULT_FLUSH_INTERVAL, BufferedWriter, simplify_message
 
 
 @dataclass_json()
 @dataclass
 class ConsoleSchema(schema.Notifier):
     file_name: str = "messages.log"
+    # seconds between writes. 0 means write every message immediately.
+    flush_interval: float = DEFAULT_FLUSH_INTERVAL
 
 
 class Console(notifier.Notifier):
@@ -34,13 +36,13 @@ class Console(notifier.Notifier):
         return ConsoleSchema
 
     def finalize(self) -> None:
+        self._writer.close()
         return super().finalize()
 
     def _received_message(self, message: messages.MessageBase) -> None:
         simplify_message(message)
-        # write every time to refresh the content immediately.
-        with open(self._file_path, "a") as f:
-            f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S.%ff}: {message}\n")
+        # the file is kept open, and messages are written in batches.
+        self._writer.write(f"{datetime.now():%Y-%m-%d %H:%M:%S.%ff}: {message}\n")
 
     def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
         return [messages.MessageBase]
@@ -48,3 +50,6 @@ class Console(notifier.Notifier):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         runbook = cast(ConsoleSchema, self.runbook)
         self._file_path = constants.RUN_LOCAL_LOG_PATH / runbook.file_name
+        self._writer = BufferedWriter(
+            self._file_path, flush_interval=runbook.flush_interval
+        )
@@ -1,10 +1,13 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import os
+import shutil
 import xml.etree.ElementTree as ET  # noqa: N817
 from dataclasses import dataclass
 from pathlib import Path
 from typing import IO, Any, Dict, List, Optional, Type, cast
+from xml.sax.saxutils import quoteattr
 
 from dataclasses_json import dataclass_json
 
@@ -20,6 +23,7 @@ from lisa.messages import (
 )
 from lisa.notifier import Notifier
 from lisa.util import LisaException, constants
+from lisa.util.perf_timer import Timer, create_timer
 
 
 @dataclass_json()
@@ -28,6 +32,13 @@ class JUnitSchema(schema.Notifier):
     path: str = "lisa.junit.xml"
     # respect the original behavior, include subtest by default
     include_subtest: bool = True
+    # append test cases to spool files of suites, and assemble the report at
+    # checkpoints and the end, instead of rewriting the whole report on every
+    # test case. It's faster for runs with many test cases.
+    streaming: bool = False
+    # seconds between assembling the report in streaming mode. 0 means the
+    # report is assembled at the end only.
+    checkpoint_interval: int = 60
 
 
 class _TestSuiteInfo:
@@ -35,6 +46,9 @@ class _TestSuiteInfo:
         self.xml: ET.Element
         self.test_count: int = 0
         self.failed_count: int = 0
+        # test cases are appended to the file in streaming mode.
+        self.spool_path: Optional[Path] = None
+        self.spool_file: Optional[IO[Any]] = None
 
 
 class _TestCaseInfo:
@@ -61,11 +75,13 @@ class JUnit(Notifier):
         super().__init__(runbook=runbook)
 
         self._report_path: Path
-        self._report_file: IO[Any]
+        self._report_file: Optional[IO[Any]] = None
         self._testsuites: ET.Element
         self._testsuites_info: Dict[str, _TestSuiteInfo]
         self._testcases_info: Dict[str, _TestCaseInfo]
         self._xml_tree: ET.ElementTree
+        self._spool_path: Path
+        self._checkpoint_timer: Timer
 
     # Test runner is initializing.
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
@@ -73,31 +89,106 @@ class JUnit(Notifier):
 
         self._report_path = constants.RUN_LOCAL_LOG_PATH / runbook.path
 
-        # Open file now, to avoid errors occurring after all the tests have completed.
-        self._report_file = open(self._report_path, "wb")
-
         self._testsuites = ET.Element("testsuites")
         self._xml_tree = ET.ElementTree(self._testsuites)
 
         self._testsuites_info = {}
         self._testcases_info = {}
 
+        if runbook.streaming:
+            self._spool_path = self._report_path.with_name(
+                f"{self._report_path.name}.spool"
+            )
+            self._spool_path.mkdir(parents=True, exist_ok=True)
+            self._checkpoint_timer = create_timer()
+            # The report is replaced at checkpoints, so it's not kept open,
+            # because an open file cannot be replaced on Windows. Write an empty
+            # report now, to avoid errors occurring after all the tests have
+            # completed.
+            self._assemble_results()
+        else:
+            # Open file now, to avoid errors occurring after all the tests have
+            # completed.
+            self._report_file = open(self._report_path, "wb")
+
     # Test runner is closing.
     def finalize(self) -> None:
+        runbook: JUnitSchema = cast(JUnitSchema, self.runbook)
         try:
-            self._write_results()
+            if runbook.streaming:
+                for testsuite_info in self._testsuites_info.values():
+                    if testsuite_info.spool_file:
+                        testsuite_info.spool_file.close()
+                        testsuite_info.spool_file = None
+                self._assemble_results()
+                # all test cases are in the report, the spool is not needed.
+                shutil.rmtree(self._spool_path, ignore_errors=True)
+            else:
+                self._write_results()
 
         finally:
-            self._report_file.close()
+            if self._report_file:
+                self._report_file.close()
 
         self._log.info(f"JUnit: {self._report_path}")
 
     def _write_results(self) -> None:
+        runbook: JUnitSchema = cast(JUnitSchema, self.runbook)
+        if runbook.streaming:
+            # the report is assembled at checkpoints, not on every change.
+            if (
+                runbook.checkpoint_interval > 0
+                and self._checkpoint_timer.elapsed(False) >= runbook.checkpoint_interval
+            ):
+                self._assemble_results()
+                self._checkpoint_timer.reset()
+            return
+
+        assert self._report_file
         self._report_file.truncate(0)
         self._report_file.seek(0)
         self._xml_tree.write(self._report_file, xml_declaration=True, encoding="utf-8")
         self._report_file.flush()
 
+    def _assemble_results(self) -> None:
+        # Write the report to a temp file, and then replace the report, so the
+        # report is always complete, even the run is killed at any time.
+        self._update_counts()
+        temp_path = self._report_path.with_name(f"{self._report_path.name}.tmp")
+        with open(temp_path, "wb") as report_file:
+            report_file.write(b"<?xml version='1.0' encoding='utf-8'?>\n")
+            report_file.write(self._get_start_tag(self._testsuites))
+            for testsuite_info in self._testsuites_info.values():
+                report_file.write(self._get_start_tag(testsuite_info.xml))
+                if testsuite_info.spool_file:
+                    testsuite_info.spool_file.flush()
+                if testsuite_info.spool_path and testsuite_info.spool_path.exists():
+                    with open(testsuite_info.spool_path, "rb") as spool_file:
+                        shutil.copyfileobj(spool_file, report_file)
+                report_file.write(b"</testsuite>")
+            report_file.write(b"</testsuites>")
+            report_file.flush()
+            os.fsync(report_file.fileno())
+        os.replace(temp_path, self._report_path)
+
+    def _get_start_tag(self, element: ET.Element) -> bytes:
+        attributes = "".join(
+            f" {key}={quoteattr(value)}" for key, value in element.attrib.items()
+        )
+        return f"<{element.tag}{attributes}>".encode("utf-8")
+
+    def _write_test_case(
+        self, testsuite_info: _TestSuiteInfo, testcase: ET.Element
+    ) -> None:
+        if not testsuite_info.spool_file:
+            assert testsuite_info.spool_path
+            testsuite_info.spool_file = open(testsuite_info.spool_path, "ab")
+        testsuite_info.spool_file.write(
+            ET.tostring(testcase, encoding="unicode").encode("utf-8")
+        )
+        # flush every test case, so the spool keeps results of a crashed run.
+        testsuite_info.spool_file.flush()
+
     # The types of messages that this class supports.
     def _subscribed_message_type(self) -> List[Type[MessageBase]]:
         subscribed_types = [TestResultMessage, TestRunMessage]
@@ -159,6 +250,12 @@ class JUnit(Notifier):
             timestamp = message.time.replace(tzinfo=None).isoformat(timespec="seconds")
             testsuite_info.xml.attrib["timestamp"] = timestamp
 
+            runbook: JUnitSchema = cast(JUnitSchema, self.runbook)
+            if runbook.streaming:
+                testsuite_info.spool_path = (
+                    self._spool_path / f"testsuite_{len(self._testsuites_info)}.xml"
+                )
+
             self._testsuites_info[message.suite_full_name] = testsuite_info
 
             # Write out current results to file.
@@ -177,6 +274,10 @@ class JUnit(Notifier):
 
     # Test run completed message.
     def _test_run_completed(self, message: TestRunMessage) -> None:
+        self._update_counts()
+        self._testsuites.attrib["time"] = self._get_elapsed_str(message.elapsed)
+
+    def _update_counts(self) -> None:
         total_tests = 0
         total_failures = 0
 
@@ -188,7 +289,6 @@ class JUnit(Notifier):
             total_tests += testsuite_info.test_count
             total_failures += testsuite_info.failed_count
 
-        self._testsuites.attrib["time"] = self._get_elapsed_str(message.elapsed)
         self._testsuites.attrib["tests"] = str(total_tests)
         self._testsuites.attrib["failures"] = str(total_failures)
         self._testsuites.attrib["errors"] = "0"
@@ -295,7 +395,12 @@ class JUnit(Notifier):
         if not testsuite_info:
             raise LisaException("Test suite not started.")
 
-        testcase = ET.SubElement(testsuite_info.xml, "testcase")
+        runbook: JUnitSchema = cast(JUnitSchema, self.runbook)
+        if runbook.streaming:
+            # the test case is kept in the spool file, not in memory.
+            testcase = ET.Element("testcase")
+        else:
+            testcase = ET.SubElement(testsuite_info.xml, "testcase")
         testcase.attrib["name"] = message.name
         testcase.attrib["classname"] = class_name
         testcase.attrib["time"] = self._get_elapsed_str(elapsed)
@@ -316,6 +421,9 @@ class JUnit(Notifier):
 
         testsuite_info.test_count += 1
 
+        if runbook.streaming:
+            self._write_test_case(testsuite_info, testcase)
+
         # Write out current results to file.
         self._write_results()
 
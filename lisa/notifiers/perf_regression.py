@@ -0,0 +1,351 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, NamedTuple, Optional, Type, cast
+
+from dataclasses_json import dataclass_json
+from marshmallow import validate
+
+from lisa import messages, notifier, schema
+from lisa.messages import PerfMessage, SubTestMessage, TestResultMessage, TestStatus
+from lisa.util import LisaException, constants, field_metadata, hookimpl
+from lisa.util import perf_statistics as stats
+from lisa.util import plugin_manager
+
+from .common import get_perf_fields
+
+PERF_BASELINE_FILE_NAME = "perf_baseline.db"
+
+ON_REGRESSION_FAIL = "fail"
+ON_REGRESSION_WARN = "warn"
+
+# numeric fields, which describe how the test runs, instead of results. They
+# are part of the baseline key, so results of different settings are not mixed.
+PARAMETER_FIELDS = {
+    "block_size",
+    "buffer_size",
+    "buffer_size_bytes",
+    "connections_num",
+    "core_count",
+    "disk_count",
+    "frequency",
+    "interval_us",
+    "iodepth",
+    "number_of_receivers",
+    "number_of_senders",
+    "numjob",
+    "packet_size_kbytes",
+    "qdepth",
+    "send_buffer_size",
+}
+
+# the direction of metrics is decided by names. Metrics without a direction,
+# like packet counts, are not analyzed.
+_HIGHER_IS_BETTER_PATTERN = re.compile(
+    r"(throughput|iops|pps|_ops|bandwidth)", re.IGNORECASE
+)
+_LOWER_IS_BETTER_PATTERN = re.compile(
+    r"(lat|_time|_sec|retrans|data_loss|cycles)", re.IGNORECASE
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS baselines (
+    tool TEXT,
+    test_case_name TEXT,
+    vmsize TEXT,
+    distro_version TEXT,
+    kernel_version TEXT,
+    data_path TEXT,
+    variant TEXT,
+    metric TEXT NOT NULL,
+    value REAL,
+    run_id TEXT,
+    test_result_id TEXT,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_baselines_key ON baselines (
+    tool, test_case_name, vmsize, distro_version, kernel_version, data_path,
+    variant, metric, time
+);
+"""
+
+
+class BaselineKey(NamedTuple):
+    tool: str
+    test_case_name: str
+    vmsize: str
+    distro_version: str
+    kernel_version: str
+    data_path: str
+    # the parameters and attributes of the message in json, like the block size
+    # of disk tests.
+    variant: str
+    metric: str
+
+
+def get_metric_direction(name: str) -> Optional[bool]:
+    """
+    returns True, if higher value is better. False, if lower value is better.
+    None, if it's unknown.
+    """
+    if name in PARAMETER_FIELDS:
+        return None
+    if _HIGHER_IS_BETTER_PATTERN.search(name):
+        return True
+    if _LOWER_IS_BETTER_PATTERN.search(name):
+        return False
+    return None
+
+
+def get_perf_samples(message: PerfMessage) -> Dict[BaselineKey, float]:
+    numbers, attributes = get_perf_fields(message)
+    variant_fields: Dict[str, Any] = {
+        key: value for key, value in numbers.items() if key in PARAMETER_FIELDS
+    }
+    variant_fields.update(attributes)
+    variant_fields["type"] = type(message).__name__
+    variant_fields["protocol_type"] = str(message.protocol_type)
+    variant_fields["role"] = message.role
+    if message.topology:
+        variant_fields["topology"] = message.topology
+    variant = json.dumps(variant_fields, sort_keys=True, default=str)
+
+    samples: Dict[BaselineKey, float] = {}
+    for name, value in numbers.items():
+        # fields, which are not set by the tool, are 0.
+        if get_metric_direction(name) is None or value == 0:
+            continue
+        key = BaselineKey(
+            tool=message.tool,
+            test_case_name=message.test_case_name,
+            vmsize=message.vmsize,
+            distro_version=message.distro_version,
+            kernel_version=message.kernel_version,
+            data_path=message.data_path,
+            variant=variant,
+            metric=name,
+        )
+        samples[key] = value
+    return samples
+
+
+class PerfBaselineStore:
+    """
+    A SQLite database of perf samples of previous runs, which are the baselines
+    of new results.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        self._lock = Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def get(self, key: BaselineKey, limit: int) -> List[float]:
+        """
+        returns the latest samples of the key.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT value FROM baselines WHERE tool=? AND test_case_name=? "
+                "AND vmsize=? AND distro_version=? AND kernel_version=? "
+                "AND data_path=? AND variant=? AND metric=? "
+                "ORDER BY time DESC LIMIT ?",
+                (*key, limit),
+            ).fetchall()
+        return [x[0] for x in rows]
+
+    def add(self, samples: Dict[BaselineKey, List[float]], test_result_id: str) -> None:
+        time = datetime.utcnow().isoformat()
+        rows = [
+            (*key, value, constants.RUN_ID, test_result_id, time)
+            for key, values in samples.items()
+            for value in values
+        ]
+        if not rows:
+            return
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(
+                    "INSERT INTO baselines VALUES (?,?,?,?,?,?,?,?,?,?,?,?)", rows
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+
+@dataclass_json()
+@dataclass
+class PerfRegressionSchema(schema.Notifier):
+    # the path of baseline database. The default path is in the cache folder.
+    path: str = ""
+    # fail: send a failed sub test result for each regressed metric.
+    # warn: log a warning only.
+    on_regression: str = field(
+        default=ON_REGRESSION_FAIL,
+        metadata=field_metadata(
+            validate=validate.OneOf([ON_REGRESSION_FAIL, ON_REGRESSION_WARN])
+        ),
+    )
+    # the min relative change of medians to be a regression, 0.05 is 5%.
+    threshold: float = 0.05
+    confidence: float = stats.DEFAULT_CONFIDENCE
+    # no analysis, if there are fewer samples in baseline.
+    min_baseline_samples: int = 5
+    # use the latest samples only, so the baseline follows the history.
+    max_baseline_samples: int = 50
+    # add samples of regressed metrics to the baseline.
+    update_baseline_on_regression: bool = False
+
+
+@dataclass
+class _Regression:
+    key: BaselineKey
+    comparison: stats.Comparison
+
+
+class PerfRegression(notifier.Notifier):
+    """
+    Compare perf messages of a test case with the baseline of previous runs,
+    when the test case completes. Significant regressions are reported as
+    failed sub test results, or warnings.
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "perf_regression"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return PerfRegressionSchema
+
+    def finalize(self) -> None:
+        plugin_manager.unregister(self)
+        self._store.close()
+
+    @hookimpl
+    def update_test_result_message(self, message: TestResultMessage) -> None:
+        # The hook is called in the thread of test case, before the result is
+        # sent. So the regressions are reported in the test case.
+        if not message.is_completed:
+            return
+        with self._lock:
+            samples = self._samples.pop(message.id_, None)
+        if not samples:
+            return
+
+        regressions = self._analyze(samples)
+        if regressions:
+            self._report(message, regressions)
+
+        runbook = cast(PerfRegressionSchema, self.runbook)
+        regressed_keys = set(x.key for x in regressions)
+        self._store.add(
+            {
+                key: values
+                for key, values in samples.items()
+                if key not in regressed_keys or runbook.update_baseline_on_regression
+            },
+            test_result_id=message.id_,
+        )
+
+    def _received_message(self, message: messages.MessageBase) -> None:
+        if not isinstance(message, PerfMessage):
+            raise LisaException(f"Received unsubscribed message type: {message.type}")
+        with self._lock:
+            case_samples = self._samples.setdefault(message.test_result_id, {})
+            for key, value in get_perf_samples(message).items():
+                # use all samples of repeated measurements, if they exist.
+                values = message.samples.get(key.metric) if message.samples else None
+                case_samples.setdefault(key, []).extend(values or [value])
+
+    def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
+        return [PerfMessage]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        runbook = cast(PerfRegressionSchema, self.runbook)
+        path = (
+            Path(runbook.path)
+            if runbook.path
+            else constants.CACHE_PATH / PERF_BASELINE_FILE_NAME
+        )
+        self._store = PerfBaselineStore(path)
+        self._lock = Lock()
+        # samples of running test cases, the key is the test result id.
+        self._samples: Dict[str, Dict[BaselineKey, List[float]]] = {}
+        plugin_manager.register(self)
+
+    def _analyze(self, samples: Dict[BaselineKey, List[float]]) -> List[_Regression]:
+        runbook = cast(PerfRegressionSchema, self.runbook)
+        regressions: List[_Regression] = []
+        for key, values in samples.items():
+            baseline = self._store.get(key, runbook.max_baseline_samples)
+            if len(baseline) < runbook.min_baseline_samples:
+                self._log.debug(
+                    f"skipped {key.test_case_name}.{key.metric}, "
+                    f"not enough baseline samples: {len(baseline)}"
+                )
+                continue
+            higher_is_better = get_metric_direction(key.metric)
+            assert higher_is_better is not None
+            comparison = stats.compare(
+                baseline=stats.remove_outliers(baseline),
+                current=values,
+                higher_is_better=higher_is_better,
+                threshold=runbook.threshold,
+                confidence=runbook.confidence,
+            )
+            if comparison.is_regression:
+                regressions.append(_Regression(key=key, comparison=comparison))
+        return regressions
+
+    def _report(
+        self, message: TestResultMessage, regressions: List[_Regression]
+    ) -> None:
+        runbook = cast(PerfRegressionSchema, self.runbook)
+        for regression in regressions:
+            comparison = regression.comparison
+            text = (
+                f"{regression.key.metric} regressed {comparison.change:.1%} "
+                f"(CI {comparison.change_lower:.1%} ~ "
+                f"{comparison.change_upper:.1%}), median "
+                f"{comparison.current_median:.3f} vs baseline "
+                f"{comparison.baseline_median:.3f}, variant: {regression.key.variant}"
+            )
+            if runbook.on_regression == ON_REGRESSION_WARN:
+                self._log.warning(f"{message.name}: {text}")
+                continue
+
+            sub_message = SubTestMessage(
+                id_=message.id_,
+                name=f"{message.name}.regression.{regression.key.metric}",
+                status=TestStatus.FAILED,
+                message=text,
+                elapsed=message.elapsed,
+                parent_test=message.name,
+                information=dict(message.information),
+            )
+            notifier.notify(sub_message)
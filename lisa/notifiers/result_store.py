@@ -0,0 +1,439 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
+
+from dataclasses_json import dataclass_json
+
+from lisa import messages, notifier, schema
+from lisa.messages import (
+    PerfMessage,
+    SubTestMessage,
+    TestResultMessage,
+    TestResultMessageBase,
+    TestRunMessage,
+)
+from lisa.util import LisaException, constants
+
+from .common import get_perf_fields
+
+RESULT_STORE_FILE_NAME = "results.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_name TEXT,
+    runbook_name TEXT,
+    test_project TEXT,
+    test_pass TEXT,
+    tags TEXT,
+    status TEXT,
+    time TEXT,
+    elapsed REAL,
+    message TEXT
+);
+CREATE TABLE IF NOT EXISTS test_results (
+    run_id TEXT NOT NULL,
+    result_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT,
+    suite_name TEXT,
+    parent_test TEXT,
+    status TEXT,
+    message TEXT,
+    time TEXT,
+    elapsed REAL,
+    platform TEXT,
+    location TEXT,
+    vmsize TEXT,
+    image TEXT,
+    kernel_version TEXT,
+    information TEXT,
+    UNIQUE (run_id, result_id, name)
+);
+CREATE INDEX IF NOT EXISTS ix_test_results_run_id ON test_results (run_id);
+CREATE INDEX IF NOT EXISTS ix_test_results_name ON test_results (name);
+CREATE INDEX IF NOT EXISTS ix_test_results_platform ON test_results (platform);
+CREATE INDEX IF NOT EXISTS ix_test_results_vmsize ON test_results (vmsize);
+CREATE INDEX IF NOT EXISTS ix_test_results_kernel_version
+    ON test_results (kernel_version);
+CREATE TABLE IF NOT EXISTS perf_metrics (
+    run_id TEXT NOT NULL,
+    test_result_id TEXT,
+    test_case_name TEXT,
+    type TEXT,
+    tool TEXT,
+    platform TEXT,
+    location TEXT,
+    vmsize TEXT,
+    kernel_version TEXT,
+    distro_version TEXT,
+    protocol_type TEXT,
+    data_path TEXT,
+    role TEXT,
+    test_date TEXT,
+    metric TEXT NOT NULL,
+    value REAL,
+    attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_perf_metrics_run_id ON perf_metrics (run_id);
+CREATE INDEX IF NOT EXISTS ix_perf_metrics_case_metric
+    ON perf_metrics (test_case_name, metric);
+CREATE INDEX IF NOT EXISTS ix_perf_metrics_platform ON perf_metrics (platform);
+CREATE INDEX IF NOT EXISTS ix_perf_metrics_vmsize ON perf_metrics (vmsize);
+CREATE INDEX IF NOT EXISTS ix_perf_metrics_kernel_version
+    ON perf_metrics (kernel_version);
+"""
+
+# the filters, which can be used in queries. The key is the argument name, and
+# the value is the column name.
+RESULT_FILTERS = {
+    "run_id": "run_id",
+    "name": "name",
+    "platform": "platform",
+    "vmsize": "vmsize",
+    "kernel_version": "kernel_version",
+    "status": "status",
+}
+PERF_FILTERS = {
+    "run_id": "run_id",
+    "name": "test_case_name",
+    "platform": "platform",
+    "vmsize": "vmsize",
+    "kernel_version": "kernel_version",
+    "metric": "metric",
+}
+
+
+def get_default_result_store_path() -> Path:
+    # the store is shared by runs, so it's in the cache folder instead of the
+    # log folder of this run.
+    return constants.CACHE_PATH / RESULT_STORE_FILE_NAME
+
+
+def get_test_durations(
+    parent_test: str, path: Optional[Path] = None
+) -> Dict[str, float]:
+    """
+    Returns historical durations of sub tests from the result store. It's used
+    to balance shards of long running suites. It returns empty, if there is no
+    store yet.
+    """
+    path = path or get_default_result_store_path()
+    if not path.exists():
+        return {}
+    store = ResultStore(path)
+    try:
+        return store.query_durations(parent_test)
+    finally:
+        store.close()
+
+
+@dataclass
+class _PerfMetric:
+    message: PerfMessage
+    metric: str
+    value: float
+    attributes: Dict[str, Any]
+
+
+class ResultStore:
+    """
+    A SQLite database of test results and perf metrics. Results of all runs are
+    appended to the same database, so they can be queried and compared by run
+    id, case name, platform, vm size and kernel version.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # messages are received in threads of notifier, so the connection is
+        # shared by threads, and protected by the lock.
+        self._connection = sqlite3.connect(
+            str(path), check_same_thread=False, isolation_level=None
+        )
+        self._connection.row_factory = sqlite3.Row
+        self._lock = Lock()
+        with self._lock:
+            # WAL allows queries from other processes, when a run is writing.
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def write(
+        self,
+        run_id: str,
+        runs: Optional[List[TestRunMessage]] = None,
+        results: Optional[List[TestResultMessageBase]] = None,
+        perf_messages: Optional[List[PerfMessage]] = None,
+    ) -> None:
+        """
+        write a batch of messages in one transaction.
+        """
+        run_rows = [self._get_run_row(run_id, x) for x in runs or []]
+        result_rows = [self._get_result_row(run_id, x) for x in results or []]
+        metric_rows = [
+            self._get_metric_row(run_id, x)
+            for message in perf_messages or []
+            for x in self._get_perf_metrics(message)
+        ]
+        if not (run_rows or result_rows or metric_rows):
+            return
+
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO runs VALUES (?,?,?,?,?,?,?,?,?,?)",
+                    run_rows,
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO test_results "
+                    "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    result_rows,
+                )
+                connection.executemany(
+                    "INSERT INTO perf_metrics "
+                    "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                    metric_rows,
+                )
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def query_results(self, limit: int = 100, **filters: str) -> List[Dict[str, Any]]:
+        """
+        returns the latest test results, which match filters.
+        """
+        where, parameters = self._get_where(RESULT_FILTERS, filters)
+        return self._query(
+            "SELECT run_id, name, status, platform, vmsize, kernel_version, "
+            f"elapsed, time, message FROM test_results {where} "
+            "ORDER BY time DESC LIMIT ?",
+            parameters + [limit],
+        )
+
+    def query_perf(self, limit: int = 100, **filters: str) -> List[Dict[str, Any]]:
+        """
+        returns aggregated perf metrics, which match filters. The metrics are
+        grouped by case, metric, run, platform, vm size and kernel version, so
+        the same metric can be compared among runs.
+        """
+        where, parameters = self._get_where(PERF_FILTERS, filters)
+        return self._query(
+            "SELECT test_case_name, metric, run_id, platform, vmsize, "
+            "kernel_version, COUNT(value) AS count, AVG(value) AS average, "
+            "MIN(value) AS minimum, MAX(value) AS maximum, "
+            f"MIN(test_date) AS test_date FROM perf_metrics {where} "
+            "GROUP BY test_case_name, metric, run_id, platform, vmsize, "
+            "kernel_version ORDER BY test_case_name, metric, test_date DESC "
+            "LIMIT ?",
+            parameters + [limit],
+        )
+
+    def query_durations(self, parent_test: str, limit: int = 10000) -> Dict[str, float]:
+        """
+        returns the average durations of sub tests of a test case in seconds.
+        The duration is saved in the information, because the elapsed of a sub
+        test is the elapsed of its test case.
+        """
+        rows = self._query(
+            "SELECT name, information FROM test_results "
+            "WHERE parent_test = ? AND type = ? ORDER BY time DESC LIMIT ?",
+            [parent_test, SubTestMessage.type, limit],
+        )
+        values: Dict[str, List[float]] = {}
+        for row in rows:
+            duration = json.loads(row["information"] or "{}").get("duration")
+            if isinstance(duration, (int, float)):
+                values.setdefault(row["name"], []).append(float(duration))
+        return {name: sum(x) / len(x) for name, x in values.items()}
+
+    def _query(self, sql: str, parameters: List[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(sql, parameters).fetchall()
+        return [dict(x) for x in rows]
+
+    def _get_where(
+        self, supported: Dict[str, str], filters: Dict[str, str]
+    ) -> Tuple[str, List[Any]]:
+        conditions: List[str] = []
+        parameters: List[Any] = []
+        for key, value in filters.items():
+            if not value:
+                continue
+            column = supported.get(key)
+            if not column:
+                raise LisaException(f"unsupported filter: '{key}'")
+            # support wildcards, like "%verify%".
+            conditions.append(f"{column} LIKE ?")
+            parameters.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, parameters
+
+    def _get_run_row(self, run_id: str, message: TestRunMessage) -> Tuple[Any, ...]:
+        return (
+            run_id,
+            message.run_name,
+            message.runbook_name,
+            message.test_project,
+            message.test_pass,
+            ",".join(message.tags or []),
+            message.status.name,
+            message.time.isoformat(),
+            message.elapsed,
+            message.message,
+        )
+
+    def _get_result_row(
+        self, run_id: str, message: TestResultMessageBase
+    ) -> Tuple[Any, ...]:
+        information = message.information
+        return (
+            run_id,
+            message.id_,
+            message.name,
+            message.type,
+            getattr(message, "suite_name", ""),
+            getattr(message, "parent_test", ""),
+            message.status.name,
+            message.message,
+            message.time.isoformat(),
+            message.elapsed,
+            information.get("platform", ""),
+            information.get("location", ""),
+            information.get("vmsize", ""),
+            information.get("image", ""),
+            information.get("kernel_version", ""),
+            json.dumps(information, default=str),
+        )
+
+    def _get_metric_row(self, run_id: str, metric: _PerfMetric) -> Tuple[Any, ...]:
+        message = metric.message
+        return (
+            run_id,
+            message.test_result_id,
+            message.test_case_name,
+            type(message).__name__,
+            message.tool,
+            message.platform,
+            message.location,
+            message.vmsize,
+            message.kernel_version,
+            message.distro_version,
+            str(message.protocol_type),
+            message.data_path,
+            message.role,
+            message.test_date.isoformat(),
+            metric.metric,
+            metric.value,
+            json.dumps(metric.attributes, default=str),
+        )
+
+    def _get_perf_metrics(self, message: PerfMessage) -> List[_PerfMetric]:
+        values, attributes = get_perf_fields(message)
+        return [
+            _PerfMetric(
+                message=message, metric=name, value=value, attributes=attributes
+            )
+            for name, value in values.items()
+        ]
+
+
+@dataclass_json()
+@dataclass
+class ResultStoreSchema(schema.Notifier):
+    # the path of database. The default path is in the cache folder, so results
+    # of runs are accumulated in one database.
+    path: str = ""
+    # messages are written in one transaction, when the count of pending
+    # messages reaches it.
+    batch_size: int = 100
+
+
+class ResultStoreNotifier(notifier.Notifier):
+    """
+    Append test results and perf metrics into a SQLite database, so the history
+    can be queried by "lisa query" without parsing log files.
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "result_store"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return ResultStoreSchema
+
+    def finalize(self) -> None:
+        try:
+            self._flush()
+        finally:
+            self._store.close()
+        self._log.info(f"results are saved to: {self._store.path}")
+
+    def _received_message(self, message: messages.MessageBase) -> None:
+        with self._lock:
+            if isinstance(message, TestRunMessage):
+                self._runs.append(message)
+                # the run status is important, so it's not batched.
+                self._flush_locked()
+                return
+            elif isinstance(message, TestResultMessage):
+                if not message.is_completed:
+                    return
+                self._results.append(message)
+            elif isinstance(message, SubTestMessage):
+                self._results.append(message)
+            elif isinstance(message, PerfMessage):
+                self._perf_messages.append(message)
+            else:
+                raise LisaException(
+                    f"Received unsubscribed message type: {message.type}"
+                )
+
+            runbook = cast(ResultStoreSchema, self.runbook)
+            pending_count = len(self._results) + len(self._perf_messages)
+            if pending_count >= runbook.batch_size:
+                self._flush_locked()
+
+    def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
+        return [TestRunMessage, TestResultMessage, SubTestMessage, PerfMessage]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        runbook = cast(ResultStoreSchema, self.runbook)
+        path = Path(runbook.path) if runbook.path else get_default_result_store_path()
+        self._store = ResultStore(path)
+        self._lock = Lock()
+        self._runs: List[TestRunMessage] = []
+        self._results: List[TestResultMessageBase] = []
+        self._perf_messages: List[PerfMessage] = []
+
+    def _flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        runs, self._runs = self._runs, []
+        results, self._results = self._results, []
+        perf_messages, self._perf_messages = self._perf_messages, []
+        self._store.write(
+            run_id=constants.RUN_ID,
+            runs=runs,
+            results=results,
+            perf_messages=perf_messages,
+        )
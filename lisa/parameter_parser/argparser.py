@@ -123,4 +123,46 @@ def parse_args() -> Namespace:
         support_variable(sub_parser)
         support_debug(sub_parser)
 
+    # Entry point for 'query'. It reads the result store, so no runbook needed.
+    query_parser = subparsers.add_parser(constants.QUERY)
+    query_parser.set_defaults(func=commands.query)
+    query_parser.add_argument(
+        "--type",
+        "-t",
+        dest="type",
+        choices=[constants.QUERY_RESULT, constants.QUERY_PERF],
+        default=constants.QUERY_RESULT,
+        help="query test results, or aggregated perf metrics",
+    )
+    query_parser.add_argument(
+        "--db",
+        type=Path,
+        dest="db",
+        help="the path of result store. The default is the one in cache folder",
+    )
+    for name in ["run_id", "name", "platform", "vmsize", "kernel_version"]:
+        query_parser.add_argument(
+            f"--{name}",
+            dest=name,
+            help=f"filter by {name}, it supports wildcards like %%value%%",
+        )
+    query_parser.add_argument(
+        "--status",
+        dest="status",
+        help="filter test results by status, like FAILED",
+    )
+    query_parser.add_argument(
+        "--metric",
+        dest="metric",
+        help="filter perf metrics by metric name",
+    )
+    query_parser.add_argument(
+        "--limit",
+        type=int,
+        dest="limit",
+        default=100,
+        help="the max count of returned rows",
+    )
+    support_debug(query_parser)
+
     return parser.parse_args()
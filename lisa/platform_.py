@@ -6,7 +6,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from enum import Enum
 from functools import partial
-from typing import Any, Dict, List, Type, cast
+from typing import Any, Dict, List, Set, Type, cast
 
 from lisa import schema
 from lisa.environment import Environment, EnvironmentStatus
@@ -48,6 +48,8 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
     def __init__(self, runbook: schema.Platform) -> None:
         super().__init__(runbook)
         self._log = get_logger("", self.type_name())
+        # names of environments, which have a partial snapshot only.
+        self._snapshot_failed_environments: Set[str] = set()
         plugin_manager.register(self)
 
     @classmethod
@@ -94,6 +96,19 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
     def _delete_environment(self, environment: Environment, log: Logger) -> None:
         raise NotImplementedError()
 
+    def _snapshot_environment(self, environment: Environment, log: Logger) -> None:
+        """
+        Saves the state of a connected environment, so it can be reverted to
+        the state by _reset_environment. By default, it's not supported.
+        """
+        pass
+
+    def _is_environment_resettable(self, environment: Environment) -> bool:
+        return False
+
+    def _reset_environment(self, environment: Environment, log: Logger) -> None:
+        raise NotImplementedError()
+
     def _get_environment_information(self, environment: Environment) -> Dict[str, str]:
         return {}
 
@@ -193,12 +208,50 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
             node.capture_kernel_config = (
                 platform_runbook.capture_kernel_config_information
             )
+            node.use_remote_agent = platform_runbook.use_remote_agent
 
             if platform_runbook.guest_enabled:
                 self._initialize_guest_nodes(node)
 
         log.info(f"deployed in {timer}")
 
+    def snapshot_environment(self, environment: Environment) -> None:
+        log = get_logger(f"snapshot[{environment.name}]", parent=self._log)
+        try:
+            self._snapshot_environment(environment, log)
+        except Exception:
+            # the environment can't be reverted to a partial snapshot.
+            self._snapshot_failed_environments.add(environment.name)
+            raise
+        self._snapshot_failed_environments.discard(environment.name)
+
+    def is_environment_resettable(self, environment: Environment) -> bool:
+        """
+        return True, if the environment can be reverted to its snapshot.
+        """
+        if environment.name in self._snapshot_failed_environments:
+            return False
+        return self._is_environment_resettable(environment)
+
+    def reset_environment(self, environment: Environment) -> None:
+        """
+        Reverts the environment to its snapshot, which is much faster than
+        deleting and deploying it again. The nodes are initialized again on
+        next use, because the states cached from them are discarded.
+        """
+        log = get_logger(f"reset[{environment.name}]", parent=self._log)
+        log.info(f"resetting environment: {environment.name}")
+        timer = create_timer()
+        # the connections are broken by reverting.
+        environment.close()
+        self._reset_environment(environment, log)
+        for node in environment.nodes.list():
+            node.reset_state()
+            # features may cache states of nodes too.
+            node.features = Features(node, self)
+        environment.reset_state()
+        log.info(f"reset in {timer}")
+
     def delete_environment(self, environment: Environment) -> None:
         log = get_logger(f"del[{environment.name}]", parent=self._log)
 
@@ -12,6 +12,7 @@ from lisa import (
     notifier,
     schema,
     search_space,
+    telemetry,
     transformer,
 )
 from lisa.action import ActionStatus
@@ -34,7 +35,13 @@ from lisa.util import (
     deep_update_dict,
     is_unittest,
 )
+from lisa.util.case_duration import (
+    DurationHistory,
+    get_duration_history,
+    predict_makespan,
+)
 from lisa.util.parallel import Task, check_cancelled
+from lisa.util.perf_timer import create_timer
 from lisa.variable import VariableEntry
 
 
@@ -43,6 +50,12 @@ class LisaRunner(BaseRunner):
     def type_name(cls) -> str:
         return constants.TESTCASE_TYPE_LISA
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # durations of previous runs, which are used to order test cases.
+        self._duration_history: DurationHistory = get_duration_history()
+        self._predicted_makespan: float = 0.0
+
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         super()._initialize(*args, **kwargs)
 
@@ -62,6 +75,7 @@ class LisaRunner(BaseRunner):
 
         # load development settings
         development.load_development_settings(self._runbook.dev)
+        telemetry.load_telemetry_settings(self._runbook.telemetry)
 
         # set flag to enable guest nodes.
         self._guest_enabled = self.platform.runbook.guest_enabled
@@ -82,6 +96,10 @@ class LisaRunner(BaseRunner):
             f"Candidate environment count: {len(self.environments)}. "
             f"Guest enabled: {self._guest_enabled}."
         )
+        self._predicted_makespan = predict_makespan(
+            [self._estimate_case_duration(x) for x in self.test_results if x.can_run],
+            self._runbook.concurrency,
+        )
 
     @property
     def is_done(self) -> bool:
@@ -181,6 +199,13 @@ class LisaRunner(BaseRunner):
             for environment in self.environments:
                 self._delete_environment_task(environment, [])
         self.platform.cleanup()
+        # the prediction counts test cases only, so the difference is mainly the
+        # time of deployments, and idle workers.
+        self._log.info(
+            f"makespan predicted: {self._predicted_makespan:.3f} sec, "
+            f"actual: {self._timer.elapsed(False):.3f} sec"
+        )
+        self._duration_history.save()
         super().close()
 
     def _dispatch_test_result(
@@ -192,6 +217,13 @@ class LisaRunner(BaseRunner):
         can_run_results = test_results
         # deploy
         if environment.status == EnvironmentStatus.Prepared and can_run_results:
+            if self._is_packable(environment, can_run_results[0]):
+                self._log.debug(
+                    f"skip deploying '{environment.name}', because "
+                    f"'{can_run_results[0].name}' is shorter than deployment, "
+                    "and it can run on a deployed environment."
+                )
+                return None
             return self._generate_task(
                 task_method=self._deploy_environment_task,
                 environment=environment,
@@ -257,6 +289,17 @@ class LisaRunner(BaseRunner):
             can_run_results = self._get_runnable_test_results(
                 self.test_results, environment=environment
             )
+            if not can_run_results and self._is_reset_needed(environment):
+                # test cases need a new environment, and it's faster to reset
+                # this environment than deploying a new one.
+                self._log.debug(
+                    f"generating reset environment task on '{environment.name}'"
+                )
+                return self._generate_task(
+                    task_method=self._reset_environment_task,
+                    environment=environment,
+                    test_results=[],
+                )
             if not can_run_results:
                 # no more test need this environment, delete it.
                 self._log.debug(
@@ -269,6 +312,31 @@ class LisaRunner(BaseRunner):
                 )
         return None
 
+    def _is_reset_needed(self, environment: Environment) -> bool:
+        if (
+            self._guest_enabled
+            or environment.is_new
+            or environment.status != EnvironmentStatus.Connected
+            or not self.platform.is_environment_resettable(environment)
+        ):
+            return False
+
+        for result in self.test_results:
+            if not (
+                result.is_queued
+                and result.runtime_data.use_new_environment
+                and result.runtime_data.metadata.requirement.environment_status
+                == EnvironmentStatus.Connected
+            ):
+                continue
+            try:
+                if result.check_environment(environment=environment):
+                    return True
+            except SkippedException:
+                # it's handled, when the test result is checked to run.
+                continue
+        return False
+
     def _prepare_environments(self) -> None:
         if all(x.status != EnvironmentStatus.New for x in self.environments):
             return
@@ -292,11 +360,15 @@ class LisaRunner(BaseRunner):
     ) -> None:
         try:
             try:
+                deploy_timer = create_timer()
                 self.platform.deploy_environment(environment)
                 assert (
                     environment.status == EnvironmentStatus.Deployed
                 ), f"actual: {environment.status}"
                 self._reset_awaitable_timer("deploy")
+                self._duration_history.add_deployment_duration(
+                    self._get_environment_type(environment), deploy_timer.elapsed()
+                )
             except ResourceAwaitableException as identifier:
                 if self._is_awaitable_timeout("deploy"):
                     self._log.info(
@@ -330,6 +402,8 @@ class LisaRunner(BaseRunner):
                 phase=constants.TRANSFORMER_PHASE_ENVIRONMENT_CONNECTED,
                 environment=environment,
             )
+            if not self._guest_enabled:
+                self._snapshot_environment(environment)
         except Exception as identifier:
             self._attach_failed_environment_to_result(
                 environment=environment,
@@ -338,6 +412,18 @@ class LisaRunner(BaseRunner):
             )
             self._delete_environment_task(environment=environment, test_results=[])
 
+    def _snapshot_environment(self, environment: Environment) -> None:
+        # the snapshot is used to reset the environment, instead of deleting
+        # and deploying it again. Without it, the environment is still good to
+        # run cases, but it's not resettable.
+        try:
+            self.platform.snapshot_environment(environment)
+        except Exception as identifier:
+            self._log.info(
+                f"failed to snapshot environment '{environment.name}', "
+                f"it won't be reset: {identifier}"
+            )
+
     def _run_test_task(
         self,
         environment: Environment,
@@ -376,6 +462,17 @@ class LisaRunner(BaseRunner):
         )
         # release environment reference to optimize memory.
         test_result.environment = None
+        if test_result.status in [
+            TestStatus.PASSED,
+            TestStatus.FAILED,
+            TestStatus.ATTEMPTED,
+        ]:
+            # skipped cases don't take the time of a real run.
+            self._duration_history.add_case_duration(
+                test_result.runtime_data.metadata.full_name,
+                self._get_case_environment_type(test_result),
+                test_result.get_elapsed(),
+            )
 
         # Some test cases may break the ssh connections. To reduce side effects
         # on next test cases, close the connection after each test run. It will
@@ -420,6 +517,10 @@ class LisaRunner(BaseRunner):
         # test cases. But if the setting is to keep failed environment, it may
         # be kept in above logic.
         if environment.status == EnvironmentStatus.Bad or environment.is_dirty:
+            # not to reset, if no more test cases to run.
+            has_queued_results = any(x.is_queued for x in self.test_results)
+            if has_queued_results and self._reset_environment(environment):
+                return
             self._log.debug(
                 f"delete environment '{environment.name}', "
                 f"because it's in Bad status or marked as dirty."
@@ -428,6 +529,37 @@ class LisaRunner(BaseRunner):
                 environment=environment, test_results=test_results
             )
 
+    def _reset_environment_task(
+        self, environment: Environment, test_results: List[TestResult]
+    ) -> None:
+        if not self._reset_environment(environment):
+            self._delete_environment_task(environment=environment, test_results=[])
+
+    def _reset_environment(self, environment: Environment) -> bool:
+        """
+        Returns True, if the environment is reverted to its snapshot, and it can
+        be used as a new environment.
+        """
+        if (
+            self._guest_enabled
+            or environment.status
+            not in [EnvironmentStatus.Connected, EnvironmentStatus.Bad]
+            or not self.platform.is_environment_resettable(environment)
+        ):
+            return False
+
+        try:
+            self.platform.reset_environment(environment)
+        except Exception as identifier:
+            self._log.debug(
+                f"error on resetting environment '{environment.name}': {identifier}"
+            )
+            environment.status = EnvironmentStatus.Bad
+            return False
+
+        environment.status = EnvironmentStatus.Connected
+        return True
+
     def _delete_environment_task(
         self, environment: Environment, test_results: List[TestResult]
     ) -> None:
@@ -699,10 +831,27 @@ class LisaRunner(BaseRunner):
 
     def _sort_test_results(self, test_results: List[TestResult]) -> List[TestResult]:
         results = test_results.copy()
-        # sort by priority, use new environment, environment status and suite name.
+        durations = {id(x): self._estimate_case_duration(x) for x in results}
+        # the longest case of a suite is the expected duration of the suite, so
+        # cases of a suite stay together.
+        suite_durations: Dict[str, float] = {}
+        for result in results:
+            suite_name = result.runtime_data.metadata.suite.name
+            suite_durations[suite_name] = max(
+                suite_durations.get(suite_name, 0), durations[id(result)]
+            )
+        # sort by priority, use new environment, environment status, expected
+        # duration of suites, suite name and expected duration of cases. The
+        # longest expected goes first, so long cases don't start at the end of
+        # the run, and make others wait for them.
+        results.sort(reverse=True, key=lambda r: durations[id(r)])
         results.sort(
             key=lambda r: str(r.runtime_data.metadata.suite.name),
         )
+        results.sort(
+            reverse=True,
+            key=lambda r: suite_durations[r.runtime_data.metadata.suite.name],
+        )
         # this step make sure Deployed is before Connected
         results.sort(
             reverse=True,
@@ -715,6 +864,61 @@ class LisaRunner(BaseRunner):
         results.sort(key=lambda r: r.runtime_data.metadata.priority)
         return results
 
+    def _estimate_case_duration(self, test_result: TestResult) -> float:
+        return self._duration_history.estimate_case_duration(
+            test_result.runtime_data.metadata.full_name,
+            self._get_case_environment_type(test_result),
+        )
+
+    def _get_environment_type(self, environment: Environment) -> str:
+        # the type is the platform and the count of nodes, because the time of
+        # deployment and cases changes most by them.
+        node_count = len(environment.runbook.nodes or []) + len(
+            environment.runbook.nodes_requirement or []
+        )
+        return f"{self.platform.type_name()}_{node_count}"
+
+    def _get_case_environment_type(self, test_result: TestResult) -> str:
+        requirement = test_result.runtime_data.requirement.environment
+        node_count = len(requirement.nodes) if requirement else 0
+        return f"{self.platform.type_name()}_{node_count}"
+
+    def _is_packable(self, environment: Environment, test_result: TestResult) -> bool:
+        """
+        A short test case runs on a deployed environment, which can run it,
+        instead of deploying a new one. It's decided by the history, so it
+        happens only if the case is shorter than deploying the environment.
+        """
+        if test_result.runtime_data.use_new_environment:
+            return False
+        deployment_duration = self._duration_history.get_deployment_duration(
+            self._get_environment_type(environment)
+        )
+        if (
+            deployment_duration is None
+            or self._estimate_case_duration(test_result) >= deployment_duration
+        ):
+            return False
+        for deployed_environment in self.environments:
+            if (
+                deployed_environment is environment
+                or deployed_environment.status
+                not in [EnvironmentStatus.Deployed, EnvironmentStatus.Connected]
+                or deployed_environment.is_dirty
+            ):
+                continue
+            if self._get_runnable_test_results(
+                [test_result],
+                environment_status=(
+                    EnvironmentStatus.Connected
+                    if deployed_environment.status == EnvironmentStatus.Connected
+                    else None
+                ),
+                environment=deployed_environment,
+            ):
+                return True
+        return False
+
     def _skip_test_results(
         self,
         test_results: List[TestResult],
@@ -34,6 +34,7 @@ from lisa.util import (
     constants,
     deep_update_dict,
     field_metadata,
+    get_schema,
     strip_strs,
 )
 
@@ -946,6 +947,17 @@ class NodeSpace(search_space.RequirementMixin, TypedSchema, ExtendableSchemaMixi
     ) -> None:
         self._excluded_features = cast(FeaturesSpace, value)
 
+    def generate_min_capability(self, capability: Any) -> Any:
+        # platforms generate min capabilities of the same requirements and
+        # capabilities many times, so results are cached by their canonical
+        # forms. The check isn't cached, because it costs less than the keys.
+        return search_space.get_requirement_cache().call(
+            search_space.RequirementMethod.generate_min_capability.value,
+            self,
+            capability,
+            super().generate_min_capability,
+        )
+
     def check(self, capability: Any) -> search_space.ResultReason:
         result = search_space.ResultReason()
         if capability is None:
@@ -1354,6 +1366,9 @@ class Platform(TypedSchema, ExtendableSchemaMixin):
     # capture kernel config info or not
     capture_kernel_config_information: bool = False
     capture_vm_information: bool = True
+    # run commands on Linux nodes by a persistent agent instead of a ssh
+    # channel for each command. It falls back to ssh, if it's not available.
+    use_remote_agent: bool = False
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         add_secret(self.admin_username, PATTERN_HEADTAIL)
@@ -1576,6 +1591,20 @@ class Development:
     jump_boxes: List[ProxyConnectionInfo] = field(default_factory=list)
 
 
+@dataclass_json()
+@dataclass
+class Telemetry:
+    enabled: bool = True
+    # seconds between samples.
+    interval: float = field(
+        default=1, metadata=field_metadata(validate=validate.Range(min=0.1))
+    )
+    # max count of samples in the buffer of a node.
+    capacity: int = field(
+        default=86400, metadata=field_metadata(validate=validate.Range(min=1))
+    )
+
+
 @dataclass_json()
 @dataclass
 class Runbook:
@@ -1601,6 +1630,7 @@ class Runbook:
         default_factory=list, metadata=field_metadata(data_key=constants.TESTCASE)
     )
     dev: Optional[Development] = field(default=None)
+    telemetry: Optional[Telemetry] = field(default=None)
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         if not self.platform:
@@ -1624,13 +1654,14 @@ def load_by_type(schema_type: Type[T], raw_runbook: Any, many: bool = False) ->
     """
     Convert dict, list or base typed schema to specified typed schema.
     """
-    if type(raw_runbook) == schema_type:
+    if not many and isinstance(raw_runbook, schema_type):
+        # it's typed already, no need to convert by dict.
         return raw_runbook
 
     if not isinstance(raw_runbook, dict) and not many:
         raw_runbook = raw_runbook.to_dict()
 
-    result: T = schema_type.schema().load(raw_runbook, many=many)  # type: ignore
+    result: T = get_schema(schema_type).load(raw_runbook, many=many)
     return result
 
 
@@ -3,13 +3,27 @@
 
 import copy
 import sys
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Iterable, List, Optional, Set, Type, TypeVar, Union
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 from dataclasses_json import dataclass_json
 
-from lisa.util import LisaException, NotMeetRequirementException
+from lisa.util import LisaException, NotMeetRequirementException, get_schema
 
 T = TypeVar("T")
 
@@ -236,13 +250,13 @@ def decode_count_space(data: Any) -> Any:
         decoded_data = []
         for item in data:
             if isinstance(item, dict):
-                decoded_data.append(IntRange.schema().load(item))  # type: ignore
+                decoded_data.append(get_schema(IntRange).load(item))
             else:
                 assert isinstance(item, IntRange), f"actual: {type(item)}"
                 decoded_data.append(item)
     else:
         assert isinstance(data, dict), f"actual: {type(data)}"
-        decoded_data = IntRange.schema().load(data)  # type: ignore
+        decoded_data = get_schema(IntRange).load(data)
     return decoded_data
 
 
@@ -358,7 +372,7 @@ def decode_set_space(data: Any) -> Any:
     """
     result = None
     if data:
-        result = SetSpace.schema().load(data)  # type: ignore
+        result = get_schema(SetSpace).load(data)
     return result
 
 
@@ -679,6 +693,135 @@ def intersect(
     )
 
 
+class _UncacheableError(Exception):
+    pass
+
+
+def get_canonical_key(value: Any) -> Hashable:
+    """
+    Returns an immutable and hashable form of a requirement or capability, like
+    IntRange, SetSpace, feature settings and NodeSpace. Values with the same
+    form have the same results of check and min capability. The iteration
+    order of sets is kept, because reasons and min values depend on it. It
+    raises _UncacheableError, if there is an unknown type.
+    """
+    value_type = value.__class__
+    if value_type is str or value_type is int or value is None:
+        return cast(Hashable, value)
+    if value_type is bool or value_type is float or isinstance(value, Enum):
+        # the type is included, because True == 1 and DiskType.Ephemeral ==
+        # "Ephemeral".
+        return (value_type, value)
+    if value_type is IntRange:
+        # it's the most common one, so build it directly.
+        return (value_type, value.min, value.max, value.max_inclusive)
+    if isinstance(value, SetSpace):
+        return (
+            value_type,
+            _get_attributes_key(value),
+            tuple([get_canonical_key(item) for item in value]),
+        )
+    if hasattr(value_type, "__dataclass_fields__"):
+        return (value_type, _get_attributes_key(value))
+    if value_type is dict:
+        return (
+            dict,
+            tuple(
+                [
+                    (get_canonical_key(key), get_canonical_key(item))
+                    for key, item in value.items()
+                ]
+            ),
+        )
+    if value_type is list or value_type is tuple:
+        return (value_type, tuple([get_canonical_key(item) for item in value]))
+    if isinstance(value, type):
+        return value
+    raise _UncacheableError(f"unknown type {value_type} in requirement")
+
+
+def _get_attributes_key(value: Any) -> Hashable:
+    # the attributes include fields and others like the extended runbook, which
+    # may be copied to results. The generic alias, which is set by creating
+    # like SetSpace[T](), doesn't impact results.
+    return tuple(
+        [
+            (name, get_canonical_key(item))
+            for name, item in vars(value).items()
+            if name != "__orig_class__"
+        ]
+    )
+
+
+class RequirementCache:
+    """
+    A LRU cache of requirement methods. The runner and platforms match the same
+    requirements and capabilities many times, like on each Azure location and
+    VM size. The keys are canonical forms, so changed objects are never hit,
+    and results are copied, so callers can change them.
+    """
+
+    def __init__(self, max_size: int = 2048) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._results: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def call(
+        self,
+        method: str,
+        requirement: Any,
+        capability: Any,
+        func: Callable[[Any], Any],
+    ) -> Any:
+        try:
+            key = (
+                method,
+                get_canonical_key(requirement),
+                get_canonical_key(capability),
+            )
+        except (_UncacheableError, TypeError):
+            # like objects with slots, which have no vars.
+            return func(capability)
+
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return _copy_result(self._results[key])
+            self.misses += 1
+
+        # exceptions are raised to callers, and not cached.
+        result = func(capability)
+        with self._lock:
+            self._results[key] = _copy_result(result)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _copy_result(result: Any) -> Any:
+    if result.__class__ is ResultReason:
+        return ResultReason(
+            result=result.result, reasons=list(result.reasons), _prefix=result._prefix
+        )
+    return copy.deepcopy(result)
+
+
+_requirement_cache = RequirementCache()
+
+
+def get_requirement_cache() -> RequirementCache:
+    return _requirement_cache
+
+
 def equal_list(first: Optional[List[Any]], second: Optional[List[Any]]) -> bool:
     if first is None or second is None:
         result = first is second
@@ -5,17 +5,19 @@ import hashlib
 import os
 import re
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import InitVar, dataclass, field
 from datetime import datetime, timedelta, timezone
-from functools import lru_cache, partial
+from functools import partial
 from pathlib import Path, PurePath
 from threading import Lock
 from time import sleep, time
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
 import requests
 from assertpy import assert_that
-from azure.core.exceptions import ResourceExistsError
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from azure.keyvault.certificates import (
     CertificateClient,
     CertificatePolicy,
@@ -93,7 +95,9 @@ from lisa.util import (
 )
 from lisa.util.logger import Logger
 from lisa.util.parallel import check_cancelled
-from lisa.util.perf_timer import create_timer
+from lisa.util.perf_timer import Timer, create_timer
+
+from .operation_poller import get_operation_poller
 
 if TYPE_CHECKING:
     from .platform_ import AzurePlatform
@@ -134,6 +138,11 @@ SAS_COPIED_CONTAINER_NAME = "lisa-sas-copied"
 # If the blob is still copy pending status after the timeout hours, it can be deleted
 BLOB_COPY_PENDING_TIMEOUT_HOURS = 6
 _global_sas_vhd_copy_lock = Lock()
+_vhd_copy_locks: Dict[str, Lock] = {}
+# The marker blob is created beside the copying vhd, so the vhd is not copied
+# by multiple processes.
+VHD_COPY_MARKER_SUFFIX = ".lisa-copying"
+_VHD_COPY_MARKER_ATTEMPTS = 3
 
 # when call sdk APIs, it's easy to have conflict on access auth files. Use lock
 # to prevent it happens.
@@ -156,6 +165,10 @@ SIG_IMAGE_KEYS = [
 # IMDS is a REST API that's available at a well-known, non-routable IP address (169.254.169.254). # noqa: E501
 METADATA_ENDPOINT = "http://169.254.169.254/metadata/instance?api-version=2021-02-01"
 
+# The waiters of operations wake up by the interval to check if the run is
+# cancelled. It doesn't call Azure, so it can be short.
+_CANCEL_CHECK_INTERVAL = 5
+
 
 @dataclass
 class EnvironmentContext:
@@ -1133,30 +1146,59 @@ def get_environment_context(environment: Environment) -> EnvironmentContext:
 def wait_operation(
     operation: Any, time_out: int = sys.maxsize, failure_identity: str = ""
 ) -> Any:
+    # The operation is polled by the shared poller, this thread waits on the
+    # future only, and wakes up to check if the run is cancelled.
+    future = get_operation_poller().submit(operation)
+    result = wait_future(future, time_out, failure_identity)
+    if result:
+        result = result.as_dict()
+
+    return result
+
+
+def wait_future(
+    future: "Future[Any]", time_out: int = sys.maxsize, failure_identity: str = ""
+) -> Any:
+    """
+    Wait an Azure operation, which runs in background, and check if the run is
+    cancelled meanwhile.
+    """
     timer = create_timer()
-    wait_result: Any = None
     if failure_identity:
         failure_identity = f"{failure_identity} failed:"
     else:
         failure_identity = "Azure operation failed:"
-    while time_out > timer.elapsed(False):
-        check_cancelled()
-        if operation.done():
-            break
-        wait_result = operation.wait(1)
-        if wait_result:
-            raise LisaException(f"{failure_identity} {wait_result}")
-    if time_out < timer.elapsed():
+    result = _wait_future(future, time_out, timer)
+    if result is _WAIT_TIMEOUT:
         raise LisaTimeoutException(
             f"{failure_identity} timeout after {time_out} seconds."
         )
-    result = operation.result()
-    if result:
-        result = result.as_dict()
-
     return result
 
 
+# A sentinel for the timeout of waiting futures.
+_WAIT_TIMEOUT = object()
+
+
+# Wait the future of the shared poller. The exception of the operation is raised
+# as is, because callers handle the SDK errors.
+def _wait_future(future: "Future[Any]", time_out: float, timer: Timer) -> Any:
+    try:
+        while True:
+            check_cancelled()
+            remaining = time_out - timer.elapsed(False)
+            if remaining <= 0:
+                return _WAIT_TIMEOUT
+            try:
+                return future.result(timeout=min(remaining, _CANCEL_CHECK_INTERVAL))
+            except FutureTimeoutError:
+                continue
+    finally:
+        # if it's timeout or the run is cancelled, nobody waits for it, so the
+        # poller drops it. It does nothing, if the future is done.
+        future.cancel()
+
+
 def get_storage_credential(
     credential: Any,
     subscription_id: str,
@@ -1430,78 +1472,195 @@ def copy_vhd_to_storage(
     )
     full_vhd_path = f"{container_client.url}/{dst_vhd_name}"
 
-    # lock here to prevent a vhd is copied in multi-thread
-    cached_key: Optional[bytearray] = None
-    with _global_sas_vhd_copy_lock:
-        blobs = container_client.list_blobs(name_starts_with=dst_vhd_name)
+    # lock per destination, so copies to different locations run concurrently,
+    # but a vhd is not copied to the same destination by multiple threads.
+    with _get_vhd_copy_lock(full_vhd_path):
         blob_client = container_client.get_blob_client(dst_vhd_name)
-        vhd_exists = False
-        for blob in blobs:
-            if blob:
-                # check if hash key matched with original key.
-                if blob.content_settings:
-                    cached_key = blob.content_settings.get(
-                        "content_md5", None
-                    )  # type: ignore
-                if is_stuck_copying(blob_client, log):
-                    # Delete the stuck vhd.
-                    blob_client.delete_blob(delete_snapshots="include")
-                elif original_key and cached_key:
-                    if original_key == cached_key:
-                        log.debug("the sas url is copied already, use it directly.")
-                        vhd_exists = True
-                    else:
-                        log.debug("found cached vhd, but the hash key mismatched.")
-                else:
-                    log.debug(
-                        "No md5 content either in original blob or current blob. "
-                        "Then no need to check the hash key"
-                    )
-                    vhd_exists = True
-
-        if not vhd_exists:
-            azcopy_path = platform._azure_runbook.azcopy_path
-            if azcopy_path:
-                log.info(f"AzCopy path: {azcopy_path}")
-                if not os.path.exists(azcopy_path):
-                    raise LisaException(f"{azcopy_path} does not exist")
-
-                sas_token = generate_sas_token(
-                    credential=platform.credential,
-                    subscription_id=platform.subscription_id,
-                    cloud=platform.cloud,
-                    account_name=storage_name,
-                    resource_group_name=platform._azure_runbook.shared_resource_group_name,  # noqa: E501
-                    writable=True,
-                )
-                dst_vhd_sas_url = f"{full_vhd_path}?{sas_token}"
-                log.info(f"copying vhd by azcopy {dst_vhd_name}")
+        marker_client = container_client.get_blob_client(
+            f"{dst_vhd_name}{VHD_COPY_MARKER_SUFFIX}"
+        )
+        while True:
+            if _is_vhd_copied(
+                container_client, blob_client, dst_vhd_name, original_key, log
+            ):
+                break
+
+            # The marker blob is created atomically. The process, which creates
+            # it, copies the vhd. Others wait the marker is removed.
+            if _acquire_vhd_copy_marker(marker_client, log):
                 try:
-                    local().execute(
-                        f"{azcopy_path} copy {src_vhd_sas_url} {dst_vhd_sas_url} --recursive=true",  # noqa: E501
-                        expected_exit_code=0,
-                        expected_exit_code_failure_message=(
-                            "Azcopy failed to copy the blob"
-                        ),
-                        timeout=60 * 60,
+                    _start_vhd_copy(
+                        platform,
+                        storage_name,
+                        src_vhd_sas_url,
+                        dst_vhd_name,
+                        full_vhd_path,
+                        blob_client,
+                        log,
                     )
-                except Exception as identifier:
-                    blob_client.delete_blob(delete_snapshots="include")
-                    raise LisaException(f"{identifier}")
+                    wait_copy_blob(blob_client, dst_vhd_name, log)
+                finally:
+                    marker_client.delete_blob()
+                return full_vhd_path
 
-                # Set metadata to mark the blob copied by AzCopy successfully
-                metadata = {"AzCopyStatus": "Success"}
-                blob_client.set_blob_metadata(metadata)
-            else:
-                blob_client.start_copy_from_url(
-                    src_vhd_sas_url, metadata=None, incremental_copy=False
-                )
+            log.debug(f"the vhd is being copied by another process: {dst_vhd_name}")
+            _wait_vhd_copy_marker_released(marker_client, dst_vhd_name)
 
         wait_copy_blob(blob_client, dst_vhd_name, log)
 
     return full_vhd_path
 
 
+def _is_vhd_copied(
+    container_client: ContainerClient,
+    blob_client: BlobClient,
+    dst_vhd_name: str,
+    original_key: Optional[bytearray],
+    log: Logger,
+) -> bool:
+    blobs = container_client.list_blobs(name_starts_with=dst_vhd_name)
+    vhd_exists = False
+    for blob in blobs:
+        # skip the copy marker, which has the same prefix.
+        if not blob or blob.name != dst_vhd_name:
+            continue
+        # check if hash key matched with original key.
+        cached_key: Optional[bytearray] = None
+        if blob.content_settings:
+            cached_key = blob.content_settings.get("content_md5", None)  # type: ignore
+        if is_stuck_copying(blob_client, log):
+            # Delete the stuck vhd.
+            blob_client.delete_blob(delete_snapshots="include")
+        elif original_key and cached_key:
+            if original_key == cached_key:
+                log.debug("the sas url is copied already, use it directly.")
+                vhd_exists = True
+            else:
+                log.debug("found cached vhd, but the hash key mismatched.")
+        else:
+            log.debug(
+                "No md5 content either in original blob or current blob. "
+                "Then no need to check the hash key"
+            )
+            vhd_exists = True
+    return vhd_exists
+
+
+def _start_vhd_copy(
+    platform: "AzurePlatform",
+    storage_name: str,
+    src_vhd_sas_url: str,
+    dst_vhd_name: str,
+    full_vhd_path: str,
+    blob_client: BlobClient,
+    log: Logger,
+) -> None:
+    azcopy_path = platform._azure_runbook.azcopy_path
+    if azcopy_path:
+        log.info(f"AzCopy path: {azcopy_path}")
+        if not os.path.exists(azcopy_path):
+            raise LisaException(f"{azcopy_path} does not exist")
+
+        sas_token = generate_sas_token(
+            credential=platform.credential,
+            subscription_id=platform.subscription_id,
+            cloud=platform.cloud,
+            account_name=storage_name,
+            resource_group_name=platform._azure_runbook.shared_resource_group_name,
+            writable=True,
+        )
+        dst_vhd_sas_url = f"{full_vhd_path}?{sas_token}"
+        log.info(f"copying vhd by azcopy {dst_vhd_name}")
+        try:
+            local().execute(
+                f"{azcopy_path} copy {src_vhd_sas_url} {dst_vhd_sas_url} --recursive=true",  # noqa: E501
+                expected_exit_code=0,
+                expected_exit_code_failure_message=("Azcopy failed to copy the blob"),
+                timeout=60 * 60,
+            )
+        except Exception as identifier:
+            blob_client.delete_blob(delete_snapshots="include")
+            raise LisaException(f"{identifier}")
+
+        # Set metadata to mark the blob copied by AzCopy successfully
+        metadata = {"AzCopyStatus": "Success"}
+        blob_client.set_blob_metadata(metadata)
+    else:
+        blob_client.start_copy_from_url(
+            src_vhd_sas_url, metadata=None, incremental_copy=False
+        )
+
+
+def _get_vhd_copy_lock(full_vhd_path: str) -> Lock:
+    with _global_sas_vhd_copy_lock:
+        lock = _vhd_copy_locks.get(full_vhd_path)
+        if not lock:
+            lock = Lock()
+            _vhd_copy_locks[full_vhd_path] = lock
+        return lock
+
+
+def _acquire_vhd_copy_marker(marker_client: BlobClient, log: Logger) -> bool:
+    # The marker may be released or removed by other processes between calls,
+    # so it's tried a few times. If it's not acquired, the caller waits for it.
+    for _ in range(_VHD_COPY_MARKER_ATTEMPTS):
+        try:
+            marker = datetime.now(timezone.utc).isoformat()
+            marker_client.upload_blob(marker)  # type: ignore
+            return True
+        except ResourceExistsError:
+            pass
+
+        # The marker is left, if the process crashed. Take it over, if it's too
+        # old.
+        try:
+            is_stale = _is_vhd_copy_marker_stale(marker_client)
+        except ResourceNotFoundError:
+            # the marker is released just now, try again.
+            continue
+        if not is_stale:
+            return False
+        log.debug(f"remove stale copy marker: {marker_client.blob_name}")
+        try:
+            marker_client.delete_blob()
+        except ResourceNotFoundError:
+            # another process removed it.
+            pass
+    return False
+
+
+def _is_vhd_copy_marker_stale(marker_client: BlobClient) -> bool:
+    properties = marker_client.get_blob_properties()
+    last_modified = properties.last_modified or datetime.now(timezone.utc)
+    age = datetime.now(timezone.utc) - last_modified
+    return age > timedelta(hours=BLOB_COPY_PENDING_TIMEOUT_HOURS)
+
+
+def _wait_vhd_copy_marker_released(
+    marker_client: BlobClient,
+    dst_vhd_name: str,
+    timeout: int = (BLOB_COPY_PENDING_TIMEOUT_HOURS + 1) * 60 * 60,
+) -> None:
+    """
+    Waits until the marker is released, or it becomes stale, so the caller can
+    take it over. The timeout is longer than the stale threshold, so a long
+    copy of another process doesn't fail the deployment.
+    """
+
+    def check() -> bool:
+        try:
+            return _is_vhd_copy_marker_stale(marker_client)
+        except ResourceNotFoundError:
+            return True
+
+    future = get_operation_poller().submit_check(check)
+    result = _wait_future(future, timeout, create_timer())
+    if result is _WAIT_TIMEOUT:
+        raise LisaTimeoutException(
+            f"timeout: waiting another process to copy VHD: {dst_vhd_name}"
+        )
+
+
 def wait_copy_blob(
     blob_client: Any,
     vhd_path: str,
@@ -1510,22 +1669,20 @@ def wait_copy_blob(
 ) -> None:
     log.info(f"copying vhd: {vhd_path}")
     if blob_client.get_blob_properties().copy.status:
-        check_till_timeout(
-            lambda: blob_client.get_blob_properties().copy.status == "success",
-            timeout_message=f"copying VHD: {vhd_path}",
-            timeout=timeout,
-            interval=2,
+        check: Callable[[], Any] = (
+            lambda: blob_client.get_blob_properties().copy.status == "success"
         )
     else:
         # If the blob is copied by AzCopy, the copy.status is None.
         # Confirm the copy operation is success by checking the metadata.
-        check_till_timeout(
+        check = (
             lambda: blob_client.get_blob_properties().metadata.get("AzCopyStatus", None)
-            == "Success",
-            timeout_message=f"copying VHD: {vhd_path}",
-            timeout=timeout,
-            interval=2,
+            == "Success"
         )
+    future = get_operation_poller().submit_check(check)
+    result = _wait_future(future, timeout, create_timer())
+    if result is _WAIT_TIMEOUT:
+        raise LisaTimeoutException(f"timeout: copying VHD: {vhd_path}")
     log.info("vhd copied")
 
 
@@ -1829,7 +1986,65 @@ def _generate_sas_token_for_vhd(
     return source_url
 
 
-@lru_cache(maxsize=10)  # noqa: B019
+class VhdStagingPipeline:
+    """
+    Stages vhds into storage accounts of target locations. The copies to
+    different locations run concurrently, and a copy in flight is shared by all
+    environments which need the same vhd in the same location. So deployments
+    only wait for the copy of its own location.
+    """
+
+    def __init__(self, max_workers: int = 16) -> None:
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="vhd_staging"
+        )
+        self._lock = Lock()
+        self._stagings: Dict[Tuple[str, str, str], "Future[str]"] = {}
+
+    def stage(
+        self, platform: "AzurePlatform", vhd_path: str, location: str, log: Logger
+    ) -> "Future[str]":
+        key = (platform.subscription_id, vhd_path, location)
+        with self._lock:
+            future = self._stagings.get(key)
+            if future:
+                return future
+            future = self._pool.submit(_stage_vhd, platform, vhd_path, location, log)
+            self._stagings[key] = future
+        # out of the lock, the callback runs inline if the copy is done already.
+        future.add_done_callback(partial(self._on_staged, key))
+        return future
+
+    def stage_all(
+        self,
+        platform: "AzurePlatform",
+        vhd_path: str,
+        locations: List[str],
+        log: Logger,
+    ) -> Dict[str, "Future[str]"]:
+        """
+        fan out copies to all locations. It doesn't wait the copies.
+        """
+        return {
+            location: self.stage(platform, vhd_path, location, log)
+            for location in locations
+        }
+
+    def _on_staged(self, key: Tuple[str, str, str], future: "Future[str]") -> None:
+        if future.exception():
+            # don't keep failures, so next call can retry.
+            with self._lock:
+                if self._stagings.get(key) is future:
+                    self._stagings.pop(key)
+
+
+_vhd_staging_pipeline = VhdStagingPipeline()
+
+
+def get_vhd_staging_pipeline() -> VhdStagingPipeline:
+    return _vhd_staging_pipeline
+
+
 def get_deployable_vhd_path(
     platform: "AzurePlatform", vhd_path: str, location: str, log: Logger
 ) -> str:
@@ -1838,6 +2053,12 @@ def get_deployable_vhd_path(
     the vhd_path is a sas url. If so, copy it to a location in current
     subscription, so it can be deployed.
     """
+    return _vhd_staging_pipeline.stage(platform, vhd_path, location, log).result()
+
+
+def _stage_vhd(
+    platform: "AzurePlatform", vhd_path: str, location: str, log: Logger
+) -> str:
     matches = SAS_URL_PATTERN.match(vhd_path)
     if not matches:
         vhd_details = get_vhd_details(platform, vhd_path)
@@ -0,0 +1,217 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import heapq
+import itertools
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import partial
+from threading import Condition, Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lisa.util.logger import Logger, get_logger
+
+# The first poll happens soon, because many operations, like deletion of not
+# existing resources, finish in seconds.
+DEFAULT_MIN_INTERVAL = 1.0
+DEFAULT_MAX_INTERVAL = 30.0
+DEFAULT_BACKOFF = 1.5
+
+
+@dataclass
+class _TrackedOperation:
+    # an Azure SDK LROPoller, or None for a check function.
+    operation: Any
+    check: Optional[Callable[[], bool]]
+    future: "Future[Any]"
+    interval: float
+    poll_count: int = 0
+    # True, if the SDK calls back that the operation is done.
+    is_notified: bool = False
+
+
+class OperationPoller:
+    """
+    Tracks all outstanding long running operations in one thread. The Azure SDK
+    pollers poll the service in their own threads, so they are completed by
+    their done callbacks, without waiting for a timer. Check functions are
+    polled by their own adaptive intervals, which grow by the backoff when they
+    are not done. When an operation is done, its future is completed with the
+    result or the exception, so callers can wait on futures instead of polling
+    Azure. If a caller cancels the future, the operation is not tracked anymore.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        backoff: float = DEFAULT_BACKOFF,
+        clock: Callable[[], float] = monotonic,
+        parent_logger: Optional[Logger] = None,
+    ) -> None:
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._clock = clock
+        self._log = get_logger("operation_poller", parent=parent_logger)
+
+        self._condition = Condition()
+        # (due time, sequence, tracked operation)
+        self._queue: List[Tuple[float, int, _TrackedOperation]] = []
+        self._sequence = itertools.count()
+        # the same operation can be waited multiple times, for example, when
+        # callers wait in slices. So it returns the same future for it.
+        self._operations: Dict[int, _TrackedOperation] = {}
+        self._thread: Optional[Thread] = None
+        self._stopped = False
+
+    @property
+    def pending_count(self) -> int:
+        with self._condition:
+            return len([x for _, _, x in self._queue if not x.future.done()])
+
+    def submit(self, operation: Any) -> "Future[Any]":
+        """
+        Track an Azure SDK LROPoller. The future is completed by the result of
+        the operation.
+        """
+        with self._condition:
+            tracked = self._operations.get(id(operation))
+            if tracked and not tracked.future.cancelled():
+                return tracked.future
+
+            tracked = _TrackedOperation(
+                operation=operation,
+                check=None,
+                future=Future(),
+                interval=self._max_interval,
+            )
+            self._operations[id(operation)] = tracked
+            # The callback may not be called, if the SDK fails to get the final
+            # resource. So done() is checked by the max interval as a fallback.
+            self._schedule(tracked, self._max_interval)
+        # it's called at once, if the operation is done already.
+        operation.add_done_callback(partial(self._notify, tracked))
+        return tracked.future
+
+    def submit_check(self, check: Callable[[], bool]) -> "Future[Any]":
+        """
+        Track a check function, like the copy status of a blob. The future is
+        completed with True, when the check returns True.
+        """
+        tracked = _TrackedOperation(
+            operation=None,
+            check=check,
+            future=Future(),
+            interval=self._min_interval,
+        )
+        with self._condition:
+            self._schedule(tracked, 0)
+        return tracked.future
+
+    def stop(self) -> None:
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _notify(self, tracked: _TrackedOperation, _: Any) -> None:
+        # It's called in the thread of the SDK poller. The result is got in the
+        # poller thread, because it joins the thread of the SDK poller.
+        with self._condition:
+            tracked.is_notified = True
+            self._schedule(tracked, 0)
+
+    def _schedule(self, tracked: _TrackedOperation, delay: float) -> None:
+        # Threading: must be called with the condition acquired.
+        heapq.heappush(
+            self._queue, (self._clock() + delay, next(self._sequence), tracked)
+        )
+        if not self._thread:
+            self._thread = Thread(target=self._run, name="azure-operation-poller")
+            self._thread.daemon = True
+            self._thread.start()
+        self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._queue:
+                        wait_time = self._queue[0][0] - self._clock()
+                        if wait_time <= 0:
+                            break
+                        self._condition.wait(wait_time)
+                    else:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                _, _, tracked = heapq.heappop(self._queue)
+
+            # poll out of the lock, so new operations can be submitted meanwhile.
+            is_done = self._poll(tracked)
+
+            with self._condition:
+                if is_done:
+                    # the operation may be tracked again after it's cancelled.
+                    if (
+                        tracked.operation is not None
+                        and self._operations.get(id(tracked.operation)) is tracked
+                    ):
+                        self._operations.pop(id(tracked.operation))
+                else:
+                    delay = self._get_next_interval(tracked)
+                    self._schedule(tracked, delay)
+
+    def _poll(self, tracked: _TrackedOperation) -> bool:
+        future = tracked.future
+        if future.done():
+            # the caller doesn't wait for it anymore, or it's completed by an
+            # earlier schedule.
+            return True
+        tracked.poll_count += 1
+        result: Any = None
+        error: Optional[Exception] = None
+        try:
+            if tracked.check is not None:
+                if not tracked.check():
+                    return False
+                result = True
+            else:
+                if not tracked.is_notified and not tracked.operation.done():
+                    return False
+                result = tracked.operation.result()
+        except Exception as identifier:
+            error = identifier
+        # The caller may cancel it at any time. It returns False, if it's
+        # cancelled, otherwise it cannot be cancelled anymore, so it's safe to
+        # complete. Completing a cancelled future raises an error, and kills
+        # the thread.
+        if future.set_running_or_notify_cancel():
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        return True
+
+    def _get_next_interval(self, tracked: _TrackedOperation) -> float:
+        if tracked.check is None:
+            # the SDK poller is checked by the fallback interval only.
+            return self._max_interval
+        tracked.interval = min(tracked.interval * self._backoff, self._max_interval)
+        return tracked.interval
+
+
+_default_poller: Optional[OperationPoller] = None
+_default_poller_lock = Lock()
+
+
+def get_operation_poller() -> OperationPoller:
+    global _default_poller
+    with _default_poller_lock:
+        if not _default_poller:
+            _default_poller = OperationPoller()
+        return _default_poller
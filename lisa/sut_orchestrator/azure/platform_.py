@@ -112,11 +112,18 @@ from .common import (
     get_resource_management_client,
     get_storage_account_name,
     get_vhd_details,
+    get_vhd_staging_pipeline,
     get_vm,
     global_credential_access_lock,
     save_console_log,
+    wait_future,
     wait_operation,
 )
+from .resource_group_reaper import (
+    RESOURCE_GROUP_JOURNAL_FILE_NAME,
+    ResourceGroupJournal,
+    ResourceGroupReaper,
+)
 from .tools import Uname, VmGeneration, Waagent
 
 # used by azure
@@ -330,6 +337,11 @@ class AzurePlatformSchema:
     deploy: bool = True
     # wait resource deleted or not
     wait_delete: bool = False
+    # how many resource groups are deleted concurrently in background.
+    delete_concurrency: int = 4
+    # delete resource groups, which are created but not deleted by previous
+    # runs, like the run is crashed.
+    delete_orphan_resource_groups: bool = True
     # the AzCopy path can be specified if use this tool to copy blob
     azcopy_path: str = field(default="")
     # use bicep to deploy, it's a new way to deploy azure resources
@@ -568,6 +580,7 @@ class AzurePlatform(Platform):
             self._resolve_marketplace_image_version(
                 environment.runbook.nodes_requirement
             )
+            self._stage_vhds(environment.runbook.nodes_requirement, log)
 
         return is_success
 
@@ -608,6 +621,15 @@ class AzurePlatform(Platform):
                 )
 
                 if self._azure_runbook.deploy:
+                    if (
+                        environment_context.resource_group_is_specified
+                        and self.runbook.keep_environment
+                        == constants.ENVIRONMENT_KEEP_NO
+                    ):
+                        # journal it before creating, so it can be deleted by
+                        # next run, if this run crashes. Kept environments are
+                        # not journaled, so they are not deleted.
+                        self._resource_group_reaper.track(resource_group_name)
                     log.info(
                         f"creating or updating resource group: [{resource_group_name}]"
                     )
@@ -654,36 +676,28 @@ class AzurePlatform(Platform):
                 f"as it's a dry run."
             )
         else:
-            assert self._rm_client
-            az_rg_exists = self._rm_client.resource_groups.check_existence(
-                resource_group_name
-            )
-            if not az_rg_exists:
-                return
             log.info(
                 f"deleting resource group: {resource_group_name}, "
                 f"wait: {self._azure_runbook.wait_delete}"
             )
-            try:
-                self._delete_boot_diagnostic_container(resource_group_name, log)
-            except Exception as identifier:
-                log.debug(
-                    f"exception on deleting boot diagnostic container: {identifier}"
-                )
-            delete_operation: Any = None
-            try:
-                delete_operation = self._rm_client.resource_groups.begin_delete(
-                    resource_group_name
-                )
-            except Exception as identifier:
-                log.debug(f"exception on delete resource group: {identifier}")
-            if delete_operation and self._azure_runbook.wait_delete:
-                wait_operation(
-                    delete_operation, failure_identity="delete resource group"
-                )
+            # the deletion runs in background, so the runner thread is free for
+            # next case, unless it needs to wait.
+            delete_future = self._resource_group_reaper.delete(resource_group_name, log)
+            if self._azure_runbook.wait_delete:
+                wait_future(delete_future, failure_identity="delete resource group")
             else:
                 log.debug("not wait deleting")
 
+    def _begin_delete_resource_group(
+        self, resource_group_name: str, log: Logger
+    ) -> Any:
+        assert self._rm_client
+        try:
+            self._delete_boot_diagnostic_container(resource_group_name, log)
+        except Exception as identifier:
+            log.debug(f"exception on deleting boot diagnostic container: {identifier}")
+        return self._rm_client.resource_groups.begin_delete(resource_group_name)
+
     def _save_console_log_and_check_panic(
         self,
         resource_group_name: str,
@@ -995,6 +1009,24 @@ class AzurePlatform(Platform):
             self.credential, self.subscription_id, self.cloud
         )
 
+        self._resource_group_reaper = ResourceGroupReaper(
+            subscription_id=self.subscription_id,
+            journal=ResourceGroupJournal(
+                constants.CACHE_PATH / RESOURCE_GROUP_JOURNAL_FILE_NAME
+            ),
+            exists_func=self._rm_client.resource_groups.check_existence,
+            delete_func=self._begin_delete_resource_group,
+            concurrency=azure_runbook.delete_concurrency,
+            parent_logger=self._log,
+        )
+        if azure_runbook.delete_orphan_resource_groups and not azure_runbook.dry_run:
+            self._resource_group_reaper.reconcile_orphans()
+
+    def _cleanup(self) -> None:
+        # make sure all queued deletions are started before exiting.
+        if hasattr(self, "_resource_group_reaper"):
+            self._resource_group_reaper.close()
+
     def _initialize_credential(self) -> None:
         azure_runbook = self._azure_runbook
 
@@ -2792,6 +2824,24 @@ class AzurePlatform(Platform):
                     node_runbook.location, node_runbook.marketplace
                 )
 
+    def _stage_vhds(
+        self, nodes_requirement: List[schema.NodeSpace], log: Logger
+    ) -> None:
+        # Start copying vhds into the chosen locations when environments are
+        # prepared, so copies of all environments run concurrently before the
+        # deployments need them.
+        if self._azure_runbook.dry_run:
+            return
+        pipeline = get_vhd_staging_pipeline()
+        for req in nodes_requirement:
+            node_runbook = req.get_extended_runbook(AzureNodeSchema, AZURE)
+            vhd = node_runbook.vhd
+            if not vhd or not vhd.vhd_path or not node_runbook.location:
+                continue
+            for vhd_path in [vhd.vhd_path, vhd.vmgs_path]:
+                if vhd_path:
+                    pipeline.stage(self, vhd_path, node_runbook.location, log)
+
     def _find_marketplace_image_location(self) -> List[str]:
         # locations used to query marketplace image information. Some image is not
         # available in all locations, so try several of them.
@@ -0,0 +1,382 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import os
+import socket
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dataclasses_json import dataclass_json
+
+from lisa import schema
+from lisa.util import LisaException, constants
+from lisa.util.logger import Logger, get_logger
+
+from .operation_poller import OperationPoller, get_operation_poller
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+RESOURCE_GROUP_JOURNAL_FILE_NAME = "azure_resource_groups.jsonl"
+
+RESOURCE_GROUP_STATE_CREATED = "created"
+RESOURCE_GROUP_STATE_DELETED = "deleted"
+
+# On Windows, which cannot check if the owner process is still running, a
+# resource group of this host is considered orphan after this time.
+ORPHAN_AGE_HOURS = 24
+
+
+@dataclass_json()
+@dataclass
+class ResourceGroupRecord:
+    name: str
+    subscription_id: str
+    state: str = RESOURCE_GROUP_STATE_CREATED
+    run_id: str = ""
+    host: str = ""
+    pid: int = 0
+    updated_time: str = field(default_factory=lambda: datetime.now().isoformat())
+
+
+class ResourceGroupJournal:
+    """
+    An append only journal of resource groups, which are created by LISA. A
+    resource group is tracked before it's created, and marked deleted when the
+    deletion completes, so resource groups of crashed runs can be found. The
+    cache folder may be shared by concurrent runs, so the journal is changed
+    under a file lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock_path = path.with_name(f"{path.name}.lock")
+        self._lock = Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def append(self, records: List[ResourceGroupRecord]) -> None:
+        if not records:
+            return
+        lines = "".join(
+            f"{json.dumps(record.to_dict())}\n" for record in records  # type: ignore
+        )
+        with self._lock, _lock_file(self._lock_path):
+            with open(self._path, "a") as f:
+                f.write(lines)
+
+    def load(self) -> Dict[Tuple[str, str], ResourceGroupRecord]:
+        """
+        returns the latest record of each resource group.
+        """
+        with self._lock:
+            return self._load()
+
+    def compact(self) -> None:
+        """
+        drop deleted resource groups, so the journal doesn't grow forever.
+        """
+        with self._lock, _lock_file(self._lock_path):
+            # load and replace in the same file lock, so records appended by
+            # other runs meanwhile are not lost.
+            records = [
+                record
+                for record in self._load().values()
+                if record.state != RESOURCE_GROUP_STATE_DELETED
+            ]
+            content = "".join(
+                f"{json.dumps(record.to_dict())}\n"  # type: ignore
+                for record in records
+            )
+            temp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.tmp")
+            with open(temp_path, "w") as f:
+                f.write(content)
+            os.replace(temp_path, self._path)
+
+    def _load(self) -> Dict[Tuple[str, str], ResourceGroupRecord]:
+        # Threading: must be called with the lock acquired. Appends don't need
+        # the file lock to read, because a partial line is skipped.
+        records: Dict[Tuple[str, str], ResourceGroupRecord] = {}
+        if not self._path.exists():
+            return records
+        with open(self._path, "r") as f:
+            lines = f.readlines()
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = schema.load_by_type(ResourceGroupRecord, json.loads(line))
+            except Exception:
+                # the last line may be partially written, if the run crashed.
+                continue
+            records[(record.subscription_id, record.name.lower())] = record
+        return records
+
+
+@contextmanager
+def _lock_file(path: Path) -> Iterator[None]:
+    """
+    An exclusive lock cross processes. It blocks until other processes release
+    it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@dataclass
+class _DeleteRequest:
+    name: str
+    log: Logger
+    future: "Future[None]"
+
+
+class ResourceGroupReaper:
+    """
+    Deletes resource groups in background, so the runner thread doesn't wait on
+    deleting. Queued deletions are dispatched in batches, with bounded
+    concurrency of the Azure API calls, and the completion is waited by the
+    shared operation poller.
+    """
+
+    def __init__(
+        self,
+        subscription_id: str,
+        journal: ResourceGroupJournal,
+        exists_func: Callable[[str], bool],
+        delete_func: Callable[[str, Logger], Any],
+        concurrency: int = 4,
+        poller: Optional[OperationPoller] = None,
+        parent_logger: Optional[Logger] = None,
+    ) -> None:
+        self._subscription_id = subscription_id
+        self._journal = journal
+        self._exists_func = exists_func
+        # returns the delete operation, or None if nothing is deleted.
+        self._delete_func = delete_func
+        self._poller = poller or get_operation_poller()
+        self._log = get_logger("rg_reaper", parent=parent_logger)
+
+        self._queue: "Queue[Optional[_DeleteRequest]]" = Queue()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(concurrency, 1), thread_name_prefix="rg_reaper"
+        )
+        self._pending: Dict[str, "Future[None]"] = {}
+        self._pending_lock = Lock()
+        self._thread: Optional[Thread] = None
+        self._is_closed = False
+
+    def track(self, name: str) -> None:
+        """
+        record a resource group before it's created.
+        """
+        self._journal.append([self._create_record(name, RESOURCE_GROUP_STATE_CREATED)])
+
+    def delete(self, name: str, log: Optional[Logger] = None) -> "Future[None]":
+        """
+        queue the resource group to delete. The future is completed when the
+        resource group is deleted. If the deletion cannot be started, the error
+        is logged, and the future is completed, like the deletion is done.
+        """
+        with self._pending_lock:
+            if self._is_closed:
+                # the dispatch thread is stopped. The resource group is kept in
+                # journal as created, so it's deleted by next run.
+                closed_future: "Future[None]" = Future()
+                closed_future.set_exception(
+                    LisaException(
+                        f"cannot delete resource group '{name}', "
+                        "the reaper is closed."
+                    )
+                )
+                return closed_future
+            # the same resource group may be deleted twice, like a failed
+            # deployment deletes it and then the environment is deleted.
+            future = self._pending.get(name.lower())
+            if future and not future.cancelled():
+                return future
+            future = Future()
+            self._pending[name.lower()] = future
+            if not self._thread:
+                self._thread = Thread(target=self._dispatch, name="rg_reaper")
+                self._thread.daemon = True
+                self._thread.start()
+            # it's queued in the lock, so it's before the stop signal of close.
+            self._queue.put(
+                _DeleteRequest(name=name, log=log or self._log, future=future)
+            )
+        return future
+
+    def reconcile_orphans(self) -> List[str]:
+        """
+        queue resource groups, which are created by previous runs, but not
+        deleted, like the run is crashed. Returns names of queued resource
+        groups.
+        """
+        orphans: List[str] = []
+        for record in self._journal.load().values():
+            if (
+                record.subscription_id != self._subscription_id
+                or record.state == RESOURCE_GROUP_STATE_DELETED
+                or record.run_id == constants.RUN_ID
+                or not self._is_orphan(record)
+            ):
+                continue
+            orphans.append(record.name)
+
+        self._journal.compact()
+        if orphans:
+            self._log.info(f"deleting orphan resource groups: {orphans}")
+        for name in orphans:
+            self.delete(name)
+        return orphans
+
+    def close(self) -> None:
+        """
+        dispatch all queued deletions. It doesn't wait the deletions complete,
+        the unfinished ones are reconciled by next run.
+        """
+        with self._pending_lock:
+            if self._is_closed:
+                return
+            self._is_closed = True
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join()
+        self._pool.shutdown(wait=True)
+
+    def _dispatch(self) -> None:
+        while True:
+            request = self._queue.get()
+            batch: List[_DeleteRequest] = []
+            is_stopping = request is None
+            if request:
+                batch.append(request)
+            # drain all queued requests, so they are deleted together.
+            while True:
+                try:
+                    request = self._queue.get_nowait()
+                except Empty:
+                    break
+                if request is None:
+                    is_stopping = True
+                else:
+                    batch.append(request)
+
+            if batch:
+                self._log.debug(f"deleting resource groups: {[x.name for x in batch]}")
+                # wait for the batch is dispatched, so close() can make sure
+                # all deletions are started.
+                list(self._pool.map(self._delete, batch))
+            if is_stopping:
+                break
+
+    def _delete(self, request: _DeleteRequest) -> None:
+        try:
+            if not self._exists_func(request.name):
+                self._complete(request, None)
+                return
+        except Exception as identifier:
+            self._complete(request, identifier)
+            return
+
+        try:
+            operation = self._delete_func(request.name, request.log)
+        except Exception as identifier:
+            # like deleting in the runner thread, the failure to start deleting
+            # doesn't fail the caller. It's kept in journal as created, so it's
+            # retried by next run.
+            request.log.debug(
+                f"exception on delete resource group '{request.name}': {identifier}"
+            )
+            self._complete(request, None, is_deleted=False)
+            return
+        if operation is None:
+            self._complete(request, None)
+            return
+        poller_future = self._poller.submit(operation)
+
+        poller_future.add_done_callback(
+            lambda x: self._complete(request, x.exception())
+        )
+
+    def _complete(
+        self,
+        request: _DeleteRequest,
+        exception: Optional[BaseException],
+        is_deleted: bool = True,
+    ) -> None:
+        with self._pending_lock:
+            # a new request is queued, if the waiter cancels this one.
+            if self._pending.get(request.name.lower()) is request.future:
+                self._pending.pop(request.name.lower())
+        if not exception and is_deleted:
+            self._journal.append(
+                [self._create_record(request.name, RESOURCE_GROUP_STATE_DELETED)]
+            )
+            request.log.debug(f"deleted resource group: {request.name}")
+        # the waiter may cancel the future, like the run is cancelled.
+        if not request.future.set_running_or_notify_cancel():
+            return
+        if exception:
+            # keep it in journal as created, so it's retried by the next run.
+            request.future.set_exception(exception)
+        else:
+            request.future.set_result(None)
+
+    def _create_record(self, name: str, state: str) -> ResourceGroupRecord:
+        return ResourceGroupRecord(
+            name=name,
+            subscription_id=self._subscription_id,
+            state=state,
+            run_id=constants.RUN_ID,
+            host=socket.gethostname(),
+            pid=os.getpid(),
+        )
+
+    def _is_orphan(self, record: ResourceGroupRecord) -> bool:
+        if record.host != socket.gethostname():
+            # The cache folder may be shared with runs on other machines. Their
+            # processes cannot be checked, and long runs may still use the
+            # resource groups, so they are reaped by runs on their own host.
+            return False
+
+        if sys.platform == "win32":
+            updated_time = datetime.fromisoformat(record.updated_time)
+            return datetime.now() - updated_time > timedelta(hours=ORPHAN_AGE_HOURS)
+
+        # the owner run is still going, if the process is alive.
+        try:
+            os.kill(record.pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            # the process exists, but belongs to another user.
+            return False
+        return record.pid == os.getpid()
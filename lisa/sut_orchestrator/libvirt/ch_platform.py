@@ -11,7 +11,11 @@ from lisa import schema
 from lisa.environment import Environment
 from lisa.feature import Feature
 from lisa.node import Node
-from lisa.sut_orchestrator.libvirt.context import NodeContext, get_node_context
+from lisa.sut_orchestrator.libvirt.context import (
+    NodeContext,
+    get_node_context,
+    get_node_host,
+)
 from lisa.sut_orchestrator.libvirt.platform import BaseLibvirtPlatform
 from lisa.tools import QemuImg
 from lisa.util.logger import Logger, filter_ansi_escape
@@ -57,10 +61,10 @@ class CloudHypervisorPlatform(BaseLibvirtPlatform):
 
         assert isinstance(node_runbook, CloudHypervisorNodeSchema)
         node_context = get_node_context(node)
-        if self.host_node.is_remote:
+        if get_node_host(node).node.is_remote:
             node_context.firmware_source_path = node_runbook.firmware
             node_context.firmware_path = os.path.join(
-                self.vm_disks_dir, os.path.basename(node_runbook.firmware)
+                node_context.vm_disks_dir, os.path.basename(node_runbook.firmware)
             )
         else:
             node_context.firmware_path = node_runbook.firmware
@@ -73,7 +77,7 @@ class CloudHypervisorPlatform(BaseLibvirtPlatform):
         log: Logger,
     ) -> None:
         if node_context.firmware_source_path:
-            self.host_node.shell.copy(
+            get_node_host(node).node.shell.copy(
                 Path(node_context.firmware_source_path),
                 Path(node_context.firmware_path),
             )
@@ -159,6 +163,12 @@ class CloudHypervisorPlatform(BaseLibvirtPlatform):
     def _get_domain_undefine_flags(self) -> int:
         return 0
 
+    def _snapshot_environment(self, environment: Environment, log: Logger) -> None:
+        # The OS disk is raw, so it cannot be kept as a backing file. The
+        # environment is deleted and deployed again instead.
+        if self.platform_runbook.reset_by_snapshot:
+            log.debug("reset_by_snapshot is not supported by cloud-hypervisor.")
+
     def _create_domain_and_attach_logger(
         self,
         node_context: NodeContext,
@@ -176,16 +186,17 @@ class CloudHypervisorPlatform(BaseLibvirtPlatform):
         self, environment: Environment, log: Logger, node: Node
     ) -> None:
         node_context = get_node_context(node)
+        host_node = get_node_host(node).node
 
         if node_context.os_disk_base_file_fmt == DiskImageFormat.QCOW2:
-            self.host_node.tools[QemuImg].convert(
+            host_node.tools[QemuImg].convert(
                 "qcow2",
                 node_context.os_disk_base_file_path,
                 "raw",
                 node_context.os_disk_file_path,
             )
         else:
-            self.host_node.execute(
+            host_node.execute(
                 f"cp {node_context.os_disk_base_file_path}"
                 f" {node_context.os_disk_file_path}",
                 expected_exit_code=0,
@@ -193,20 +204,19 @@ class CloudHypervisorPlatform(BaseLibvirtPlatform):
             )
 
         if node_context.os_disk_img_resize_gib:
-            self.host_node.tools[QemuImg].resize(
+            host_node.tools[QemuImg].resize(
                 src_file=node_context.os_disk_file_path,
                 size_gib=node_context.os_disk_img_resize_gib,
             )
 
-    def _get_vmm_version(self) -> str:
+    def _get_vmm_version(self, host_node: Node) -> str:
         result = "Unknown"
-        if self.host_node:
-            output = self.host_node.execute(
-                "cloud-hypervisor --version",
-                shell=True,
-            ).stdout
-            output = filter_ansi_escape(output)
-            match = re.search(CH_VERSION_PATTERN, output.strip())
-            if match:
-                result = match.group("ch_version")
+        output = host_node.execute(
+            "cloud-hypervisor --version",
+            shell=True,
+        ).stdout
+        output = filter_ansi_escape(output)
+        match = re.search(CH_VERSION_PATTERN, output.strip())
+        if match:
+            result = match.group("ch_version")
         return result
@@ -1,13 +1,38 @@
 from dataclasses import dataclass, field
+from threading import Lock
 from typing import Any, Dict, List, Optional, Tuple
 
 import libvirt  # type: ignore
 
 from lisa.environment import Environment
 from lisa.node import Node
+from lisa.util.perf_timer import Timer
 
 from .console_logger import QemuConsoleLogger
-from .schema import DiskImageFormat
+from .lease_watcher import DhcpLeaseWatcher
+from .placement import Reservation
+from .schema import DiskImageFormat, LibvirtHost
+
+
+# A libvirt host, which the VMs are spawned on.
+@dataclass
+class HostContext:
+    # The key of the host in the placement ledger.
+    name: str
+    runbook: LibvirtHost
+    node: Node
+    libvirt_conn_str: str = ""
+    libvirt_conn: Optional[libvirt.virConnect] = None
+    # Wakes up the deploying threads when VMs acquire IP addresses.
+    lease_watcher: Optional[DhcpLeaseWatcher] = None
+
+    # used for port forwarding in case of Remote Host
+    # 49512 is the first available private port
+    next_available_port: int = 49152
+    port_forwarding_lock: Lock = field(default_factory=Lock)
+
+    # Lock used for scp-ing disk image to Remote host VM
+    disk_img_copy_lock: Lock = field(default_factory=Lock)
 
 
 @dataclass
@@ -26,6 +51,15 @@ class EnvironmentContext:
     # List of (port, IP) used in port forwading
     port_forwarding_list: List[Tuple[int, str]] = field(default_factory=list)
 
+    # The host, which all the VMs of the environment are placed on.
+    host: Optional[HostContext] = None
+    # The CPU and memory reserved on the host.
+    reservation: Optional[Reservation] = None
+    vm_disks_dir: str = ""
+
+    # True, if all the nodes have a snapshot to revert to.
+    has_snapshot: bool = False
+
 
 @dataclass
 class InitSystem:
@@ -36,6 +70,8 @@ class InitSystem:
 @dataclass
 class NodeContext:
     vm_name: str = ""
+    host: Optional[HostContext] = None
+    vm_disks_dir: str = ""
     firmware_source_path: str = ""
     firmware_path: str = ""
     cloud_init_file_path: str = ""
@@ -56,6 +92,18 @@ class NodeContext:
 
     console_logger: Optional[QemuConsoleLogger] = None
     domain: Optional[libvirt.virDomain] = None
+    # MAC address of the NIC, which is used to match the DHCP lease.
+    mac_address: str = ""
+    # Started when the domain is started, it measures boot to IP latency.
+    boot_timer: Optional[Timer] = None
+
+    # The snapshot, which the node is reverted to. The memory is saved to the
+    # state file, and the disks at the time are kept as backing files of the
+    # disks. The key is the disk path, and the value is its backing file.
+    snapshot_state_file_path: str = ""
+    snapshot_disk_file_paths: Dict[str, str] = field(default_factory=dict)
+    nvram_file_path: str = ""
+    snapshot_nvram_file_path: str = ""
 
 
 def get_environment_context(environment: Environment) -> EnvironmentContext:
@@ -64,3 +112,9 @@ def get_environment_context(environment: Environment) -> EnvironmentContext:
 
 def get_node_context(node: Node) -> NodeContext:
     return node.get_context(NodeContext)
+
+
+def get_node_host(node: Node) -> HostContext:
+    host = get_node_context(node).host
+    assert host, f"the node '{node.name}' is not placed on a host"
+    return host
@@ -0,0 +1,191 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+# Wakes up the threads that wait for VMs to acquire an IP address from libvirt's
+# DHCP server.
+#
+# libvirt doesn't raise an event when its DHCP server hands out a lease. So, the
+# leases of the network are read by a single watcher thread on behalf of all the
+# waiting VMs. The watcher is woken up by domain and network lifecycle events
+# (delivered by the libvirt events thread) and otherwise backs off exponentially,
+# instead of every deploying thread spinning on the libvirt daemon.
+
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional
+
+import libvirt  # type: ignore
+
+from lisa.util.logger import Logger, get_logger
+
+from . import libvirt_events_thread
+
+# The first interval is short, because leases are usually handed out within a few
+# seconds after the domain starts.
+_MIN_POLL_INTERVAL = 0.25
+_MAX_POLL_INTERVAL = 4.0
+
+
+@dataclass
+class _LeaseWaiter:
+    mac_address: str
+    address: Optional[str] = None
+    acquired: Event = field(default_factory=Event)
+
+
+class DhcpLeaseWatcher:
+    def __init__(
+        self,
+        conn: libvirt.virConnect,
+        network_name: str = "default",
+        parent_logger: Optional[Logger] = None,
+    ) -> None:
+        self._conn = conn
+        self._network_name = network_name
+        self._log = get_logger("lease_watcher", parent=parent_logger)
+
+        self._lock = Lock()
+        # Waiters are indexed by the lower case MAC address of the VM's NIC.
+        self._waiters: Dict[str, List[_LeaseWaiter]] = {}
+        self._wake_up = Event()
+        self._stopped = Event()
+        self._thread: Optional[Thread] = None
+        self._domain_callback_id: Optional[int] = None
+        self._network_callback_id: Optional[int] = None
+
+    def start(self) -> None:
+        # The events are dispatched by the libvirt events thread, so it must be
+        # running before the callbacks are registered.
+        libvirt_events_thread.init()
+
+        try:
+            self._domain_callback_id = self._conn.domainEventRegisterAny(
+                None,
+                libvirt.VIR_DOMAIN_EVENT_ID_LIFECYCLE,
+                self._domain_lifecycle_event,
+                None,
+            )
+            self._network_callback_id = self._conn.networkEventRegisterAny(
+                None,
+                libvirt.VIR_NETWORK_EVENT_ID_LIFECYCLE,
+                self._network_lifecycle_event,
+                None,
+            )
+        except libvirt.libvirtError as ex:
+            # The watcher still works without the events, it just relies on the
+            # back-off timer only.
+            self._log.debug(f"failed to register libvirt events: {ex}")
+
+        thread = Thread(target=self._watch, name="libvirt-lease-watcher")
+        thread.daemon = True
+        thread.start()
+        self._thread = thread
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake_up.set()
+
+        try:
+            if self._domain_callback_id is not None:
+                self._conn.domainEventDeregisterAny(self._domain_callback_id)
+            if self._network_callback_id is not None:
+                self._conn.networkEventDeregisterAny(self._network_callback_id)
+        except libvirt.libvirtError as ex:
+            self._log.debug(f"failed to deregister libvirt events: {ex}")
+        self._domain_callback_id = None
+        self._network_callback_id = None
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    # Block until the NIC with the MAC address acquires a lease or the timeout
+    # expires. Returns the IP address, or None on timeout.
+    def wait_for_address(self, mac_address: str, timeout: float) -> Optional[str]:
+        waiter = _LeaseWaiter(mac_address=mac_address.lower())
+        with self._lock:
+            self._waiters.setdefault(waiter.mac_address, []).append(waiter)
+        # Scan immediately, the lease may already exist.
+        self._wake_up.set()
+
+        try:
+            waiter.acquired.wait(max(timeout, 0))
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(waiter.mac_address, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(waiter.mac_address, None)
+
+        return waiter.address
+
+    # Threading: called on libvirt events thread.
+    def _domain_lifecycle_event(
+        self,
+        conn: libvirt.virConnect,
+        domain: libvirt.virDomain,
+        event: int,
+        detail: int,
+        opaque: Any,
+    ) -> None:
+        if event in (
+            libvirt.VIR_DOMAIN_EVENT_STARTED,
+            libvirt.VIR_DOMAIN_EVENT_RESUMED,
+        ):
+            self._wake_up.set()
+
+    # Threading: called on libvirt events thread.
+    def _network_lifecycle_event(
+        self,
+        conn: libvirt.virConnect,
+        network: libvirt.virNetwork,
+        event: int,
+        detail: int,
+        opaque: Any,
+    ) -> None:
+        self._wake_up.set()
+
+    def _watch(self) -> None:
+        interval = _MIN_POLL_INTERVAL
+        while not self._stopped.is_set():
+            with self._lock:
+                has_waiters = bool(self._waiters)
+
+            if has_waiters:
+                woken_up = self._wake_up.wait(interval)
+            else:
+                # Nothing to do until somebody waits.
+                woken_up = self._wake_up.wait()
+            self._wake_up.clear()
+
+            if self._stopped.is_set():
+                break
+
+            if woken_up:
+                interval = _MIN_POLL_INTERVAL
+            else:
+                interval = min(interval * 2, _MAX_POLL_INTERVAL)
+
+            try:
+                self._scan_leases()
+            except libvirt.libvirtError as ex:
+                self._log.debug(f"failed to read DHCP leases: {ex}")
+
+    def _scan_leases(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                return
+
+        network = self._conn.networkLookupByName(self._network_name)
+        leases = network.DHCPLeases()
+
+        with self._lock:
+            for lease in leases:
+                mac_address = str(lease.get("mac", "")).lower()
+                address = lease.get("ipaddr")
+                if not address:
+                    continue
+                for waiter in self._waiters.pop(mac_address, []):
+                    waiter.address = address
+                    waiter.acquired.set()
@@ -0,0 +1,162 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+# Places environments on libvirt hosts.
+#
+# The free memory of a host doesn't tell how much memory is promised to the VMs,
+# which are being deployed or are still booting. So the CPU and memory of all the
+# VMs placed on a host are reserved in a ledger, until their environment is
+# deleted. The ledger is shared by all the platforms of a run, because each
+# runner creates its own platform for the same hosts.
+
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Optional
+
+from lisa.util import LisaException
+
+from .schema import PLACEMENT_POLICY_PACK, PLACEMENT_POLICY_SPREAD
+
+
+@dataclass
+class HostCapacity:
+    core_count: int = 0
+    memory_mib: int = 0
+
+
+@dataclass(eq=False)
+class Reservation:
+    host: str
+    core_count: int = 0
+    memory_mib: int = 0
+
+
+@dataclass
+class _HostEntry:
+    capacity: HostCapacity = field(default_factory=HostCapacity)
+    reservations: List[Reservation] = field(default_factory=list)
+
+    @property
+    def reserved_core_count(self) -> int:
+        return sum(x.core_count for x in self.reservations)
+
+    @property
+    def reserved_memory_mib(self) -> int:
+        return sum(x.memory_mib for x in self.reservations)
+
+
+class HostLedger:
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._hosts: Dict[str, _HostEntry] = {}
+
+    def update_capacity(self, host: str, capacity: HostCapacity) -> None:
+        """
+        The memory is measured as the free memory of the host. If there are
+        reservations on the host, the free memory is already taken by them, so
+        only the core count is updated.
+        """
+        with self._lock:
+            entry = self._hosts.setdefault(host, _HostEntry())
+            entry.capacity.core_count = capacity.core_count
+            if not entry.reservations:
+                entry.capacity.memory_mib = capacity.memory_mib
+
+    def get_capacity(self, host: str) -> HostCapacity:
+        with self._lock:
+            entry = self._hosts.get(host, _HostEntry())
+            return HostCapacity(
+                core_count=entry.capacity.core_count,
+                memory_mib=entry.capacity.memory_mib,
+            )
+
+    def get_reserved(self, host: str) -> HostCapacity:
+        with self._lock:
+            entry = self._hosts.get(host, _HostEntry())
+            return HostCapacity(
+                core_count=entry.reserved_core_count,
+                memory_mib=entry.reserved_memory_mib,
+            )
+
+    def can_fit(self, host: str, demand: HostCapacity) -> bool:
+        """
+        Returns True, if the demand fits the host when nothing is reserved on it.
+        """
+        capacity = self.get_capacity(host)
+        return (
+            demand.core_count <= capacity.core_count
+            and demand.memory_mib <= capacity.memory_mib
+        )
+
+    def reserve(
+        self,
+        hosts: List[str],
+        demand: HostCapacity,
+        policy: str = PLACEMENT_POLICY_SPREAD,
+    ) -> Optional[Reservation]:
+        """
+        Reserves the demand on one of the hosts by the policy. The spread
+        policy places it on the least utilized host, and the pack policy places
+        it on the most utilized host, which still has room. The earlier host is
+        chosen on ties. Returns None, if no host has room now.
+        """
+        if policy not in [PLACEMENT_POLICY_SPREAD, PLACEMENT_POLICY_PACK]:
+            raise LisaException(
+                f"unknown placement policy: '{policy}'. Expecting either "
+                f"'{PLACEMENT_POLICY_SPREAD}' or '{PLACEMENT_POLICY_PACK}'."
+            )
+
+        with self._lock:
+            selected: Optional[str] = None
+            selected_utilization = 0.0
+            for host in hosts:
+                entry = self._hosts.get(host)
+                if not entry:
+                    continue
+                utilization = _get_utilization(entry, demand)
+                if utilization is None:
+                    continue
+                if (
+                    selected is None
+                    or (
+                        policy == PLACEMENT_POLICY_SPREAD
+                        and utilization < selected_utilization
+                    )
+                    or (
+                        policy == PLACEMENT_POLICY_PACK
+                        and utilization > selected_utilization
+                    )
+                ):
+                    selected = host
+                    selected_utilization = utilization
+
+            if selected is None:
+                return None
+
+            reservation = Reservation(
+                host=selected,
+                core_count=demand.core_count,
+                memory_mib=demand.memory_mib,
+            )
+            self._hosts[selected].reservations.append(reservation)
+            return reservation
+
+    def release(self, reservation: Reservation) -> None:
+        with self._lock:
+            entry = self._hosts.get(reservation.host)
+            if entry and reservation in entry.reservations:
+                entry.reservations.remove(reservation)
+
+
+# Returns the utilization of the host after the demand is placed, or None if it
+# doesn't fit. The utilization is the higher one of CPU and memory.
+def _get_utilization(entry: _HostEntry, demand: HostCapacity) -> Optional[float]:
+    capacity = entry.capacity
+    core_count = entry.reserved_core_count + demand.core_count
+    memory_mib = entry.reserved_memory_mib + demand.memory_mib
+    if core_count > capacity.core_count or memory_mib > capacity.memory_mib:
+        return None
+    return max(
+        core_count / max(capacity.core_count, 1),
+        memory_mib / max(capacity.memory_mib, 1),
+    )
@@ -12,8 +12,9 @@ import sys
 import tempfile
 import time
 import xml.etree.ElementTree as ET  # noqa: N817
+from functools import partial
 from pathlib import Path, PurePosixPath
-from threading import Lock, Timer
+from threading import Timer
 from typing import Any, Dict, List, Optional, Tuple, Type, cast
 
 import libvirt  # type: ignore
@@ -41,18 +42,29 @@ from lisa.tools import (
     Uname,
     Whoami,
 )
-from lisa.util import LisaException, constants, get_public_key_data
+from lisa.util import (
+    LisaException,
+    ResourceAwaitableException,
+    constants,
+    get_public_key_data,
+)
 from lisa.util.logger import Logger, filter_ansi_escape, get_logger
+from lisa.util.parallel import run_in_parallel
+from lisa.util.perf_timer import create_timer
 
 from . import libvirt_events_thread
 from .console_logger import QemuConsoleLogger
 from .context import (
     DataDiskContext,
+    HostContext,
     InitSystem,
     NodeContext,
     get_environment_context,
     get_node_context,
+    get_node_host,
 )
+from .lease_watcher import DhcpLeaseWatcher
+from .placement import HostCapacity, HostLedger
 from .platform_interface import IBaseLibvirtPlatform
 from .schema import (
     FIRMWARE_TYPE_BIOS,
@@ -60,6 +72,7 @@ from .schema import (
     BaseLibvirtNodeSchema,
     BaseLibvirtPlatformSchema,
     DiskImageFormat,
+    LibvirtHost,
 )
 from .serial_console import SerialConsole
 from .start_stop import StartStop
@@ -70,6 +83,9 @@ KEY_HOST_KERNEL = "host_kernel_version"
 KEY_LIBVIRT_VERSION = "libvirt_version"
 KEY_VMM_VERSION = "vmm_version"
 
+# seconds between queries of the IP address, if the lease watcher isn't used.
+IP_ADDRESS_POLL_INTERVAL = 1
+
 
 class _HostCapabilities:
     def __init__(self) -> None:
@@ -90,20 +106,14 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         StartStop,
     ]
 
+    # The reservations of all the platforms, because the runners create their
+    # own platforms for the same hosts.
+    _host_ledger = HostLedger()
+
     def __init__(self, runbook: schema.Platform) -> None:
         super().__init__(runbook=runbook)
-        self.libvirt_conn_str: str
-        self.libvirt_conn: libvirt.virConnect
         self.platform_runbook: BaseLibvirtPlatformSchema
-        self.host_node: Node
-        self.vm_disks_dir: str
-
-        # used for port forwarding in case of Remote Host
-        self._next_available_port: int
-        self._port_forwarding_lock: Lock
-
-        # Lock used for scp-ing disk image to Remote host VM
-        self._disk_img_copy_lock: Lock
+        self.hosts: List[HostContext] = []
 
         self._host_environment_information_hooks = {
             KEY_HOST_DISTRO: self._get_host_distro,
@@ -128,26 +138,29 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
     def node_runbook_type(cls) -> type:
         return BaseLibvirtNodeSchema
 
+    @property
+    def host_node(self) -> Node:
+        # The first host, which is used when a host isn't specified.
+        return self.hosts[0].node
+
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         libvirt_events_thread.init()
 
-        # 49512 is the first available private port
-        self._next_available_port = 49152
-        self._port_forwarding_lock = Lock()
-
-        self._disk_img_copy_lock = Lock()
-
         self.platform_runbook = self.runbook.get_extended_runbook(
             self.__platform_runbook_type(), type_name=type(self).type_name()
         )
 
-        if len(self.platform_runbook.hosts) > 1:
-            self._log.warning(
-                "Multiple hosts are currently not supported. "
-                "Only the first host will be used."
-            )
+        if not self.platform_runbook.hosts:
+            raise LisaException("At least one host must be provided")
+
+        for index, host in enumerate(self.platform_runbook.hosts):
+            self.hosts.append(self._connect_host(index, host))
 
-        host = self.platform_runbook.hosts[0]
+    def _connect_host(self, index: int, host: LibvirtHost) -> HostContext:
+        # keep the name of the first host, so the log path is the same as a
+        # single host.
+        name = "libvirt-host" if index == 0 else f"libvirt-host-{index}"
+        host_node: Node
         if host.is_remote():
             assert host.address
             if not host.username:
@@ -155,29 +168,43 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             if not host.private_key_file:
                 raise LisaException("Private key file must be provided for remote host")
 
-            self.host_node = RemoteNode(
-                runbook=schema.Node(name="libvirt-host"),
-                index=-1,
-                logger_name="libvirt-host",
+            host_node = RemoteNode(
+                runbook=schema.Node(name=name),
+                index=-1 - index,
+                logger_name=name,
                 parent_logger=get_logger("libvirt-platform"),
             )
 
-            self.host_node.set_connection_info(
+            host_node.set_connection_info(
                 address=host.address,
                 username=host.username,
                 private_key_file=host.private_key_file,
             )
         else:
-            self.host_node = local_node_connect(
-                name="libvirt-host",
+            host_node = local_node_connect(
+                name=name,
                 parent_logger=get_logger("libvirt-platform"),
             )
 
         if self.platform_runbook.capture_libvirt_debug_logs:
-            self._enable_libvirt_debug_log()
+            self._enable_libvirt_debug_log(host_node)
+
+        host_context = HostContext(
+            # VMs of different hypervisors on the same host share its resources,
+            # so the address identifies the host in the ledger.
+            name=host.address or "localhost",
+            runbook=host,
+            node=host_node,
+            libvirt_conn_str=self._get_libvirt_conn_string(host),
+        )
+        host_context.libvirt_conn = libvirt.open(host_context.libvirt_conn_str)
+
+        host_context.lease_watcher = DhcpLeaseWatcher(
+            host_context.libvirt_conn, parent_logger=host_node.log
+        )
+        host_context.lease_watcher.start()
 
-        self.__init_libvirt_conn_string()
-        self.libvirt_conn = libvirt.open(self.libvirt_conn_str)
+        return host_context
 
     def _prepare_environment(self, environment: Environment, log: Logger) -> bool:
         # Ensure environment log directory is created before connecting to any nodes.
@@ -191,22 +218,32 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         self._deploy_nodes(environment, log)
 
     def _delete_environment(self, environment: Environment, log: Logger) -> None:
-        self._delete_nodes(environment, log)
+        environment_context = get_environment_context(environment)
+        host = environment_context.host
+        if host:
+            self._delete_nodes(environment, log)
+
+            if host.node.is_remote:
+                self._stop_port_forwarding(environment, log)
 
-        if self.host_node.is_remote:
-            self._stop_port_forwarding(environment, log)
+        self._release_host(environment, log)
 
     def _cleanup(self) -> None:
-        if self.platform_runbook.capture_libvirt_debug_logs:
-            self._disable_libvirt_debug_log()
+        for host in self.hosts:
+            if host.lease_watcher:
+                host.lease_watcher.stop()
+                host.lease_watcher = None
+
+            if self.platform_runbook.capture_libvirt_debug_logs:
+                self._disable_libvirt_debug_log(host.node)
 
-        self._capture_libvirt_logs()
+            self._capture_libvirt_logs(host.node)
 
-        if self.host_node.is_remote:
-            dmesg_output = self.host_node.tools[Dmesg].get_output(force_run=True)
-            dmesg_path = self.host_node.local_log_path / "dmesg.txt"
-            with open(str(dmesg_path), "w") as f:
-                f.write(dmesg_output)
+            if host.node.is_remote:
+                dmesg_output = host.node.tools[Dmesg].get_output(force_run=True)
+                dmesg_path = host.node.local_log_path / "dmesg.txt"
+                with open(str(dmesg_path), "w") as f:
+                    f.write(dmesg_output)
 
     def _configure_environment(self, environment: Environment, log: Logger) -> None:
         environment_context = get_environment_context(environment)
@@ -226,7 +263,21 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         if not environment.runbook.nodes_requirement:
             return True
 
-        host_capabilities = self._get_host_capabilities(log)
+        hosts_capabilities = [
+            self._get_host_capabilities(host, log) for host in self.hosts
+        ]
+        for host, host_capabilities in zip(self.hosts, hosts_capabilities):
+            self._host_ledger.update_capacity(
+                host.name, self._get_host_capacity(host_capabilities)
+            )
+
+        # The nodes of an environment are placed on the same host, so they can't
+        # be larger than the largest host.
+        host_capabilities = _HostCapabilities()
+        host_capabilities.core_count = max(x.core_count for x in hosts_capabilities)
+        host_capabilities.free_memory_kib = max(
+            x.free_memory_kib for x in hosts_capabilities
+        )
         nodes_capabilities = self._create_node_capabilities(host_capabilities)
 
         nodes_requirement = []
@@ -241,16 +292,22 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             node_requirement = node_space.generate_min_capability(nodes_capabilities)
             nodes_requirement.append(node_requirement)
 
-        if not self._check_host_capabilities(nodes_requirement, host_capabilities, log):
+        if not any(
+            self._check_host_capabilities(nodes_requirement, x, log) for x in self.hosts
+        ):
+            log.error("No host can fulfill the requirements of the nodes.")
             return False
 
         environment.runbook.nodes_requirement = nodes_requirement
         return True
 
-    def _get_host_capabilities(self, log: Logger) -> _HostCapabilities:
+    def _get_host_capabilities(
+        self, host: HostContext, log: Logger
+    ) -> _HostCapabilities:
         host_capabilities = _HostCapabilities()
 
-        capabilities_xml_str = self.libvirt_conn.getCapabilities()
+        assert host.libvirt_conn
+        capabilities_xml_str = host.libvirt_conn.getCapabilities()
         capabilities_xml = ET.fromstring(capabilities_xml_str)
 
         host_xml = capabilities_xml.find("host")
@@ -270,7 +327,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
         # Get free memory.
         # Include the disk cache size, as it will be freed if memory becomes limited.
-        memory_stats = self.libvirt_conn.getMemoryStats(
+        memory_stats = host.libvirt_conn.getMemoryStats(
             libvirt.VIR_NODE_MEMORY_STATS_ALL_CELLS
         )
         host_capabilities.free_memory_kib = (
@@ -279,13 +336,22 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         )
 
         log.debug(
-            f"QEMU host: "
+            f"QEMU host {host.name}: "
             f"CPU Cores = {host_capabilities.core_count}, "
             f"Free Memory = {host_capabilities.free_memory_kib} KiB"
         )
 
         return host_capabilities
 
+    def _get_host_capacity(self, host_capabilities: _HostCapabilities) -> HostCapacity:
+        return HostCapacity(
+            core_count=int(
+                host_capabilities.core_count
+                * self.platform_runbook.cpu_overcommit_ratio
+            ),
+            memory_mib=host_capabilities.free_memory_kib // 1024,
+        )
+
     # Create the set of capabilities that are generally supported on QEMU nodes.
     def _create_node_capabilities(
         self, host_capabilities: _HostCapabilities
@@ -317,27 +383,34 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
     def _check_host_capabilities(
         self,
         nodes_requirements: List[schema.NodeSpace],
-        host_capabilities: _HostCapabilities,
+        host: HostContext,
         log: Logger,
     ) -> bool:
-        total_required_memory_mib = 0
-
-        for node_requirements in nodes_requirements:
-            # Calculate the total amount of memory required for all the VMs.
-            assert isinstance(node_requirements.memory_mb, int)
-            total_required_memory_mib += node_requirements.memory_mb
-
-        # Ensure host has enough memory for all the VMs.
-        total_required_memory_kib = total_required_memory_mib * 1024
-        if total_required_memory_kib > host_capabilities.free_memory_kib:
-            log.error(
-                f"Nodes require a total of {total_required_memory_kib} KiB memory. "
-                f"Host only has {host_capabilities.free_memory_kib} KiB free."
+        demand = self._get_nodes_demand(nodes_requirements)
+        # Ensure host has enough resources for all the VMs, when the other
+        # environments are deleted. If they aren't deleted yet, the environment
+        # waits for them on deploying.
+        if not self._host_ledger.can_fit(host.name, demand):
+            capacity = self._host_ledger.get_capacity(host.name)
+            log.debug(
+                f"Nodes require a total of {demand.core_count} cores and "
+                f"{demand.memory_mib} MiB memory. Host {host.name} only has "
+                f"{capacity.core_count} cores and {capacity.memory_mib} MiB free."
             )
             return False
 
         return True
 
+    def _get_nodes_demand(self, nodes_requirements: List[Any]) -> HostCapacity:
+        demand = HostCapacity()
+        for node_requirements in nodes_requirements:
+            assert isinstance(node_requirements, schema.NodeSpace)
+            assert isinstance(node_requirements.core_count, int)
+            assert isinstance(node_requirements.memory_mb, int)
+            demand.core_count += node_requirements.core_count
+            demand.memory_mib += node_requirements.memory_mb
+        return demand
+
     # Get the minimum value for a node requirement with an interger type.
     # Note: Unlike other orchestrators, we don't want to fill up the capacity of
     # the host in case the test is running on a dev box.
@@ -345,6 +418,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         return search_space.generate_min_capability_countspace(count_space, count_space)
 
     def _deploy_nodes(self, environment: Environment, log: Logger) -> None:
+        self._reserve_host(environment, log)
         self._configure_nodes(environment, log)
 
         try:
@@ -361,16 +435,61 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
             raise ex
 
+    # Place the environment on a host, which has room for all its nodes. If no
+    # host has room now, the environment waits for other environments to be
+    # deleted.
+    def _reserve_host(self, environment: Environment, log: Logger) -> None:
+        environment_context = get_environment_context(environment)
+        if environment_context.reservation:
+            return
+
+        assert environment.runbook.nodes_requirement
+        demand = self._get_nodes_demand(environment.runbook.nodes_requirement)
+
+        reservation = self._host_ledger.reserve(
+            [x.name for x in self.hosts],
+            demand,
+            self.platform_runbook.placement_policy,
+        )
+        if not reservation:
+            raise ResourceAwaitableException(
+                "host",
+                f"no host has {demand.core_count} cores and "
+                f"{demand.memory_mib} MiB memory to reserve.",
+            )
+
+        environment_context.reservation = reservation
+        environment_context.host = next(
+            x for x in self.hosts if x.name == reservation.host
+        )
+        reserved = self._host_ledger.get_reserved(reservation.host)
+        log.debug(
+            f"placed on host {reservation.host}, "
+            f"reserved cores: {reserved.core_count}, "
+            f"reserved memory: {reserved.memory_mib} MiB"
+        )
+
+    def _release_host(self, environment: Environment, log: Logger) -> None:
+        environment_context = get_environment_context(environment)
+        if environment_context.reservation:
+            self._host_ledger.release(environment_context.reservation)
+            log.debug(f"released host {environment_context.reservation.host}")
+            environment_context.reservation = None
+
     # Pre-determine all the nodes' properties, including the name of all the resouces
     # to be created. This makes it easier to cleanup everything after the test is
     # finished (or fails).
     def _configure_nodes(self, environment: Environment, log: Logger) -> None:
+        environment_context = get_environment_context(environment)
+        host = environment_context.host
+        assert host
+
         # Generate a random name for the VMs.
         test_suffix = "".join(random.choice(string.ascii_uppercase) for _ in range(5))
         vm_name_prefix = f"lisa-{test_suffix}"
 
-        self.vm_disks_dir = os.path.join(
-            self.platform_runbook.hosts[0].lisa_working_dir, vm_name_prefix
+        environment_context.vm_disks_dir = os.path.join(
+            host.runbook.lisa_working_dir, vm_name_prefix
         )
 
         assert environment.runbook.nodes_requirement
@@ -387,6 +506,9 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
                 raise LisaException(f"file does not exist: {node_runbook.disk_img}")
 
             node = environment.create_node_from_requirement(node_space)
+            node_context = get_node_context(node)
+            node_context.host = host
+            node_context.vm_disks_dir = environment_context.vm_disks_dir
 
             self._configure_node(
                 node,
@@ -405,6 +527,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         vm_name_prefix: str,
     ) -> None:
         node_context = get_node_context(node)
+        host = get_node_host(node)
 
         if node_runbook.ignition:
             node_context.init_system = InitSystem.IGNITION
@@ -436,18 +559,17 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
         if node_context.init_system == InitSystem.CLOUD_INIT:
             node_context.cloud_init_file_path = os.path.join(
-                self.vm_disks_dir, f"{node_context.vm_name}-cloud-init.iso"
+                node_context.vm_disks_dir, f"{node_context.vm_name}-cloud-init.iso"
             )
         else:
             node_context.ignition_file_path = os.path.join(
-                self.vm_disks_dir, f"{node_context.vm_name}-ignition.json"
+                node_context.vm_disks_dir, f"{node_context.vm_name}-ignition.json"
             )
 
-        if self.host_node.is_remote:
+        if host.node.is_remote:
             node_context.os_disk_source_file_path = node_runbook.disk_img
-            host = self.platform_runbook.hosts[0]
             node_context.os_disk_base_file_path = os.path.join(
-                host.lisa_working_dir, os.path.basename(node_runbook.disk_img)
+                host.runbook.lisa_working_dir, os.path.basename(node_runbook.disk_img)
             )
         else:
             node_context.os_disk_base_file_path = node_runbook.disk_img
@@ -460,7 +582,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             node_context.os_disk_img_resize_gib = node_runbook.disk_img_resize_gib
 
         node_context.os_disk_file_path = os.path.join(
-            self.vm_disks_dir, f"{node_context.vm_name}-os.qcow2"
+            node_context.vm_disks_dir, f"{node_context.vm_name}-os.qcow2"
         )
 
         node_context.console_log_file_path = str(
@@ -497,7 +619,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             for i in range(node_space.disk.data_disk_count):
                 data_disk = DataDiskContext()
                 data_disk.file_path = os.path.join(
-                    self.vm_disks_dir, f"{node_context.vm_name}-data-{i}.qcow2"
+                    node_context.vm_disks_dir, f"{node_context.vm_name}-data-{i}.qcow2"
                 )
                 data_disk.size_gib = node_space.disk.data_disk_size
 
@@ -543,16 +665,32 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         environment: Environment,
         log: Logger,
     ) -> None:
-        self.host_node.shell.mkdir(Path(self.vm_disks_dir), exist_ok=True)
-
-        for node in environment.nodes.list():
-            node_context = get_node_context(node)
-            self._create_node(
-                node,
-                node_context,
-                environment,
-                log,
-            )
+        environment_context = get_environment_context(environment)
+        host = environment_context.host
+        assert host
+        host.node.shell.mkdir(Path(environment_context.vm_disks_dir), exist_ok=True)
+
+        # Initialize the shared host tools before creating the nodes in parallel,
+        # so the threads don't race on installing them.
+        _ = host.node.tools[QemuImg]
+        _ = host.node.tools[Ls]
+        _ = host.node.tools[Chmod]
+
+        # The disks, the cloud-init ISOs and the domains of the nodes don't depend
+        # on each other, so they are created in parallel.
+        run_in_parallel(
+            [
+                partial(
+                    self._create_node,
+                    node,
+                    get_node_context(node),
+                    environment,
+                    log,
+                )
+                for node in environment.nodes.list()
+            ],
+            log,
+        )
 
     def _create_node(
         self,
@@ -561,20 +699,21 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         environment: Environment,
         log: Logger,
     ) -> None:
+        host = get_node_host(node)
         # Create required directories and copy the required files to the host node.
         if node_context.os_disk_source_file_path:
             # use lock to avoid multiple environments scp disk img to same
             # os_disk_base_file_path.
-            with self._disk_img_copy_lock:
-                source_exists = self.host_node.tools[Ls].path_exists(
+            with host.disk_img_copy_lock:
+                source_exists = host.node.tools[Ls].path_exists(
                     path=node_context.os_disk_base_file_path, sudo=True
                 )
                 if source_exists:
-                    self.host_node.tools[Chmod].chmod(
+                    host.node.tools[Chmod].chmod(
                         node_context.os_disk_base_file_path, "a+r", sudo=True
                     )
                 else:
-                    self.host_node.shell.copy(
+                    host.node.shell.copy(
                         Path(node_context.os_disk_source_file_path),
                         Path(node_context.os_disk_base_file_path),
                     )
@@ -595,13 +734,25 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         # Create libvirt domain (i.e. VM).
         xml = self._create_node_domain_xml(environment, log, node)
         log.debug(f"Domain xml for {node_context.vm_name} - {xml}")
-        node_context.domain = self.libvirt_conn.defineXML(xml)
+        assert host.libvirt_conn
+        node_context.domain = host.libvirt_conn.defineXML(xml)
+        node_context.mac_address = self._get_domain_mac_address(node_context.domain)
 
         log.debug(f"Creating libvirt domain - {node_context.vm_name}")
+        node_context.boot_timer = create_timer()
         self._create_domain_and_attach_logger(
             node_context,
         )
 
+    # Get the MAC address, which libvirt assigns to the NIC when the domain is
+    # defined.
+    def _get_domain_mac_address(self, domain: libvirt.virDomain) -> str:
+        domain_xml = ET.fromstring(domain.XMLDesc())
+        mac = domain_xml.find("./devices/interface/mac")
+        if mac is None:
+            return ""
+        return mac.attrib.get("address", "").lower()
+
     # Delete all the VMs.
     def _delete_nodes(self, environment: Environment, log: Logger) -> None:
         # Delete nodes.
@@ -609,8 +760,11 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             self._delete_node(node, log)
 
         # Delete VM disks directory.
+        environment_context = get_environment_context(environment)
+        host = environment_context.host
+        assert host
         try:
-            self.host_node.shell.remove(Path(self.vm_disks_dir), True)
+            host.node.shell.remove(Path(environment_context.vm_disks_dir), True)
         except Exception as ex:
             log.warning(f"Failed to delete VM files directory: {ex}")
 
@@ -654,6 +808,174 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
         watchdog.cancel()
 
+    def _snapshot_environment(self, environment: Environment, log: Logger) -> None:
+        if not self.platform_runbook.reset_by_snapshot:
+            return
+
+        environment_context = get_environment_context(environment)
+        run_in_parallel(
+            [
+                partial(self._snapshot_node, node, log)
+                for node in environment.nodes.list()
+            ],
+            log,
+        )
+        environment_context.has_snapshot = True
+
+    def _is_environment_resettable(self, environment: Environment) -> bool:
+        return get_environment_context(environment).has_snapshot
+
+    def _reset_environment(self, environment: Environment, log: Logger) -> None:
+        run_in_parallel(
+            [
+                partial(self._revert_node, node, log)
+                for node in environment.nodes.list()
+            ],
+            log,
+        )
+
+    # Save the memory and disks of the VM. Saving the memory stops the VM, so the
+    # disks are consistent with the memory. And then the disks are kept as
+    # backing files, so the changes after the snapshot go to new overlays, which
+    # are discarded on reverting.
+    def _snapshot_node(self, node: Node, log: Logger) -> None:
+        node_context = get_node_context(node)
+        host = get_node_host(node)
+        assert node_context.domain
+
+        log.debug(f"Taking snapshot of VM: {node_context.vm_name}")
+        timer = create_timer()
+        state_file_path = os.path.join(
+            node_context.vm_disks_dir, f"{node_context.vm_name}-snapshot.state"
+        )
+        nvram = ET.fromstring(node_context.domain.XMLDesc()).find("./os/nvram")
+        node_context.domain.save(state_file_path)
+        try:
+            if node_context.console_logger:
+                node_context.console_logger.wait_for_close()
+                node_context.console_logger = None
+
+            disk_file_paths = [node_context.os_disk_file_path] + [
+                x.file_path for x in node_context.data_disks
+            ]
+            try:
+                for disk_file_path in disk_file_paths:
+                    snapshot_file_path = f"{disk_file_path}.snapshot"
+                    # the disks are owned by libvirt, so sudo is needed.
+                    host.node.execute(
+                        f"mv {disk_file_path} {snapshot_file_path}",
+                        sudo=True,
+                        expected_exit_code=0,
+                        expected_exit_code_failure_message="Failed to keep the disk",
+                    )
+                    node_context.snapshot_disk_file_paths[
+                        disk_file_path
+                    ] = snapshot_file_path
+                    host.node.tools[QemuImg].create_diff_qcow2(
+                        disk_file_path, snapshot_file_path, sudo=True
+                    )
+
+                if nvram is not None and nvram.text:
+                    node_context.nvram_file_path = nvram.text
+                    node_context.snapshot_nvram_file_path = os.path.join(
+                        node_context.vm_disks_dir, f"{node_context.vm_name}-nvram.fd"
+                    )
+                    host.node.tools[Cp].copy(
+                        PurePosixPath(node_context.nvram_file_path),
+                        PurePosixPath(node_context.snapshot_nvram_file_path),
+                        sudo=True,
+                    )
+            except Exception:
+                # move the disks back, so the domain is restored with them.
+                self._discard_snapshot_disks(node_context, host)
+                raise
+        finally:
+            self._restore_domain_and_attach_logger(node_context, host, state_file_path)
+        node_context.snapshot_state_file_path = state_file_path
+        log.debug(f"Took snapshot of VM {node_context.vm_name} in {timer}")
+
+    def _discard_snapshot_disks(
+        self, node_context: NodeContext, host: HostContext
+    ) -> None:
+        for (
+            disk_file_path,
+            snapshot_file_path,
+        ) in node_context.snapshot_disk_file_paths.items():
+            # the overlay, if it's created, is overwritten.
+            host.node.execute(
+                f"mv -f {snapshot_file_path} {disk_file_path}",
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="Failed to restore the disk",
+            )
+        node_context.snapshot_disk_file_paths.clear()
+        node_context.snapshot_nvram_file_path = ""
+
+    def _revert_node(self, node: Node, log: Logger) -> None:
+        node_context = get_node_context(node)
+        host = get_node_host(node)
+        assert node_context.domain
+        assert node_context.snapshot_state_file_path
+
+        log.debug(f"Reverting VM: {node_context.vm_name}")
+        if node_context.domain.isActive():
+            node_context.domain.destroy()
+        if node_context.console_logger:
+            node_context.console_logger.close()
+            node_context.console_logger = None
+
+        # Recreate the overlays to discard changes after the snapshot.
+        qemu_img = host.node.tools[QemuImg]
+        for (
+            disk_file_path,
+            snapshot_file_path,
+        ) in node_context.snapshot_disk_file_paths.items():
+            qemu_img.create_diff_qcow2(disk_file_path, snapshot_file_path, sudo=True)
+        if node_context.snapshot_nvram_file_path:
+            host.node.tools[Cp].copy(
+                PurePosixPath(node_context.snapshot_nvram_file_path),
+                PurePosixPath(node_context.nvram_file_path),
+                sudo=True,
+            )
+
+        self._restore_domain_and_attach_logger(
+            node_context, host, node_context.snapshot_state_file_path
+        )
+        # the guest clock stops at the time of the snapshot, so it's synced with
+        # the host. Otherwise, cases may fail on time checks, like certificates.
+        self._sync_node_time(node, host)
+
+    def _sync_node_time(self, node: Node, host: HostContext) -> None:
+        result = host.node.execute(
+            "date -u +%s.%N",
+            expected_exit_code=0,
+            expected_exit_code_failure_message="Failed to get the host time",
+        )
+        node.execute(
+            f"date -u -s @{result.stdout.strip()}",
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="Failed to sync the guest time",
+        )
+
+    def _restore_domain_and_attach_logger(
+        self, node_context: NodeContext, host: HostContext, state_file_path: str
+    ) -> None:
+        # Like creating the domain, restore it in the paused state, so the console
+        # logger connects before the VM runs.
+        assert host.libvirt_conn
+        assert node_context.domain
+        host.libvirt_conn.restoreFlags(
+            state_file_path, None, libvirt.VIR_DOMAIN_SAVE_PAUSED
+        )
+
+        node_context.console_logger = QemuConsoleLogger()
+        node_context.console_logger.attach(
+            node_context.domain, node_context.console_log_file_path
+        )
+
+        node_context.domain.resume()
+
     def _get_domain_undefine_flags(self) -> int:
         return int(
             libvirt.VIR_DOMAIN_UNDEFINE_MANAGED_SAVE
@@ -665,8 +987,10 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
     def _stop_port_forwarding(self, environment: Environment, log: Logger) -> None:
         log.debug(f"Clearing port forwarding rules for environment {environment.name}")
         environment_context = get_environment_context(environment)
+        host = environment_context.host
+        assert host
         for port, address in environment_context.port_forwarding_list:
-            self.host_node.tools[Iptables].stop_forwarding(port, address, 22)
+            host.node.tools[Iptables].stop_forwarding(port, address, 22)
 
     # Retrieve the VMs' dynamic properties (e.g. IP address).
     def _fill_nodes_metadata(self, environment: Environment, log: Logger) -> None:
@@ -675,64 +999,74 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         # Give all the VMs some time to boot and then acquire an IP address.
         timeout = time.time() + environment_context.network_boot_timeout
 
-        if self.host_node.is_remote:
-            remote_node = cast(RemoteNode, self.host_node)
+        # The VMs boot in parallel, so wait for them in parallel too. Otherwise,
+        # the slowest VM to boot delays waiting on cloud-init of all others.
+        run_in_parallel(
+            [
+                partial(self._fill_node_metadata, environment, log, node, timeout)
+                for node in environment.nodes.list()
+            ],
+            log,
+        )
+
+    def _fill_node_metadata(
+        self, environment: Environment, log: Logger, node: Node, timeout: float
+    ) -> None:
+        environment_context = get_environment_context(environment)
+        assert isinstance(node, RemoteNode)
+        host = get_node_host(node)
+
+        if host.node.is_remote:
+            remote_node = cast(RemoteNode, host.node)
             conn_info = remote_node.connection_info
             address = conn_info[constants.ENVIRONMENTS_NODES_REMOTE_ADDRESS]
 
-        for node in environment.nodes.list():
-            assert isinstance(node, RemoteNode)
-
-            # Get the VM's IP address.
-            local_address = self._get_node_ip_address(environment, log, node, timeout)
-
-            node_port = 22
-            if self.host_node.is_remote:
-                with self._port_forwarding_lock:
-                    port_not_found = True
-                    while port_not_found:
-                        if self._next_available_port > 65535:
-                            raise LisaException(
-                                "No available ports on the host to forward"
-                            )
-
-                        # check if the port is already in use
-                        output = self.host_node.execute(
-                            f"nc -vz 127.0.0.1 {self._next_available_port}"
-                        )
-                        if output.exit_code == 1:  # port not in use
-                            node_port = self._next_available_port
-                            port_not_found = False
-                        self._next_available_port += 1
-
-                self.host_node.tools[Iptables].start_forwarding(
-                    node_port, local_address, 22
-                )
+        # Get the VM's IP address.
+        local_address = self._get_node_ip_address(environment, log, node, timeout)
+
+        node_port = 22
+        if host.node.is_remote:
+            with host.port_forwarding_lock:
+                port_not_found = True
+                while port_not_found:
+                    if host.next_available_port > 65535:
+                        raise LisaException("No available ports on the host to forward")
+
+                    # check if the port is already in use
+                    output = host.node.execute(
+                        f"nc -vz 127.0.0.1 {host.next_available_port}"
+                    )
+                    if output.exit_code == 1:  # port not in use
+                        node_port = host.next_available_port
+                        port_not_found = False
+                    host.next_available_port += 1
+
+                host.node.tools[Iptables].start_forwarding(node_port, local_address, 22)
 
                 environment_context.port_forwarding_list.append(
                     (node_port, local_address)
                 )
-            else:
-                address = local_address
-
-            # Set SSH connection info for the node.
-            node.set_connection_info(
-                address=local_address,
-                public_address=address,
-                public_port=node_port,
-                username=self.runbook.admin_username,
-                private_key_file=self.runbook.admin_private_key_file,
-            )
+        else:
+            address = local_address
+
+        # Set SSH connection info for the node.
+        node.set_connection_info(
+            address=local_address,
+            public_address=address,
+            public_port=node_port,
+            username=self.runbook.admin_username,
+            private_key_file=self.runbook.admin_private_key_file,
+        )
 
-            node_context = get_node_context(node)
-            if node_context.init_system == InitSystem.CLOUD_INIT:
-                # Ensure cloud-init completes its setup.
-                node.execute(
-                    "cloud-init status --wait",
-                    sudo=True,
-                    expected_exit_code=0,
-                    expected_exit_code_failure_message="waiting on cloud-init",
-                )
+        node_context = get_node_context(node)
+        if node_context.init_system == InitSystem.CLOUD_INIT:
+            # Ensure cloud-init completes its setup.
+            node.execute(
+                "cloud-init status --wait",
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="waiting on cloud-init",
+            )
 
     # Setup Ignition for a VM.
     def _create_node_ignition(
@@ -761,7 +1095,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             with open(ignition_path, "w") as f:
                 json.dump(user_data, f)
 
-            self.host_node.shell.copy(
+            get_node_host(node).node.shell.copy(
                 Path(ignition_path), Path(node_context.ignition_file_path)
             )
         finally:
@@ -830,7 +1164,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
                 [("/user-data", user_data_string), ("/meta-data", meta_data_string)],
             )
 
-            self.host_node.shell.copy(
+            get_node_host(node).node.shell.copy(
                 Path(iso_path), Path(node_context.cloud_init_file_path)
             )
         finally:
@@ -861,7 +1195,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
     def _create_node_data_disks(self, node: Node) -> None:
         node_context = get_node_context(node)
-        qemu_img = self.host_node.tools[QemuImg]
+        qemu_img = get_node_host(node).node.tools[QemuImg]
 
         for disk in node_context.data_disks:
             qemu_img.create_new_qcow2(disk.file_path, disk.size_gib * 1024)
@@ -874,6 +1208,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         node: Node,
     ) -> str:
         node_context = get_node_context(node)
+        host = get_node_host(node)
 
         domain = ET.Element("domain")
         domain.attrib["type"] = "kvm"
@@ -904,7 +1239,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             # libvirt v7.2.0 and Ubuntu 20.04 only has libvirt v6.0.0. Therefore, we
             # have to select the firmware manually.
             firmware_config = self._get_firmware_config(
-                node_context.machine_type, node_context.enable_secure_boot
+                host, node_context.machine_type, node_context.enable_secure_boot
             )
 
             print(firmware_config)
@@ -963,7 +1298,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         video = ET.SubElement(devices, "video")
 
         video_model = ET.SubElement(video, "model")
-        if isinstance(self.host_node.os, CBLMariner):
+        if isinstance(host.node.os, CBLMariner):
             video_model.attrib["type"] = "vga"
         else:
             video_model.attrib["type"] = "qxl"
@@ -1101,18 +1436,40 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         timeout: float,
     ) -> str:
         node_context = get_node_context(node)
+        lease_watcher = get_node_host(node).lease_watcher
+
+        addr = self._try_get_node_ip_address(environment, log, node)
+        if not addr and lease_watcher and node_context.mac_address:
+            # Sleep until the DHCP lease of the VM shows up, instead of asking
+            # libvirt over and over.
+            addr = lease_watcher.wait_for_address(
+                node_context.mac_address, timeout - time.time()
+            )
+            if not addr:
+                # The last chance, in case the lease isn't visible through the
+                # network, but through the domain.
+                addr = self._try_get_node_ip_address(environment, log, node)
+        else:
+            # The lease watcher can't be used, so ask libvirt until timeout.
+            while not addr and time.time() < timeout:
+                time.sleep(IP_ADDRESS_POLL_INTERVAL)
+                addr = self._try_get_node_ip_address(environment, log, node)
+        if not addr:
+            raise LisaException(
+                f"no IP addresses found for {node_context.vm_name}."
+                " Guest OS might have failed to boot"
+            )
 
-        while True:
-            addr = self._try_get_node_ip_address(environment, log, node)
-            if addr:
-                log.debug(f"VM {node_context.vm_name} booted with IP - {addr}")
-                return addr
-
-            if time.time() > timeout:
-                raise LisaException(
-                    f"no IP addresses found for {node_context.vm_name}."
-                    " Guest OS might have failed to boot"
-                )
+        if node_context.boot_timer:
+            # Boot to IP latency is reported as the provision time of the node.
+            node.provision_time = node_context.boot_timer.elapsed()
+            log.info(
+                f"VM {node_context.vm_name} booted with IP - {addr}, "
+                f"boot to IP time: {node_context.boot_timer}"
+            )
+        else:
+            log.debug(f"VM {node_context.vm_name} booted with IP - {addr}")
+        return addr
 
     # Try to get the IP address of the VM.
     def _try_get_node_ip_address(
@@ -1122,8 +1479,10 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         node: Node,
     ) -> Optional[str]:
         node_context = get_node_context(node)
+        libvirt_conn = get_node_host(node).libvirt_conn
+        assert libvirt_conn
 
-        domain = self.libvirt_conn.lookupByName(node_context.vm_name)
+        domain = libvirt_conn.lookupByName(node_context.vm_name)
 
         # Acquire IP address from libvirt's DHCP server.
         interfaces = domain.interfaceAddresses(
@@ -1143,11 +1502,13 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
     def _get_firmware_config(
         self,
+        host: HostContext,
         machine_type: Optional[str],
         enable_secure_boot: bool,
     ) -> Dict[str, Any]:
         # Resolve the machine type to its full name.
-        domain_caps_str = self.libvirt_conn.getDomainCapabilities(
+        assert host.libvirt_conn
+        domain_caps_str = host.libvirt_conn.getDomainCapabilities(
             machine=machine_type, virttype="kvm"
         )
         domain_caps = ET.fromstring(domain_caps_str)
@@ -1157,7 +1518,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
 
         # Read the QEMU firmware config files.
         # Note: "/usr/share/qemu/firmware" is a well known location for these files.
-        firmware_configs_str = self.host_node.execute(
+        firmware_configs_str = host.node.execute(
             "cat /usr/share/qemu/firmware/*.json",
             shell=True,
             expected_exit_code=0,
@@ -1234,9 +1595,8 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
     def _libvirt_uri_schema(self) -> str:
         raise NotImplementedError()
 
-    def __init_libvirt_conn_string(self) -> None:
+    def _get_libvirt_conn_string(self, host: LibvirtHost) -> str:
         hypervisor = self._libvirt_uri_schema()
-        host = self.platform_runbook.hosts[0]
 
         host_addr = ""
         transport = ""
@@ -1248,7 +1608,7 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             transport = "+ssh"
             params = f"?keyfile={host.private_key_file}"
 
-        self.libvirt_conn_str = f"{hypervisor}{transport}://{host_addr}/system{params}"
+        return f"{hypervisor}{transport}://{host_addr}/system{params}"
 
     def __platform_runbook_type(self) -> type:
         platform_runbook_type: type = type(self).platform_runbook_type()
@@ -1260,49 +1620,48 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
         assert issubclass(node_runbook_type, BaseLibvirtNodeSchema)
         return node_runbook_type
 
-    def _get_host_distro(self) -> str:
-        result = self.host_node.os.information.full_version if self.host_node else ""
+    def _get_host_distro(self, host_node: Node) -> str:
+        result = host_node.os.information.full_version
         return result
 
-    def _get_host_kernel_version(self) -> str:
-        result = ""
-        if self.host_node:
-            uname = self.host_node.tools[Uname]
-            result = uname.get_linux_information().kernel_version_raw
+    def _get_host_kernel_version(self, host_node: Node) -> str:
+        uname = host_node.tools[Uname]
+        result = uname.get_linux_information().kernel_version_raw
         return result
 
-    def _get_libvirt_version(self) -> str:
-        result = ""
-        if self.host_node:
-            result = self.host_node.execute("libvirtd --version", shell=True).stdout
-            result = filter_ansi_escape(result)
+    def _get_libvirt_version(self, host_node: Node) -> str:
+        result = host_node.execute("libvirtd --version", shell=True).stdout
+        result = filter_ansi_escape(result)
         return result
 
-    def _get_vmm_version(self) -> str:
+    def _get_vmm_version(self, host_node: Node) -> str:
         return "Unknown"
 
     def _get_environment_information(self, environment: Environment) -> Dict[str, str]:
         information: Dict[str, str] = {}
 
-        if self.host_node:
-            node: Node = self.host_node
-            for key, method in self._host_environment_information_hooks.items():
-                node.log.debug(f"detecting {key} ...")
-                try:
-                    value = method()
-                    if value:
-                        information[key] = value
-                except Exception as identifier:
-                    node.log.exception(f"error on get {key}.", exc_info=identifier)
+        if not self.hosts:
+            return information
+
+        host = get_environment_context(environment).host
+        node: Node = host.node if host else self.host_node
+        for key, method in self._host_environment_information_hooks.items():
+            node.log.debug(f"detecting {key} ...")
+            try:
+                value = method(node)
+                if value:
+                    information[key] = value
+            except Exception as identifier:
+                node.log.exception(f"error on get {key}.", exc_info=identifier)
 
         return information
 
-    def _enable_libvirt_debug_log(self) -> None:
-        self.host_node.tools[Mkdir].create_directory(
+    def _enable_libvirt_debug_log(self, host_node: Node) -> None:
+        host_node.tools[Mkdir].create_directory(
             str(self.LIBVIRT_DEBUG_LOG_PATH.parent),
             sudo=True,
         )
-        sed = self.host_node.tools[Sed]
+        sed = host_node.tools[Sed]
         sed.append(
             f'log_outputs="1:file:{self.LIBVIRT_DEBUG_LOG_PATH} 3:syslog:libvirtd" '
             f"# {self.CONFIG_FILE_MARKER}",
@@ -1310,34 +1669,32 @@ class BaseLibvirtPlatform(Platform, IBaseLibvirtPlatform):
             sudo=True,
         )
 
-        self.host_node.tools[Service].restart_service("libvirtd")
+        host_node.tools[Service].restart_service("libvirtd")
 
-    def _disable_libvirt_debug_log(self) -> None:
-        self.host_node.tools[Sed].delete_lines(
+    def _disable_libvirt_debug_log(self, host_node: Node) -> None:
+        host_node.tools[Sed].delete_lines(
             self.CONFIG_FILE_MARKER,
             self.LIBVIRTD_CONF_PATH,
             sudo=True,
         )
 
-    def _capture_libvirt_logs(self) -> None:
-        libvirt_log_local_path = self.host_node.local_log_path / "libvirtd.log"
+    def _capture_libvirt_logs(self, host_node: Node) -> None:
+        libvirt_log_local_path = host_node.local_log_path / "libvirtd.log"
 
         if self.platform_runbook.capture_libvirt_debug_logs:
-            libvirt_log_temp_path = self.host_node.working_path / "libvirtd.log"
+            libvirt_log_temp_path = host_node.working_path / "libvirtd.log"
 
             # Copy the log file to working_path, change ownership and then copy_back
             # to the local machine.
-            self.host_node.tools[Cp].copy(
+            host_node.tools[Cp].copy(
                 self.LIBVIRT_DEBUG_LOG_PATH, libvirt_log_temp_path, sudo=True
             )
-            user = self.host_node.tools[Whoami].get_username()
-            self.host_node.tools[Chown].change_owner(libvirt_log_temp_path, user)
-            self.host_node.shell.copy_back(
-                libvirt_log_temp_path, libvirt_log_local_path
-            )
+            user = host_node.tools[Whoami].get_username()
+            host_node.tools[Chown].change_owner(libvirt_log_temp_path, user)
+            host_node.shell.copy_back(libvirt_log_temp_path, libvirt_log_local_path)
         else:
-            libvirt_log = self.host_node.tools[Journalctl].logs_for_unit(
-                "libvirtd", sudo=self.host_node.is_remote
+            libvirt_log = host_node.tools[Journalctl].logs_for_unit(
+                "libvirtd", sudo=host_node.is_remote
             )
             with open(str(libvirt_log_local_path), "w") as f:
                 f.write(libvirt_log)
@@ -9,6 +9,9 @@ from lisa.util import LisaException
 FIRMWARE_TYPE_BIOS = "bios"
 FIRMWARE_TYPE_UEFI = "uefi"
 
+PLACEMENT_POLICY_SPREAD = "spread"
+PLACEMENT_POLICY_PACK = "pack"
+
 
 # Configuration options for cloud-init ISO generation for the VM.
 @dataclass_json()
@@ -38,12 +41,26 @@ class LibvirtHost:
 @dataclass_json()
 @dataclass
 class BaseLibvirtPlatformSchema:
-    # An optional remote host for the VMs. All test VMs will be spawned on the
-    # specified host by connecting remotely to the libvirt instance running on it.
+    # Optional remote hosts for the VMs. The test VMs will be spawned on the
+    # specified hosts by connecting remotely to the libvirt instances running on
+    # them. All VMs of an environment are placed on the same host.
     #
-    # CAUTION: Even though this field is a List, only one host is supported currently.
+    # The CPU and memory of deployed environments are reserved per host, and an
+    # environment waits for resources, if no host has room for it. So the
+    # runbook's concurrency can be raised with the number of hosts.
     hosts: List[LibvirtHost] = field(default_factory=lambda: [LibvirtHost()])
 
+    # How environments are placed on hosts.
+    # - spread: on the least utilized host, it's the default.
+    # - pack: on the most utilized host which still has room, so other hosts are
+    #   kept free for large environments.
+    placement_policy: str = PLACEMENT_POLICY_SPREAD
+
+    # The count of vCPUs, which can be reserved per physical core of a host. vCPUs
+    # are usually idle in tests, so they are overcommitted by default, and only
+    # the memory is strictly limited.
+    cpu_overcommit_ratio: float = 4.0
+
     # The timeout length for how long to wait for the OS to boot and request an IP
     # address from the libvirt DHCP server.
     # Specified in seconds. Default: 30s.
@@ -51,6 +68,11 @@ class BaseLibvirtPlatformSchema:
 
     capture_libvirt_debug_logs: bool = False
 
+    # Take a snapshot of the VMs after an environment is initialized, and revert
+    # to it, when the environment is dirty or a test case needs a new
+    # environment. It's much faster than deploying a new environment.
+    reset_by_snapshot: bool = False
+
 
 # Possible disk image formats
 class DiskImageFormat(Enum):
@@ -0,0 +1,440 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import codecs
+import csv
+import os
+import re
+import shlex
+import subprocess
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple
+
+from lisa import schema
+from lisa.util import LisaException
+from lisa.util.logger import Logger
+from lisa.util.shell import LocalShell, SshShell
+
+if TYPE_CHECKING:
+    from lisa.environment import Environment
+    from lisa.node import Node
+
+_telemetry_settings: Optional[schema.Telemetry] = None
+
+# The script runs on the node for the whole case, and prints counters of /proc
+# every interval. So there is one long-lived channel, instead of a command per
+# sample. Each frame starts with a line of "@ <timestamp>", and ends with "@@".
+_SCRIPT = (
+    "while :; do "
+    'echo "@ $(date +%s.%N)"; '
+    "head -n 1 /proc/stat; "
+    "grep -E '^(ctxt|intr|softirq) ' /proc/stat | cut -d ' ' -f 1,2; "
+    "grep -E '^(MemTotal|MemAvailable|Cached|Dirty):' /proc/meminfo; "
+    "cat /proc/loadavg; "
+    "tail -n +3 /proc/net/dev; "
+    "cat /proc/diskstats; "
+    "echo @@; "
+    "sleep {interval}; "
+    "done"
+)
+
+# 0.52 0.58 0.59 2/1187 12345
+_LOADAVG_PATTERN = re.compile(r"^(?P<load>[\d.]+) [\d.]+ [\d.]+ \d+/\d+ \d+$")
+# whole disks only, partitions are included in them.
+_DISK_PATTERN = re.compile(r"^(sd[a-z]+|vd[a-z]+|xvd[a-z]+|nvme\d+n\d+|md\d+)$")
+_MEMINFO_FIELDS = {
+    "MemTotal:": "mem_total_kb",
+    "MemAvailable:": "mem_available_kb",
+    "Cached:": "mem_cached_kb",
+    "Dirty:": "mem_dirty_kb",
+}
+# the sector size of /proc/diskstats is always 512 bytes.
+_SECTOR_KB = 0.5
+# seconds to wait for the reader exits.
+_STOP_TIMEOUT = 10
+# bytes of each read from the script.
+_READ_SIZE = 65536
+
+
+def load_telemetry_settings(runbook: Optional[schema.Telemetry]) -> None:
+    global _telemetry_settings
+    if runbook and runbook.enabled:
+        _telemetry_settings = runbook
+    else:
+        _telemetry_settings = None
+
+
+def is_telemetry_enabled() -> bool:
+    return _telemetry_settings is not None
+
+
+@dataclass
+class TelemetrySample:
+    # the local time, when the sample is received. It's used to correlate with
+    # the case log, since clocks of nodes may be different.
+    time: float
+    values: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class _Frame:
+    time: float
+    remote_time: float
+    counters: Dict[str, float] = field(default_factory=dict)
+    gauges: Dict[str, float] = field(default_factory=dict)
+
+
+class TelemetryParser:
+    """
+    It's the stdout writer of the sampling script. It parses frames of /proc
+    counters to samples. Counters are converted to rates by the previous frame,
+    so the first frame has gauges only.
+    """
+
+    def __init__(self) -> None:
+        # pieces of the unfinished line.
+        self._buffer: List[str] = []
+        self._frame: Optional[_Frame] = None
+        self._previous: Optional[_Frame] = None
+        self.samples: List[TelemetrySample] = []
+
+    def write(self, text: str) -> None:
+        if "\n" not in text:
+            self._buffer.append(text)
+            return
+        lines = text.split("\n")
+        self._buffer.append(lines[0])
+        lines[0] = "".join(self._buffer)
+        self._buffer = [lines.pop()]
+        for line in lines:
+            self._parse_line(line.strip())
+
+    def flush(self) -> None:
+        # a frame is parsed when it's completed, so there is nothing to flush.
+        ...
+
+    def pop_samples(self) -> List[TelemetrySample]:
+        samples, self.samples = self.samples, []
+        return samples
+
+    def _parse_line(self, line: str) -> None:
+        if not line:
+            return
+        if line == "@@":
+            self._complete_frame()
+            return
+        if line.startswith("@ "):
+            self._complete_frame()
+            try:
+                remote_time = float(line[2:])
+            except ValueError:
+                remote_time = time.time()
+            self._frame = _Frame(time=time.time(), remote_time=remote_time)
+            return
+        frame = self._frame
+        if not frame:
+            return
+
+        try:
+            if not self._parse_system_line(frame, line):
+                self._parse_device_line(frame, line)
+        except ValueError:
+            # ignore unexpected lines, like errors of the script.
+            pass
+
+    def _parse_system_line(self, frame: _Frame, line: str) -> bool:
+        parts = line.split()
+        name = parts[0]
+        if name == "cpu" and len(parts) >= 9:
+            # user nice system idle iowait irq softirq steal
+            values = [float(x) for x in parts[1:9]]
+            frame.counters["cpu_total"] = sum(values)
+            frame.counters["cpu_idle"] = values[3] + values[4]
+            frame.counters["cpu_iowait"] = values[4]
+            frame.counters["cpu_irq"] = values[5] + values[6]
+            frame.counters["cpu_steal"] = values[7]
+        elif name in ["ctxt", "intr", "softirq"] and len(parts) >= 2:
+            frame.counters[name] = float(parts[1])
+        elif name in _MEMINFO_FIELDS and len(parts) >= 2:
+            frame.gauges[_MEMINFO_FIELDS[name]] = float(parts[1])
+        elif _LOADAVG_PATTERN.match(line):
+            frame.gauges["load_1m"] = float(parts[0])
+        else:
+            return False
+        return True
+
+    def _parse_device_line(self, frame: _Frame, line: str) -> None:
+        parts = line.split()
+        if ":" in line:
+            # eth0: 1234 12 0 0 0 0 0 0 5678 34 0 ...
+            iface, raw = line.split(":", 1)
+            columns = raw.split()
+            if len(columns) >= 10:
+                prefix = f"net.{iface.strip()}"
+                frame.counters[f"{prefix}.rx_kb"] = float(columns[0]) / 1024
+                frame.counters[f"{prefix}.rx_packets"] = float(columns[1])
+                frame.counters[f"{prefix}.tx_kb"] = float(columns[8]) / 1024
+                frame.counters[f"{prefix}.tx_packets"] = float(columns[9])
+        elif len(parts) >= 14 and _DISK_PATTERN.match(parts[2]):
+            # major minor name reads merged sectors ms writes merged sectors ms
+            # in_flight io_ms ...
+            prefix = f"disk.{parts[2]}"
+            frame.counters[f"{prefix}.reads"] = float(parts[3])
+            frame.counters[f"{prefix}.read_kb"] = float(parts[5]) * _SECTOR_KB
+            frame.counters[f"{prefix}.writes"] = float(parts[7])
+            frame.counters[f"{prefix}.write_kb"] = float(parts[9]) * _SECTOR_KB
+            frame.counters[f"{prefix}.io_ms"] = float(parts[12])
+
+    def _complete_frame(self) -> None:
+        frame = self._frame
+        if not frame:
+            return
+        sample = TelemetrySample(time=frame.time, values=dict(frame.gauges))
+        previous = self._previous
+        if previous:
+            seconds = frame.remote_time - previous.remote_time
+            if seconds > 0:
+                sample.values.update(self._get_rates(previous, frame, seconds))
+        self.samples.append(sample)
+        self._previous = frame
+        self._frame = None
+
+    def _get_rates(
+        self, previous: _Frame, current: _Frame, seconds: float
+    ) -> Dict[str, float]:
+        deltas: Dict[str, float] = {}
+        for name, value in current.counters.items():
+            if name in previous.counters:
+                # counters may be reset, like a nic is recreated.
+                deltas[name] = max(value - previous.counters[name], 0)
+
+        rates: Dict[str, float] = {}
+        cpu_total = deltas.pop("cpu_total", 0)
+        cpu_idle = deltas.pop("cpu_idle", 0)
+        cpu_iowait = deltas.pop("cpu_iowait", 0)
+        cpu_irq = deltas.pop("cpu_irq", 0)
+        cpu_steal = deltas.pop("cpu_steal", 0)
+        if cpu_total > 0:
+            rates["cpu_percent"] = (cpu_total - cpu_idle) / cpu_total * 100
+            rates["cpu_iowait_percent"] = cpu_iowait / cpu_total * 100
+            rates["cpu_irq_percent"] = cpu_irq / cpu_total * 100
+            rates["cpu_steal_percent"] = cpu_steal / cpu_total * 100
+        for name, delta in deltas.items():
+            if name.endswith(".io_ms"):
+                rates[f"{name[:-6]}.util_percent"] = min(
+                    delta / (seconds * 1000) * 100, 100
+                )
+            else:
+                rates[f"{name}_per_sec"] = delta / seconds
+        return rates
+
+
+class TelemetryBuffer:
+    """
+    A ring buffer of samples with marks, like the start and end of cases.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._samples: Deque[TelemetrySample] = deque(maxlen=capacity)
+        self._marks: List[Tuple[str, float]] = []
+        self._lock = Lock()
+
+    def add(self, samples: List[TelemetrySample]) -> None:
+        with self._lock:
+            self._samples.extend(samples)
+
+    def mark(self, name: str) -> float:
+        mark_time = time.time()
+        with self._lock:
+            self._marks.append((name, mark_time))
+        return mark_time
+
+    def get_marks(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._marks)
+
+    def get_samples(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> List[TelemetrySample]:
+        with self._lock:
+            return [
+                x
+                for x in self._samples
+                if (start is None or x.time >= start) and (end is None or x.time <= end)
+            ]
+
+    def export(
+        self, path: Path, start: Optional[float] = None, end: Optional[float] = None
+    ) -> int:
+        """
+        write samples as a csv time series. The offset column is seconds since
+        the start, so it's easy to match with the case log.
+        """
+        samples = self.get_samples(start, end)
+        names: Dict[str, None] = {}
+        for sample in samples:
+            names.update(dict.fromkeys(sample.values))
+        columns = sorted(names)
+        base_time = start if start is not None else (samples[0].time if samples else 0)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "offset"] + columns)
+            for sample in samples:
+                writer.writerow(
+                    [
+                        time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(sample.time)),
+                        f"{sample.time - base_time:.3f}",
+                    ]
+                    + [_format_value(sample.values.get(x)) for x in columns]
+                )
+        return len(samples)
+
+
+class TelemetrySampler:
+    """
+    Samples /proc counters of a node in background. The channel is opened by
+    start, and closed by stop or closing the node. The output is read here, and
+    parsed to the ring buffer, so the memory is bounded by the capacity. The
+    processes of shells keep all output until they exit, so they aren't used.
+    """
+
+    def __init__(self, node: "Node", interval: float, capacity: int) -> None:
+        self._node = node
+        self._interval = interval
+        self._log = node.log
+        self.buffer = TelemetryBuffer(capacity)
+        self._reader: Optional[Thread] = None
+        self._close: Optional[Callable[[], None]] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._reader is not None
+
+    def start(self) -> None:
+        if self._reader:
+            return
+        if not self._node.is_posix:
+            raise LisaException("telemetry sampler supports posix nodes only")
+        script = _SCRIPT.format(interval=self._interval)
+        shell = self._node.shell
+        read: Callable[[int], bytes]
+        if isinstance(shell, SshShell):
+            # the script exits on next output, after the channel is closed.
+            channel = shell.open_channel(f"sh -c {shlex.quote(script)}")
+            read = channel.recv
+            self._close = channel.close
+        elif isinstance(shell, LocalShell):
+            process = subprocess.Popen(
+                ["sh", "-c", script],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            assert process.stdout
+            read = partial(os.read, process.stdout.fileno())
+            self._close = partial(_kill_process, process)
+        else:
+            raise LisaException(
+                f"telemetry sampler doesn't support {type(shell).__name__}"
+            )
+        self._reader = Thread(
+            target=self._read,
+            args=(read, _BufferedParser(self.buffer)),
+            name=f"telemetry_{self._node.name}",
+        )
+        self._reader.daemon = True
+        self._reader.start()
+        self._log.debug(f"telemetry sampler started, interval: {self._interval}s")
+
+    def stop(self) -> None:
+        reader, self._reader = self._reader, None
+        close, self._close = self._close, None
+        if not reader:
+            return
+        try:
+            if close:
+                close()
+            reader.join(_STOP_TIMEOUT)
+        except Exception as identifier:
+            self._log.debug(f"failed to stop telemetry sampler: {identifier}")
+        self._log.debug("telemetry sampler stopped")
+
+    def _read(self, read: Callable[[int], bytes], parser: TelemetryParser) -> None:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                data = read(_READ_SIZE)
+                if not data:
+                    break
+                parser.write(decoder.decode(data))
+        except Exception as identifier:
+            # the channel may be closed by stop in the middle of reading.
+            self._log.debug(f"telemetry sampler stopped reading: {identifier}")
+
+
+class _BufferedParser(TelemetryParser):
+    def __init__(self, buffer: TelemetryBuffer) -> None:
+        super().__init__()
+        self._target = buffer
+
+    def write(self, text: str) -> None:
+        super().write(text)
+        if self.samples:
+            self._target.add(self.pop_samples())
+
+
+def start_case_telemetry(
+    environment: "Environment", case_name: str, log: Logger
+) -> List[Tuple["Node", float]]:
+    """
+    start samplers of all nodes, if telemetry is enabled. Returns nodes and the
+    start time of the case.
+    """
+    if not _telemetry_settings:
+        return []
+    started: List[Tuple["Node", float]] = []
+    for node in environment.nodes.list():
+        try:
+            sampler = node.get_telemetry(
+                interval=_telemetry_settings.interval,
+                capacity=_telemetry_settings.capacity,
+            )
+            sampler.start()
+            started.append((node, sampler.buffer.mark(f"{case_name} start")))
+        except Exception as identifier:
+            log.debug(f"skipped telemetry of node '{node.name}': {identifier}")
+    return started
+
+
+def stop_case_telemetry(
+    started: List[Tuple["Node", float]], case_name: str, log_path: Path, log: Logger
+) -> None:
+    """
+    stop samplers, and export samples of the case next to the case log.
+    """
+    for node, start in started:
+        try:
+            sampler = node.get_telemetry()
+            end = sampler.buffer.mark(f"{case_name} end")
+            # the channel is closed after each case with node connections.
+            sampler.stop()
+            file_name = log_path / f"telemetry_{node.name}.csv"
+            count = sampler.buffer.export(file_name, start=start, end=end)
+            log.debug(f"exported {count} telemetry samples to '{file_name}'")
+        except Exception as identifier:
+            log.debug(f"failed to export telemetry of node '{node.name}': {identifier}")
+
+
+def _kill_process(process: "subprocess.Popen[bytes]") -> None:
+    process.kill()
+    process.wait(_STOP_TIMEOUT)
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value is None:
+        return ""
+    return f"{value:.3f}".rstrip("0").rstrip(".")
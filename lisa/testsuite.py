@@ -9,7 +9,7 @@ from dataclasses import dataclass, field
 from functools import wraps
 from pathlib import Path
 from time import sleep
-from typing import Any, Callable, Dict, List, Optional, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 
 from func_timeout import FunctionTimedOut, func_timeout  # type: ignore
 from retry import retry
@@ -20,7 +20,9 @@ from lisa.environment import Environment, EnvironmentSpace, EnvironmentStatus
 from lisa.feature import Feature
 from lisa.features import SerialConsole
 from lisa.messages import TestResultMessage, TestStatus, _is_completed_status
+from lisa.node import Node
 from lisa.operating_system import OperatingSystem, Windows
+from lisa.telemetry import start_case_telemetry, stop_case_telemetry
 from lisa.util import (
     BadEnvironmentStateException,
     LisaException,
@@ -645,33 +647,45 @@ class TestSuite:
             ).as_posix()
             case_result.set_status(TestStatus.RUNNING, "")
             case_timeout = case_result.runtime_data.metadata.timeout
+            case_telemetry: List[Tuple[Node, float]] = []
+            try:
+                if is_continue:
+                    is_continue = self.__before_case(
+                        case_result=case_result,
+                        timeout=case_timeout,
+                        test_kwargs=case_kwargs,
+                        log=case_log,
+                    )
+                else:
+                    case_result.stacktrace = suite_error_stacktrace
+                    case_result.set_status(TestStatus.SKIPPED, suite_error_message)
+
+                if is_continue:
+                    # start after before_case, so telemetry doesn't connect to
+                    # nodes ahead of the setup of the suite.
+                    case_telemetry = start_case_telemetry(
+                        environment, case_unique_name, case_log
+                    )
+                    self.__run_case(
+                        case_result=case_result,
+                        timeout=case_timeout,
+                        test_kwargs=case_kwargs,
+                        log=case_log,
+                    )
 
-            if is_continue:
-                is_continue = self.__before_case(
+                self.__after_case(
                     case_result=case_result,
                     timeout=case_timeout,
                     test_kwargs=case_kwargs,
                     log=case_log,
                 )
-            else:
-                case_result.stacktrace = suite_error_stacktrace
-                case_result.set_status(TestStatus.SKIPPED, suite_error_message)
-
-            if is_continue:
-                self.__run_case(
-                    case_result=case_result,
-                    timeout=case_timeout,
-                    test_kwargs=case_kwargs,
-                    log=case_log,
+            finally:
+                # samplers are stopped, and samples are exported for failed
+                # cases too.
+                stop_case_telemetry(
+                    case_telemetry, case_unique_name, case_log_path, case_log
                 )
 
-            self.__after_case(
-                case_result=case_result,
-                timeout=case_timeout,
-                test_kwargs=case_kwargs,
-                log=case_log,
-            )
-
             if case_result.status == TestStatus.FAILED:
                 try:
                     self.__save_serial_log(environment, case_log_path)
@@ -105,6 +105,7 @@ from .stress_ng import StressNg
 from .swap import Swap
 from .sysctl import Sysctl
 from .systemd_analyze import SystemdAnalyze
+from .tail import Tail
 from .tar import Tar
 from .taskset import TaskSet
 from .tcpdump import TcpDump
@@ -229,6 +230,7 @@ __all__ = [
     "Swap",
     "Sysctl",
     "SystemdAnalyze",
+    "Tail",
     "Tar",
     "TaskSet",
     "Tee",
@@ -1,6 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+from typing import Dict
+
 from lisa.executable import Tool
 
 
@@ -12,6 +14,16 @@ class Chmod(Tool):
     def chmod(self, path: str, permission: str, sudo: bool = False) -> None:
         self.run(f"{permission} {path}", sudo=sudo, force_run=True)
 
+    def chmod_many(self, permissions: Dict[str, str], sudo: bool = False) -> None:
+        """
+        Changes permissions of paths in one shell session. The key is the
+        path, and the value is the permission.
+        """
+        self.run_many(
+            [f"{permission} {path}" for path, permission in permissions.items()],
+            sudo=sudo,
+        )
+
     def update_folder(
         self, path: str, permission: str, sudo: bool = False, timeout: int = 10
     ) -> None:
@@ -13,6 +13,7 @@ from lisa.util import LisaException, RepoNotExistException, constants
 from lisa.util.process import Process
 
 from .git import Git
+from .mixins import BuildCacheMixin
 
 if TYPE_CHECKING:
     from lisa.testsuite import TestResult
@@ -37,7 +38,7 @@ FIOMODES = Enum(
 )
 
 
-class Fio(Tool):
+class Fio(Tool, BuildCacheMixin):
     fio_repo = "https://github.com/axboe/fio/"
     branch = "fio-3.29"
     # iteration21: (groupid=0, jobs=64): err= 0: pid=6157: Fri Dec 24 08:55:21 2021
@@ -394,7 +395,12 @@ class Fio(Tool):
         from .make import Make
 
         make = self.node.tools[Make]
-        make.make_install(cwd=code_path)
+        self.install_with_build_cache(
+            revision=git.get_current_commit_hash(code_path),
+            build=lambda destdir: make.make_install(
+                cwd=code_path, update_envs={"DESTDIR": destdir}
+            ),
+        )
         self.node.execute(
             "ln -sf /usr/local/bin/fio /usr/bin/fio", sudo=True, cwd=code_path
         ).assert_exit_code()
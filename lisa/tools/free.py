@@ -80,6 +80,9 @@ class Free(Tool):
     def get_free_memory_gb(self) -> int:
         return self._get_field_bytes_kib("Mem", "free") >> 20
 
+    def get_available_memory_mb(self) -> int:
+        return self._get_field_bytes_kib("Mem", "available") >> 10
+
     def get_total_memory(self) -> str:
         """
         Returns total memory in power of 1000 with unit
@@ -4,6 +4,8 @@ import json
 import re
 import time
 from decimal import Decimal
+from functools import partial
+from pathlib import PurePath
 from typing import TYPE_CHECKING, Any, Dict, List, Pattern, Type, cast
 
 from retry import retry
@@ -26,6 +28,7 @@ from .git import Git
 from .ls import Ls
 from .lsof import Lsof
 from .make import Make
+from .mixins import BuildCacheMixin
 
 if TYPE_CHECKING:
     from lisa.testsuite import TestResult
@@ -65,7 +68,7 @@ IPERF_UDP_CONCURRENCY = [
 ]
 
 
-class Iperf3(Tool):
+class Iperf3(Tool, BuildCacheMixin):
     _repo = "https://github.com/esnet/iperf"
     _branch = "3.10.1"
     _sender_pattern = re.compile(
@@ -451,14 +454,20 @@ class Iperf3(Tool):
         git = self.node.tools[Git]
         git.clone(self._repo, tool_path)
         code_path = tool_path.joinpath("iperf")
-        make = self.node.tools[Make]
-        self.node.execute("./configure", cwd=code_path).assert_exit_code()
-        make.make_install(code_path)
+        self.install_with_build_cache(
+            revision=git.get_current_commit_hash(code_path),
+            build=partial(self._build, code_path),
+        )
         self.node.execute("ldconfig", sudo=True, cwd=code_path).assert_exit_code()
         self.node.execute(
             "ln -fs /usr/local/bin/iperf3 /usr/bin/iperf3", sudo=True, cwd=code_path
         ).assert_exit_code()
 
+    def _build(self, code_path: PurePath, destdir: str) -> None:
+        make = self.node.tools[Make]
+        self.node.execute("./configure", cwd=code_path).assert_exit_code()
+        make.make_install(code_path, update_envs={"DESTDIR": destdir})
+
     def _get_bandwidth(self, result: str, pattern: Pattern[str]) -> Decimal:
         matched = pattern.match(result)
         assert matched, "fail to get bandwidth"
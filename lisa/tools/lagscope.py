@@ -3,13 +3,15 @@
 
 import re
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, cast
+from pathlib import PurePath
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Type, cast
 
 from lisa import notifier
 from lisa.executable import Tool
 from lisa.messages import NetworkLatencyPerformanceMessage, create_perf_message
 from lisa.operating_system import CBLMariner, Debian, Posix, Redhat, Suse
 from lisa.util import LisaException, constants, find_groups_in_lines, get_datetime_path
+from lisa.util.latency_histogram import LatencyHistogram
 from lisa.util.process import ExecutableResult, Process
 
 from .firewall import Firewall
@@ -17,7 +19,7 @@ from .gcc import Gcc
 from .git import Git
 from .lsof import Lsof
 from .make import Make
-from .mixins import KillableMixin
+from .mixins import BuildCacheMixin, KillableMixin
 from .sockperf import Sockperf
 from .sysctl import Sysctl
 
@@ -25,7 +27,7 @@ if TYPE_CHECKING:
     from lisa.testsuite import TestResult
 
 
-class Lagscope(Tool, KillableMixin):
+class Lagscope(Tool, KillableMixin, BuildCacheMixin):
     repo = "https://github.com/Microsoft/lagscope"
     # the latest tag doesn't contain changes for 95th,99th percentile.
     branch = "master"
@@ -98,6 +100,10 @@ class Lagscope(Tool, KillableMixin):
     # 08:19:33 ERR : failed to connect to receiver: 10.0.1.4:6001
     #  on socket: 3. errno = 113
     _client_failure_pattern = re.compile(r"^(?P<error>.*? ERR : .*?)\r?$", re.M)
+    # 02:11:12 INFO: Dumping all latencies into csv file: Latency-20220106-0817.csv
+    _csv_file_pattern = re.compile(
+        r"Dumping all latencies into csv file: (?P<file>\S+)", re.M
+    )
 
     @property
     def dependencies(self) -> List[Type[Tool]]:
@@ -191,7 +197,8 @@ class Lagscope(Tool, KillableMixin):
         if print_percentile:
             cmd += " -P "
         if dump_csv:
-            cmd += f" -RLatency-{get_datetime_path()}.csv "
+            csv_path = self.node.working_path / f"Latency-{get_datetime_path()}.csv"
+            cmd += f" -R{csv_path} "
         process = self.node.execute_async(cmd, shell=True)
         return process
 
@@ -240,6 +247,23 @@ class Lagscope(Tool, KillableMixin):
             self._log.debug(f"no average latency found in {result.stdout}")
             return Decimal(-1.0)
 
+    def get_latency_histogram(
+        self, result: ExecutableResult
+    ) -> Optional[LatencyHistogram]:
+        """
+        Returns the histogram of all latencies, which are dumped to the csv
+        file by the client. It's None, if the csv file isn't dumped.
+        """
+        matched = self._csv_file_pattern.search(result.stdout)
+        if not matched:
+            self._log.debug("no latency csv file found in lagscope results.")
+            return None
+        remote_path = self.node.get_pure_path(matched.group("file"))
+        local_path = self.node.local_log_path / remote_path.name
+        self.node.shell.copy_back(remote_path, local_path)
+        with open(local_path) as f:
+            return parse_lagscope_csv(f)
+
     def create_latency_performance_messages(
         self,
         result: ExecutableResult,
@@ -253,6 +277,7 @@ class Lagscope(Tool, KillableMixin):
         all_matched_results = find_groups_in_lines(
             result.stdout, self._interval_frequency_pattern
         )
+        histogram = self.get_latency_histogram(result)
         perf_message_list: List[NetworkLatencyPerformanceMessage] = []
         for matched_result in all_matched_results:
             other_fields: Dict[str, Any] = {}
@@ -281,6 +306,11 @@ class Lagscope(Tool, KillableMixin):
                 test_case_name,
                 other_fields,
             )
+            if histogram and not perf_message_list:
+                # the distribution is the same for all intervals, so it's in
+                # the first message only.
+                message.histograms = {"latency_us": histogram.to_dict()}
+                message.statistics = {"latency_us": histogram.get_statistics()}
             perf_message_list.append(message)
             notifier.notify(message)
         return perf_message_list
@@ -301,6 +331,23 @@ class Lagscope(Tool, KillableMixin):
         git = self.node.tools[Git]
         git.clone(self.repo, tool_path, ref=self.branch)
         code_path = tool_path.joinpath("lagscope")
+        # the install script doesn't support DESTDIR, so the binary is cached
+        # only.
+        self.install_with_build_cache(
+            revision=git.get_current_commit_hash(code_path),
+            build=lambda _: self._build(code_path),
+            paths=["/usr/local/bin/lagscope"],
+        )
+        self.node.execute(
+            "ln -sf /usr/local/bin/lagscope /usr/bin/lagscope",
+            sudo=True,
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="fail to create symlink to lagscope",
+        )
+        return self._check_exists()
+
+    def _build(self, code_path: PurePath) -> None:
         self.node.execute(
             "./do-cmake.sh build",
             cwd=code_path,
@@ -316,14 +363,6 @@ class Lagscope(Tool, KillableMixin):
             expected_exit_code=0,
             expected_exit_code_failure_message="fail to run do-cmake.sh install",
         )
-        self.node.execute(
-            "ln -sf /usr/local/bin/lagscope /usr/bin/lagscope",
-            sudo=True,
-            shell=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message="fail to create symlink to lagscope",
-        )
-        return self._check_exists()
 
     def _install_dep_packages(self) -> None:
         posix_os: Posix = cast(Posix, self.node.os)
@@ -368,6 +407,21 @@ class Lagscope(Tool, KillableMixin):
                 posix_os.install_packages(package)
 
 
+def parse_lagscope_csv(lines: Iterable[str]) -> LatencyHistogram:
+    # the csv has the iteration and the latency in microseconds, like "1, 295"
+    histogram = LatencyHistogram()
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) < 2:
+            continue
+        try:
+            histogram.record(float(parts[-1]))
+        except ValueError:
+            # the header
+            continue
+    return histogram
+
+
 class BSDLagscope(Lagscope):
     @property
     def can_install(self) -> bool:
@@ -25,6 +25,14 @@ class Ls(Tool):
         )
         return 0 == cmd_result.exit_code
 
+    def paths_exist(self, paths: List[str], sudo: bool = False) -> List[bool]:
+        """
+        Checks paths in one shell session, and returns results in the same
+        order.
+        """
+        results = self.run_many(paths, sudo=sudo)
+        return [0 == x.exit_code for x in results]
+
     def list(self, path: str, sudo: bool = False) -> List[str]:
         cmd_result = self.run(
             f"-p -d {path}/*",
@@ -98,6 +106,9 @@ class WindowsLs(Ls):
         )
         return output.strip() == "True"
 
+    def paths_exist(self, paths: List[str], sudo: bool = False) -> List[bool]:
+        return [self.path_exists(x, sudo=sudo) for x in paths]
+
     def list(self, path: str, sudo: bool = False) -> List[str]:
         command = f'Get-ChildItem -Path "{path}" | Select-Object -ExpandProperty Name'
         output = self.node.tools[PowerShell].run_cmdlet(
@@ -1,7 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-from typing import TYPE_CHECKING
+import tempfile
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from lisa.util.build_cache import get_build_cache
 
 from .kill import Kill
 
@@ -17,3 +21,163 @@ class KillableMixin:
             process_name = self.command  # type: ignore
         kill_tool = node.tools[Kill]
         kill_tool.by_name(process_name)
+
+
+class BuildCacheMixin:
+    """
+    Reuses the install tree of a source build across nodes. Only the files of
+    the build are packed and uploaded to the build cache, so files installed by
+    others on the node at the same time are not shared. Other nodes with the
+    same key unpack them, instead of compiling again.
+    """
+
+    def install_with_build_cache(
+        self,
+        revision: str,
+        build: Callable[[str], None],
+        paths: Optional[List[str]] = None,
+        include_kernel: bool = False,
+    ) -> None:
+        """
+        The build is called with the DESTDIR to install. By default, it's a
+        private staging folder, and the staged files are packed, and then
+        installed to the root of the node.
+
+        If the build system doesn't support DESTDIR, set paths to the installed
+        files, which the tool needs, and shell patterns are supported. The
+        build is called with an empty DESTDIR, and the paths are packed, only
+        if all of them are changed by the build.
+        """
+        # make sure this Mixin used with Tool.
+        node: Node = self.node  # type: ignore
+        cache = get_build_cache()
+        if not cache:
+            build("")
+            return
+
+        parts = self._get_build_cache_key_parts(revision, paths, include_kernel)
+        key = cache.get_key(parts)
+        with cache.lock(key):
+            artifact = cache.get(key)
+            if artifact:
+                node.log.debug(f"installing {parts['tool']} from build cache {key}")
+                self._extract_build_artifact(artifact)
+                return
+
+            if paths:
+                self._create_build_marker(key)
+                build("")
+                artifact = self._pack_build_paths(key, paths)
+            else:
+                artifact = self._build_in_staging(key, build)
+            if artifact:
+                cache.put(key, parts, artifact)
+                node.log.debug(f"uploaded {parts['tool']} to build cache {key}")
+
+    def _get_build_cache_key_parts(
+        self, revision: str, paths: Optional[List[str]], include_kernel: bool
+    ) -> Dict[str, str]:
+        node: Node = self.node  # type: ignore
+        information = node.os.information
+        kernel = node.os.get_kernel_information()  # type: ignore
+        parts: Dict[str, str] = {
+            "tool": self.name,  # type: ignore
+            "revision": revision,
+            "distro": f"{node.os.name} {information.vendor}",
+            "version": str(information.version),
+            "arch": kernel.hardware_platform,
+            "paths": ",".join(paths) if paths else "staging",
+        }
+        if include_kernel:
+            parts["kernel"] = kernel.raw_version
+        return parts
+
+    def _get_build_cache_path(self) -> PurePath:
+        node: Node = self.node  # type: ignore
+        return node.working_path / "build_cache"
+
+    def _create_build_marker(self, key: str) -> None:
+        node: Node = self.node  # type: ignore
+        remote_path = self._get_build_cache_path()
+        node.shell.mkdir(remote_path, exist_ok=True)
+        node.execute(f"touch {remote_path / f'{key}.marker'}", shell=True)
+
+    def _build_in_staging(
+        self, key: str, build: Callable[[str], None]
+    ) -> Optional[Path]:
+        node: Node = self.node  # type: ignore
+        remote_path = self._get_build_cache_path()
+        staging_path = remote_path / f"{key}_staging"
+        remote_file = remote_path / f"{key}.tar.gz"
+        node.execute(f"rm -rf {staging_path}", shell=True, sudo=True)
+        node.shell.mkdir(staging_path, parents=True, exist_ok=True)
+        build(str(staging_path))
+
+        # directories are not packed, so the metadata of existing directories,
+        # like /usr/local, is not changed by the staging folder.
+        node.execute(
+            r"find . \( -type f -o -type l \) -print0 | "
+            f"tar --null -czf {remote_file} -T -",
+            shell=True,
+            sudo=True,
+            cwd=staging_path,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to pack build artifact",
+        )
+        self._extract_remote_artifact(remote_file)
+        local_file = Path(tempfile.mkdtemp()) / remote_file.name
+        node.shell.copy_back(remote_file, local_file)
+        node.execute(f"rm -rf {remote_file} {staging_path}", shell=True, sudo=True)
+        return local_file
+
+    def _pack_build_paths(self, key: str, paths: List[str]) -> Optional[Path]:
+        # The files are checked by the change time, which is newer than the
+        # marker created before the build. So an artifact isn't created from
+        # files left by an earlier install.
+        node: Node = self.node  # type: ignore
+        remote_path = self._get_build_cache_path()
+        marker = remote_path / f"{key}.marker"
+        remote_file = remote_path / f"{key}.tar.gz"
+        if not node.shell.exists(marker):
+            return None
+        find = f"find {' '.join(paths)} -maxdepth 0"
+        result = node.execute(f"{find} ! -cnewer {marker}", shell=True, sudo=True)
+        node.execute(f"rm -f {marker}", shell=True, sudo=True)
+        if result.exit_code != 0 or result.stdout.strip():
+            node.log.debug(
+                "not all files are installed by the build, it's not cached: "
+                f"{result.stdout}"
+            )
+            return None
+        node.execute(
+            rf"{find} \( -type f -o -type l \) -print0 | "
+            f"tar --null -czf {remote_file} -T -",
+            shell=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to pack build artifact",
+        )
+        local_file = Path(tempfile.mkdtemp()) / remote_file.name
+        node.shell.copy_back(remote_file, local_file)
+        node.execute(f"rm -f {remote_file}", shell=True, sudo=True)
+        return local_file
+
+    def _extract_build_artifact(self, artifact: Path) -> None:
+        node: Node = self.node  # type: ignore
+        remote_path = self._get_build_cache_path()
+        remote_file = remote_path / artifact.name
+        node.shell.mkdir(remote_path, exist_ok=True)
+        node.shell.copy(artifact, remote_file)
+        self._extract_remote_artifact(remote_file)
+        node.execute(f"rm -f {remote_file}", shell=True)
+
+    def _extract_remote_artifact(self, remote_file: PurePath) -> None:
+        node: Node = self.node  # type: ignore
+        node.execute(
+            f"tar -xzf {remote_file} --no-overwrite-dir -C /",
+            shell=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to extract build artifact",
+        )
+        node.execute("ldconfig", shell=True, sudo=True, no_error_log=True)
@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-from typing import Optional, Type
+from typing import List, Optional, Type
 
 from lisa.executable import Tool
 from lisa.tools.ls import Ls
@@ -20,6 +20,12 @@ class Mkdir(Tool):
     def create_directory(self, path: str, sudo: bool = False) -> None:
         self.run(f"-p {path}", sudo=sudo, force_run=True)
 
+    def create_directories(self, paths: List[str], sudo: bool = False) -> None:
+        """
+        Creates directories in one shell session.
+        """
+        self.run_many([f"-p {x}" for x in paths], sudo=sudo)
+
     @classmethod
     def _windows_tool(cls) -> Optional[Type[Tool]]:
         return WindowsMkdir
@@ -42,3 +48,7 @@ class WindowsMkdir(Mkdir):
         self.node.tools[PowerShell].run_cmdlet(
             f"New-Item -ItemType Directory '{path}'", sudo=sudo
         )
+
+    def create_directories(self, paths: List[str], sudo: bool = False) -> None:
+        for path in paths:
+            self.create_directory(path, sudo=sudo)
@@ -18,6 +18,7 @@ from lisa.tools import Firewall, Gcc, Git, Make, Sed
 from lisa.util import LisaException, constants
 from lisa.util.process import ExecutableResult, Process
 
+from .mixins import BuildCacheMixin
 from .sysctl import Sysctl
 
 if TYPE_CHECKING:
@@ -82,7 +83,7 @@ class NtttcpResult:
     cycles_per_byte: Decimal = Decimal(0)
 
 
-class Ntttcp(Tool):
+class Ntttcp(Tool, BuildCacheMixin):
     repo = "https://github.com/microsoft/ntttcp-for-linux"
     throughput_pattern = re.compile(r" 	 throughput	:(.+)")
     # NTTTCP output sample
@@ -206,6 +207,7 @@ class Ntttcp(Tool):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        base_port: int = 0,
     ) -> Process:
         cmd = ""
         if server_ip:
@@ -223,6 +225,8 @@ class Ntttcp(Tool):
             cmd += f" --show-dev-interrupts {dev_differentiator} "
         if run_as_daemon:
             cmd += " -D "
+        if base_port:
+            cmd += f" -p {base_port} "
         process = self.node.execute_async(
             f"ulimit -n 204800 && {self.command} {cmd}", shell=True, sudo=True
         )
@@ -247,6 +251,7 @@ class Ntttcp(Tool):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        base_port: int = 0,
     ) -> ExecutableResult:
         # -rserver_ip: run as a receiver with specified server ip address
         # -P: Number of ports listening on receiver side [default: 16] [max: 512]
@@ -275,6 +280,7 @@ class Ntttcp(Tool):
             dev_differentiator,
             run_as_daemon,
             udp_mode,
+            base_port,
         )
 
         return self.wait_server_result(process)
@@ -298,8 +304,10 @@ class Ntttcp(Tool):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        base_port: int = 0,
     ) -> ExecutableResult:
         # -sserver_ip: run as a sender with server ip address
+        # -p: Destination port number, or starting port number [default: 5001]
         # -P: Number of ports listening on receiver side [default: 16] [max: 512]
         # -n: [sender only] number of threads per each receiver port     [default: 4]
         # [max: 25600]
@@ -327,6 +335,8 @@ class Ntttcp(Tool):
             cmd += f" --show-dev-interrupts {dev_differentiator} "
         if run_as_daemon:
             cmd += " -D "
+        if base_port:
+            cmd += f" -p {base_port} "
         result = self.node.execute(
             f"ulimit -n 204800 && {self.command} {cmd}",
             shell=True,
@@ -466,7 +476,12 @@ class Ntttcp(Tool):
         git.clone(self.repo, tool_path)
         make = self.node.tools[Make]
         code_path = tool_path.joinpath(self.tool_path_folder)
-        make.make_install(cwd=code_path)
+        # the makefile doesn't support DESTDIR, so the binary is cached only.
+        self.install_with_build_cache(
+            revision=git.get_current_commit_hash(code_path),
+            build=lambda _: make.make_install(cwd=code_path),
+            paths=["/usr/local/bin/ntttcp"],
+        )
         if not isinstance(self.node.os, BSD):
             self.node.execute(
                 "ln -s /usr/local/bin/ntttcp /usr/bin/ntttcp", sudo=True, cwd=code_path
@@ -552,6 +567,7 @@ class BSDNtttcp(Ntttcp):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        base_port: int = 0,
     ) -> Process:
         assert server_ip, "server ip is required for ntttcp server"
         self._log.debug(
@@ -565,6 +581,8 @@ class BSDNtttcp(Ntttcp):
         )
         if run_as_daemon:
             cmd += " -D "
+        if base_port:
+            cmd += f" -p {base_port} "
         if udp_mode:
             raise LisaException("UDP mode is not supported in FreeBSD")
 
@@ -589,6 +607,7 @@ class BSDNtttcp(Ntttcp):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        base_port: int = 0,
     ) -> ExecutableResult:
         self._log.debug(
             "Paramers nic_name, cool_down_time_seconds, warm_up_time_seconds, "
@@ -602,6 +621,8 @@ class BSDNtttcp(Ntttcp):
             raise LisaException("UDP mode is not supported in FreeBSD")
         if run_as_daemon:
             cmd += " -D "
+        if base_port:
+            cmd += f" -p {base_port} "
         result = self.node.execute(
             f"ulimit -n 204800 && {self.command} {cmd}",
             shell=True,
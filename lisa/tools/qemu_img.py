@@ -37,11 +37,14 @@ class QemuImg(Tool):
             expected_exit_code_failure_message="Failed to create disk image.",
         )
 
-    def create_diff_qcow2(self, output_img_path: str, backing_img_path: str) -> None:
+    def create_diff_qcow2(
+        self, output_img_path: str, backing_img_path: str, sudo: bool = False
+    ) -> None:
         params = f'create -F qcow2 -f qcow2 -b "{backing_img_path}" "{output_img_path}"'
         self.run(
             params,
             force_run=True,
+            sudo=sudo,
             expected_exit_code=0,
             expected_exit_code_failure_message="Failed to create differential disk.",
         )
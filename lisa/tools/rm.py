@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-from typing import Optional, Type
+from typing import List, Optional, Type
 
 from lisa.executable import Tool
 from lisa.tools.ls import Ls
@@ -23,6 +23,16 @@ class Rm(Tool):
     def remove_directory(self, path: str, sudo: bool = False) -> None:
         self.run(f"-rf {path}", sudo=sudo, force_run=True)
 
+    def remove_files(self, paths: List[str], sudo: bool = False) -> None:
+        """
+        Removes files in one shell session. Missing files are ignored like
+        remove_file.
+        """
+        self.run_many(paths, sudo=sudo)
+
+    def remove_directories(self, paths: List[str], sudo: bool = False) -> None:
+        self.run_many([f"-rf {x}" for x in paths], sudo=sudo)
+
     @classmethod
     def _windows_tool(cls) -> Optional[Type[Tool]]:
         return WindowsRm
@@ -44,5 +54,9 @@ class WindowsRm(Rm):
 
         self.node.tools[PowerShell].run_cmdlet(f"Remove-Item {path} -Force", sudo=sudo)
 
+    def remove_files(self, paths: List[str], sudo: bool = False) -> None:
+        for path in paths:
+            self.remove_file(path, sudo=sudo)
+
     def remove_directory(self, path: str, sudo: bool = False) -> None:
         raise NotImplementedError
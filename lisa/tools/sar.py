@@ -1,22 +1,142 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import json
 import re
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, cast
+from pathlib import PurePath, PurePosixPath
+from signal import SIGINT
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Pattern, Type, cast
 
 from assertpy.assertpy import assert_that
 
 from lisa.executable import Tool
-from lisa.messages import NetworkPPSPerformanceMessage, create_perf_message
+from lisa.messages import NetworkPPSPerformanceMessage, PerfMessage, create_perf_message
 from lisa.operating_system import Posix
-from lisa.util import constants, find_groups_in_lines
+from lisa.util import (
+    LisaException,
+    constants,
+    find_groups_in_lines,
+    generate_random_chars,
+)
+from lisa.util import perf_statistics as stats
 from lisa.util.process import ExecutableResult, Process
 
 from .firewall import Firewall
+from .kill import Kill
 
 if TYPE_CHECKING:
     from lisa.testsuite import TestResult
 
+# The locations of the sysstat collector in distros. It's run directly, because
+# sar -o doesn't record all activities, like disks and TCP.
+SADC_PATHS = [
+    "/usr/lib/sysstat/sadc",
+    "/usr/lib64/sa/sadc",
+    "/usr/lib/sa/sadc",
+    "/usr/libexec/sa/sadc",
+]
+
+# The metric groups, which are summarized by default. Per CPU series are
+# excluded, since there are too many of them on large VMs.
+SYSSTAT_DEFAULT_GROUPS: Dict[str, Pattern[str]] = {
+    "cpu": re.compile(r"^cpu-load(-all)?\.all\."),
+    "softirq": re.compile(r"^network\.softnet\.all\."),
+    "nic": re.compile(r"^network\.net-e?dev\."),
+    "tcp": re.compile(r"^network\.net-e?tcp\."),
+    "disk": re.compile(r"^disk\."),
+}
+SYSSTAT_PERCENTILES = [50, 90, 99]
+# the prefix of statistics names in perf messages.
+SYSSTAT_STATISTICS_PREFIX = "sysstat."
+
+# the fields to name items of lists, like cpu-load and net-dev.
+_SYSSTAT_ITEM_KEYS = ["cpu", "iface", "disk-device", "intr", "filesystem", "device"]
+
+
+@dataclass
+class SysstatData:
+    # the time of samples, like "2023-01-01 06:37:42".
+    timestamps: List[str] = field(default_factory=list)
+    # the values by series, like "network.net-dev.eth0.rxpck". A series may
+    # have fewer values than timestamps, if it's missing in some samples.
+    series: Dict[str, List[float]] = field(default_factory=dict)
+
+    def summarize(
+        self,
+        groups: Optional[List[Pattern[str]]] = None,
+        percentiles: Optional[List[int]] = None,
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        returns min, max, mean and percentiles of series, which match any
+        group.
+        """
+        if groups is None:
+            groups = list(SYSSTAT_DEFAULT_GROUPS.values())
+        if percentiles is None:
+            percentiles = SYSSTAT_PERCENTILES
+        summary: Dict[str, Dict[str, float]] = {}
+        for name, values in self.series.items():
+            if not values or not any(x.search(name) for x in groups):
+                continue
+            # sort once for all percentiles of the series.
+            sorted_values = sorted(values)
+            item: Dict[str, float] = {
+                "count": len(sorted_values),
+                "min": sorted_values[0],
+                "max": sorted_values[-1],
+                "mean": sum(sorted_values) / len(sorted_values),
+            }
+            for percent in percentiles:
+                item[f"p{percent}"] = stats.percentile(sorted_values, percent)
+            summary[name] = item
+        return summary
+
+
+def parse_sadf_json(content: str) -> SysstatData:
+    """
+    parse the output of "sadf -j". Each sample is flattened to series, which
+    are named by the path of keys, and the names of list items.
+    """
+    try:
+        raw = json.loads(content)
+    except json.JSONDecodeError as identifier:
+        raise LisaException(f"failed to parse sadf output: {identifier}")
+    hosts = raw.get("sysstat", {}).get("hosts", [])
+    data = SysstatData()
+    for host in hosts:
+        for sample in host.get("statistics", []):
+            timestamp = sample.get("timestamp", {})
+            if not timestamp:
+                # it's a restart mark, or a comment.
+                continue
+            data.timestamps.append(
+                f"{timestamp.get('date', '')} {timestamp.get('time', '')}"
+            )
+            row: Dict[str, float] = {}
+            for key, value in sample.items():
+                if key != "timestamp":
+                    _flatten_sysstat(value, key, row)
+            for name, value in row.items():
+                data.series.setdefault(name, []).append(value)
+    return data
+
+
+def _flatten_sysstat(value: Any, path: str, row: Dict[str, float]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten_sysstat(item, f"{path}.{key}", row)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            if not isinstance(item, dict):
+                continue
+            name = next(
+                (str(item[x]) for x in _SYSSTAT_ITEM_KEYS if x in item), str(index)
+            )
+            _flatten_sysstat(item, f"{path}.{name}", row)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        row[path] = float(value)
+
 
 class Sar(Tool):
     # 06:37:41        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil # noqa: E501
@@ -88,25 +208,28 @@ class Sar(Tool):
     def get_data(
         self, nic_name: str, result: ExecutableResult
     ) -> Dict[str, List[Decimal]]:
-        sar_result_pattern = re.compile(
-            rf"([\w\W]*?){nic_name}([\w\W]*?)\s+(?P<rxpck>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<txpck>\d+.\d+)([\w\W]*?)\s+(?P<rxkb>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<rxcmp>\d+.\d+)([\w\W]*?)\s+(?P<txcmp>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<rxmcst>\d+.\d+)([\w\W]*?)\s+(?P<ifutil>\d+.\d+)",
-            re.M,
-        )
-        raw_list = re.finditer(self.sar_results_pattern, result.stdout)
+        # The columns are located by the header once per block, and rows are
+        # split by whitespaces. So each line is scanned once.
         rx_pps: List[Decimal] = []
         tx_pps: List[Decimal] = []
         tx_rx_pps: List[Decimal] = []
-        for sar_result in raw_list:
-            temp = sar_result_pattern.match(sar_result.group())
-            assert temp, f"not find matched sar result for nic {nic_name}"
-            rx_pps.append(Decimal(temp.group("rxpck")))
-            tx_pps.append(Decimal(temp.group("txpck")))
-            tx_rx_pps.append(
-                Decimal(temp.group("rxpck")) + Decimal(temp.group("txpck"))
-            )
+        for block in self.sar_results_pattern.finditer(result.stdout):
+            lines = block.group().splitlines()
+            header = lines[0].split()
+            rx_index = header.index("rxpck/s") - header.index("IFACE")
+            tx_index = header.index("txpck/s") - header.index("IFACE")
+            row: List[str] = []
+            for line in lines[1:]:
+                columns = line.split()
+                if nic_name in columns:
+                    row = columns[columns.index(nic_name) :]
+                    break
+            assert row, f"not find matched sar result for nic {nic_name}"
+            rx = Decimal(row[rx_index])
+            tx = Decimal(row[tx_index])
+            rx_pps.append(rx)
+            tx_pps.append(tx)
+            tx_rx_pps.append(rx + tx)
 
         return {
             "rx_pps": rx_pps,
@@ -159,6 +282,72 @@ class Sar(Tool):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         firewall = self.node.tools[Firewall]
         firewall.stop()
+        # the pid of sadc, which is recording.
+        self._recording_pid = ""
+        self._recording_path: Optional[PurePath] = None
+
+    def start_recording(self, interval: int = 1) -> PurePath:
+        """
+        record all activities to a binary file in background, until
+        stop_recording is called. It's retrieved and parsed once, instead of
+        parsing text output of multiple sar runs.
+        """
+        if self._recording_pid:
+            raise LisaException("sysstat is recording already")
+        sadc_path = self._get_sadc_path()
+        recording_path = self.node.working_path / (
+            f"sysstat_{generate_random_chars(length=8)}.sa"
+        )
+        result = self.node.execute(
+            f"nohup {sadc_path} -S XALL {interval} {recording_path} "
+            "> /dev/null 2>&1 & echo $!",
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to start sadc",
+        )
+        self._recording_pid = result.stdout.strip()
+        self._recording_path = recording_path
+        return recording_path
+
+    def stop_recording(self) -> SysstatData:
+        if not self._recording_pid:
+            raise LisaException("sysstat is not recording")
+        pid, self._recording_pid = self._recording_pid, ""
+        self.node.tools[Kill].by_pid(pid, signum=SIGINT, ignore_not_exist=True)
+        assert self._recording_path
+        return self.get_recorded_data(self._recording_path)
+
+    def get_recorded_data(self, path: PurePath) -> SysstatData:
+        # -A includes all activities, and per CPU or per device items.
+        result = self.node.execute(
+            f"sadf -j {path} -- -A",
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to convert sysstat file",
+        )
+        return parse_sadf_json(result.stdout)
+
+    def add_statistics(
+        self,
+        message: PerfMessage,
+        data: SysstatData,
+        groups: Optional[List[Pattern[str]]] = None,
+    ) -> None:
+        """
+        attach summaries of recorded series to statistics of a perf message.
+        """
+        summary = data.summarize(groups=groups)
+        if not summary:
+            return
+        if message.statistics is None:
+            message.statistics = {}
+        for name, value in summary.items():
+            message.statistics[f"{SYSSTAT_STATISTICS_PREFIX}{name}"] = value
+
+    def _get_sadc_path(self) -> str:
+        for path in SADC_PATHS:
+            if self.node.shell.exists(PurePosixPath(path)):
+                return path
+        raise LisaException(f"cannot find sadc in {SADC_PATHS}")
 
 
 class SarBSD(Sar):
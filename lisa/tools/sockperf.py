@@ -3,8 +3,19 @@
 
 import pathlib
 import re
-from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Type, Union, cast
+from decimal import Decimal, InvalidOperation
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 from assertpy import assert_that
 
@@ -13,6 +24,7 @@ from lisa.executable import Tool
 from lisa.messages import NetworkLatencyPerformanceMessage, create_perf_message
 from lisa.operating_system import BSD, CBLMariner, Posix, Ubuntu
 from lisa.util import constants
+from lisa.util.latency_histogram import LatencyHistogram
 from lisa.util.process import Process
 
 from .firewall import Firewall
@@ -172,20 +184,45 @@ class Sockperf(Tool):
         protocol_flag = self._get_protocol_flag(mode)
         return self.start(command=f"server {protocol_flag} -i {self_ip}")
 
-    def run_client_async(self, mode: str, server_ip: str) -> Process:
+    def run_client_async(
+        self, mode: str, server_ip: str, full_log_path: str = ""
+    ) -> Process:
+        # --full-log: dumps the send and receive time of all packets to a file.
         protocol_flag = self._get_protocol_flag(mode)
-        return self.start(
-            command=f"ping-pong {protocol_flag} --full-rtt -i {server_ip}"
+        command = f"ping-pong {protocol_flag} --full-rtt -i {server_ip}"
+        if full_log_path:
+            command += f" --full-log {full_log_path}"
+        return self.start(command=command)
+
+    def run_client(self, mode: str, server_ip: str, full_log_path: str = "") -> str:
+        return (
+            self.run_client_async(mode, server_ip, full_log_path).wait_result().stdout
         )
 
-    def run_client(self, mode: str, server_ip: str) -> str:
-        return self.run_client_async(mode, server_ip).wait_result().stdout
+    def get_latency_histogram(
+        self, full_log_path: pathlib.PurePath
+    ) -> LatencyHistogram:
+        """
+        Returns the histogram of round trip latencies of all packets from the
+        full log of the client.
+        """
+        local_path = self.node.local_log_path / full_log_path.name
+        self.node.shell.copy_back(full_log_path, local_path)
+        with open(local_path) as f:
+            histogram, lost_count = parse_sockperf_full_log(f)
+        if lost_count:
+            self._log.info(
+                f"skipped {lost_count} packets without valid receive time, "
+                "they may be lost."
+            )
+        return histogram
 
     def create_latency_performance_message(
         self,
         sockperf_output: str,
         test_case_name: str,
         test_result: "TestResult",
+        histogram: Optional[LatencyHistogram] = None,
     ) -> None:
         matched_results = self.sockperf_result_regex.search(sockperf_output)
         assert matched_results, "Could not find sockperf latency results in output."
@@ -222,6 +259,9 @@ class Sockperf(Tool):
             test_case_name,
             other_fields,
         )
+        if histogram:
+            message.histograms = {"latency_us": histogram.to_dict()}
+            message.statistics = {"latency_us": histogram.get_statistics()}
         notifier.notify(message)
 
     def get_average_latency(self, sockperf_output: str) -> Decimal:
@@ -252,3 +292,29 @@ class Sockperf(Tool):
         stats["total_observations"] = self.get_total_observations(sockperf_output)
         stats["run_time_seconds"] = self.get_run_time(sockperf_output)
         return stats
+
+
+def parse_sockperf_full_log(lines: Iterable[str]) -> Tuple[LatencyHistogram, int]:
+    # the packet lines have the index, the send and the receive time in
+    # seconds, like "1, 1658925451.123456789, 1658925451.123756789". The
+    # times are parsed by Decimal, because float loses sub-microsecond
+    # precision of epoch seconds. Returns the histogram, and the count of
+    # packets, which have no valid receive time, like lost UDP packets.
+    histogram = LatencyHistogram()
+    lost_count = 0
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) != 3:
+            continue
+        try:
+            tx_time = Decimal(parts[1].strip())
+            rx_time = Decimal(parts[2].strip())
+        except InvalidOperation:
+            # the header
+            continue
+        if rx_time <= tx_time:
+            # the receive time is 0, if the packet is lost.
+            lost_count += 1
+            continue
+        histogram.record(float((rx_time - tx_time) * 1000000))
+    return histogram, lost_count
@@ -0,0 +1,136 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+import time
+from pathlib import PurePath
+from typing import Callable, Dict, List, Optional
+
+from lisa.executable import Tool
+from lisa.tools.pgrep import Pgrep
+from lisa.util import LisaException, create_timer
+from lisa.util.process import Process
+
+# seconds without new lines, after the followed process exits. The files may
+# be written just before the process exits.
+_DRAIN_QUIET_TIME = 3
+_DRAIN_TIMEOUT = 60
+
+# ==> /opt/ltp/ltp-results.log <==
+_HEADER_PATTERN = re.compile(r"^==> (?P<file>.+) <==$")
+
+
+class Tail(Tool):
+    @property
+    def command(self) -> str:
+        return "tail"
+
+    @property
+    def can_install(self) -> bool:
+        return False
+
+    def follow(
+        self,
+        files: List[PurePath],
+        handle_line: Callable[[PurePath, str], None],
+        process_name: str,
+        timeout: int = 600,
+        interval: int = 10,
+        sudo: bool = False,
+    ) -> None:
+        """
+        Handles lines of files as they are written, until the process exits.
+        It replaces Pgrep.wait_processes for long running tests, so results
+        can be handled before all tests complete. The lines are read by a
+        persistent tail process, and the process is checked by pgrep in the
+        interval. If the tail process exits, like the connection is broken,
+        it's started again, and lines are not handled twice.
+        """
+        timer = create_timer()
+        pgrep = self.node.tools[Pgrep]
+        reader = _TailReader(files, handle_line)
+        process = self._start(files, sudo)
+        next_check = 0.0
+        try:
+            while True:
+                if not reader.read(process) and not process.is_running():
+                    self._log.debug("the tail process exited, start it again.")
+                    reader.restart()
+                    process = self._start(files, sudo)
+                if timer.elapsed(False) >= timeout:
+                    raise LisaException(
+                        f"The '{process_name}' process timed out with "
+                        f"{timeout} seconds."
+                    )
+                if timer.elapsed(False) >= next_check:
+                    next_check = timer.elapsed(False) + interval
+                    # it keeps SSH alive, like wait_processes.
+                    if not pgrep.get_processes(process_name):
+                        self._log.debug(
+                            f"The '{process_name}' process is not running, "
+                            "stop to follow."
+                        )
+                        break
+                time.sleep(1)
+
+            # handle lines, which are written just before the process exits.
+            drain_timer = create_timer()
+            quiet_timer = create_timer()
+            while (
+                quiet_timer.elapsed(False) < _DRAIN_QUIET_TIME
+                and drain_timer.elapsed(False) < _DRAIN_TIMEOUT
+            ):
+                if reader.read(process):
+                    quiet_timer = create_timer()
+                time.sleep(0.5)
+        finally:
+            process.kill()
+
+    def _start(self, files: List[PurePath], sudo: bool) -> Process:
+        # -F follows files by names, so files can be created later. -v prints
+        # headers, so the file of lines can be known.
+        return self.run_async(
+            f"-v -n +1 -F {' '.join(str(x) for x in files)}",
+            force_run=True,
+            sudo=sudo,
+            buffer_lines=True,
+        )
+
+
+class _TailReader:
+    def __init__(
+        self, files: List[PurePath], handle_line: Callable[[PurePath, str], None]
+    ) -> None:
+        self._files = {str(x): x for x in files}
+        self._handle_line = handle_line
+        # count of lines handled, and lines to skip after restarted.
+        self._handled: Dict[str, int] = {x: 0 for x in self._files}
+        self._skip: Dict[str, int] = {x: 0 for x in self._files}
+        # tail prints the header of the file before its lines.
+        self._current: Optional[str] = None
+
+    def restart(self) -> None:
+        # the new tail process outputs from the beginning of files. Handled
+        # lines include skipped ones, so lines not skipped yet are added.
+        self._skip = {x: self._skip[x] + self._handled[x] for x in self._files}
+        self._handled = {x: 0 for x in self._files}
+        self._current = None
+
+    def read(self, process: Process) -> bool:
+        lines = process.read_output_lines()
+        for line in lines:
+            matched = _HEADER_PATTERN.match(line)
+            if matched and matched.group("file") in self._files:
+                self._current = matched.group("file")
+                continue
+            # tail prints an empty line before headers, and the parsers
+            # don't need empty lines, so they are skipped.
+            if not line.strip() or self._current is None:
+                continue
+            if self._skip[self._current] > 0:
+                self._skip[self._current] -= 1
+                self._handled[self._current] += 1
+                continue
+            self._handled[self._current] += 1
+            self._handle_line(self._files[self._current], line)
+        return len(lines) > 0
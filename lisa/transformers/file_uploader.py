@@ -73,12 +73,34 @@ class FileUploaderTransformer(DeploymentTransformer):
             mkdir = self._node.tools[Mkdir]
             mkdir.create_directory(runbook.destination)
 
-        for name in runbook.files:
-            local_path = PurePath(runbook.source) / name
-            remote_path = PurePath(runbook.destination)
-            self._log.debug(f"uploading file from '{local_path}' to '{remote_path}'")
+        # files in the source folder are uploaded in one stream. Others, like
+        # folders, are uploaded by RemoteCopy.
+        top_files = [
+            name
+            for name in runbook.files
+            if PurePath(name).name == name
+            and os.path.isfile(os.path.join(runbook.source, name))
+        ]
+        if top_files:
+            self._log.debug(
+                f"uploading {len(top_files)} files from '{runbook.source}' "
+                f"to '{runbook.destination}'"
+            )
+            statistics = self._node.shell.copy_directory(
+                PurePath(runbook.source),
+                PurePath(runbook.destination),
+                files=top_files,
+            )
+            self._log.debug(f"uploaded files: {statistics}")
 
-            copy.copy_to_remote(local_path, remote_path)
+        for name in runbook.files:
+            if name not in top_files:
+                local_path = PurePath(runbook.source) / name
+                remote_path = PurePath(runbook.destination)
+                self._log.debug(
+                    f"uploading file from '{local_path}' to '{remote_path}'"
+                )
+                copy.copy_to_remote(local_path, remote_path)
             uploaded_files.append(name)
 
         result[UPLOADED_FILES] = uploaded_files
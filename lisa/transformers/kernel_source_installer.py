@@ -2,7 +2,7 @@
 # Licensed under the MIT license.
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from pathlib import PurePath
+from pathlib import Path, PurePath
 from typing import Any, Dict, List, Optional, Type, cast
 
 from dataclasses_json import dataclass_json
@@ -11,14 +11,16 @@ from lisa import schema
 from lisa.base_tools import Mv
 from lisa.node import Node
 from lisa.operating_system import CBLMariner, Redhat, Ubuntu
-from lisa.tools import Cp, Echo, Git, Make, Sed, Uname
+from lisa.tools import Cp, Echo, Free, Git, Make, Nproc, Sed, Uname
 from lisa.tools.gcc import Gcc
 from lisa.tools.lscpu import Lscpu
-from lisa.util import LisaException, field_metadata, subclasses
+from lisa.util import LisaException, constants, field_metadata, subclasses
 from lisa.util.logger import Logger, get_logger
 
 from .kernel_installer import BaseInstaller, BaseInstallerSchema
 
+CCACHE_FILE_NAME = "ccache.tar"
+
 
 @dataclass_json()
 @dataclass
@@ -75,6 +77,18 @@ class PatchModifierSchema(BaseModifierSchema):
     file_pattern: str = "*.patch"
 
 
+@dataclass_json()
+@dataclass
+class CcacheSchema:
+    # The cache folder on the node. It's kept between runs on the same node.
+    path: str = "$HOME/.ccache"
+    max_size: str = "20G"
+    # A folder on the controller to keep the cache, so builds on new nodes,
+    # like iterations of git bisect, can reuse it. A relative path is under
+    # the runbook folder. If it's empty, the cache is kept on the node only.
+    controller_path: str = ""
+
+
 @dataclass_json()
 @dataclass
 class SourceInstallerSchema(BaseInstallerSchema):
@@ -93,9 +107,20 @@ class SourceInstallerSchema(BaseInstallerSchema):
         ),
     )
 
+    # Use ccache to reuse object files across builds.
+    ccache: Optional[CcacheSchema] = None
+
+    # The parallel jobs of make. If it's 0, it's sized by the count of CPU and
+    # the available memory.
+    build_jobs: int = 0
+
 
 class SourceInstaller(BaseInstaller):
     _code_path: PurePath
+    _build_jobs: int
+    _make_arguments: str
+    _make_envs: Dict[str, str]
+    _ccache_path: Optional[PurePath]
 
     @classmethod
     def type_name(cls) -> str:
@@ -158,10 +183,15 @@ class SourceInstaller(BaseInstaller):
         # modify code
         self._modify_code(node=node, code_path=self._code_path)
 
+        self._build_jobs = self._get_build_jobs(node)
+        self._log.info(f"building with {self._build_jobs} parallel jobs")
+        self._setup_ccache(node=node, code_path=self._code_path)
+
         kconfig_file = runbook.kernel_config_file
         self._build_code(
             node=node, code_path=self._code_path, kconfig_file=kconfig_file
         )
+        self._save_ccache(node=node)
 
         self._install_build(node=node, code_path=self._code_path)
 
@@ -188,14 +218,12 @@ class SourceInstaller(BaseInstaller):
         return kernel_version
 
     def _install_build(self, node: Node, code_path: PurePath) -> None:
-        make = node.tools[Make]
-        make.make(arguments="modules", cwd=code_path, sudo=True)
+        # use the same arguments of the build, or the objects are rebuilt.
+        self._make(node, "modules", code_path, sudo=True)
 
-        make.make(
-            arguments="INSTALL_MOD_STRIP=1 modules_install", cwd=code_path, sudo=True
-        )
+        self._make(node, "INSTALL_MOD_STRIP=1 modules_install", code_path, sudo=True)
 
-        make.make(arguments="install", cwd=code_path, sudo=True)
+        self._make(node, "install", code_path, sudo=True)
 
         # The build for Redhat needs extra steps than RPM package. So put it
         # here, not in OS.
@@ -296,18 +324,127 @@ class SourceInstaller(BaseInstaller):
             )
             result.assert_exit_code()
 
+        self._make(node, "olddefconfig", code_path)
+
+        # set timeout to 2 hours. The build is incremental, if the objects of
+        # previous builds are in the code path.
+        self._make(node, "", code_path, timeout=60 * 60 * 2)
+
+    def _make(
+        self,
+        node: Node,
+        arguments: str,
+        code_path: PurePath,
+        sudo: bool = False,
+        timeout: int = 600,
+    ) -> None:
         make = node.tools[Make]
-        make.make(arguments="olddefconfig", cwd=code_path)
+        make.make(
+            arguments=f"{self._make_arguments} {arguments}".strip(),
+            cwd=code_path,
+            sudo=sudo,
+            timeout=timeout,
+            thread_count=self._build_jobs,
+            # the envs are cleared after used, so pass a copy.
+            update_envs=dict(self._make_envs),
+        )
 
-        # set timeout to 2 hours
-        make.make(arguments="", cwd=code_path, timeout=60 * 60 * 2)
+    def _get_build_jobs(self, node: Node) -> int:
+        runbook: SourceInstallerSchema = self.runbook
+        if runbook.build_jobs:
+            return runbook.build_jobs
+        return calculate_build_jobs(
+            cpu_count=node.tools[Nproc].get_num_procs(),
+            available_memory_mb=node.tools[Free].get_available_memory_mb(),
+        )
+
+    def _setup_ccache(self, node: Node, code_path: PurePath) -> None:
+        runbook: SourceInstallerSchema = self.runbook
+        self._make_arguments = ""
+        self._make_envs = {}
+        self._ccache_path = None
+        if not runbook.ccache:
+            return
+        if node.execute("command -v ccache", shell=True).exit_code != 0:
+            self._log.info("ccache is not installed, build without cache.")
+            return
+
+        echo_result = node.tools[Echo].run(runbook.ccache.path, shell=True)
+        cache_path = node.get_pure_path(echo_result.stdout)
+        node.execute(f"mkdir -p {cache_path}", shell=True, sudo=True)
+        controller_file = self._get_ccache_controller_file()
+        if controller_file and controller_file.exists():
+            self._log.info(f"restoring ccache from {controller_file}")
+            remote_file = node.working_path / CCACHE_FILE_NAME
+            node.shell.copy(controller_file, remote_file)
+            node.execute(
+                f"tar -xf {remote_file} -C {cache_path} && rm -f {remote_file}",
+                shell=True,
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="failed to restore ccache",
+            )
+        # the modules are installed by sudo, so the cache is shared by users.
+        node.execute(f"chmod -R a+rwX {cache_path}", shell=True, sudo=True)
+
+        self._ccache_path = cache_path
+        # The base dir makes paths relative, so objects are reused, even if
+        # the code path is different.
+        self._make_envs = {
+            "CCACHE_DIR": str(cache_path),
+            "CCACHE_BASEDIR": str(code_path),
+            "CCACHE_UMASK": "000",
+        }
+        self._make_arguments = 'CC="ccache gcc"'
+        node.execute(
+            f"ccache -M {runbook.ccache.max_size} && ccache -z",
+            shell=True,
+            update_envs=dict(self._make_envs),
+        )
+
+    def _save_ccache(self, node: Node) -> None:
+        if not self._ccache_path:
+            return
+        result = node.execute(
+            "ccache -s", shell=True, update_envs=dict(self._make_envs)
+        )
+        self._log.debug(f"ccache statistics: {result.stdout}")
+
+        controller_file = self._get_ccache_controller_file()
+        if not controller_file:
+            return
+        self._log.info(f"saving ccache to {controller_file}")
+        remote_file = node.working_path / CCACHE_FILE_NAME
+        # ccache compresses objects already, so the tar isn't compressed.
+        node.execute(
+            f"tar -cf {remote_file} -C {self._ccache_path} .",
+            shell=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to pack ccache",
+        )
+        controller_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = controller_file.with_name(f"{controller_file.name}.tmp")
+        node.shell.copy_back(remote_file, temp_file)
+        temp_file.replace(controller_file)
+        node.execute(f"rm -f {remote_file}", shell=True, sudo=True)
+
+    def _get_ccache_controller_file(self) -> Optional[Path]:
+        runbook: SourceInstallerSchema = self.runbook
+        assert runbook.ccache
+        if not runbook.ccache.controller_path:
+            return None
+        path = Path(runbook.ccache.controller_path)
+        if not path.is_absolute():
+            path = constants.RUNBOOK_PATH / path
+        return path / CCACHE_FILE_NAME
 
     def _install_build_tools(self, node: Node) -> None:
         os = node.os
         self._log.info("installing build tools")
         if isinstance(os, Redhat):
             for package in list(
-                ["elfutils-libelf-devel", "openssl-devel", "dwarves", "bc"]
+                ["elfutils-libelf-devel", "openssl-devel", "dwarves", "bc", "ccache"]
             ):
                 if os.is_package_in_repo(package):
                     os.install_packages(package)
@@ -482,6 +619,12 @@ class PatchModifier(BaseModifier):
         git.apply(cwd=self._code_path, patches=patches_path)
 
 
+def calculate_build_jobs(cpu_count: int, available_memory_mb: int) -> int:
+    # A kernel compile job takes about 512MB memory at most, so the jobs are
+    # limited by memory, and the build doesn't fail by OOM on small VMs.
+    return max(1, min(cpu_count, available_memory_mb // 512))
+
+
 def _get_code_path(path: str, node: Node, default_name: str) -> PurePath:
     if path:
         code_path = node.get_pure_path(path)
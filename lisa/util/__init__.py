@@ -693,6 +693,23 @@ def field_metadata(
     )
 
 
+# cached marshmallow schemas of dataclass_json types.
+_schemas: Dict[Type[Any], Any] = {}
+
+
+def get_schema(schema_type: Type[Any]) -> Any:
+    """
+    Returns the marshmallow schema of a dataclass_json type. Building a schema
+    is slow, because schemas of all nested fields are built too. The schema
+    doesn't keep state on loading, so it's built once and shared.
+    """
+    schema = _schemas.get(schema_type)
+    if schema is None:
+        schema = schema_type.schema()
+        _schemas[schema_type] = schema
+    return schema
+
+
 def is_unittest() -> bool:
     return "unittest" in sys.argv[0]
 
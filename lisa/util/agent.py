@@ -0,0 +1,277 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import base64
+import codecs
+import errno
+import json
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import spur  # type: ignore
+
+from lisa.util import LisaException
+from lisa.util.logger import Logger, get_logger
+
+# seconds to wait the agent is ready, or a process is started.
+_START_TIMEOUT = 20
+
+
+class AgentUnavailableException(LisaException):
+    """
+    The agent cannot run commands, so they should be run by ssh.
+    """
+
+
+class AgentProcess:
+    """
+    A process started by the agent. It has the same methods as processes of
+    spur, which are used by Process, so Process can use both of them.
+    """
+
+    def __init__(
+        self,
+        agent: "RemoteAgent",
+        id_: int,
+        stdout: Any,
+        stderr: Any,
+        encoding: str,
+    ) -> None:
+        self.pid = 0
+        self._agent = agent
+        self._id = id_
+        self._encoding = encoding or "utf-8"
+        self._writers: Dict[str, Any] = {"stdout": stdout, "stderr": stderr}
+        self._decoders = {
+            name: codecs.getincrementaldecoder(self._encoding)(errors="replace")
+            for name in self._writers
+        }
+        self._outputs: Dict[str, List[str]] = {name: [] for name in self._writers}
+        self._started = Event()
+        self._exited = Event()
+        self._error: Optional[Dict[str, Any]] = None
+        self._return_code: Optional[int] = None
+
+    def is_running(self) -> bool:
+        return not self._exited.is_set()
+
+    def stdin_write(self, value: str) -> None:
+        self._agent.send(
+            {
+                "type": "stdin",
+                "id": self._id,
+                "data": base64.b64encode(value.encode(self._encoding)).decode("ascii"),
+            }
+        )
+
+    def send_signal(self, signal: int) -> None:
+        self._agent.send({"type": "signal", "id": self._id, "signal": signal})
+
+    def wait_for_result(self) -> Any:
+        self._exited.wait()
+        return spur.results.result(
+            self._return_code,
+            True,
+            "".join(self._outputs["stdout"]),
+            "".join(self._outputs["stderr"]),
+        )
+
+    def close(self) -> None:
+        self._agent.release(self._id)
+
+    def wait_started(self, timeout: float) -> None:
+        if not self._started.wait(timeout):
+            raise AgentUnavailableException(
+                f"the agent doesn't start the process in {timeout} seconds."
+            )
+        if self._error is not None:
+            raise FileNotFoundError(self._error["errno"], self._error["message"])
+        if not self.pid and self._return_code is None:
+            raise AgentUnavailableException("the agent exited.")
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        event_type = event["type"]
+        if event_type == "started":
+            self.pid = event["pid"]
+            self._started.set()
+        elif event_type == "error":
+            if event["errno"] == errno.ENOENT:
+                # it's raised like spur, if the command is not found.
+                self._error = event
+                self._started.set()
+                self._exited.set()
+            else:
+                # like shells, other errors are outputs with the exit code.
+                self._write("stdout", event["message"].encode(self._encoding))
+                self._finish(126)
+        elif event_type == "output":
+            name = event["stream"]
+            self._write(name, base64.b64decode(event["data"]))
+        elif event_type == "exit":
+            self._finish(event["exit_code"])
+
+    def abort(self) -> None:
+        # the agent exits, so the exit code is unknown.
+        self._finish(None)
+
+    def _write(self, name: str, data: bytes, final: bool = False) -> None:
+        content = self._decoders[name].decode(data, final)
+        if not content:
+            return
+        self._outputs[name].append(content)
+        writer = self._writers[name]
+        if writer is not None:
+            writer.write(content)
+
+    def _finish(self, return_code: Optional[int]) -> None:
+        if self._exited.is_set():
+            return
+        for name in self._writers:
+            self._write(name, b"", final=True)
+        self._return_code = return_code
+        self._started.set()
+        self._exited.set()
+
+
+class RemoteAgent:
+    """
+    The client of the agent, which runs on a node, and starts processes for
+    Process. All processes share one connection, so it saves the time of
+    opening a ssh channel and a pty for each command. If the agent exits, or
+    it's not responsive, it raises AgentUnavailableException, and commands
+    should be run by ssh.
+
+    The stderr is merged into the stdout by default like the pty.
+    """
+
+    def __init__(
+        self,
+        reader: Any,
+        writer: Any,
+        log: Logger,
+        close: Optional[Callable[[], None]] = None,
+        timeout: float = _START_TIMEOUT,
+    ) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._close = close
+        self._timeout = timeout
+        self._log = get_logger("agent", parent=log)
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._processes: Dict[int, AgentProcess] = {}
+        self._next_id = 0
+        self._ready = Event()
+        self._is_alive = True
+        # sudo may need a tty, so it's checked after the agent is started.
+        self.support_sudo = True
+
+        self._thread = Thread(target=self._read_events, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout) or not self._is_alive:
+            self.close()
+            raise AgentUnavailableException(
+                f"the agent is not ready in {timeout} seconds."
+            )
+
+    @property
+    def is_alive(self) -> bool:
+        return self._is_alive
+
+    def spawn(
+        self,
+        command: Sequence[str],
+        update_env: Optional[Mapping[str, str]] = None,
+        cwd: Optional[str] = None,
+        stdout: Any = None,
+        stderr: Any = None,
+        encoding: str = "utf-8",
+        merge_stderr: bool = True,
+    ) -> AgentProcess:
+        with self._lock:
+            if not self._is_alive:
+                raise AgentUnavailableException("the agent exited.")
+            self._next_id += 1
+            id_ = self._next_id
+            process = AgentProcess(self, id_, stdout, stderr, encoding)
+            self._processes[id_] = process
+        self.send(
+            {
+                "type": "start",
+                "id": id_,
+                "command": list(command),
+                "cwd": cwd,
+                "env": dict(update_env or {}),
+                "merge_stderr": merge_stderr,
+            }
+        )
+        try:
+            process.wait_started(self._timeout)
+        except AgentUnavailableException:
+            # it's not responsive, so don't use it anymore.
+            self.close()
+            raise
+        except FileNotFoundError:
+            self.release(id_)
+            raise
+        return process
+
+    def send(self, request: Dict[str, Any]) -> None:
+        line = f"{json.dumps(request)}\n".encode("utf-8")
+        try:
+            with self._write_lock:
+                self._writer.write(line)
+                self._writer.flush()
+        except Exception as identifier:
+            self._abort()
+            raise AgentUnavailableException(
+                f"failed to send to the agent: {identifier}"
+            )
+
+    def release(self, id_: int) -> None:
+        with self._lock:
+            self._processes.pop(id_, None)
+
+    def close(self) -> None:
+        self._abort()
+        try:
+            self._writer.close()
+        except Exception as identifier:
+            self._log.debug(f"failed to close the agent input: {identifier}")
+        if self._close:
+            self._close()
+
+    def _read_events(self) -> None:
+        try:
+            while True:
+                line = self._reader.readline()
+                if not line:
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # like messages of profiles, which are not events.
+                    self._log.debug(f"unknown output of the agent: {line!r}")
+                    continue
+                if event.get("type") == "ready":
+                    self._log.debug(f"the agent is ready: {event}")
+                    self._ready.set()
+                    continue
+                with self._lock:
+                    process = self._processes.get(event.get("id", 0))
+                    if event.get("type") in ["exit", "error"]:
+                        self._processes.pop(event.get("id", 0), None)
+                if process:
+                    process.handle_event(event)
+        except Exception as identifier:
+            self._log.debug(f"failed to read events of the agent: {identifier}")
+        self._log.debug("the agent exited.")
+        self._abort()
+
+    def _abort(self) -> None:
+        with self._lock:
+            self._is_alive = False
+            processes = list(self._processes.values())
+        self._ready.set()
+        for process in processes:
+            process.abort()
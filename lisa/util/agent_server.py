@@ -0,0 +1,178 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+# The agent runs on nodes, and starts processes for lisa.util.agent.RemoteAgent.
+# It's uploaded and run by python3 on nodes, so it uses the standard library
+# only, and it shouldn't import other modules of lisa.
+#
+# Requests are json lines on stdin, and events are json lines on stdout. The
+# outputs of processes are encoded by base64, because they may not be text.
+#   {"type": "start", "id": 1, "command": ["ls"], "cwd": "/", "env": {},
+#    "merge_stderr": true}
+#   {"type": "stdin", "id": 1, "data": "<base64>"}
+#   {"type": "signal", "id": 1, "signal": 9}
+# Events:
+#   {"type": "ready", "version": 1, "pid": 123}
+#   {"type": "started", "id": 1, "pid": 124}
+#   {"type": "error", "id": 1, "errno": 2, "message": "..."}
+#   {"type": "output", "id": 1, "stream": "stdout", "data": "<base64>"}
+#   {"type": "exit", "id": 1, "exit_code": 0}
+
+import base64
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+from typing import IO, Any, Dict, List
+
+AGENT_VERSION = 1
+
+_write_lock = threading.Lock()
+_processes: Dict[int, "subprocess.Popen[bytes]"] = {}
+_processes_lock = threading.Lock()
+
+
+def _send(event: Dict[str, Any]) -> None:
+    line = (json.dumps(event) + "\n").encode("utf-8")
+    with _write_lock:
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+
+
+def _read_output(id_: int, name: str, stream: IO[bytes]) -> None:
+    while True:
+        # read what is available, so outputs are streamed without waiting for
+        # a full buffer.
+        data = os.read(stream.fileno(), 65536)
+        if not data:
+            break
+        _send(
+            {
+                "type": "output",
+                "id": id_,
+                "stream": name,
+                "data": base64.b64encode(data).decode("ascii"),
+            }
+        )
+    stream.close()
+
+
+def _wait_exit(
+    id_: int, process: "subprocess.Popen[bytes]", readers: List[threading.Thread]
+) -> None:
+    # the exit event is sent after all outputs.
+    for reader in readers:
+        reader.join()
+    exit_code = process.wait()
+    if exit_code < 0:
+        # killed by a signal, use the exit code of shells.
+        exit_code = 128 - exit_code
+    with _processes_lock:
+        _processes.pop(id_, None)
+    if process.stdin:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+    _send({"type": "exit", "id": id_, "exit_code": exit_code})
+
+
+def _start(request: Dict[str, Any]) -> None:
+    id_ = request["id"]
+    env = dict(os.environ)
+    env.update(request.get("env") or {})
+    merge_stderr = request.get("merge_stderr", True)
+    try:
+        # a new session, so the process and its children can be signaled.
+        process = subprocess.Popen(
+            request["command"],
+            cwd=request.get("cwd") or None,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            start_new_session=True,
+        )
+    except OSError as identifier:
+        _send(
+            {
+                "type": "error",
+                "id": id_,
+                "errno": identifier.errno or 0,
+                "message": identifier.strerror or str(identifier),
+            }
+        )
+        return
+
+    with _processes_lock:
+        _processes[id_] = process
+    _send({"type": "started", "id": id_, "pid": process.pid})
+
+    streams = [("stdout", process.stdout)]
+    if not merge_stderr:
+        streams.append(("stderr", process.stderr))
+    readers = [
+        threading.Thread(target=_read_output, args=(id_, name, stream), daemon=True)
+        for name, stream in streams
+    ]
+    for reader in readers:
+        reader.start()
+    threading.Thread(
+        target=_wait_exit, args=(id_, process, readers), daemon=True
+    ).start()
+
+
+def _write_stdin(request: Dict[str, Any]) -> None:
+    with _processes_lock:
+        process = _processes.get(request["id"])
+    if process and process.stdin:
+        try:
+            process.stdin.write(base64.b64decode(request["data"]))
+            process.stdin.flush()
+        except OSError:
+            # the process may exit already.
+            pass
+
+
+def _signal(id_: int, signal_number: int) -> None:
+    with _processes_lock:
+        process = _processes.get(id_)
+    if not process:
+        return
+    try:
+        os.killpg(process.pid, signal_number)
+    except OSError:
+        # children may run as other users, like sudo. Signal the process only.
+        try:
+            process.send_signal(signal_number)
+        except OSError:
+            pass
+
+
+def main() -> None:
+    _send({"type": "ready", "version": AGENT_VERSION, "pid": os.getpid()})
+    for line in sys.stdin.buffer:
+        try:
+            request = json.loads(line.decode("utf-8"))
+        except ValueError:
+            continue
+        request_type = request.get("type")
+        if request_type == "start":
+            _start(request)
+        elif request_type == "stdin":
+            _write_stdin(request)
+        elif request_type == "signal":
+            _signal(request["id"], request["signal"])
+
+    # the connection is closed. Like the ssh session is closed, hang up
+    # processes, which are still running.
+    with _processes_lock:
+        ids = list(_processes.keys())
+    for id_ in ids:
+        _signal(id_, signal.SIGHUP)
+
+
+if __name__ == "__main__":
+    main()
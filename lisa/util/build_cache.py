@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+BUILD_CACHE_ENV_NAME = "LISA_BUILD_CACHE"
+
+
+class BuildCache:
+    """
+    A store of prebuilt install trees on the controller. An artifact is a
+    tarball keyed by the tool, source revision, distro, version and arch. The
+    first node builds and uploads it, and other nodes with the same key unpack
+    it instead of compiling.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = Lock()
+        self._key_locks: Dict[str, Lock] = {}
+
+    def get_key(self, parts: Dict[str, str]) -> str:
+        content = json.dumps(parts, sort_keys=True)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        name = parts.get("tool", "artifact")
+        return f"{name}_{digest}"
+
+    def lock(self, key: str) -> Lock:
+        # nodes with the same key wait for the first one, so the build runs
+        # once, and others reuse the artifact.
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if not lock:
+                lock = Lock()
+                self._key_locks[key] = lock
+        return lock
+
+    def get_artifact_path(self, key: str) -> Path:
+        return self.path / f"{key}.tar.gz"
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self.get_artifact_path(key)
+        return path if path.exists() else None
+
+    def put(self, key: str, parts: Dict[str, str], file: Path) -> Path:
+        self.path.mkdir(parents=True, exist_ok=True)
+        path = self.get_artifact_path(key)
+        # replace is atomic, so a concurrent run never reads a partial file.
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        shutil.move(str(file), temp_path)
+        os.replace(temp_path, path)
+        with open(self.path / f"{key}.json", "w") as f:
+            json.dump(parts, f, indent=2, sort_keys=True)
+        return path
+
+    def remove(self, key: str) -> None:
+        self.get_artifact_path(key).unlink(missing_ok=True)
+        (self.path / f"{key}.json").unlink(missing_ok=True)
+
+
+_build_cache: Optional[BuildCache] = None
+_build_cache_lock = Lock()
+
+
+def get_build_cache() -> Optional[BuildCache]:
+    """
+    Returns the shared build cache, or None if it's not enabled. Artifacts are
+    extracted as root on nodes, so the cache is opt-in. Set the
+    LISA_BUILD_CACHE environment variable to a trusted folder to enable it.
+    """
+    global _build_cache
+
+    with _build_cache_lock:
+        if not _build_cache:
+            path = os.environ.get(BUILD_CACHE_ENV_NAME)
+            if not path:
+                return None
+            _build_cache = BuildCache(Path(path))
+    return _build_cache
@@ -0,0 +1,147 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import heapq
+import json
+import os
+import statistics
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Optional
+
+from lisa.util import constants, is_unittest
+from lisa.util.sharding import DEFAULT_TEST_DURATION
+
+CASE_DURATION_FILE_NAME = "case_durations.json"
+# the weight of the latest duration, so the history follows changes of cases,
+# but isn't swung by a single slow run.
+DURATION_SMOOTHING = 0.3
+
+
+class DurationHistory:
+    """
+    Durations of test cases and environment deployments in previous runs. Cases
+    are keyed by the case name and the environment type, and deployments are
+    keyed by the environment type. Each duration is an exponential moving
+    average in seconds. If the path is None, the history is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self._lock = Lock()
+        self._cases: Dict[str, Dict[str, float]] = {}
+        self._deployments: Dict[str, float] = {}
+        self._default_duration: Optional[float] = None
+        if path and path.exists():
+            try:
+                data = json.loads(path.read_text())
+            except (OSError, ValueError):
+                # a broken history only loses the estimation, not the run.
+                data = {}
+            self._cases = data.get("cases", {})
+            self._deployments = data.get("deployments", {})
+
+    def get_case_duration(
+        self, case_name: str, environment_type: str = ""
+    ) -> Optional[float]:
+        with self._lock:
+            durations = self._cases.get(case_name)
+            if not durations:
+                return None
+            if environment_type in durations:
+                return durations[environment_type]
+            # the case ran on other environment types only.
+            return statistics.mean(durations.values())
+
+    def estimate_case_duration(
+        self, case_name: str, environment_type: str = ""
+    ) -> float:
+        """
+        Returns the historical duration of the case. Cases without history are
+        estimated by the median of all known cases.
+        """
+        duration = self.get_case_duration(case_name, environment_type)
+        if duration is not None:
+            return duration
+        with self._lock:
+            if self._default_duration is None:
+                known = [x for item in self._cases.values() for x in item.values()]
+                self._default_duration = (
+                    statistics.median(known) if known else DEFAULT_TEST_DURATION
+                )
+            return self._default_duration
+
+    def add_case_duration(
+        self, case_name: str, environment_type: str, elapsed: float
+    ) -> None:
+        with self._lock:
+            durations = self._cases.setdefault(case_name, {})
+            durations[environment_type] = _smooth(
+                durations.get(environment_type), elapsed
+            )
+            self._default_duration = None
+
+    def get_deployment_duration(self, environment_type: str) -> Optional[float]:
+        with self._lock:
+            return self._deployments.get(environment_type)
+
+    def add_deployment_duration(self, environment_type: str, elapsed: float) -> None:
+        with self._lock:
+            self._deployments[environment_type] = _smooth(
+                self._deployments.get(environment_type), elapsed
+            )
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            content = json.dumps(
+                {"cases": self._cases, "deployments": self._deployments},
+                indent=2,
+                sort_keys=True,
+            )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # replace is atomic, so a concurrent run never reads a partial file. If
+        # runs save at the same time, the last one wins.
+        temp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(content)
+        os.replace(temp_path, self.path)
+
+
+def predict_makespan(durations: Iterable[float], worker_count: int) -> float:
+    """
+    Returns the wall time of running all durations by the workers, when the
+    longest ones start first, and each one goes to the least loaded worker.
+    """
+    loads = [0.0] * max(worker_count, 1)
+    for duration in sorted(durations, reverse=True):
+        heapq.heapreplace(loads, loads[0] + duration)
+    return max(loads)
+
+
+_duration_history: Optional[DurationHistory] = None
+_duration_history_lock = Lock()
+
+
+def get_duration_history() -> DurationHistory:
+    """
+    Returns the history shared by all runners. It's persisted under the cache
+    folder. Selftests get a new in-memory one, so the durations of a test don't
+    change the order of cases in others.
+    """
+    global _duration_history
+
+    if is_unittest() or not hasattr(constants, "CACHE_PATH"):
+        return DurationHistory()
+    with _duration_history_lock:
+        if _duration_history is None:
+            _duration_history = DurationHistory(
+                constants.CACHE_PATH / CASE_DURATION_FILE_NAME
+            )
+    return _duration_history
+
+
+def _smooth(previous: Optional[float], current: float) -> float:
+    if previous is None:
+        return current
+    return previous + DURATION_SMOOTHING * (current - previous)
@@ -48,6 +48,11 @@ FEATURE_DISK = "Disk"
 LIST = "list"
 LIST_CASE = "case"
 
+# query types
+QUERY = "query"
+QUERY_RESULT = "result"
+QUERY_PERF = "perf"
+
 # notifier
 NOTIFIER = "notifier"
 NOTIFIER_CONSOLE = "console"
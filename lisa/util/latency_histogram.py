@@ -0,0 +1,173 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lisa.util import LisaException
+
+# the significant bits of bucket values. The relative error of a value is less
+# than 1/2**(bits-1), so 8 bits is less than 0.8%.
+DEFAULT_SIGNIFICANT_BITS = 8
+# values are counted in the unit of resolution, like 1ns for microseconds.
+DEFAULT_RESOLUTION = 0.001
+DEFAULT_PERCENTILES = [50, 90, 99, 99.9, 99.99, 99.999]
+
+
+class LatencyHistogram:
+    """
+    A log-linear histogram like HdrHistogram. Values are grouped by powers of
+    2, and each group is split into linear buckets, so the size is bounded by
+    the range of values, not the count. Histograms with the same settings can
+    be merged, like the ones of repeated runs or multiple pairs, and any
+    percentile can be computed from them.
+    """
+
+    def __init__(
+        self,
+        significant_bits: int = DEFAULT_SIGNIFICANT_BITS,
+        resolution: float = DEFAULT_RESOLUTION,
+    ) -> None:
+        if significant_bits < 2:
+            raise LisaException(
+                f"significant_bits must be at least 2, but it's {significant_bits}"
+            )
+        if resolution <= 0:
+            raise LisaException(f"resolution must be positive, but it's {resolution}")
+        self.significant_bits = significant_bits
+        self.resolution = resolution
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+        self._sub_bucket_count = 1 << significant_bits
+        self._half_count = self._sub_bucket_count >> 1
+
+    def record(self, value: float, count: int = 1) -> None:
+        if value < 0:
+            raise LisaException(f"latency must not be negative, but it's {value}")
+        index = self._get_index(int(round(value / self.resolution)))
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.sum += value * count
+
+    def record_many(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.record(value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if (self.significant_bits, self.resolution) != (
+            other.significant_bits,
+            other.resolution,
+        ):
+            raise LisaException(
+                "cannot merge histograms with different settings: "
+                f"{self.significant_bits}/{self.resolution} and "
+                f"{other.significant_bits}/{other.resolution}"
+            )
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.sum += other.sum
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.total_count if self.total_count else 0.0
+
+    def get_percentile(self, percent: float) -> float:
+        """
+        the value at the percentile by rank. It's the middle of the bucket,
+        and is bounded by the recorded min and max.
+        """
+        if not self.total_count:
+            raise LisaException("cannot get percentile from an empty histogram")
+        if percent <= 0:
+            return self.min
+        if percent >= 100:
+            return self.max
+        rank = max(1, math.ceil(self.total_count * percent / 100))
+        accumulated = 0
+        for index in sorted(self.counts):
+            accumulated += self.counts[index]
+            if accumulated >= rank:
+                lower, width = self._get_bucket(index)
+                value = (lower + (width - 1) / 2) * self.resolution
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def get_statistics(
+        self, percentiles: Optional[List[float]] = None
+    ) -> Dict[str, float]:
+        if percentiles is None:
+            percentiles = DEFAULT_PERCENTILES
+        result: Dict[str, float] = {
+            "count": self.total_count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+        }
+        for percent in percentiles:
+            result[f"p{percent:g}"] = self.get_percentile(percent)
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        # the keys are strings, so it's serializable to json.
+        return {
+            "significant_bits": self.significant_bits,
+            "resolution": self.resolution,
+            "count": self.total_count,
+            "min": self.min,
+            "max": self.max,
+            "sum": self.sum,
+            "counts": {str(index): self.counts[index] for index in sorted(self.counts)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls(
+            significant_bits=data["significant_bits"], resolution=data["resolution"]
+        )
+        histogram.counts = {int(key): value for key, value in data["counts"].items()}
+        histogram.total_count = data["count"]
+        histogram.sum = data["sum"]
+        if histogram.total_count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
+
+    def _get_index(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        mantissa = value >> shift
+        return (
+            self._sub_bucket_count
+            + (shift - 1) * self._half_count
+            + (mantissa - self._half_count)
+        )
+
+    def _get_bucket(self, index: int) -> Tuple[int, int]:
+        # returns the lower value and the width of the bucket.
+        if index < self._sub_bucket_count:
+            return index, 1
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        mantissa = offset % self._half_count + self._half_count
+        return mantissa << shift, 1 << shift
+
+
+def merge_histograms(histograms: Iterable[LatencyHistogram]) -> LatencyHistogram:
+    result: Optional[LatencyHistogram] = None
+    for histogram in histograms:
+        if result is None:
+            result = LatencyHistogram(histogram.significant_bits, histogram.resolution)
+        result.merge(histogram)
+    if result is None:
+        raise LisaException("no histogram to merge")
+    return result
@@ -0,0 +1,229 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Mapping, Optional, TypeVar
+
+from lisa.util import LisaException
+from lisa.util import perf_statistics as stats
+from lisa.util.logger import Logger
+from lisa.util.perf_timer import create_timer
+
+T = TypeVar("T")
+
+# the variables of runbook to override repetition settings of perf cases.
+VARIABLE_PREFIX = "perf_repetition_"
+
+
+@dataclass
+class RepetitionSettings:
+    """
+    The default settings measure once, which is the same as no repetition.
+    """
+
+    # runs before measuring, the results are dropped.
+    warmup: int = 0
+    min_samples: int = 1
+    max_samples: int = 1
+    # stop repeating, when the relative width of the confidence interval of
+    # medians is narrower than the target for all metrics. 0.05 means the
+    # interval is within 5% of the median.
+    target_relative_ci: float = 0.05
+    # stop repeating, when the next sample is expected to exceed the budget in
+    # seconds. 0 means no limit. min_samples are always measured.
+    time_budget: float = 0
+    confidence: float = stats.DEFAULT_CONFIDENCE
+    outlier_threshold: float = stats.DEFAULT_OUTLIER_THRESHOLD
+
+    def __post_init__(self) -> None:
+        if self.warmup < 0:
+            raise LisaException(f"warmup cannot be negative: {self.warmup}")
+        if self.min_samples < 1:
+            raise LisaException(f"min_samples must be at least 1: {self.min_samples}")
+        if self.max_samples < self.min_samples:
+            raise LisaException(
+                f"max_samples ({self.max_samples}) cannot be less than "
+                f"min_samples ({self.min_samples})"
+            )
+
+    @property
+    def is_repeated(self) -> bool:
+        return self.warmup > 0 or self.max_samples > 1
+
+
+def get_repetition_settings(variables: Mapping[str, Any]) -> RepetitionSettings:
+    """
+    create settings from variables like perf_repetition_max_samples.
+    """
+    settings = RepetitionSettings()
+    values: Dict[str, Any] = {}
+    for name, default_value in settings.__dict__.items():
+        value = variables.get(f"{VARIABLE_PREFIX}{name}", None)
+        if value is not None and value != "":
+            values[name] = type(default_value)(value)
+    max_samples = values.get("max_samples", settings.max_samples)
+    if "min_samples" not in values and max_samples > 1:
+        # at least 3 samples to reject outliers.
+        values["min_samples"] = min(3, max_samples)
+    return RepetitionSettings(**values)
+
+
+@dataclass
+class MetricStatistics:
+    # the samples after outliers are removed.
+    samples: List[float]
+    outliers: List[float]
+    median: float
+    mad: float
+    ci_lower: float
+    ci_upper: float
+
+    @property
+    def relative_ci(self) -> float:
+        if self.median == 0:
+            return 0.0 if self.ci_upper == self.ci_lower else float("inf")
+        return (self.ci_upper - self.ci_lower) / abs(self.median)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": len(self.samples),
+            "outliers": len(self.outliers),
+            "median": self.median,
+            "mad": self.mad,
+            "ci_lower": self.ci_lower,
+            "ci_upper": self.ci_upper,
+        }
+
+
+@dataclass
+class Measurement(Generic[T]):
+    # the results of all samples, excluding warm up runs.
+    results: List[T] = field(default_factory=list)
+    # the raw metrics of each sample, in the same order of results.
+    samples: List[Dict[str, float]] = field(default_factory=list)
+    statistics: Dict[str, MetricStatistics] = field(default_factory=dict)
+    is_converged: bool = False
+    elapsed: float = 0
+
+    @property
+    def representative(self) -> T:
+        """
+        The result, which is the closest to medians of all metrics. It's used
+        to create messages, which have fields of a single run.
+        """
+        if not self.results:
+            raise LisaException("no result is measured")
+
+        def _distance(index: int) -> float:
+            distance = 0.0
+            for name, statistics in self.statistics.items():
+                value = self.samples[index][name]
+                scale = abs(statistics.median) or 1.0
+                distance += abs(value - statistics.median) / scale
+            return distance
+
+        best = min(range(len(self.results)), key=_distance)
+        return self.results[best]
+
+    def get_raw_samples(self) -> Dict[str, List[float]]:
+        raw: Dict[str, List[float]] = {}
+        for sample in self.samples:
+            for name, value in sample.items():
+                raw.setdefault(name, []).append(value)
+        return raw
+
+    def get_statistics(self) -> Dict[str, Dict[str, float]]:
+        return {name: value.to_dict() for name, value in self.statistics.items()}
+
+
+def measure(
+    run: Callable[[], T],
+    get_metrics: Callable[[T], Mapping[str, Any]],
+    settings: Optional[RepetitionSettings] = None,
+    log: Optional[Logger] = None,
+) -> Measurement[T]:
+    """
+    run warm up runs, and then repeat the run, until the confidence intervals
+    of all metrics are narrow enough, or the max samples or the time budget is
+    reached. Outliers are removed before calculating statistics.
+    """
+    if settings is None:
+        settings = RepetitionSettings()
+
+    for index in range(settings.warmup):
+        if log:
+            log.debug(f"warm up run {index + 1}/{settings.warmup}")
+        run()
+
+    measurement: Measurement[T] = Measurement()
+    timer = create_timer()
+    while len(measurement.results) < settings.max_samples:
+        result = run()
+        measurement.results.append(result)
+        measurement.samples.append(
+            {name: float(value) for name, value in get_metrics(result).items()}
+        )
+        measurement.statistics = _calculate(measurement.samples, settings)
+
+        count = len(measurement.results)
+        elapsed = timer.elapsed(False)
+        if count < settings.min_samples:
+            continue
+        if count > 1 and all(
+            x.relative_ci <= settings.target_relative_ci
+            for x in measurement.statistics.values()
+        ):
+            measurement.is_converged = True
+            break
+        if settings.time_budget > 0 and elapsed + elapsed / count > (
+            settings.time_budget
+        ):
+            if log:
+                log.debug(
+                    f"stop repeating at {count} samples, the next one may exceed "
+                    f"the time budget {settings.time_budget}s"
+                )
+            break
+
+    measurement.elapsed = timer.elapsed()
+    if log and settings.is_repeated:
+        summary = ", ".join(
+            f"{name}: {x.median:.3f} (CI {x.ci_lower:.3f} ~ {x.ci_upper:.3f}, "
+            f"{len(x.outliers)} outliers)"
+            for name, x in measurement.statistics.items()
+        )
+        log.info(
+            f"measured {len(measurement.results)} samples in "
+            f"{measurement.elapsed:.1f}s, converged: {measurement.is_converged}. "
+            f"{summary}"
+        )
+    return measurement
+
+
+def _calculate(
+    samples: List[Dict[str, float]], settings: RepetitionSettings
+) -> Dict[str, MetricStatistics]:
+    names: List[str] = []
+    for sample in samples:
+        names.extend(x for x in sample if x not in names)
+
+    result: Dict[str, MetricStatistics] = {}
+    for name in names:
+        values = [x[name] for x in samples if name in x]
+        accepted = stats.remove_outliers(values, settings.outlier_threshold)
+        outliers = list(values)
+        for value in accepted:
+            outliers.remove(value)
+        # the seed makes the intervals reproducible for the same samples.
+        ci_lower, ci_upper = stats.bootstrap_ci(
+            accepted, confidence=settings.confidence, seed=len(values)
+        )
+        result[name] = MetricStatistics(
+            samples=accepted,
+            outliers=outliers,
+            median=stats.median(accepted),
+            mad=stats.mad(accepted),
+            ci_lower=ci_lower,
+            ci_upper=ci_upper,
+        )
+    return result
@@ -0,0 +1,161 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import random
+import statistics
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# scales MAD to be a consistent estimator of the standard deviation of normal
+# distribution.
+MAD_SCALE = 1.4826
+# the threshold of modified z-score to consider a sample as outlier.
+DEFAULT_OUTLIER_THRESHOLD = 3.5
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_RESAMPLES = 1000
+
+
+def median(values: Sequence[float]) -> float:
+    return float(statistics.median(values))
+
+
+def percentile(sorted_values: Sequence[float], percent: float) -> float:
+    """
+    the percentile with linear interpolation between closest ranks. The values
+    must be sorted, so multiple percentiles share one sort.
+    """
+    if not sorted_values:
+        raise ValueError("percentile requires at least one value")
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return float(
+        sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    )
+
+
+def mad(values: Sequence[float]) -> float:
+    """
+    median absolute deviation, which is scaled to be comparable with the
+    standard deviation. It's robust to outliers, which are common in perf
+    results, like a noisy neighbor.
+    """
+    center = median(values)
+    return median([abs(x - center) for x in values]) * MAD_SCALE
+
+
+def remove_outliers(
+    values: Sequence[float], threshold: float = DEFAULT_OUTLIER_THRESHOLD
+) -> List[float]:
+    """
+    remove outliers by the modified z-score, which is based on the median and
+    MAD. If MAD is 0, all values are kept.
+    """
+    if len(values) < 3:
+        return list(values)
+    center = median(values)
+    deviation = mad(values)
+    if deviation == 0:
+        return list(values)
+    return [x for x in values if abs(x - center) / deviation <= threshold]
+
+
+def bootstrap_ci(
+    values: Sequence[float],
+    statistic: Callable[[Sequence[float]], float] = median,
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Optional[int] = None,
+) -> Tuple[float, float]:
+    """
+    returns the percentile bootstrap confidence interval of the statistic.
+    """
+    if len(values) < 2:
+        value = statistic(values)
+        return value, value
+    generator = random.Random(seed)
+    estimates = sorted(
+        statistic(generator.choices(values, k=len(values))) for _ in range(resamples)
+    )
+    return _get_percentile_interval(estimates, confidence)
+
+
+@dataclass
+class Comparison:
+    baseline_median: float
+    current_median: float
+    # relative change of current to baseline, 0.1 means 10% higher.
+    change: float
+    # the bootstrap confidence interval of the relative change.
+    change_lower: float
+    change_upper: float
+    # the change is in the bad direction, larger than the threshold, and the
+    # confidence interval doesn't include no change.
+    is_regression: bool
+    # the change is in the good direction, and significant.
+    is_improvement: bool
+
+
+def compare(
+    baseline: Sequence[float],
+    current: Sequence[float],
+    higher_is_better: bool,
+    threshold: float = 0.05,
+    confidence: float = DEFAULT_CONFIDENCE,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Optional[int] = None,
+) -> Comparison:
+    """
+    compare medians of current samples with baseline samples. A change is
+    significant, if it's larger than the threshold, and the bootstrap
+    confidence interval of the relative change excludes 0.
+    """
+    baseline_median = median(baseline)
+    current_median = median(current)
+    change = _get_relative_change(baseline_median, current_median)
+
+    generator = random.Random(seed)
+    changes = sorted(
+        _get_relative_change(
+            median(generator.choices(baseline, k=len(baseline))),
+            median(generator.choices(current, k=len(current))),
+        )
+        for _ in range(resamples)
+    )
+    change_lower, change_upper = _get_percentile_interval(changes, confidence)
+
+    if higher_is_better:
+        is_worse = change < -threshold and change_upper < 0
+        is_better = change > threshold and change_lower > 0
+    else:
+        is_worse = change > threshold and change_lower > 0
+        is_better = change < -threshold and change_upper < 0
+
+    return Comparison(
+        baseline_median=baseline_median,
+        current_median=current_median,
+        change=change,
+        change_lower=change_lower,
+        change_upper=change_upper,
+        is_regression=is_worse,
+        is_improvement=is_better,
+    )
+
+
+def _get_relative_change(baseline: float, current: float) -> float:
+    if baseline == 0:
+        if current == 0:
+            return 0.0
+        return float("inf") if current > 0 else float("-inf")
+    return (current - baseline) / abs(baseline)
+
+
+def _get_percentile_interval(
+    sorted_values: List[float], confidence: float
+) -> Tuple[float, float]:
+    tail = (1 - confidence) / 2
+    last_index = len(sorted_values) - 1
+    lower = sorted_values[int(round(tail * last_index))]
+    upper = sorted_values[int(round((1 - tail) * last_index))]
+    return lower, upper
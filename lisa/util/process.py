@@ -11,6 +11,7 @@ import subprocess
 import time
 from dataclasses import dataclass
 from pathlib import Path
+from threading import Lock
 from typing import Any, Callable, Dict, List, Optional, Union
 
 import spur  # type: ignore
@@ -24,7 +25,9 @@ from lisa.util import (
     SshSpawnTimeoutException,
     create_timer,
     filter_ansi_escape,
+    generate_random_chars,
 )
+from lisa.util.agent import AgentProcess, AgentUnavailableException
 from lisa.util.logger import Logger, LogWriter, add_handler, get_logger
 from lisa.util.shell import Shell, SshShell
 
@@ -178,6 +181,122 @@ def process_command(
     return split_command
 
 
+class CommandBatch:
+    """
+    Composes commands into one shell script, and splits the output of the
+    script into results of each command. The output of each command is
+    wrapped by delimiters with a random marker, and the exit code is printed
+    in the end delimiter. Commands run one by one, and a failed command
+    doesn't stop the others. The stderr is merged into the stdout, because
+    the remote shell merges them by the pty anyway.
+    """
+
+    def __init__(self, commands: List[str]) -> None:
+        self.commands = list(commands)
+        self._marker = f"__lisa_batch_{generate_random_chars(length=16)}__"
+        self._pattern = re.compile(
+            rf"{self._marker}:(?P<index>\d+)\r?\n(?P<output>.*?)\r?\n"
+            rf"{self._marker}:(?P=index):(?P<exit_code>\d+)",
+            re.DOTALL,
+        )
+
+    @property
+    def script(self) -> str:
+        lines: List[str] = []
+        for index, command in enumerate(self.commands):
+            # the command is in a subshell, so "exit" or "cd" doesn't affect
+            # others. The new line before ")" ends comments in the command.
+            # The stdin is closed, so a command cannot read the rest.
+            lines.append(
+                f"echo '{self._marker}:{index}'; ( {command}\n) </dev/null 2>&1; "
+                f"printf '\\n{self._marker}:{index}:%s\\n' \"$?\""
+            )
+        return "\n".join(lines)
+
+    def split_result(self, result: ExecutableResult) -> List[ExecutableResult]:
+        """
+        If the script is timed out or killed, commands without the end
+        delimiter have no exit code.
+        """
+        outputs: Dict[int, "re.Match[str]"] = {}
+        for matched in self._pattern.finditer(result.stdout):
+            outputs[int(matched.group("index"))] = matched
+        results: List[ExecutableResult] = []
+        for index, command in enumerate(self.commands):
+            if index in outputs:
+                matched = outputs[index]
+                results.append(
+                    ExecutableResult(
+                        stdout=matched.group("output").strip(),
+                        stderr="",
+                        exit_code=int(matched.group("exit_code")),
+                        cmd=command,
+                        elapsed=result.elapsed,
+                    )
+                )
+            else:
+                results.append(
+                    ExecutableResult(
+                        stdout="",
+                        stderr=result.stderr,
+                        exit_code=None,
+                        cmd=command,
+                        elapsed=result.elapsed,
+                        is_timeout=result.is_timeout,
+                    )
+                )
+        return results
+
+
+class _LineWriter:
+    """
+    Writes to the log writer, and if lines are buffered, keeps the output,
+    which is not read yet. So complete lines can be read before the process
+    exits. The output may be written by characters, so chunks are kept in a
+    list, and they are joined and split only when lines are read.
+    """
+
+    def __init__(self, writer: LogWriter, buffer_lines: bool = False) -> None:
+        self._writer = writer
+        self._buffer_lines = buffer_lines
+        self._lock = Lock()
+        self._chunks: List[str] = []
+
+    @property
+    def buffer_lines(self) -> bool:
+        return self._buffer_lines
+
+    def write(self, message: str) -> None:
+        self._writer.write(message)
+        if self._buffer_lines:
+            with self._lock:
+                self._chunks.append(message)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+        # the last line is complete, after the process exits.
+        with self._lock:
+            last_chunk = next((x for x in reversed(self._chunks) if x), "")
+            if last_chunk and not last_chunk.endswith("\n"):
+                self._chunks.append("\n")
+
+    def read_lines(self) -> List[str]:
+        with self._lock:
+            unread = "".join(self._chunks)
+            index = unread.rfind("\n")
+            if index < 0:
+                self._chunks = [unread] if unread else []
+                return []
+            content = unread[:index]
+            remaining = unread[index + 1 :]
+            self._chunks = [remaining] if remaining else []
+        # the pty ends lines with "\r\n".
+        return [x.rstrip("\r") for x in content.split("\n")]
+
+
 class Process:
     def __init__(
         self,
@@ -216,9 +335,11 @@ class Process:
         no_debug_log: bool = False,
         encoding: str = "utf-8",
         command_splitter: Callable[..., List[str]] = process_command,
+        buffer_lines: bool = False,
     ) -> None:
         """
-        command include all parameters also.
+        command include all parameters also. If buffer_lines is True, the
+        output is kept until it's read by read_output_lines.
         """
         stdout_level = logging.INFO
         stderr_level = logging.ERROR
@@ -233,7 +354,10 @@ class Process:
 
         self.stdout_logger = get_logger("stdout", parent=self._log)
         self.stderr_logger = get_logger("stderr", parent=self._log)
-        self._stdout_writer = LogWriter(logger=self.stdout_logger, level=stdout_level)
+        self._stdout_writer = _LineWriter(
+            LogWriter(logger=self.stdout_logger, level=stdout_level),
+            buffer_lines=buffer_lines,
+        )
         self._stderr_writer = LogWriter(logger=self.stderr_logger, level=stderr_level)
 
         self._sudo = sudo
@@ -278,17 +402,27 @@ class Process:
 
         try:
             self._timer = create_timer()
-            self._process = self._shell.spawn(
-                command=split_command,
-                stdout=self._stdout_writer,
-                stderr=self._stderr_writer,
+            self._process = self._spawn_by_agent(
+                split_command=split_command,
                 cwd=cwd_path,
-                update_env=update_envs,
-                allow_error=True,
-                store_pid=self._is_posix,
+                update_envs=update_envs,
                 encoding=encoding,
                 use_pty=use_pty,
+                sudo=sudo,
+                nohup=nohup,
             )
+            if not self._process:
+                self._process = self._shell.spawn(
+                    command=split_command,
+                    stdout=self._stdout_writer,
+                    stderr=self._stderr_writer,
+                    cwd=cwd_path,
+                    update_env=update_envs,
+                    allow_error=True,
+                    store_pid=self._is_posix,
+                    encoding=encoding,
+                    use_pty=use_pty,
+                )
             # save for logging.
             self._cmd = split_command
             self._running = True
@@ -443,6 +577,18 @@ class Process:
             self._running = self._process.is_running()
         return self._running
 
+    def read_output_lines(self) -> List[str]:
+        """
+        Returns complete lines of stdout, which are not returned by previous
+        calls. It's used to handle the output of a long running process before
+        it exits. The process must be started with buffer_lines.
+        """
+        if not self._stdout_writer.buffer_lines:
+            raise LisaException(
+                "lines are not buffered, start the process with buffer_lines=True"
+            )
+        return self._stdout_writer.read_lines()
+
     def wait_output(
         self,
         keyword: str,
@@ -486,6 +632,8 @@ class Process:
                 popen.stdout.close()
             if popen.stderr:
                 popen.stderr.close()
+        elif isinstance(self._process, AgentProcess):
+            self._process.close()
         elif isinstance(self._process, spur.ssh.SshProcess):
             if self._process._stdin:
                 self._process._stdin.close()
@@ -495,6 +643,43 @@ class Process:
                 self._process._stderr.close()
         self._process = None
 
+    def _spawn_by_agent(
+        self,
+        split_command: List[str],
+        cwd: Optional[str],
+        update_envs: Dict[str, str],
+        encoding: str,
+        use_pty: bool,
+        sudo: bool,
+        nohup: bool,
+    ) -> Optional[AgentProcess]:
+        # The agent replaces the pty of remote Linux. The nohup processes
+        # should keep running after the agent exits, and sudo may need a pty
+        # to input the password, so they are run by ssh.
+        if (
+            not use_pty
+            or nohup
+            or not isinstance(self._shell, SshShell)
+            or not self._shell.agent
+            or not self._shell.agent.is_alive
+        ):
+            return None
+        agent = self._shell.agent
+        if sudo and (self._shell.is_sudo_required_password or not agent.support_sudo):
+            return None
+        try:
+            return agent.spawn(
+                command=split_command,
+                stdout=self._stdout_writer,
+                stderr=self._stderr_writer,
+                cwd=cwd,
+                update_env=update_envs,
+                encoding=encoding,
+            )
+        except AgentUnavailableException as identifier:
+            self._log.debug(f"run by ssh, because {identifier}")
+            return None
+
     def _filter_sudo_result(self, raw_input: str) -> str:
         # this warning message may break commands, so remove it from the first line
         # of standard output.
@@ -0,0 +1,121 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import heapq
+import statistics
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from lisa.util import LisaException
+from lisa.util.logger import Logger
+from lisa.util.parallel import run_in_parallel
+from lisa.util.perf_timer import create_timer
+
+# seconds of a test, which has no history, and no other test has history.
+DEFAULT_TEST_DURATION = 60.0
+
+N = TypeVar("N")
+T = TypeVar("T")
+
+
+@dataclass
+class TestShard:
+    index: int
+    tests: List[str] = field(default_factory=list)
+    # the sum of historical durations of tests in seconds.
+    estimated_duration: float = 0
+    # the wall time of running the shard in seconds. It's set after running.
+    elapsed: float = 0
+
+    def get_information(self) -> Dict[str, Any]:
+        """
+        The information is added to sub test results, so the timing of shards
+        can be compared with estimations. The elapsed is added after the shard
+        completes, because results may be sent while it's running.
+        """
+        information: Dict[str, Any] = {
+            "shard": self.index,
+            "shard_test_count": len(self.tests),
+            "shard_estimated_duration": round(self.estimated_duration, 3),
+        }
+        if self.elapsed:
+            information["shard_elapsed"] = round(self.elapsed, 3)
+        return information
+
+
+def split_tests(
+    tests: Sequence[str],
+    shard_count: int,
+    durations: Optional[Dict[str, float]] = None,
+) -> List[TestShard]:
+    """
+    Splits tests into shards, which have similar durations. The longest tests
+    are assigned first to the shard with the least duration. Tests without
+    history are estimated by the median of known durations. The tests in a
+    shard keep the original order, because some suites depend on it.
+    """
+    if shard_count < 1:
+        raise LisaException(f"shard count must be positive, but it's {shard_count}")
+    tests = list(dict.fromkeys(tests))
+    if not tests:
+        return []
+    shard_count = min(shard_count, len(tests))
+    durations = durations or {}
+
+    known = [durations[x] for x in tests if x in durations]
+    default_duration = statistics.median(known) if known else DEFAULT_TEST_DURATION
+    costs = [durations.get(x, default_duration) for x in tests]
+
+    shards = [TestShard(index=index) for index in range(shard_count)]
+    assigned: List[List[int]] = [[] for _ in shards]
+    loads: List[Tuple[float, int]] = [(0.0, index) for index in range(shard_count)]
+    for test_index in sorted(range(len(tests)), key=lambda x: (-costs[x], x)):
+        load, shard_index = heapq.heappop(loads)
+        assigned[shard_index].append(test_index)
+        heapq.heappush(loads, (load + costs[test_index], shard_index))
+
+    for shard, test_indexes in zip(shards, assigned):
+        test_indexes.sort()
+        shard.tests = [tests[x] for x in test_indexes]
+        shard.estimated_duration = sum(costs[x] for x in test_indexes)
+    return shards
+
+
+def run_shards(
+    shards: List[TestShard],
+    nodes: Sequence[N],
+    run_shard: Callable[[TestShard, N], T],
+    log: Logger,
+) -> List[T]:
+    """
+    Runs each shard on its own node at the same time, and returns results in
+    the order of shards. The run_shard shouldn't raise on failed tests, so the
+    results of other shards are kept, and can be merged.
+    """
+    if len(nodes) < len(shards):
+        raise LisaException(
+            f"there are {len(shards)} shards, but only {len(nodes)} nodes."
+        )
+
+    def _run_shard(shard: TestShard, node: N) -> T:
+        timer = create_timer()
+        try:
+            return run_shard(shard, node)
+        finally:
+            shard.elapsed = timer.elapsed()
+            log.debug(
+                f"shard {shard.index} of {len(shard.tests)} tests completed in "
+                f"{shard.elapsed:.3f} sec, estimated "
+                f"{shard.estimated_duration:.3f} sec."
+            )
+
+    results = run_in_parallel(
+        [partial(_run_shard, shard, nodes[shard.index]) for shard in shards], log
+    )
+    if shards:
+        log.info(
+            f"{len(shards)} shards completed, the longest one took "
+            f"{max(x.elapsed for x in shards):.3f} sec."
+        )
+    return results
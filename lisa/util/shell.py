@@ -8,10 +8,23 @@ import shutil
 import socket
 import sys
 import time
+import uuid
 from functools import partial
 from pathlib import Path, PurePath, PureWindowsPath
 from time import sleep
-from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 import paramiko
 import spur  # type: ignore
@@ -30,6 +43,23 @@ from lisa.util import (
 
 from .logger import Logger, get_logger
 from .perf_timer import create_timer
+from .transfer import (
+    LARGE_FILE_SIZE,
+    MAX_CONCURRENT_REQUESTS,
+    TRANSFER_WINDOW_SIZE,
+    TransferStatistics,
+    extract_tar,
+    get_changed_files,
+    get_checksum_command,
+    get_file_checksum,
+    get_tar_command,
+    list_local_files,
+    parse_checksums,
+    write_tar,
+)
+
+if TYPE_CHECKING:
+    from .agent import RemoteAgent
 
 _get_jump_box_logger = partial(get_logger, name="jump_box")
 
@@ -225,6 +255,10 @@ class SshShell(InitializableMixin):
         self.password_prompts: List[str] = []
         self.bash_prompt: str = ""
         self.spawn_initialization_error_string = ""
+        # it's set by the node, if the remote agent is enabled.
+        self.agent: Optional["RemoteAgent"] = None
+        self._transfer_sftp: Optional[paramiko.SFTPClient] = None
+        self._log = get_logger("shell", connection_info.address)
 
         paramiko_logger = logging.getLogger("paramiko")
         paramiko_logger.setLevel(logging.WARN)
@@ -310,6 +344,11 @@ class SshShell(InitializableMixin):
             )
 
     def close(self) -> None:
+        if self.agent:
+            # the agent uses the connection, so close it first.
+            self.agent.close()
+            self.agent = None
+        self._close_transfer_sftp()
         if self._inner_shell:
             self._inner_shell.close()
             # after closed, can be reconnect
@@ -392,6 +431,19 @@ class SshShell(InitializableMixin):
                     raise identifier
         return process
 
+    def open_channel(self, command: str) -> paramiko.Channel:
+        """
+        Runs the command in a new channel without pty, and returns the
+        channel. It's for long running processes, which handle inputs and
+        outputs by themselves, like the remote agent.
+        """
+        self.initialize()
+        assert self._inner_shell
+        transport = self._inner_shell._spur._get_ssh_transport()
+        channel = cast(paramiko.Channel, transport.open_session())
+        channel.exec_command(command)
+        return channel
+
     def mkdir(
         self,
         path: PurePath,
@@ -569,7 +621,9 @@ class SshShell(InitializableMixin):
         destination_str = self._purepath_to_str(destination)
         self._inner_shell.symlink(source_str, destination_str)
 
-    def copy(self, local_path: PurePath, node_path: PurePath) -> None:
+    def copy(
+        self, local_path: PurePath, node_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """Upload local file to target node
         Inputs:
             local_path: local path. (Absolute. Use a PurePosixPath, if the
@@ -578,20 +632,46 @@ class SshShell(InitializableMixin):
             node_path: target path. (Absolute. Use a PurePosixPath, if the
                                      target node is a Posix one, because LISA
                                      might be ran from Windows)
+            skip_unchanged: skip if the target file has the same checksum.
+                            (Posix only)
         """
         self.mkdir(node_path.parent, parents=True, exist_ok=True)
         self.initialize()
         assert self._inner_shell
         local_path_str = self._purepath_to_str(local_path, True)
         node_path_str = self._purepath_to_str(node_path, False)
-        self._inner_shell.put(
-            local_path_str,
-            node_path_str,
-            create_directories=True,
-            consistent=self.is_posix,
-        )
+        statistics = TransferStatistics(str(local_path_str), str(node_path_str))
+        timer = create_timer()
+        if skip_unchanged and self._is_same_file(
+            Path(local_path_str), str(node_path_str)
+        ):
+            statistics.skipped_count = 1
+        elif self.is_posix and os.path.getsize(local_path_str) >= LARGE_FILE_SIZE:
+            # like create_directories of the small files.
+            self.mkdir(node_path.parent, parents=True, exist_ok=True)
+            statistics.size = self._transfer(
+                partial(
+                    self._put_large_file,
+                    local_path=str(local_path_str),
+                    node_path=str(node_path_str),
+                )
+            )
+            statistics.file_count = 1
+        else:
+            self._inner_shell.put(
+                local_path_str,
+                node_path_str,
+                create_directories=True,
+                consistent=self.is_posix,
+            )
+            statistics.size = os.path.getsize(local_path_str)
+            statistics.file_count = 1
+        statistics.elapsed = timer.elapsed()
+        self._log.debug(f"uploaded {local_path_str}: {statistics}")
 
-    def copy_back(self, node_path: PurePath, local_path: PurePath) -> None:
+    def copy_back(
+        self, node_path: PurePath, local_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """Download target node's file to local node
         Inputs:
             local_path: local path. (Absolute. Use a PurePosixPath, if the
@@ -600,16 +680,255 @@ class SshShell(InitializableMixin):
             node_path: target path. (Absolute. Use a PurePosixPath, if the
                                      target node is a Posix one, because LISA
                                      might be ran from Windows)
+            skip_unchanged: skip if the local file has the same checksum.
+                            (Posix only)
         """
         self.initialize()
         assert self._inner_shell
         node_path_str = self._purepath_to_str(node_path, False)
         local_path_str = self._purepath_to_str(local_path, True)
-        self._inner_shell.get(
-            node_path_str,
-            local_path_str,
-            consistent=self.is_posix,
+        statistics = TransferStatistics(str(node_path_str), str(local_path_str))
+        timer = create_timer()
+        if (
+            skip_unchanged
+            and os.path.exists(local_path_str)
+            and self._is_same_file(Path(local_path_str), str(node_path_str))
+        ):
+            statistics.skipped_count = 1
+        elif self.is_posix:
+            # the size is unknown, so all files are downloaded by the tuned
+            # channel. It's reused, so there is no extra round trip.
+            statistics.size = self._transfer(
+                partial(
+                    self._get_file,
+                    node_path=str(node_path_str),
+                    local_path=str(local_path_str),
+                )
+            )
+            statistics.file_count = 1
+        else:
+            self._inner_shell.get(
+                node_path_str,
+                local_path_str,
+                consistent=self.is_posix,
+            )
+            statistics.size = os.path.getsize(local_path_str)
+            statistics.file_count = 1
+        statistics.elapsed = timer.elapsed()
+        self._log.debug(f"downloaded {node_path_str}: {statistics}")
+
+    def copy_directory(
+        self,
+        local_path: PurePath,
+        node_path: PurePath,
+        files: Optional[Sequence[Union[str, PurePath]]] = None,
+        compress: bool = False,
+        skip_unchanged: bool = False,
+    ) -> TransferStatistics:
+        """Upload files of local directory to target node recursively. On Posix
+        nodes, files are sent in one tar stream, so there is no round trip for
+        each file.
+        Inputs:
+            local_path: local directory. (Absolute)
+            node_path: target directory. (Absolute. Use a PurePosixPath, if the
+                                          target node is a Posix one)
+            files: relative paths of files to upload. All files are uploaded,
+                   if it's not specified.
+            compress: compress the tar stream by gzip. It helps on text files
+                      and slow links.
+            skip_unchanged: skip files, which have same checksums on the target
+                            node.
+        """
+        self.initialize()
+        local_dir = Path(self._purepath_to_str(local_path, True))
+        node_dir = str(self._purepath_to_str(node_path, False))
+        local_files = list_local_files(local_dir, files)
+        statistics = TransferStatistics(str(local_dir), node_dir)
+        timer = create_timer()
+        if not self.is_posix:
+            for name, path in local_files.items():
+                self.copy(path, node_path / name)
+                statistics.size += path.stat().st_size
+            statistics.file_count = len(local_files)
+        else:
+            if skip_unchanged:
+                exit_code, output = self._run_command(
+                    get_checksum_command(node_dir, is_directory=True)
+                )
+                remote_checksums = parse_checksums(output) if exit_code == 0 else {}
+                changed = get_changed_files(local_files, remote_checksums)
+                statistics.skipped_count = len(local_files) - len(changed)
+                local_files = {x: local_files[x] for x in changed}
+            if local_files:
+                statistics.size = self._upload_tar(node_dir, local_files, compress)
+            statistics.file_count = len(local_files)
+        statistics.elapsed = timer.elapsed()
+        self._log.debug(f"uploaded directory {local_dir}: {statistics}")
+        return statistics
+
+    def copy_back_directory(
+        self, node_path: PurePath, local_path: PurePath, compress: bool = False
+    ) -> TransferStatistics:
+        """Download files of target node's directory to local recursively. They
+        are received in one tar stream. (Posix only)
+        Inputs:
+            node_path: target directory. (Absolute. Use a PurePosixPath, if the
+                                          target node is a Posix one)
+            local_path: local directory. (Absolute)
+            compress: compress the tar stream by gzip.
+        """
+        self.initialize()
+        if not self.is_posix:
+            raise LisaException("copy_back_directory supports Posix nodes only.")
+        node_dir = str(self._purepath_to_str(node_path, False))
+        local_dir = Path(self._purepath_to_str(local_path, True))
+        statistics = TransferStatistics(node_dir, str(local_dir))
+        timer = create_timer()
+        channel = self.open_channel(
+            get_tar_command(node_dir, extract=False, compress=compress)
+        )
+        try:
+            reader = channel.makefile("rb")
+            statistics.file_count, statistics.size = extract_tar(
+                reader, local_dir, compress
+            )
+            # read the rest, if tar fails in the middle.
+            reader.read()
+            exit_code = channel.recv_exit_status()
+            error = channel.makefile_stderr("rb").read().decode("utf-8", "replace")
+        finally:
+            channel.close()
+        if exit_code != 0:
+            raise LisaException(
+                f"failed to download directory {node_dir}, "
+                f"exit code: {exit_code}, error: {error}"
+            )
+        statistics.elapsed = timer.elapsed()
+        self._log.debug(f"downloaded directory {node_dir}: {statistics}")
+        return statistics
+
+    def _transfer(self, func: Callable[[paramiko.SFTPClient], int]) -> int:
+        # the transfer channel may be closed, like the connection is reset, so
+        # open it again, and retry once.
+        try:
+            return func(self._get_transfer_sftp())
+        except (EOFError, SSHException, socket.error) as identifier:
+            self._log.debug(f"retry on the transfer channel error: {identifier}")
+            self._close_transfer_sftp()
+            return func(self._get_transfer_sftp())
+
+    def _get_transfer_sftp(self) -> paramiko.SFTPClient:
+        """
+        The SFTP session with a large window, so many requests can be sent
+        before acknowledgements. It's reused by transfers.
+        """
+        if self._transfer_sftp:
+            channel = self._transfer_sftp.get_channel()
+            if channel and not channel.closed:
+                return self._transfer_sftp
+        self.initialize()
+        assert self._inner_shell
+        transport = self._inner_shell._spur._get_ssh_transport()
+        sftp = paramiko.SFTPClient.from_transport(
+            transport, window_size=TRANSFER_WINDOW_SIZE
         )
+        assert sftp, "failed to open the transfer channel"
+        self._transfer_sftp = sftp
+        return sftp
+
+    def _close_transfer_sftp(self) -> None:
+        if self._transfer_sftp:
+            try:
+                self._transfer_sftp.close()
+            except Exception as identifier:
+                self._log.debug(f"failed to close the transfer channel: {identifier}")
+            self._transfer_sftp = None
+
+    def _put_large_file(
+        self, sftp: paramiko.SFTPClient, local_path: str, node_path: str
+    ) -> int:
+        # Like the consistent mode of spurplus, write to a temp file, and
+        # rename it. The permissions of the existing file are kept.
+        temp_path = f"{node_path}.{uuid.uuid4()}.tmp"
+        size = os.path.getsize(local_path)
+        try:
+            with open(local_path, "rb") as f:
+                # the writes are pipelined by paramiko.
+                sftp.putfo(f, temp_path, file_size=size)
+            try:
+                mode = sftp.stat(node_path).st_mode
+            except FileNotFoundError:
+                mode = None
+            if mode is not None:
+                sftp.chmod(temp_path, mode)
+            sftp.posix_rename(temp_path, node_path)
+        except BaseException:
+            try:
+                sftp.remove(temp_path)
+            except Exception as identifier:
+                self._log.debug(f"failed to remove {temp_path}: {identifier}")
+            raise
+        return size
+
+    def _get_file(
+        self, sftp: paramiko.SFTPClient, node_path: str, local_path: str
+    ) -> int:
+        # download to a temp file, so the local file is not broken on failures.
+        Path(local_path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = f"{local_path}.{uuid.uuid4()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                # the stub of paramiko misses arguments of prefetch.
+                sftp.getfo(  # type: ignore
+                    node_path,
+                    f,
+                    prefetch=True,
+                    max_concurrent_prefetch_requests=MAX_CONCURRENT_REQUESTS,
+                )
+            shutil.move(temp_path, local_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return os.path.getsize(local_path)
+
+    def _upload_tar(
+        self, node_dir: str, local_files: Dict[str, Path], compress: bool
+    ) -> int:
+        channel = self.open_channel(
+            get_tar_command(node_dir, extract=True, compress=compress)
+        )
+        try:
+            writer = channel.makefile("wb")
+            size = write_tar(writer, local_files, compress)
+            writer.flush()
+            channel.shutdown_write()
+            exit_code = channel.recv_exit_status()
+            error = channel.makefile_stderr("rb").read().decode("utf-8", "replace")
+        finally:
+            channel.close()
+        if exit_code != 0:
+            raise LisaException(
+                f"failed to upload files to {node_dir}, "
+                f"exit code: {exit_code}, error: {error}"
+            )
+        return size
+
+    def _run_command(self, command: str) -> Tuple[int, str]:
+        channel = self.open_channel(command)
+        try:
+            output = channel.makefile("rb").read().decode("utf-8", "replace")
+            return channel.recv_exit_status(), output
+        finally:
+            channel.close()
+
+    def _is_same_file(self, local_path: Path, node_path: str) -> bool:
+        if not self.is_posix:
+            return False
+        exit_code, output = self._run_command(get_checksum_command(node_path))
+        if exit_code != 0:
+            return False
+        checksums = list(parse_checksums(output).values())
+        return bool(checksums) and checksums[0] == get_file_checksum(local_path)
 
     def _purepath_to_str(
         self, path: Union[Path, PurePath, str], is_local: bool = False
@@ -852,22 +1171,71 @@ class LocalShell(InitializableMixin):
             destination = Path(destination)
         source.symlink_to(destination)
 
-    def copy(self, local_path: PurePath, node_path: PurePath) -> None:
+    def copy(
+        self, local_path: PurePath, node_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """Upload local file to target node
         Inputs:
             local_path: local path. (Absolute)
             node_path: target path. (Absolute)
+            skip_unchanged: skip if the target file has the same checksum.
         """
+        if (
+            skip_unchanged
+            and Path(node_path).exists()
+            and get_file_checksum(Path(local_path))
+            == get_file_checksum(Path(node_path))
+        ):
+            return
         self.mkdir(node_path.parent, parents=True, exist_ok=True)
         shutil.copy(local_path, node_path)
 
-    def copy_back(self, node_path: PurePath, local_path: PurePath) -> None:
+    def copy_back(
+        self, node_path: PurePath, local_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """Download target node's file to local node
         Inputs:
             local_path: local path. (Absolute)
             node_path: target path. (Absolute)
+            skip_unchanged: skip if the local file has the same checksum.
+        """
+        self.copy(
+            local_path=node_path, node_path=local_path, skip_unchanged=skip_unchanged
+        )
+
+    def copy_directory(
+        self,
+        local_path: PurePath,
+        node_path: PurePath,
+        files: Optional[Sequence[Union[str, PurePath]]] = None,
+        compress: bool = False,
+        skip_unchanged: bool = False,
+    ) -> TransferStatistics:
+        """Copy files of the directory recursively. The compress is ignored
+        locally.
         """
-        self.copy(local_path=node_path, node_path=local_path)
+        local_files = list_local_files(Path(local_path), files)
+        statistics = TransferStatistics(str(local_path), str(node_path))
+        timer = create_timer()
+        for name, path in local_files.items():
+            target = Path(node_path) / name
+            if (
+                skip_unchanged
+                and target.exists()
+                and get_file_checksum(path) == get_file_checksum(target)
+            ):
+                statistics.skipped_count += 1
+                continue
+            self.copy(path, target)
+            statistics.size += path.stat().st_size
+            statistics.file_count += 1
+        statistics.elapsed = timer.elapsed()
+        return statistics
+
+    def copy_back_directory(
+        self, node_path: PurePath, local_path: PurePath, compress: bool = False
+    ) -> TransferStatistics:
+        return self.copy_directory(local_path=node_path, node_path=local_path)
 
 
 class WslShell(InitializableMixin):
@@ -879,9 +1247,12 @@ class WslShell(InitializableMixin):
     def __getattr__(self, key: str) -> Any:
         return getattr(self._parent, key)
 
-    def copy(self, local_path: PurePath, node_path: PurePath) -> None:
+    def copy(
+        self, local_path: PurePath, node_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """
-        Copy to temp folder for transfer between WSL and Windows.
+        Copy to temp folder for transfer between WSL and Windows. The
+        skip_unchanged is not supported, so files are always copied.
         """
         # parent must be Windows
         host_temp_file = self._get_parent_temp_path() / node_path.name
@@ -896,9 +1267,12 @@ class WslShell(InitializableMixin):
 
         self._parent.remove(host_temp_file)
 
-    def copy_back(self, node_path: PurePath, local_path: PurePath) -> None:
+    def copy_back(
+        self, node_path: PurePath, local_path: PurePath, skip_unchanged: bool = False
+    ) -> None:
         """
-        Copy to temp folder for transfer between WSL and Windows.
+        Copy to temp folder for transfer between WSL and Windows. The
+        skip_unchanged is not supported, so files are always copied.
         """
         host_temp_file = self._get_parent_temp_path() / node_path.name
         wsl_path = self._get_wsl_file_windows_path(node_path)
@@ -917,6 +1291,54 @@ class WslShell(InitializableMixin):
 
         self._parent.remove(host_temp_file)
 
+    def copy_directory(
+        self,
+        local_path: PurePath,
+        node_path: PurePath,
+        files: Optional[Sequence[Union[str, PurePath]]] = None,
+        compress: bool = False,
+        skip_unchanged: bool = False,
+    ) -> TransferStatistics:
+        """
+        Copy files one by one, because they are copied by the temp folder.
+        """
+        local_files = list_local_files(Path(local_path), files)
+        statistics = TransferStatistics(str(local_path), str(node_path))
+        timer = create_timer()
+        for name, path in local_files.items():
+            self.copy(path, node_path / name)
+            statistics.size += path.stat().st_size
+        statistics.file_count = len(local_files)
+        statistics.elapsed = timer.elapsed()
+        return statistics
+
+    def copy_back_directory(
+        self, node_path: PurePath, local_path: PurePath, compress: bool = False
+    ) -> TransferStatistics:
+        """
+        Copy back files one by one, because they are copied by the temp folder.
+        The files are listed by the Windows path of the WSL directory.
+        """
+        wsl_path = self._get_wsl_file_windows_path(node_path)
+        process = self._parent.spawn(
+            command=["cmd", "/c", "dir", "/s", "/b", "/a-d", str(wsl_path)]
+        )
+        output = self._wait_process_output(process)
+        statistics = TransferStatistics(str(node_path), str(local_path))
+        timer = create_timer()
+        for line in output.splitlines():
+            line = line.strip()
+            # an empty directory outputs "File Not Found".
+            if not line.startswith(str(wsl_path)):
+                continue
+            relative_path = PureWindowsPath(line).relative_to(wsl_path)
+            target = Path(local_path).joinpath(*relative_path.parts)
+            self.copy_back(node_path.joinpath(*relative_path.parts), target)
+            statistics.size += target.stat().st_size
+            statistics.file_count += 1
+        statistics.elapsed = timer.elapsed()
+        return statistics
+
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         return self._parent._initialize(*args, **kwargs)
 
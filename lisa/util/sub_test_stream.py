@@ -0,0 +1,151 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from dataclasses_json import dataclass_json
+
+from lisa import schema
+from lisa.messages import TestStatus, send_sub_test_result_message
+from lisa.util import constants
+
+if TYPE_CHECKING:
+    from lisa.testsuite import TestResult
+
+SUB_TEST_CHECKPOINT_FOLDER_NAME = "sub_test_checkpoints"
+
+
+@dataclass_json()
+@dataclass
+class SubTestRecord:
+    name: str
+    status: str
+    information: Dict[str, Any] = field(default_factory=dict)
+
+
+def get_checkpoint_path(test_name: str) -> Path:
+    file_name = re.sub(r"[^\w.-]", "_", test_name)
+    return constants.CACHE_PATH / SUB_TEST_CHECKPOINT_FOLDER_NAME / f"{file_name}.jsonl"
+
+
+class SubTestStream:
+    """
+    Sends sub test results as soon as they are parsed, and appends them to a
+    local checkpoint file. If a run is interrupted, like the VM crashed, the
+    results before it are kept. If resume is enabled, results in the
+    checkpoint are sent again, and the test can skip the completed tests. The
+    checkpoint is removed, after all results are handled.
+
+    It's thread safe, so shards of a test case can share it.
+    """
+
+    def __init__(
+        self,
+        test_result: "TestResult",
+        resume: bool = False,
+        path: Optional[Path] = None,
+    ) -> None:
+        self._test_result = test_result
+        self._path = path or get_checkpoint_path(
+            test_result.runtime_data.metadata.full_name
+        )
+        self._lock = Lock()
+        self._sent: Dict[str, TestStatus] = {}
+        self.resumed: Dict[str, SubTestRecord] = {}
+
+        if resume:
+            for record in self._load():
+                self.resumed[record.name] = record
+            for record in self.resumed.values():
+                information = dict(record.information)
+                information["resumed"] = True
+                self._send(record.name, TestStatus[record.status], information)
+        elif self._path.exists():
+            self._path.unlink()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def completed_tests(self) -> List[str]:
+        """
+        names of tests in the checkpoint, which can be skipped by the resumed
+        run.
+        """
+        return list(self.resumed.keys())
+
+    @property
+    def failed_tests(self) -> List[str]:
+        with self._lock:
+            return [
+                name
+                for name, status in self._sent.items()
+                if status == TestStatus.FAILED
+            ]
+
+    def send(
+        self,
+        name: str,
+        status: TestStatus,
+        information: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Sends the result, and saves it to the checkpoint. The result is not
+        sent, if it's resumed, or the same status is sent. So results can be
+        sent by both the live parser and the final parser.
+        """
+        if name in self.resumed:
+            return False
+        with self._lock:
+            if self._sent.get(name) == status:
+                return False
+            self._sent[name] = status
+        information = information or {}
+        self._send(name, status, information)
+        self._append(SubTestRecord(name, status.name, information))
+        return True
+
+    def complete(self) -> None:
+        with self._lock:
+            if self._path.exists():
+                self._path.unlink()
+
+    def _send(self, name: str, status: TestStatus, information: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sent[name] = status
+        send_sub_test_result_message(
+            test_result=self._test_result,
+            test_case_name=name,
+            test_status=status,
+            other_fields={"information": information},
+        )
+
+    def _append(self, record: SubTestRecord) -> None:
+        line = json.dumps(record.to_dict(), default=str)  # type: ignore
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self._path, "a") as f:
+                f.write(f"{line}\n")
+
+    def _load(self) -> List[SubTestRecord]:
+        if not self._path.exists():
+            return []
+        with open(self._path, "r") as f:
+            lines = f.readlines()
+        records: List[SubTestRecord] = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(schema.load_by_type(SubTestRecord, json.loads(line)))
+            except Exception:
+                # the last line may be partially written, if the run crashed.
+                continue
+        return records
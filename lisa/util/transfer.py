@@ -0,0 +1,192 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import hashlib
+import os
+import posixpath
+import shlex
+import tarfile
+from dataclasses import dataclass
+from pathlib import Path, PurePath, PurePosixPath
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from lisa.util import LisaException
+
+# The window of the transfer channel. The default window of paramiko is 2MB,
+# which limits the throughput on links with high latency, because the sender
+# waits for the window to be adjusted.
+TRANSFER_WINDOW_SIZE = 64 * 1024 * 1024
+# the count of outstanding read requests, and each request is 32KB.
+MAX_CONCURRENT_REQUESTS = 128
+# files larger than it are transferred by the tuned channel.
+LARGE_FILE_SIZE = 16 * 1024 * 1024
+
+_BUFFER_SIZE = 1024 * 1024
+
+
+@dataclass
+class TransferStatistics:
+    source: str
+    destination: str
+    # bytes of transferred files, skipped files are not counted.
+    size: int = 0
+    elapsed: float = 0
+    file_count: int = 0
+    skipped_count: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """
+        MB per second
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.size / 1024 / 1024 / self.elapsed
+
+    def __str__(self) -> str:
+        return (
+            f"{self.file_count} files, {self.size / 1024 / 1024:.2f} MB "
+            f"in {self.elapsed:.3f} sec, {self.throughput:.2f} MB/s, "
+            f"{self.skipped_count} skipped"
+        )
+
+
+def get_file_checksum(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_BUFFER_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_checksum_command(path: str, is_directory: bool = False) -> str:
+    """
+    The command outputs sha256 of the file, or of all files in the directory
+    with the relative paths.
+    """
+    if is_directory:
+        return f"cd {shlex.quote(path)} && find . -type f -exec sha256sum {{}} +"
+    return f"sha256sum {shlex.quote(path)}"
+
+
+def parse_checksums(output: str) -> Dict[str, str]:
+    """
+    Parses the output of sha256sum. The key is the path without the leading
+    "./", and the value is the checksum.
+    """
+    checksums: Dict[str, str] = {}
+    for line in output.splitlines():
+        line = line.strip()
+        parts = line.split(maxsplit=1)
+        if len(parts) != 2 or len(parts[0]) != 64:
+            continue
+        # the binary mode marks the path with "*"
+        name = parts[1].lstrip("*")
+        if name.startswith("./"):
+            name = name[2:]
+        checksums[name] = parts[0].lower()
+    return checksums
+
+
+def list_local_files(
+    local_dir: Path, files: Optional[Sequence[Union[str, PurePath]]] = None
+) -> Dict[str, Path]:
+    """
+    Returns files of the directory recursively. The key is the relative posix
+    path, so it can be used in tar and remote paths. If files are specified,
+    only they are returned.
+    """
+    if files is not None:
+        return {PurePosixPath(*Path(x).parts).as_posix(): local_dir / x for x in files}
+    result: Dict[str, Path] = {}
+    for root, _, names in os.walk(local_dir):
+        for name in names:
+            path = Path(root) / name
+            relative = PurePosixPath(*path.relative_to(local_dir).parts).as_posix()
+            result[relative] = path
+    return dict(sorted(result.items()))
+
+
+def get_changed_files(
+    local_files: Dict[str, Path], remote_checksums: Dict[str, str]
+) -> List[str]:
+    return [
+        name
+        for name, path in local_files.items()
+        if remote_checksums.get(name) != get_file_checksum(path)
+    ]
+
+
+def get_tar_command(path: str, extract: bool, compress: bool) -> str:
+    """
+    The command reads or writes the tar stream by stdin or stdout on nodes.
+    """
+    compress_flag = "z" if compress else ""
+    quoted_path = shlex.quote(path)
+    if extract:
+        return (
+            f"mkdir -p {quoted_path} && " f"tar -x{compress_flag}f - -C {quoted_path}"
+        )
+    return f"tar -c{compress_flag}f - -C {quoted_path} ."
+
+
+def write_tar(
+    fileobj: Any, local_files: Dict[str, Path], compress: bool = False
+) -> int:
+    """
+    Writes files to a tar stream, and returns the size of files. The stream is
+    not seekable, so it can be written to a channel directly.
+    """
+    size = 0
+    with tarfile.open(
+        fileobj=fileobj,
+        mode="w|gz" if compress else "w|",
+        bufsize=_BUFFER_SIZE,
+    ) as tar:
+        for name, path in local_files.items():
+            tar.add(str(path), arcname=name, recursive=False)
+            size += path.stat().st_size
+    return size
+
+
+def extract_tar(
+    fileobj: Any, local_dir: Path, compress: bool = False
+) -> Tuple[int, int]:
+    """
+    Extracts files from a tar stream, and returns the count and size of files.
+    """
+    count = 0
+    size = 0
+    local_dir.mkdir(parents=True, exist_ok=True)
+    extract_args: Dict[str, Any] = {}
+    if hasattr(tarfile, "data_filter"):
+        # reject absolute paths, and paths out of the directory.
+        extract_args["filter"] = "data"
+    with tarfile.open(
+        fileobj=fileobj,
+        mode="r|gz" if compress else "r|",
+        bufsize=_BUFFER_SIZE,
+    ) as tar:
+        for member in tar:
+            # the filter isn't available on old Python versions.
+            _check_tar_member(member)
+            tar.extract(member, path=str(local_dir), **extract_args)
+            if member.isfile():
+                count += 1
+                size += member.size
+    return count, size
+
+
+def _check_tar_member(member: tarfile.TarInfo) -> None:
+    # reject absolute paths, and paths out of the directory. Links are checked
+    # by their targets too.
+    paths = [member.name]
+    if member.issym():
+        # it's relative to the folder of the link.
+        paths.append(posixpath.join(posixpath.dirname(member.name), member.linkname))
+    elif member.islnk():
+        paths.append(member.linkname)
+    for path in paths:
+        normalized_path = posixpath.normpath(path)
+        if posixpath.isabs(normalized_path) or normalized_path.split("/")[0] == "..":
+            raise LisaException(f"unsafe path in tar stream: {member.name}")
@@ -2,6 +2,7 @@
 # Licensed under the MIT license.
 
 import re
+from functools import partial
 from pathlib import PurePosixPath
 from typing import Any, List, Tuple, Type, Union
 
@@ -29,6 +30,7 @@ from lisa.tools import (
     Timeout,
     Wget,
 )
+from lisa.tools.mixins import BuildCacheMixin
 from lisa.util import (
     LisaException,
     MissingPackagesException,
@@ -44,7 +46,7 @@ from microsoft.testsuites.dpdk.common import (
 PACKAGE_MANAGER_SOURCE = "package_manager"
 
 
-class DpdkTestpmd(Tool):
+class DpdkTestpmd(Tool, BuildCacheMixin):
     # TestPMD tool to bundle the DPDK build and toolset together.
 
     # regex to identify sriov re-enable event, example:
@@ -704,37 +706,14 @@ class DpdkTestpmd(Tool):
         else:
             sample_apps = ""
 
-        node.execute(
-            f"meson {sample_apps} build",
-            shell=True,
-            cwd=self.dpdk_path,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "meson build for dpdk failed, check that"
-                "dpdk build has not changed to eliminate the use of meson or "
-                "meson version is compatible with this dpdk version and OS."
-            ),
-        )
         self.dpdk_build_path = self.dpdk_path.joinpath("build")
-        node.execute(
-            "ninja",
-            cwd=self.dpdk_build_path,
-            timeout=1800,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "ninja build for dpdk failed. check build spew for missing headers "
-                "or dependencies. Also check that this ninja version requirement "
-                "has not changed for dpdk."
-            ),
-        )
-        node.execute(
-            "ninja install",
-            cwd=self.dpdk_build_path,
-            sudo=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "ninja install failed for dpdk binaries."
-            ),
+        if self._dpdk_source and self._dpdk_source.endswith(".tar.gz"):
+            revision = self._dpdk_source
+        else:
+            revision = git_tool.get_current_commit_hash(self.dpdk_path)
+        self.install_with_build_cache(
+            revision=f"{revision} {sample_apps} mana={self.is_mana}",
+            build=partial(self._build_dpdk, sample_apps),
         )
         node.execute(
             "ldconfig",
@@ -832,6 +811,54 @@ class DpdkTestpmd(Tool):
         if network_drivers:
             modprobe.load(network_drivers)
 
+    def _build_dpdk(self, sample_apps: str, destdir: str) -> None:
+        node = self.node
+        node.execute(
+            f"meson {sample_apps} build",
+            shell=True,
+            cwd=self.dpdk_path,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=(
+                "meson build for dpdk failed, check that"
+                "dpdk build has not changed to eliminate the use of meson or "
+                "meson version is compatible with this dpdk version and OS."
+            ),
+        )
+        node.execute(
+            "ninja",
+            cwd=self.dpdk_build_path,
+            timeout=1800,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=(
+                "ninja build for dpdk failed. check build spew for missing headers "
+                "or dependencies. Also check that this ninja version requirement "
+                "has not changed for dpdk."
+            ),
+        )
+        node.execute(
+            "ninja install",
+            cwd=self.dpdk_build_path,
+            sudo=True,
+            shell=True,
+            update_envs={"DESTDIR": destdir},
+            expected_exit_code=0,
+            expected_exit_code_failure_message=(
+                "ninja install failed for dpdk binaries."
+            ),
+        )
+        if destdir and sample_apps:
+            # the sample apps are run from the build folder, so they are staged
+            # at the same path.
+            examples_path = self.dpdk_build_path.joinpath("examples")
+            staged_path = f"{destdir}{examples_path}"
+            node.execute(
+                f"mkdir -p {staged_path} && cp -a {examples_path}/. {staged_path}",
+                shell=True,
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="failed to stage sample apps.",
+            )
+
     def _install_dependencies(self) -> None:
         node = self.node
         if isinstance(node.os, Ubuntu):
@@ -1,9 +1,24 @@
-from typing import Any, Dict
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List
 
-from lisa import Node, TestCaseMetadata, TestSuite, TestSuiteMetadata
+from assertpy import assert_that
+
+from lisa import (
+    Environment,
+    Logger,
+    Node,
+    TestCaseMetadata,
+    TestSuite,
+    TestSuiteMetadata,
+    run_in_parallel,
+)
+from lisa.notifiers.result_store import get_test_durations
 from lisa.testsuite import TestResult, simple_requirement
-from lisa.util import SkippedException, UnsupportedDistroException
-from microsoft.testsuites.kselftest.kselftest import Kselftest
+from lisa.util import LisaException, SkippedException, UnsupportedDistroException
+from lisa.util.sharding import TestShard, run_shards, split_tests
+from lisa.util.sub_test_stream import SubTestStream
+from microsoft.testsuites.kselftest.kselftest import Kselftest, KselftestResult
 
 
 @TestSuiteMetadata(
@@ -33,6 +48,11 @@ class KselftestTestsuite(TestSuite):
 
         For both cases, verify that the kselftest tool extracts the tar, runs the script
         run_kselftest.sh and redirects test results to a file kselftest-results.txt.
+
+        If the environment has multiple nodes, tests are split into shards, and
+        shards run on nodes at the same time. Results are sent as soon as each
+        test completes. If the variable "resume_sub_tests" is true, tests
+        completed by an interrupted run are skipped.
         """,
         priority=3,
         timeout=_CASE_TIME_OUT,
@@ -42,17 +62,73 @@ class KselftestTestsuite(TestSuite):
     )
     def verify_kselftest(
         self,
-        node: Node,
+        log: Logger,
+        environment: Environment,
         log_path: str,
         variables: Dict[str, Any],
         result: TestResult,
     ) -> None:
         file_path = variables.get("kselftest_file_path", "")
+        resume = variables.get("resume_sub_tests", False)
+        nodes = list(environment.nodes.list())
         try:
-            kselftest: Kselftest = node.tools.get(
-                Kselftest,
-                kselftest_file_path=file_path,
+            kselftests = run_in_parallel(
+                [partial(self._get_kselftest, node, file_path) for node in nodes], log
             )
-            kselftest.run_all(result, log_path, self._KSELF_TIMEOUT)
         except UnsupportedDistroException as identifier:
             raise SkippedException(identifier)
+
+        if len(kselftests) == 1:
+            kselftests[0].run_all(result, log_path, self._KSELF_TIMEOUT, resume=resume)
+        else:
+            self._run_sharded(log, result, kselftests, log_path, resume)
+
+    def _get_kselftest(self, node: Node, file_path: str) -> Kselftest:
+        kselftest: Kselftest = node.tools.get(
+            Kselftest,
+            kselftest_file_path=file_path,
+        )
+        return kselftest
+
+    def _run_sharded(
+        self,
+        log: Logger,
+        result: TestResult,
+        kselftests: List[Kselftest],
+        log_path: str,
+        resume: bool,
+    ) -> None:
+        # shards share the stream, so all completed tests can be resumed by
+        # another count of shards.
+        stream = SubTestStream(result, resume=resume)
+        resumed_tests = kselftests[0].get_resumed_tests(stream)
+        tests = [x for x in kselftests[0].list_tests() if x not in resumed_tests]
+        # sub test results are named by tests without collections.
+        history = get_test_durations(result.runtime_data.name)
+        durations = {
+            x: history[x.split(":", 1)[-1]]
+            for x in tests
+            if x.split(":", 1)[-1] in history
+        }
+        shards = split_tests(tests, len(kselftests), durations)
+
+        def _run_shard(shard: TestShard, kselftest: Kselftest) -> List[KselftestResult]:
+            shard_log_path = Path(log_path) / f"shard_{shard.index}"
+            shard_log_path.mkdir(parents=True, exist_ok=True)
+            return kselftest.run_tests(
+                str(shard_log_path),
+                self._KSELF_TIMEOUT,
+                tests=shard.tests,
+                stream=stream,
+                shard=shard,
+            )
+
+        shard_results = run_shards(shards, kselftests, _run_shard, log)
+        if not any(shard_results) and not stream.resumed:
+            raise LisaException("tests did not run, kselftest-results.txt is empty")
+
+        for shard, results in zip(shards, shard_results):
+            kselftests[0].send_results(result, results, shard, stream)
+        stream.complete()
+        failed_tests = stream.failed_tests
+        assert_that(failed_tests).described_as("kselftests failed").is_empty()
@@ -1,8 +1,9 @@
 import os
 import re
+import time
 from dataclasses import dataclass
 from pathlib import PurePath, PurePosixPath
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from assertpy import assert_that
 
@@ -16,7 +17,15 @@ from lisa.tools import Cp, Git, Ls, Make, RemoteCopy, Tar
 from lisa.tools.chmod import Chmod
 from lisa.tools.mkdir import Mkdir
 from lisa.tools.whoami import Whoami
-from lisa.util import LisaException, UnsupportedDistroException, find_groups_in_lines
+from lisa.util import (
+    LisaException,
+    UnsupportedDistroException,
+    create_timer,
+    find_groups_in_lines,
+)
+from lisa.util.perf_timer import Timer
+from lisa.util.sharding import TestShard
+from lisa.util.sub_test_stream import SubTestStream
 
 _UBUNTU_OS_PACKAGES = [
     "git",
@@ -61,6 +70,7 @@ class KselftestResult:
     name: str = ""
     status: TestStatus = TestStatus.QUEUED
     exit_value: int = 0
+    collection: str = ""
 
 
 class Kselftest(Tool):
@@ -75,8 +85,14 @@ class Kselftest(Tool):
     # example timeout test log: "not ok 8 selftests: netfilter: nft_concat_range.sh
     # # TIMEOUT 45 seconds"
     _RESULT_KSELFTEST_OK_REGEX = re.compile(
-        r"^(?P<status>(not ok|ok))\s+\d+\s+selftests:\s+\S+:\s+(?P<name>\S+)\s*(?:# (?:exit=)?(?P<reason>SKIP|TIMEOUT\d+).*)?(?:# exit=(?P<exit>\d+))?"  # noqa: E501
+        r"^(?P<status>(not ok|ok))\s+\d+\s+selftests:\s+(?P<collection>\S+):\s+(?P<name>\S+)\s*(?:# (?:exit=)?(?P<reason>SKIP|TIMEOUT\d+).*)?(?:# exit=(?P<exit>\d+))?"  # noqa: E501
     )
+    # a test starts, like "# selftests: net: veth.sh"
+    _TEST_START_REGEX = re.compile(
+        r"^#\s+selftests:\s+(?P<collection>\S+):\s+(?P<name>\S+)\s*$"
+    )
+    # the output of "run_kselftest.sh -l", like "net:veth.sh"
+    _TEST_NAME_REGEX = re.compile(r"^[\w.-]+(/[\w.-]+)*:\S+$")
 
     @property
     def command(self) -> str:
@@ -203,7 +219,65 @@ class Kselftest(Tool):
         log_path: str,
         timeout: int = 5000,
         run_test_as_root: bool = False,
+        resume: bool = False,
     ) -> List[KselftestResult]:
+        stream = SubTestStream(test_result, resume=resume)
+        tests: Optional[List[str]] = None
+        if stream.resumed:
+            resumed_tests = self.get_resumed_tests(stream)
+            tests = [x for x in self.list_tests() if x not in resumed_tests]
+
+        results: List[KselftestResult] = []
+        # all tests may be completed by the interrupted run.
+        if tests is None or tests:
+            results = self.run_tests(
+                log_path, timeout, run_test_as_root, tests=tests, stream=stream
+            )
+
+        if not results and not stream.resumed:
+            raise LisaException("tests did not run, kselftest-results.txt is empty")
+
+        failed_tests = self.send_results(test_result, results, stream=stream)
+        stream.complete()
+
+        # assert that none of the tests failed
+        assert_that(failed_tests).described_as("kselftests failed").is_empty()
+
+        return results
+
+    def list_tests(self) -> List[str]:
+        """
+        Returns tests in the format of "collection:test", which can be passed
+        to run_tests.
+        """
+        result = self.run(
+            "-l",
+            force_run=True,
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to list kselftests",
+        )
+        return [
+            line.strip()
+            for line in result.stdout.splitlines()
+            if self._TEST_NAME_REGEX.match(line.strip())
+        ]
+
+    def run_tests(
+        self,
+        log_path: str,
+        timeout: int = 5000,
+        run_test_as_root: bool = False,
+        tests: Optional[List[str]] = None,
+        stream: Optional[SubTestStream] = None,
+        shard: Optional[TestShard] = None,
+    ) -> List[KselftestResult]:
+        """
+        Runs all tests or the specified tests, and returns parsed results. It
+        doesn't check failures, so results of multiple runs can be merged. If
+        the stream is specified, results are sent by it as soon as each test
+        completes, and the duration is measured by the output.
+        """
         # Executing kselftest as root may cause
         # VM to hang
 
@@ -216,13 +290,24 @@ class Kselftest(Tool):
 
         result_file_name = "kselftest-results.txt"
         result_file = f"{result_directory}/{result_file_name}"
-        self.run(
-            f" 2>&1 | tee {result_file}",
+        parameters = "".join(f" -t {x}" for x in tests or [])
+        process = self.run_async(
+            f"{parameters} 2>&1 | tee {result_file}",
             sudo=run_test_as_root,
             force_run=True,
             shell=True,
-            timeout=timeout,
+            buffer_lines=stream is not None,
         )
+        timer = create_timer()
+        start_times: Dict[str, float] = {}
+        while stream and process.is_running() and timer.elapsed(False) < timeout:
+            for line in process.read_output_lines():
+                self._handle_live_line(line, timer, start_times, stream, shard)
+            time.sleep(1)
+        process.wait_result(timeout=max(timeout - timer.elapsed(False), 1))
+        if stream:
+            for line in process.read_output_lines():
+                self._handle_live_line(line, timer, start_times, stream, shard)
 
         # Allow read permissions for "others" to remote copy the file
         # kselftest-results.txt
@@ -241,30 +326,86 @@ class Kselftest(Tool):
             result_output = f.read()
             results = self._parse_results(result_output)
 
-        if not results:
-            raise LisaException("tests did not run, kselftest-results.txt is empty")
+        return results
 
-        # assert that all tests passed
+    def send_results(
+        self,
+        test_result: TestResult,
+        results: List[KselftestResult],
+        shard: Optional[TestShard] = None,
+        stream: Optional[SubTestStream] = None,
+    ) -> List[str]:
+        """
+        Sends sub test results, and returns names of failed tests. If the
+        stream is specified, results, which are sent already, are skipped, and
+        failed tests of its checkpoint are returned also.
+        """
         failed_tests = []
         for result in results:
+            information = self._get_information(result, shard)
+            if stream:
+                stream.send(result.name, result.status, information)
+                continue
+
             if result.status == TestStatus.FAILED:
                 failed_tests.append(result.name)
 
             # create test result message
             info: Dict[str, Any] = {}
-            info["information"] = {}
-            info["information"]["exit_value"] = result.exit_value
+            info["information"] = information
             send_sub_test_result_message(
                 test_result=test_result,
                 test_case_name=result.name,
                 test_status=result.status,
                 other_fields=info,
             )
-
-        # assert that none of the tests failed
-        assert_that(failed_tests).described_as("kselftests failed").is_empty()
-
-        return results
+        if stream:
+            failed_tests = stream.failed_tests
+        return failed_tests
+
+    def get_resumed_tests(self, stream: SubTestStream) -> List[str]:
+        """
+        Returns resumed tests in the format of "collection:test", so they can
+        be excluded from the result of list_tests.
+        """
+        return [
+            f"{record.information.get('collection', '')}:{name}"
+            for name, record in stream.resumed.items()
+        ]
+
+    def _get_information(
+        self, result: KselftestResult, shard: Optional[TestShard]
+    ) -> Dict[str, Any]:
+        information: Dict[str, Any] = {
+            "exit_value": result.exit_value,
+            "collection": result.collection,
+        }
+        if shard:
+            information.update(shard.get_information())
+        return information
+
+    def _handle_live_line(
+        self,
+        line: str,
+        timer: Timer,
+        start_times: Dict[str, float],
+        stream: SubTestStream,
+        shard: Optional[TestShard],
+    ) -> None:
+        start_matched = self._TEST_START_REGEX.match(line)
+        if start_matched:
+            start_times[start_matched.group("name")] = timer.elapsed(False)
+            return
+        results = self._parse_results(line)
+        if not results:
+            return
+        result = results[0]
+        information = self._get_information(result, shard)
+        if result.name in start_times:
+            information["duration"] = round(
+                timer.elapsed(False) - start_times.pop(result.name), 3
+            )
+        stream.send(result.name, result.status, information)
 
     def _parse_results(self, result: str) -> List[KselftestResult]:
         parsed_result: List[KselftestResult] = []
@@ -284,6 +425,7 @@ class Kselftest(Tool):
                         name=matched[0]["name"],
                         status=self._parse_status_to_test_status(matched),
                         exit_value=self._parse_exit_val_to_test_status(matched),
+                        collection=matched[0]["collection"],
                     )
                 )
 
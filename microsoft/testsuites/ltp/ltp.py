@@ -2,7 +2,8 @@
 # Licensed under the MIT license.
 
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import partial
 from pathlib import PurePath, PurePosixPath
 from typing import Any, Dict, List, Optional, Type
 
@@ -27,8 +28,11 @@ from lisa.tools import (
     Rm,
     Swap,
     Sysctl,
+    Tail,
 )
 from lisa.util import LisaException, find_patterns_in_lines
+from lisa.util.sharding import TestShard
+from lisa.util.sub_test_stream import SubTestStream
 
 
 @dataclass
@@ -37,6 +41,18 @@ class LtpResult:
     name: str = ""
     status: TestStatus = TestStatus.QUEUED
     exit_value: int = 0
+    # seconds, it's parsed from the output log.
+    duration: float = 0
+
+
+@dataclass
+class _LiveResults:
+    # results are sent, when both the status and the duration are parsed.
+    stream: SubTestStream
+    shard: Optional[TestShard] = None
+    results: Dict[str, LtpResult] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+    current_test: str = ""
 
 
 class Ltp(Tool):
@@ -49,6 +65,19 @@ class Ltp(Tool):
     # Machine Architecture: x86_64
     _RESULT_LTP_ARCH_REGEX = re.compile(r"Machine Architecture: (.*)\s+")
 
+    # tag=abs01 stime=1654731788
+    # ...
+    # duration=0 termination_type=exited termination_id=0 corefile=no
+    _OUTPUT_DURATION_REGEX = re.compile(
+        r"tag=(?P<name>\S+) stime=\d+(?:(?!<<<test_start>>>)[\s\S])*?"
+        r"duration=(?P<duration>\d+(?:\.\d+)?)"
+    )
+    # the same as above, but match lines one by one.
+    _OUTPUT_TAG_LINE_REGEX = re.compile(r"^tag=(?P<name>\S+) stime=\d+")
+    _OUTPUT_DURATION_LINE_REGEX = re.compile(
+        r"^duration=(?P<duration>\d+(?:\.\d+)?) termination_type="
+    )
+
     LTP_DIR_NAME = "ltp"
     DEFAULT_LTP_TESTS_GIT_TAG = "20230929"
     LTP_GIT_URL = "https://github.com/linux-test-project/ltp.git"
@@ -56,6 +85,7 @@ class Ltp(Tool):
     LTP_RESULT_PATH = "/opt/ltp/ltp-results.log"
     LTP_OUTPUT_PATH = "/opt/ltp/ltp-output.log"
     LTP_SKIP_FILE = "/opt/ltp/skipfile"
+    LTP_RUNTEST_PATH = "/opt/ltp/runtest"
     COMPILE_TIMEOUT = 1800
     RUN_TIMEOUT = 12000
 
@@ -84,26 +114,88 @@ class Ltp(Tool):
         log_path: str,
         block_device: Optional[str] = None,
         temp_dir: str = "/tmp/",
+        resume: bool = False,
     ) -> List[LtpResult]:
-        # tests cannot be empty
-        assert_that(ltp_tests, "ltp_tests cannot be empty").is_not_empty()
-        ls = self.node.tools[Ls]
-        rm = self.node.tools[Rm]
+        stream = SubTestStream(test_result, resume=resume)
+        results = self.run_tests(
+            ltp_tests,
+            skip_tests,
+            log_path,
+            block_device=block_device,
+            temp_dir=temp_dir,
+            stream=stream,
+        )
+        failed_tests = self.send_results(test_result, results, stream=stream)
+        stream.complete()
 
-        # remove skipfile if it exists
-        if ls.path_exists(self.LTP_SKIP_FILE):
-            self._log.debug(f"Removing skipfile: {self.LTP_SKIP_FILE}")
-            rm.remove_file(self.LTP_SKIP_FILE, sudo=True)
+        # assert that none of the tests failed
+        assert_that(
+            failed_tests, f"The following tests failed: {failed_tests}"
+        ).is_empty()
 
-        # remove results file if it exists
-        if ls.path_exists(self.LTP_RESULT_PATH, sudo=True):
-            self._log.debug(f"Removing {self.LTP_RESULT_PATH}")
-            rm.remove_file(self.LTP_RESULT_PATH, sudo=True)
+        return results
 
-        # remove output file if it exists
-        if ls.path_exists(self.LTP_OUTPUT_PATH, sudo=True):
-            self._log.debug(f"Removing {self.LTP_OUTPUT_PATH}")
-            rm.remove_file(self.LTP_OUTPUT_PATH, sudo=True)
+    def run_shard(
+        self,
+        shard: TestShard,
+        ltp_tests: List[str],
+        skip_tests: List[str],
+        log_path: str,
+        block_device: Optional[str] = None,
+        temp_dir: str = "/tmp/",
+        stream: Optional[SubTestStream] = None,
+    ) -> List[LtpResult]:
+        """
+        Runs a part of tests in runtest files. The entries of the shard are
+        written to a runtest file, and runltp accepts it by the absolute path.
+        """
+        entries = self.get_runtest_entries(ltp_tests)
+        content = "\n".join(entries[x] for x in shard.tests if x in entries)
+        file_name = f"ltp-shard-{shard.index}.runtest"
+        local_path = PurePath(log_path) / file_name
+        with open(local_path, "w") as f:
+            f.write(f"{content}\n")
+        remote_path = self.node.working_path / file_name
+        self.node.shell.copy(local_path, remote_path)
+
+        return self.run_tests(
+            [str(remote_path)],
+            skip_tests,
+            log_path,
+            block_device=block_device,
+            temp_dir=temp_dir,
+            stream=stream,
+            shard=shard,
+        )
+
+    def run_tests(
+        self,
+        ltp_tests: List[str],
+        skip_tests: List[str],
+        log_path: str,
+        block_device: Optional[str] = None,
+        temp_dir: str = "/tmp/",
+        stream: Optional[SubTestStream] = None,
+        shard: Optional[TestShard] = None,
+    ) -> List[LtpResult]:
+        """
+        Runs tests and returns parsed results. It doesn't check failures, so
+        results of multiple runs can be merged. If the stream is specified,
+        results are sent by it as soon as each test completes, and tests in
+        its checkpoint are skipped.
+        """
+        # tests cannot be empty
+        assert_that(ltp_tests, "ltp_tests cannot be empty").is_not_empty()
+        # remove the skipfile and results of previous runs, if they exist. They
+        # are removed in one session, and missing files are ignored by rm.
+        self._log.debug(
+            f"Removing {self.LTP_SKIP_FILE}, {self.LTP_RESULT_PATH} and "
+            f"{self.LTP_OUTPUT_PATH}"
+        )
+        self.node.tools[Rm].remove_files(
+            [self.LTP_SKIP_FILE, self.LTP_RESULT_PATH, self.LTP_OUTPUT_PATH],
+            sudo=True,
+        )
 
         # add parameters for the test logging
         parameters = f"-p -q -l {self.LTP_RESULT_PATH} -o {self.LTP_OUTPUT_PATH} "
@@ -119,6 +211,9 @@ class Ltp(Tool):
         # directory where temporary files will be created
         parameters += f"-d {temp_dir} "
 
+        if stream:
+            skip_tests = skip_tests + stream.completed_tests
+
         # add the list of skip tests to run
         if len(skip_tests) > 0:
             # write skip test to skipfile with newline separator
@@ -140,15 +235,29 @@ class Ltp(Tool):
             shell=True,
         )
 
-        pgrep = self.node.tools[Pgrep]
-        pgrep.wait_processes("runltp", timeout=self.RUN_TIMEOUT)
+        if stream:
+            live_results = _LiveResults(stream=stream, shard=shard)
+            self.node.tools[Tail].follow(
+                [
+                    PurePosixPath(self.LTP_RESULT_PATH),
+                    PurePosixPath(self.LTP_OUTPUT_PATH),
+                ],
+                partial(self._handle_live_line, live_results),
+                "runltp",
+                timeout=self.RUN_TIMEOUT,
+                sudo=True,
+            )
+        else:
+            pgrep = self.node.tools[Pgrep]
+            pgrep.wait_processes("runltp", timeout=self.RUN_TIMEOUT)
 
         # to avoid no permission issue when copying back files
         self.node.tools[Chmod].update_folder("/opt", "a+rwX", sudo=True)
 
         # write output to log path
+        local_ltp_output_path = PurePath(log_path) / "ltp-output.log"
         self.node.shell.copy_back(
-            PurePosixPath(self.LTP_OUTPUT_PATH), PurePath(log_path) / "ltp-output.log"
+            PurePosixPath(self.LTP_OUTPUT_PATH), local_ltp_output_path
         )
 
         # write results to log path
@@ -163,30 +272,65 @@ class Ltp(Tool):
             result_output = f.read()
             results = self._parse_results(result_output)
 
-        # assert that all tests passed
+        with open(local_ltp_output_path, "r", errors="replace") as f:
+            durations = self._parse_durations(f.read())
+        for result in results:
+            result.duration = durations.get(result.name, 0)
+
+        return results
+
+    def send_results(
+        self,
+        test_result: TestResult,
+        results: List[LtpResult],
+        shard: Optional[TestShard] = None,
+        stream: Optional[SubTestStream] = None,
+    ) -> List[str]:
+        """
+        Sends sub test results, and returns names of failed tests. If the
+        stream is specified, results, which are sent already, are skipped, and
+        failed tests of its checkpoint are returned also.
+        """
         failed_tests = []
         for result in results:
+            information = self._get_information(result, shard)
+            if stream:
+                stream.send(result.name, result.status, information)
+                continue
+
             if result.status == TestStatus.FAILED:
                 failed_tests.append(result.name)
 
             # create test result message
             info: Dict[str, Any] = {}
-            info["information"] = {}
-            info["information"]["version"] = result.version
-            info["information"]["exit_value"] = result.exit_value
+            info["information"] = information
             send_sub_test_result_message(
                 test_result=test_result,
                 test_case_name=result.name,
                 test_status=result.status,
                 other_fields=info,
             )
-
-        # assert that none of the tests failed
-        assert_that(
-            failed_tests, f"The following tests failed: {failed_tests}"
-        ).is_empty()
-
-        return results
+        if stream:
+            failed_tests = stream.failed_tests
+        return failed_tests
+
+    def get_runtest_entries(self, ltp_tests: List[str]) -> Dict[str, str]:
+        """
+        Returns entries of runtest files by test names in the order of files.
+        An entry is a line of a test name and its command.
+        """
+        entries: Dict[str, str] = {}
+        cat = self.node.tools[Cat]
+        for ltp_test in ltp_tests:
+            content = cat.read(
+                f"{self.LTP_RUNTEST_PATH}/{ltp_test}", sudo=True, force_run=True
+            )
+            for line in content.splitlines():
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                entries.setdefault(line.split()[0], line)
+        return entries
 
     def _install(self) -> bool:
         assert isinstance(self.node.os, Posix), f"{self.node.os} is not supported"
@@ -387,6 +531,57 @@ class Ltp(Tool):
 
         return parsed_result
 
+    def _get_information(
+        self, result: LtpResult, shard: Optional[TestShard]
+    ) -> Dict[str, Any]:
+        information: Dict[str, Any] = {
+            "version": result.version,
+            "exit_value": result.exit_value,
+            "duration": result.duration,
+        }
+        if shard:
+            information.update(shard.get_information())
+        return information
+
+    def _handle_live_line(
+        self, live_results: _LiveResults, path: PurePath, line: str
+    ) -> None:
+        if str(path) == self.LTP_RESULT_PATH:
+            matched = self._RESULT_TESTCASE_REGEX.match(line)
+            if not matched:
+                return
+            name = matched.group(1).strip()
+            live_results.results[name] = LtpResult(
+                version=self._git_tag,
+                name=name,
+                status=self._parse_status_to_test_status(matched.group(2)),
+                exit_value=int(matched.group(3)),
+            )
+        else:
+            tag_matched = self._OUTPUT_TAG_LINE_REGEX.match(line)
+            if tag_matched:
+                live_results.current_test = tag_matched.group("name")
+                return
+            duration_matched = self._OUTPUT_DURATION_LINE_REGEX.match(line)
+            if not duration_matched or not live_results.current_test:
+                return
+            name = live_results.current_test
+            live_results.durations[name] = float(duration_matched.group("duration"))
+            live_results.current_test = ""
+
+        result = live_results.results.get(name)
+        if result and name in live_results.durations:
+            result.duration = live_results.durations[name]
+            live_results.stream.send(
+                name, result.status, self._get_information(result, live_results.shard)
+            )
+
+    def _parse_durations(self, output: str) -> Dict[str, float]:
+        return {
+            x.group("name"): float(x.group("duration"))
+            for x in self._OUTPUT_DURATION_REGEX.finditer(output)
+        }
+
     def _parse_status_to_test_status(self, status: str) -> TestStatus:
         if status == "PASS":
             return TestStatus.PASSED
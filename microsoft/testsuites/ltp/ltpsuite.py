@@ -2,22 +2,31 @@
 # Licensed under the MIT license.
 
 
-from logging import Logger
-from typing import Any, Dict
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from assertpy import assert_that
 
 from lisa import (
+    Environment,
+    Logger,
     Node,
     TestCaseMetadata,
     TestSuite,
     TestSuiteMetadata,
+    run_in_parallel,
     schema,
     search_space,
     simple_requirement,
 )
+from lisa.notifiers.result_store import get_test_durations
 from lisa.operating_system import BSD, Windows
 from lisa.testsuite import TestResult
 from lisa.tools import Lsblk, Swap
-from microsoft.testsuites.ltp.ltp import Ltp
+from lisa.util.sharding import TestShard, run_shards, split_tests
+from lisa.util.sub_test_stream import SubTestStream
+from microsoft.testsuites.ltp.ltp import Ltp, LtpResult
 
 
 @TestSuiteMetadata(
@@ -34,7 +43,11 @@ class LtpTestsuite(TestSuite):
 
     @TestCaseMetadata(
         description="""
-        This test case will run Ltp lite tests.
+        This test case will run Ltp lite tests. If the environment has
+        multiple nodes, tests are split into shards by durations of previous
+        runs, and shards run on nodes at the same time. Results are sent as
+        soon as each test completes. If the variable "resume_sub_tests" is
+        true, tests completed by an interrupted run are skipped.
         """,
         priority=3,
         timeout=_TIME_OUT,
@@ -49,7 +62,8 @@ class LtpTestsuite(TestSuite):
     )
     def verify_ltp_lite(
         self,
-        node: Node,
+        log: Logger,
+        environment: Environment,
         log_path: str,
         variables: Dict[str, Any],
         result: TestResult,
@@ -58,6 +72,7 @@ class LtpTestsuite(TestSuite):
         tests = variables.get("ltp_test", "")
         skip_tests = variables.get("ltp_skip_test", "")
         ltp_tests_git_tag = variables.get("ltp_tests_git_tag", "")
+        resume = variables.get("resume_sub_tests", False)
 
         # block device is required for few ltp tests
         # If not provided, we will find a disk with enough space
@@ -75,27 +90,100 @@ class LtpTestsuite(TestSuite):
         else:
             skip_test_list = []
 
-        if not block_device:
-            mountpoint = node.find_partition_with_freespace(
-                self.LTP_REQUIRED_DISK_SIZE_IN_GB, use_os_drive=False, raise_error=False
-            )
-            if mountpoint:
-                block_device = (
-                    node.tools[Lsblk].find_disk_by_mountpoint(mountpoint).device_name
-                )
+        # if the environment has multiple nodes, tests are sharded among them.
+        nodes = list(environment.nodes.list())
+        block_devices = [
+            block_device or self._find_block_device(node) for node in nodes
+        ]
+        ltp_tools = run_in_parallel(
+            [partial(self._get_ltp, node, ltp_tests_git_tag) for node in nodes], log
+        )
 
         # run ltp lite tests
-        ltp: Ltp = node.tools.get(Ltp, git_tag=ltp_tests_git_tag)
-        ltp.run_test(
-            result,
-            test_list,
-            skip_test_list,
-            log_path,
-            block_device=block_device,
-        )
+        if len(nodes) == 1:
+            ltp_tools[0].run_test(
+                result,
+                test_list,
+                skip_test_list,
+                log_path,
+                block_device=block_devices[0],
+                resume=resume,
+            )
+        else:
+            self._run_sharded(
+                log,
+                result,
+                ltp_tools,
+                block_devices,
+                test_list,
+                skip_test_list,
+                log_path,
+                resume,
+            )
 
     def after_case(self, log: Logger, **kwargs: Any) -> None:
         # remove swap file created by ltp run since
         # can interfere with other tests
-        node: Node = kwargs.pop("node")
-        node.tools[Swap].delete_swap()
+        environment: Environment = kwargs.pop("environment")
+        for node in environment.nodes.list():
+            node.tools[Swap].delete_swap()
+
+    def _get_ltp(self, node: Node, git_tag: str) -> Ltp:
+        ltp: Ltp = node.tools.get(Ltp, git_tag=git_tag)
+        return ltp
+
+    def _find_block_device(self, node: Node) -> Optional[str]:
+        block_device: Optional[str] = None
+        mountpoint = node.find_partition_with_freespace(
+            self.LTP_REQUIRED_DISK_SIZE_IN_GB, use_os_drive=False, raise_error=False
+        )
+        if mountpoint:
+            block_device = (
+                node.tools[Lsblk].find_disk_by_mountpoint(mountpoint).device_name
+            )
+        return block_device
+
+    def _run_sharded(
+        self,
+        log: Logger,
+        result: TestResult,
+        ltp_tools: List[Ltp],
+        block_devices: List[Optional[str]],
+        test_list: List[str],
+        skip_test_list: List[str],
+        log_path: str,
+        resume: bool,
+    ) -> None:
+        # shards share the stream, so all completed tests can be resumed by
+        # another count of shards.
+        stream = SubTestStream(result, resume=resume)
+        # tests are balanced by durations of previous runs.
+        test_names = [
+            x
+            for x in ltp_tools[0].get_runtest_entries(test_list)
+            if x not in stream.resumed
+        ]
+        durations = get_test_durations(result.runtime_data.name)
+        shards = split_tests(test_names, len(ltp_tools), durations)
+
+        def _run_shard(shard: TestShard, ltp: Ltp) -> List[LtpResult]:
+            shard_log_path = Path(log_path) / f"shard_{shard.index}"
+            shard_log_path.mkdir(parents=True, exist_ok=True)
+            return ltp.run_shard(
+                shard,
+                test_list,
+                skip_test_list,
+                str(shard_log_path),
+                block_device=block_devices[shard.index],
+                stream=stream,
+            )
+
+        shard_results = run_shards(shards, ltp_tools, _run_shard, log)
+
+        for shard, results in zip(shards, shard_results):
+            ltp_tools[0].send_results(result, results, shard, stream)
+        stream.complete()
+        failed_tests = stream.failed_tests
+        assert_that(
+            failed_tests, f"The following tests failed: {failed_tests}"
+        ).is_empty()
@@ -2,8 +2,10 @@
 # Licensed under the MIT license.
 import inspect
 import pathlib
+from dataclasses import replace
+from decimal import Decimal
 from functools import partial
-from typing import Any, Dict, List, Optional, Union, cast
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
 from assertpy import assert_that
 from retry import retry
@@ -49,8 +51,17 @@ from lisa.tools.ntttcp import (
     NTTTCP_TCP_CONCURRENCY_BSD,
     NTTTCP_UDP_CONCURRENCY,
 )
-from lisa.util import LisaException
+from lisa.util import LisaException, get_datetime_path
+from lisa.util.perf_harness import RepetitionSettings, measure
 from lisa.util.process import ExecutableResult, Process
+from microsoft.testsuites.performance.multipair import (
+    TOPOLOGY_PAIRS,
+    NodePair,
+    get_distinct_nodes,
+    get_node_pairs,
+    get_topology,
+    run_pairs,
+)
 
 
 def perf_disk(
@@ -71,8 +82,12 @@ def perf_disk(
     numjob: int = 0,
     overwrite: bool = False,
     cwd: Optional[pathlib.PurePath] = None,
+    repetition: Optional[RepetitionSettings] = None,
 ) -> None:
     fio_result_list: List[FIOResult] = []
+    # raw samples and statistics of repeated runs by qdepth.
+    fio_samples: Dict[int, Dict[str, List[float]]] = {}
+    fio_statistics: Dict[int, Dict[str, Dict[str, float]]] = {}
     fio = node.tools[Fio]
     numjobiterator = 0
     # In fio test, numjob*max_iodepth (aio-nr) should always be less than aio-max-nr.
@@ -91,19 +106,33 @@ def perf_disk(
         while iodepth <= max_iodepth:
             if num_jobs:
                 numjob = num_jobs[numjobindex]
-            fio_result = fio.launch(
-                name=f"iteration{numjobiterator}",
-                filename=filename,
-                mode=mode.name,
-                time=time,
-                size_gb=size_mb,
-                block_size=f"{block_size}K",
-                iodepth=iodepth,
-                overwrite=overwrite,
-                numjob=numjob,
-                cwd=cwd,
+            measurement = measure(
+                partial(
+                    fio.launch,
+                    name=f"iteration{numjobiterator}",
+                    filename=filename,
+                    mode=mode.name,
+                    time=time,
+                    size_gb=size_mb,
+                    block_size=f"{block_size}K",
+                    iodepth=iodepth,
+                    overwrite=overwrite,
+                    numjob=numjob,
+                    cwd=cwd,
+                ),
+                _get_fio_metrics,
+                settings=repetition,
+                log=node.log,
             )
+            fio_result = measurement.representative
             fio_result_list.append(fio_result)
+            if repetition and repetition.is_repeated:
+                fio_samples.setdefault(fio_result.qdepth, {}).update(
+                    measurement.get_raw_samples()
+                )
+                fio_statistics.setdefault(fio_result.qdepth, {}).update(
+                    measurement.get_statistics()
+                )
             iodepth = iodepth * 2
             numjobindex += 1
             numjobiterator += 1
@@ -123,9 +152,19 @@ def perf_disk(
         other_fields=other_fields,
     )
     for fio_message in fio_messages:
+        if fio_message.qdepth in fio_samples:
+            fio_message.samples = fio_samples[fio_message.qdepth]
+            fio_message.statistics = fio_statistics[fio_message.qdepth]
         notifier.notify(fio_message)
 
 
+def _get_fio_metrics(result: FIOResult) -> Dict[str, Any]:
+    return {
+        f"{result.mode}_iops": result.iops,
+        f"{result.mode}_lat_usec": result.latency,
+    }
+
+
 def get_nic_datapath(node: Node) -> str:
     data_path: str = ""
     assert (
@@ -234,11 +273,22 @@ def perf_tcp_pps(
         client_netperf.run_as_client_async(server.internal_address, core_count, port)
     client_sar = client.tools[Sar]
     server_sar = server.tools[Sar]
-    server_sar.get_statistics_async()
-    result = client_sar.get_statistics()
+    # record all activities of the client, like cpu, softirq and tcp, for the
+    # same period of pps statistics.
+    record_sysstat = not isinstance(client.os, BSD)
+    if record_sysstat:
+        client_sar.start_recording()
+    try:
+        server_sar.get_statistics_async()
+        result = client_sar.get_statistics()
+    finally:
+        if record_sysstat:
+            sysstat_data = client_sar.stop_recording()
     pps_message = client_sar.create_pps_performance_messages(
         result, inspect.stack()[1][3], test_type, test_result
     )
+    if record_sysstat:
+        client_sar.add_statistics(pps_message, sysstat_data)
     notifier.notify(pps_message)
 
 
@@ -252,6 +302,7 @@ def perf_ntttcp(  # noqa: C901
     lagscope_server_ip: Optional[str] = None,
     server_nic_name: Optional[str] = None,
     client_nic_name: Optional[str] = None,
+    repetition: Optional[RepetitionSettings] = None,
 ) -> List[Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]]:
     # Either server and client are set explicitly or we use the first two nodes
     # from the environment. We never combine the two options. We need to specify
@@ -356,65 +407,89 @@ def perf_ntttcp(  # noqa: C901
             if udp_mode:
                 buffer_size = int(1024 / 1024)
 
-            server_result = server_ntttcp.run_as_server_async(
-                server_nic_name,
-                server_ip=server.internal_address if isinstance(server.os, BSD) else "",
-                ports_count=num_threads_p,
-                buffer_size=buffer_size,
-                dev_differentiator=dev_differentiator,
-                udp_mode=udp_mode,
-            )
-            client_lagscope_process = client_lagscope.run_as_client_async(
-                server_ip=server.internal_address,
-                ping_count=0,
-                run_time_seconds=10,
-                print_histogram=False,
-                print_percentile=False,
-                histogram_1st_interval_start_value=0,
-                length_of_histogram_intervals=0,
-                count_of_histogram_intervals=0,
-                dump_csv=False,
-            )
-            client_ntttcp_result = client_ntttcp.run_as_client(
-                client_nic_name,
-                server.internal_address,
-                buffer_size=buffer_size,
-                threads_count=num_threads_n,
-                ports_count=num_threads_p,
-                dev_differentiator=dev_differentiator,
-                udp_mode=udp_mode,
-            )
-            server.tools[Kill].by_name(server_ntttcp.command)
-            server_ntttcp_result = server_result.wait_result()
-            server_result_temp = server_ntttcp.create_ntttcp_result(
-                server_ntttcp_result
-            )
-            client_result_temp = client_ntttcp.create_ntttcp_result(
-                client_ntttcp_result, role="client"
-            )
-            client_sar_result = client_lagscope_process.wait_result()
-            client_average_latency = client_lagscope.get_average(client_sar_result)
-            if udp_mode:
-                ntttcp_message: Union[
-                    NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage
-                ] = client_ntttcp.create_ntttcp_udp_performance_message(
-                    server_result_temp,
-                    client_result_temp,
-                    str(test_thread),
-                    buffer_size,
-                    test_case_name,
-                    test_result,
+            def _run_ntttcp(
+                num_threads_p: int = num_threads_p,
+                num_threads_n: int = num_threads_n,
+                buffer_size: int = buffer_size,
+                test_thread: int = test_thread,
+            ) -> Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]:
+                # one sample of the connection count, it may be repeated.
+                assert server and client and server_nic_name and client_nic_name
+                server_result = server_ntttcp.run_as_server_async(
+                    server_nic_name,
+                    server_ip=server.internal_address
+                    if isinstance(server.os, BSD)
+                    else "",
+                    ports_count=num_threads_p,
+                    buffer_size=buffer_size,
+                    dev_differentiator=dev_differentiator,
+                    udp_mode=udp_mode,
                 )
-            else:
-                ntttcp_message = client_ntttcp.create_ntttcp_tcp_performance_message(
-                    server_result_temp,
-                    client_result_temp,
-                    client_average_latency,
-                    str(test_thread),
-                    buffer_size,
-                    test_case_name,
-                    test_result,
+                client_lagscope_process = client_lagscope.run_as_client_async(
+                    server_ip=server.internal_address,
+                    ping_count=0,
+                    run_time_seconds=10,
+                    print_histogram=False,
+                    print_percentile=False,
+                    histogram_1st_interval_start_value=0,
+                    length_of_histogram_intervals=0,
+                    count_of_histogram_intervals=0,
+                    dump_csv=False,
+                )
+                client_ntttcp_result = client_ntttcp.run_as_client(
+                    client_nic_name,
+                    server.internal_address,
+                    buffer_size=buffer_size,
+                    threads_count=num_threads_n,
+                    ports_count=num_threads_p,
+                    dev_differentiator=dev_differentiator,
+                    udp_mode=udp_mode,
+                )
+                server.tools[Kill].by_name(server_ntttcp.command)
+                server_ntttcp_result = server_result.wait_result()
+                server_result_temp = server_ntttcp.create_ntttcp_result(
+                    server_ntttcp_result
+                )
+                client_result_temp = client_ntttcp.create_ntttcp_result(
+                    client_ntttcp_result, role="client"
                 )
+                client_sar_result = client_lagscope_process.wait_result()
+                client_average_latency = client_lagscope.get_average(client_sar_result)
+                if udp_mode:
+                    ntttcp_message: Union[
+                        NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage
+                    ] = client_ntttcp.create_ntttcp_udp_performance_message(
+                        server_result_temp,
+                        client_result_temp,
+                        str(test_thread),
+                        buffer_size,
+                        test_case_name,
+                        test_result,
+                    )
+                else:
+                    ntttcp_message = (
+                        client_ntttcp.create_ntttcp_tcp_performance_message(
+                            server_result_temp,
+                            client_result_temp,
+                            client_average_latency,
+                            str(test_thread),
+                            buffer_size,
+                            test_case_name,
+                            test_result,
+                        )
+                    )
+                return ntttcp_message
+
+            measurement = measure(
+                _run_ntttcp,
+                partial(_get_ntttcp_metrics, udp_mode=udp_mode),
+                settings=repetition,
+                log=client.log,
+            )
+            ntttcp_message = measurement.representative
+            if repetition and repetition.is_repeated:
+                ntttcp_message.samples = measurement.get_raw_samples()
+                ntttcp_message.statistics = measurement.get_statistics()
             notifier.notify(ntttcp_message)
             perf_ntttcp_message_list.append(ntttcp_message)
     finally:
@@ -435,6 +510,194 @@ def perf_ntttcp(  # noqa: C901
     return perf_ntttcp_message_list
 
 
+def _get_ntttcp_metrics(
+    message: Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage],
+    udp_mode: bool,
+) -> Dict[str, Any]:
+    if udp_mode:
+        assert isinstance(message, NetworkUDPPerformanceMessage)
+        return {
+            "tx_throughput_in_gbps": message.tx_throughput_in_gbps,
+            "rx_throughput_in_gbps": message.rx_throughput_in_gbps,
+            "data_loss": message.data_loss,
+        }
+    assert isinstance(message, NetworkTCPPerformanceMessage)
+    return {
+        "throughput_in_gbps": message.throughput_in_gbps,
+        "latency_us": message.latency_us,
+    }
+
+
+def perf_ntttcp_multi_pair(
+    test_result: TestResult,
+    topology: str = TOPOLOGY_PAIRS,
+    pair_count: int = 0,
+    connections: int = 64,
+    udp_mode: bool = False,
+    test_case_name: str = "",
+) -> List[Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]]:
+    """
+    Runs ntttcp on multiple pairs of nodes at the same time. It returns and
+    notifies a message per pair, and an aggregate message of all pairs. The
+    messages are tagged by the topology.
+    """
+    environment = test_result.environment
+    assert environment, "fail to get environment from testresult"
+    if not test_case_name:
+        test_case_name = inspect.stack()[1][3]
+
+    pairs = get_node_pairs(environment.nodes.list(), topology, pair_count)
+    nodes = get_distinct_nodes(pairs)
+    ntttcp_tools = run_in_parallel(
+        [lambda node=node: node.tools[Ntttcp] for node in nodes]  # type: ignore
+    )
+    for ntttcp in ntttcp_tools:
+        ntttcp.setup_system(udp_mode, set_task_max=False)
+
+    num_threads_p = min(connections, 64)
+    num_threads_n = max(1, connections // num_threads_p)
+    buffer_size = 1 if udp_mode else 64
+
+    def _get_base_port(pair: NodePair) -> int:
+        # servers of incast share a node, so each pair uses its own ports.
+        return 5001 + pair.index * (num_threads_p + 2)
+
+    def _start_server(pair: NodePair) -> Process:
+        nic_name, dev_differentiator = _get_ntttcp_nic(pair.server)
+        return pair.server.tools[Ntttcp].run_as_server_async(
+            nic_name,
+            ports_count=num_threads_p,
+            buffer_size=buffer_size,
+            server_ip=pair.server.internal_address
+            if isinstance(pair.server.os, BSD)
+            else "",
+            dev_differentiator=dev_differentiator,
+            udp_mode=udp_mode,
+            base_port=_get_base_port(pair),
+        )
+
+    def _run_client(pair: NodePair) -> ExecutableResult:
+        nic_name, dev_differentiator = _get_ntttcp_nic(pair.client)
+        return pair.client.tools[Ntttcp].run_as_client(
+            nic_name,
+            pair.server.internal_address,
+            buffer_size=buffer_size,
+            threads_count=num_threads_n,
+            ports_count=num_threads_p,
+            dev_differentiator=dev_differentiator,
+            udp_mode=udp_mode,
+            base_port=_get_base_port(pair),
+        )
+
+    try:
+        server_processes, client_results = run_pairs(
+            pairs, _start_server, _run_client, environment.log
+        )
+        for server in {pair.server.name: pair.server for pair in pairs}.values():
+            server.tools[Kill].by_name(server.tools[Ntttcp].command)
+
+        messages: List[
+            Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]
+        ] = []
+        for pair, server_process, client_result in zip(
+            pairs, server_processes, client_results
+        ):
+            message = _create_ntttcp_pair_message(
+                pair,
+                server_process.wait_result(),
+                client_result,
+                num_threads_p * num_threads_n,
+                buffer_size,
+                udp_mode,
+                test_case_name,
+                test_result,
+            )
+            message.topology = get_topology(pairs, topology, pair)
+            messages.append(message)
+
+        aggregate_message = _aggregate_ntttcp_messages(messages, pairs)
+        aggregate_message.topology = get_topology(pairs, topology)
+        messages.append(aggregate_message)
+        for message in messages:
+            notifier.notify(message)
+    finally:
+        for ntttcp in ntttcp_tools:
+            ntttcp.restore_system(udp_mode)
+    return messages
+
+
+def _get_ntttcp_nic(node: RemoteNode) -> Tuple[str, str]:
+    if NetworkDataPath.Sriov.value == get_nic_datapath(node):
+        return node.nics.get_primary_nic().pci_device_name, "mlx"
+    return node.nics.default_nic, "Hypervisor callback interrupts"
+
+
+def _create_ntttcp_pair_message(
+    pair: NodePair,
+    server_output: ExecutableResult,
+    client_output: ExecutableResult,
+    connections: int,
+    buffer_size: int,
+    udp_mode: bool,
+    test_case_name: str,
+    test_result: TestResult,
+) -> Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]:
+    client_ntttcp = pair.client.tools[Ntttcp]
+    server_result = pair.server.tools[Ntttcp].create_ntttcp_result(server_output)
+    client_result = client_ntttcp.create_ntttcp_result(client_output, role="client")
+    if udp_mode:
+        return client_ntttcp.create_ntttcp_udp_performance_message(
+            server_result,
+            client_result,
+            str(connections),
+            buffer_size,
+            test_case_name,
+            test_result,
+        )
+    # the latency isn't measured, when pairs run at the same time.
+    return client_ntttcp.create_ntttcp_tcp_performance_message(
+        server_result,
+        client_result,
+        Decimal(0),
+        str(connections),
+        buffer_size,
+        test_case_name,
+        test_result,
+    )
+
+
+def _aggregate_ntttcp_messages(
+    messages: List[Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]],
+    pairs: List[NodePair],
+) -> Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]:
+    aggregate = replace(messages[0])
+    aggregate.connections_num = sum(x.connections_num for x in messages)
+    aggregate.number_of_senders = len({x.client.name for x in pairs})
+    aggregate.number_of_receivers = len({x.server.name for x in pairs})
+    if isinstance(aggregate, NetworkUDPPerformanceMessage):
+        udp_messages = cast(List[NetworkUDPPerformanceMessage], messages)
+        aggregate.tx_throughput_in_gbps = Decimal(
+            sum(x.tx_throughput_in_gbps for x in udp_messages)
+        )
+        aggregate.rx_throughput_in_gbps = Decimal(
+            sum(x.rx_throughput_in_gbps for x in udp_messages)
+        )
+        aggregate.data_loss = (
+            100
+            * (aggregate.tx_throughput_in_gbps - aggregate.rx_throughput_in_gbps)
+            / aggregate.tx_throughput_in_gbps
+        )
+    else:
+        tcp_messages = cast(List[NetworkTCPPerformanceMessage], messages)
+        aggregate.throughput_in_gbps = Decimal(
+            sum(x.throughput_in_gbps for x in tcp_messages)
+        )
+        aggregate.tx_packets = Decimal(sum(x.tx_packets for x in tcp_messages))
+        aggregate.rx_packets = Decimal(sum(x.rx_packets for x in tcp_messages))
+        aggregate.retrans_segments = sum(x.retrans_segments for x in tcp_messages)
+    return aggregate
+
+
 def perf_iperf(
     test_result: TestResult,
     connections: List[int],
@@ -558,11 +821,16 @@ def perf_sockperf(
             "sockperf: Warmup stage",
             timeout=30,
         )
-        client_output = client.tools[Sockperf].run_client(
-            mode, server.nics.get_primary_nic().ip_addr
+        client_sockperf = client.tools[Sockperf]
+        full_log_path = client.working_path / f"sockperf-{get_datetime_path()}.csv"
+        client_output = client_sockperf.run_client(
+            mode, server.nics.get_primary_nic().ip_addr, str(full_log_path)
         )
-        client.tools[Sockperf].create_latency_performance_message(
-            client_output, test_case_name, test_result
+        client_sockperf.create_latency_performance_message(
+            client_output,
+            test_case_name,
+            test_result,
+            histogram=client_sockperf.get_latency_histogram(full_log_path),
         )
     finally:
         if server_proc.is_running():
@@ -0,0 +1,119 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+from dataclasses import dataclass
+from functools import partial
+from threading import Barrier
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, cast
+
+from lisa import Logger, Node, RemoteNode, SkippedException, run_in_parallel
+from lisa.util import LisaException
+
+# Each client sends to its own server, the nodes are paired in order.
+TOPOLOGY_PAIRS = "pairs"
+# All clients send to the same server, which is the second node.
+TOPOLOGY_INCAST = "incast"
+TOPOLOGY_AGGREGATE = "aggregate"
+
+# seconds to wait other clients before starting traffic.
+CLIENT_START_TIMEOUT = 600
+
+S = TypeVar("S")
+T = TypeVar("T")
+
+
+@dataclass
+class NodePair:
+    index: int
+    client: RemoteNode
+    server: RemoteNode
+
+    @property
+    def name(self) -> str:
+        return f"{self.index}:{self.client.name}->{self.server.name}"
+
+
+def get_node_pairs(
+    nodes: Iterable[Node], topology: str = TOPOLOGY_PAIRS, pair_count: int = 0
+) -> List[NodePair]:
+    """
+    Pairs nodes of an environment by the topology. Like single pair cases, the
+    first node of a pair is the client, and the second one is the server. If
+    the pair count is 0, all nodes are used.
+    """
+    remote_nodes = [cast(RemoteNode, x) for x in nodes]
+    if topology == TOPOLOGY_PAIRS:
+        pairs = [
+            NodePair(index=index, client=remote_nodes[i], server=remote_nodes[i + 1])
+            for index, i in enumerate(range(0, len(remote_nodes) - 1, 2))
+        ]
+    elif topology == TOPOLOGY_INCAST:
+        server = remote_nodes[1] if len(remote_nodes) > 1 else None
+        clients = [x for i, x in enumerate(remote_nodes) if i != 1]
+        pairs = (
+            [
+                NodePair(index=index, client=client, server=server)
+                for index, client in enumerate(clients)
+            ]
+            if server
+            else []
+        )
+    else:
+        raise LisaException(
+            f"unknown topology '{topology}', "
+            f"it should be '{TOPOLOGY_PAIRS}' or '{TOPOLOGY_INCAST}'."
+        )
+
+    if not pairs or len(pairs) < pair_count:
+        raise SkippedException(
+            f"topology '{topology}' needs {max(pair_count, 1)} pairs, "
+            f"but there are {len(pairs)} pairs in {len(remote_nodes)} nodes."
+        )
+    if pair_count:
+        pairs = pairs[:pair_count]
+    return pairs
+
+
+def get_topology(
+    pairs: List[NodePair], topology: str, pair: Optional[NodePair] = None
+) -> Dict[str, Any]:
+    """
+    The topology of a result. The node names are not included, so results of
+    different runs can be compared.
+    """
+    return {
+        "kind": topology,
+        "pair_count": len(pairs),
+        "pair": pair.index if pair else TOPOLOGY_AGGREGATE,
+    }
+
+
+def get_distinct_nodes(pairs: List[NodePair]) -> List[RemoteNode]:
+    nodes: Dict[str, RemoteNode] = {}
+    for pair in pairs:
+        nodes.setdefault(pair.client.name, pair.client)
+        nodes.setdefault(pair.server.name, pair.server)
+    return list(nodes.values())
+
+
+def run_pairs(
+    pairs: List[NodePair],
+    start_server: Callable[[NodePair], S],
+    run_client: Callable[[NodePair], T],
+    log: Logger,
+) -> Tuple[List[S], List[T]]:
+    """
+    Starts servers of all pairs, then runs all clients at the same time. It
+    returns results of servers and clients in the order of pairs.
+    """
+    servers = run_in_parallel([partial(start_server, pair) for pair in pairs], log)
+
+    # the clients wait each other, so the traffic of all pairs overlaps.
+    barrier = Barrier(len(pairs))
+
+    def _run_client(pair: NodePair) -> T:
+        barrier.wait(CLIENT_START_TIMEOUT)
+        log.debug(f"starting client of pair {pair.name}")
+        return run_client(pair)
+
+    clients = run_in_parallel([partial(_run_client, pair) for pair in pairs], log)
+    return servers, clients
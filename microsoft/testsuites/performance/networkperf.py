@@ -1,7 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 from functools import partial
-from typing import Any
+from typing import Any, Dict
 
 from lisa import (
     Logger,
@@ -26,14 +26,17 @@ from lisa.tools.iperf3 import (
 )
 from lisa.tools.sockperf import SOCKPERF_TCP, SOCKPERF_UDP
 from lisa.util.parallel import run_in_parallel
+from lisa.util.perf_harness import get_repetition_settings
 from microsoft.testsuites.performance.common import (
     cleanup_process,
     perf_iperf,
     perf_ntttcp,
+    perf_ntttcp_multi_pair,
     perf_sockperf,
     perf_tcp_latency,
     perf_tcp_pps,
 )
+from microsoft.testsuites.performance.multipair import TOPOLOGY_PAIRS
 
 
 @TestSuiteMetadata(
@@ -145,8 +148,12 @@ class NetworkPerformace(TestSuite):
             network_interface=Synthetic(),
         ),
     )
-    def perf_tcp_ntttcp_128_connections_synthetic(self, result: TestResult) -> None:
-        perf_ntttcp(result, connections=[128])
+    def perf_tcp_ntttcp_128_connections_synthetic(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp(
+            result, connections=[128], repetition=get_repetition_settings(variables)
+        )
 
     @TestCaseMetadata(
         description="""
@@ -162,8 +169,10 @@ class NetworkPerformace(TestSuite):
             )
         ),
     )
-    def perf_tcp_ntttcp_synthetic(self, result: TestResult) -> None:
-        perf_ntttcp(result)
+    def perf_tcp_ntttcp_synthetic(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp(result, repetition=get_repetition_settings(variables))
 
     @TestCaseMetadata(
         description="""
@@ -179,8 +188,33 @@ class NetworkPerformace(TestSuite):
             )
         ),
     )
-    def perf_tcp_ntttcp_sriov(self, result: TestResult) -> None:
-        perf_ntttcp(result)
+    def perf_tcp_ntttcp_sriov(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp(result, repetition=get_repetition_settings(variables))
+
+    @TestCaseMetadata(
+        description="""
+        This test case uses ntttcp to test aggregate sriov tcp network throughput
+         of multiple client and server pairs, which run at the same time. The
+         topology is "pairs" by default, and "incast" sends from all clients to
+         one server. It's set by the variable perf_multi_pair_topology.
+        """,
+        priority=3,
+        timeout=TIMEOUT,
+        requirement=simple_requirement(
+            min_count=4,
+            network_interface=Sriov(),
+        ),
+    )
+    def perf_tcp_ntttcp_multi_pair_sriov(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp_multi_pair(
+            result,
+            topology=variables.get("perf_multi_pair_topology", TOPOLOGY_PAIRS),
+            pair_count=int(variables.get("perf_multi_pair_count", 0)),
+        )
 
     @TestCaseMetadata(
         description="""
@@ -194,8 +228,12 @@ class NetworkPerformace(TestSuite):
             unsupported_os=[BSD, Windows],
         ),
     )
-    def perf_udp_1k_ntttcp_synthetic(self, result: TestResult) -> None:
-        perf_ntttcp(result, udp_mode=True)
+    def perf_udp_1k_ntttcp_synthetic(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp(
+            result, udp_mode=True, repetition=get_repetition_settings(variables)
+        )
 
     @TestCaseMetadata(
         description="""
@@ -209,8 +247,12 @@ class NetworkPerformace(TestSuite):
             unsupported_os=[BSD, Windows],
         ),
     )
-    def perf_udp_1k_ntttcp_sriov(self, result: TestResult) -> None:
-        perf_ntttcp(result, udp_mode=True)
+    def perf_udp_1k_ntttcp_sriov(
+        self, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        perf_ntttcp(
+            result, udp_mode=True, repetition=get_repetition_settings(variables)
+        )
 
     @TestCaseMetadata(
         description="""
@@ -27,6 +27,7 @@ from lisa.operating_system import SLES, Debian, Redhat
 from lisa.testsuite import TestResult, node_requirement
 from lisa.tools import FileSystem, Lscpu, Mkfs, Mount, NFSClient, NFSServer, Sysctl
 from lisa.util import SkippedException
+from lisa.util.perf_harness import get_repetition_settings
 from microsoft.testsuites.performance.common import (
     perf_disk,
     reset_partitions,
@@ -61,10 +62,13 @@ class StoragePerformance(TestSuite):
             ),
         ),
     )
-    def perf_ultra_datadisks_4k(self, node: Node, result: TestResult) -> None:
+    def perf_ultra_datadisks_4k(
+        self, node: Node, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
         self._perf_premium_datadisks(
             node=node,
             test_result=result,
+            variables=variables,
             disk_type=DiskType.ultradisk,
         )
 
@@ -83,10 +87,13 @@ class StoragePerformance(TestSuite):
             ),
         ),
     )
-    def perf_ultra_datadisks_1024k(self, node: Node, result: TestResult) -> None:
+    def perf_ultra_datadisks_1024k(
+        self, node: Node, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
         self._perf_premium_datadisks(
             node=node,
             test_result=result,
+            variables=variables,
             block_size=1024,
             disk_type=DiskType.ultradisk,
         )
@@ -106,8 +113,10 @@ class StoragePerformance(TestSuite):
             ),
         ),
     )
-    def perf_premium_datadisks_4k(self, node: Node, result: TestResult) -> None:
-        self._perf_premium_datadisks(node, result)
+    def perf_premium_datadisks_4k(
+        self, node: Node, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        self._perf_premium_datadisks(node, result, variables)
 
     @TestCaseMetadata(
         description="""
@@ -124,8 +133,10 @@ class StoragePerformance(TestSuite):
             ),
         ),
     )
-    def perf_premium_datadisks_1024k(self, node: Node, result: TestResult) -> None:
-        self._perf_premium_datadisks(node, result, block_size=1024)
+    def perf_premium_datadisks_1024k(
+        self, node: Node, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        self._perf_premium_datadisks(node, result, variables, block_size=1024)
 
     @TestCaseMetadata(
         description="""
@@ -142,8 +153,10 @@ class StoragePerformance(TestSuite):
             ),
         ),
     )
-    def perf_premium_datadisks_io(self, node: Node, result: TestResult) -> None:
-        self._perf_premium_datadisks(node, result, max_iodepth=64)
+    def perf_premium_datadisks_io(
+        self, node: Node, result: TestResult, variables: Dict[str, Any]
+    ) -> None:
+        self._perf_premium_datadisks(node, result, variables, max_iodepth=64)
 
     @TestCaseMetadata(
         description="""
@@ -501,6 +514,7 @@ class StoragePerformance(TestSuite):
         self,
         node: Node,
         test_result: TestResult,
+        variables: Dict[str, Any],
         disk_setup_type: DiskSetupType = DiskSetupType.raw,
         disk_type: DiskType = DiskType.premiumssd,
         block_size: int = 4,
@@ -532,6 +546,7 @@ class StoragePerformance(TestSuite):
             size_mb=8192,
             overwrite=True,
             test_result=test_result,
+            repetition=get_repetition_settings(variables),
         )
 
     def after_case(self, log: Logger, **kwargs: Any) -> None:
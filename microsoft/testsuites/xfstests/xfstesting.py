@@ -1,10 +1,12 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import string
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, cast
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, cast
 
 from lisa import (
+    Environment,
     Logger,
     Node,
     RemoteNode,
@@ -13,18 +15,22 @@ from lisa import (
     TestSuite,
     TestSuiteMetadata,
     UnsupportedDistroException,
+    run_in_parallel,
     schema,
     search_space,
     simple_requirement,
 )
 from lisa.features import Disk, Nvme
+from lisa.notifiers.result_store import get_test_durations
 from lisa.operating_system import BSD, Oracle, Redhat, Windows
 from lisa.sut_orchestrator import AZURE
 from lisa.sut_orchestrator.azure.features import AzureFileShare
 from lisa.sut_orchestrator.azure.platform_ import AzurePlatform
 from lisa.testsuite import TestResult
 from lisa.tools import Echo, FileSystem, KernelConfig, Mkfs, Mount, Parted
-from lisa.util import BadEnvironmentStateException, generate_random_chars
+from lisa.util import BadEnvironmentStateException, LisaException, generate_random_chars
+from lisa.util.sharding import TestShard, run_shards, split_tests
+from lisa.util.sub_test_stream import SubTestStream
 from microsoft.testsuites.xfstests.xfstests import Xfstests
 
 _scratch_folder = "/root/scratch"
@@ -95,7 +101,11 @@ def _prepare_azure_file_share(
     category="community",
     description="""
     This test suite is to validate different types of data disk on Linux VM
-     using xfstests.
+     using xfstests. If the environment has multiple nodes, tests of data disk
+     cases are split into shards by durations of previous runs, and shards run
+     on nodes at the same time. Results are sent as soon as each test
+     completes. If the variable "resume_sub_tests" is true, tests completed by
+     an interrupted run are skipped.
     """,
 )
 class Xfstesting(TestSuite):
@@ -135,6 +145,8 @@ class Xfstesting(TestSuite):
 
     def before_case(self, log: Logger, **kwargs: Any) -> None:
         node = kwargs["node"]
+        variables: Dict[str, Any] = kwargs["variables"]
+        self._resume = variables.get("resume_sub_tests", False)
         if isinstance(node.os, Oracle) and (node.os.information.version <= "9.0.0"):
             self.excluded_tests = self.excluded_tests + " btrfs/299"
 
@@ -157,21 +169,13 @@ class Xfstesting(TestSuite):
         priority=3,
     )
     def verify_generic_standard_datadisk(
-        self, log_path: Path, result: TestResult
+        self, log: Logger, log_path: Path, result: TestResult
     ) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        disk = node.features[Disk]
-        data_disks = disk.get_raw_data_disks()
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            data_disks[0],
-            f"{data_disks[0]}1",
-            f"{data_disks[0]}2",
+            disk_feature=Disk,
             excluded_tests=self.excluded_tests,
         )
 
@@ -193,20 +197,14 @@ class Xfstesting(TestSuite):
         use_new_environment=True,
         priority=3,
     )
-    def verify_xfs_standard_datadisk(self, log_path: Path, result: TestResult) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        disk = node.features[Disk]
-        data_disks = disk.get_raw_data_disks()
+    def verify_xfs_standard_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            data_disks[0],
-            f"{data_disks[0]}1",
-            f"{data_disks[0]}2",
+            disk_feature=Disk,
             test_type=FileSystem.xfs.name,
             excluded_tests=self.excluded_tests,
         )
@@ -229,20 +227,14 @@ class Xfstesting(TestSuite):
         use_new_environment=True,
         priority=3,
     )
-    def verify_ext4_standard_datadisk(self, log_path: Path, result: TestResult) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        disk = node.features[Disk]
-        data_disks = disk.get_raw_data_disks()
+    def verify_ext4_standard_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            data_disks[0],
-            f"{data_disks[0]}1",
-            f"{data_disks[0]}2",
+            disk_feature=Disk,
             file_system=FileSystem.ext4,
             test_type=FileSystem.ext4.name,
             excluded_tests=self.excluded_tests,
@@ -267,22 +259,16 @@ class Xfstesting(TestSuite):
         priority=3,
     )
     def verify_btrfs_standard_datadisk(
-        self, log_path: Path, result: TestResult
+        self, log: Logger, log_path: Path, result: TestResult
     ) -> None:
         environment = result.environment
         assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        self._check_btrfs_supported(node)
-        xfstests = self._install_xfstests(node)
-        disk = node.features[Disk]
-        data_disks = disk.get_raw_data_disks()
+        self._check_btrfs_supported(environment.nodes[0])
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            data_disks[0],
-            f"{data_disks[0]}1",
-            f"{data_disks[0]}2",
+            disk_feature=Disk,
             file_system=FileSystem.btrfs,
             test_type=FileSystem.btrfs.name,
             excluded_tests=self.excluded_tests,
@@ -300,20 +286,14 @@ class Xfstesting(TestSuite):
             supported_features=[Nvme], unsupported_os=[BSD, Windows]
         ),
     )
-    def verify_generic_nvme_datadisk(self, log_path: Path, result: TestResult) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        nvme_disk = node.features[Nvme]
-        nvme_data_disks = nvme_disk.get_raw_data_disks()
+    def verify_generic_nvme_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            nvme_data_disks[0],
-            f"{nvme_data_disks[0]}p1",
-            f"{nvme_data_disks[0]}p2",
+            disk_feature=Nvme,
             excluded_tests=self.excluded_tests,
         )
 
@@ -329,20 +309,14 @@ class Xfstesting(TestSuite):
             supported_features=[Nvme], unsupported_os=[BSD, Windows]
         ),
     )
-    def verify_xfs_nvme_datadisk(self, log_path: Path, result: TestResult) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        nvme_disk = node.features[Nvme]
-        nvme_data_disks = nvme_disk.get_raw_data_disks()
+    def verify_xfs_nvme_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            nvme_data_disks[0],
-            f"{nvme_data_disks[0]}p1",
-            f"{nvme_data_disks[0]}p2",
+            disk_feature=Nvme,
             test_type=FileSystem.xfs.name,
             excluded_tests=self.excluded_tests,
         )
@@ -359,20 +333,14 @@ class Xfstesting(TestSuite):
             supported_features=[Nvme], unsupported_os=[BSD, Windows]
         ),
     )
-    def verify_ext4_nvme_datadisk(self, log_path: Path, result: TestResult) -> None:
-        environment = result.environment
-        assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        xfstests = self._install_xfstests(node)
-        nvme_disk = node.features[Nvme]
-        nvme_data_disks = nvme_disk.get_raw_data_disks()
+    def verify_ext4_nvme_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            nvme_data_disks[0],
-            f"{nvme_data_disks[0]}p1",
-            f"{nvme_data_disks[0]}p2",
+            disk_feature=Nvme,
             file_system=FileSystem.ext4,
             test_type=FileSystem.ext4.name,
             excluded_tests=self.excluded_tests,
@@ -390,21 +358,17 @@ class Xfstesting(TestSuite):
             supported_features=[Nvme], unsupported_os=[BSD, Windows]
         ),
     )
-    def verify_btrfs_nvme_datadisk(self, log_path: Path, result: TestResult) -> None:
+    def verify_btrfs_nvme_datadisk(
+        self, log: Logger, log_path: Path, result: TestResult
+    ) -> None:
         environment = result.environment
         assert environment, "fail to get environment from testresult"
-        node = cast(RemoteNode, environment.nodes[0])
-        self._check_btrfs_supported(node)
-        xfstests = self._install_xfstests(node)
-        nvme_disk = node.features[Nvme]
-        nvme_data_disks = nvme_disk.get_raw_data_disks()
+        self._check_btrfs_supported(environment.nodes[0])
         self._execute_xfstests(
+            log,
             log_path,
-            xfstests,
             result,
-            nvme_data_disks[0],
-            f"{nvme_data_disks[0]}p1",
-            f"{nvme_data_disks[0]}p2",
+            disk_feature=Nvme,
             file_system=FileSystem.btrfs,
             test_type=FileSystem.btrfs.name,
             excluded_tests=self.excluded_tests,
@@ -461,9 +425,10 @@ class Xfstesting(TestSuite):
             azure_file_share.create_fileshare_folders(test_folders_share_dict)
 
             self._execute_xfstests(
+                log,
                 log_path,
-                xfstests,
                 result,
+                xfstests=xfstests,
                 test_dev=fs_url_dict[file_share_name],
                 scratch_dev=fs_url_dict[scratch_name],
                 excluded_tests=self.excluded_tests,
@@ -475,25 +440,28 @@ class Xfstesting(TestSuite):
 
     def after_case(self, log: Logger, **kwargs: Any) -> None:
         try:
-            node: Node = kwargs.pop("node")
-            for path in [
-                "/dev/mapper/delay-test",
-                "/dev/mapper/huge-test",
-                "/dev/mapper/huge-test-zero",
-            ]:
-                if 0 == node.execute(f"ls -lt {path}", sudo=True).exit_code:
-                    node.execute(f"dmsetup remove {path}", sudo=True)
-            for mount_point in [_scratch_folder, _test_folder]:
-                node.tools[Mount].umount("", mount_point, erase=False)
+            # tests may be sharded to all nodes, so all of them are cleaned up.
+            environment: Environment = kwargs.pop("environment")
+            for node in environment.nodes.list():
+                for path in [
+                    "/dev/mapper/delay-test",
+                    "/dev/mapper/huge-test",
+                    "/dev/mapper/huge-test-zero",
+                ]:
+                    if 0 == node.execute(f"ls -lt {path}", sudo=True).exit_code:
+                        node.execute(f"dmsetup remove {path}", sudo=True)
+                for mount_point in [_scratch_folder, _test_folder]:
+                    node.tools[Mount].umount("", mount_point, erase=False)
         except Exception as identifier:
             raise BadEnvironmentStateException(f"after case, {identifier}")
 
     def _execute_xfstests(
         self,
+        log: Logger,
         log_path: Path,
-        xfstests: Xfstests,
         result: TestResult,
-        data_disk: str = "",
+        disk_feature: Optional[Union[Type[Disk], Type[Nvme]]] = None,
+        xfstests: Optional[Xfstests] = None,
         test_dev: str = "",
         scratch_dev: str = "",
         file_system: FileSystem = FileSystem.xfs,
@@ -501,10 +469,64 @@ class Xfstesting(TestSuite):
         excluded_tests: str = "",
         mount_opts: str = "",
     ) -> None:
+        """
+        If disk_feature is set, tests run on the first data disk of it, and
+        tests are sharded among all nodes of the environment. Otherwise, they
+        run on the first node with the specified devices.
+        """
         environment = result.environment
         assert environment, "fail to get environment from testresult"
 
-        node = cast(RemoteNode, environment.nodes[0])
+        nodes = [cast(RemoteNode, x) for x in environment.nodes.list()]
+        if not disk_feature:
+            nodes = nodes[:1]
+        # results are sent as soon as each test completes, and tests completed
+        # by an interrupted run are excluded, if it's resumed.
+        stream = SubTestStream(result, resume=self._resume)
+        excluded_tests = " ".join([excluded_tests] + stream.completed_tests)
+        prepare = partial(
+            self._prepare_xfstests,
+            disk_feature=disk_feature,
+            xfstests=xfstests,
+            test_dev=test_dev,
+            scratch_dev=scratch_dev,
+            file_system=file_system,
+            test_type=test_type,
+            excluded_tests=excluded_tests,
+            mount_opts=mount_opts,
+        )
+        prepared = run_in_parallel([partial(prepare, node) for node in nodes], log)
+
+        if len(prepared) == 1:
+            xfstests, data_disk = prepared[0]
+            try:
+                xfstests.run_test(
+                    test_type, log_path, result, data_disk, self.TIME_OUT, stream
+                )
+            finally:
+                stream.complete()
+        else:
+            self._run_sharded(log, log_path, result, prepared, test_type, stream)
+
+        resumed_failures = [x for x in stream.failed_tests if x in stream.resumed]
+        if resumed_failures:
+            raise LisaException(f"Fail resumed cases {' '.join(resumed_failures)}")
+
+    def _prepare_xfstests(
+        self,
+        node: RemoteNode,
+        disk_feature: Optional[Union[Type[Disk], Type[Nvme]]],
+        xfstests: Optional[Xfstests],
+        test_dev: str,
+        scratch_dev: str,
+        file_system: FileSystem,
+        test_type: str,
+        excluded_tests: str,
+        mount_opts: str,
+    ) -> Tuple[Xfstests, str]:
+        if not xfstests:
+            xfstests = self._install_xfstests(node)
+
         # TODO: will include generic/641 once the kernel contains below fix.
         # exclude this case generic/641 temporarily
         # it will trigger oops on RHEL8.3/8.4, VM will reboot
@@ -517,7 +539,14 @@ class Xfstesting(TestSuite):
             excluded_tests += " generic/641"
 
         # prepare data disk when xfstesting target is data disk
-        if data_disk:
+        data_disk = ""
+        if disk_feature:
+            feature = cast(Union[Disk, Nvme], node.features[disk_feature])
+            data_disk = feature.get_raw_data_disks()[0]
+            # nvme partitions have "p" before the number, like nvme0n1p1.
+            separator = "p" if issubclass(disk_feature, Nvme) else ""
+            test_dev = f"{data_disk}{separator}1"
+            scratch_dev = f"{data_disk}{separator}2"
             _prepare_data_disk(
                 node,
                 data_disk,
@@ -534,7 +563,55 @@ class Xfstesting(TestSuite):
             mount_opts,
         )
         xfstests.set_excluded_tests(excluded_tests)
-        xfstests.run_test(test_type, log_path, result, data_disk, self.TIME_OUT)
+        return xfstests, data_disk
+
+    def _run_sharded(
+        self,
+        log: Logger,
+        log_path: Path,
+        result: TestResult,
+        prepared: List[Tuple[Xfstests, str]],
+        test_type: str,
+        stream: SubTestStream,
+    ) -> None:
+        # tests are balanced by durations of previous runs.
+        tests = prepared[0][0].list_tests(test_type)
+        durations = get_test_durations(result.runtime_data.name)
+        shards = split_tests(tests, len(prepared), durations)
+
+        def _run_shard(shard: TestShard, item: Tuple[Xfstests, str]) -> None:
+            xfstests, data_disk = item
+            xfstests.run_tests(
+                test_type,
+                timeout=self.TIME_OUT,
+                tests=shard.tests,
+                stream=stream,
+                data_disk=data_disk,
+                shard=shard,
+            )
+
+        run_shards(shards, prepared, _run_shard, log)
+
+        # results are checked after all shards completed, so the shard timing
+        # is in messages, and failures of all shards are reported.
+        failures: List[str] = []
+        for shard in shards:
+            xfstests, data_disk = prepared[shard.index]
+            shard_log_path = log_path / f"shard_{shard.index}"
+            try:
+                xfstests.check_test_results(
+                    shard_log_path,
+                    test_type,
+                    result,
+                    data_disk,
+                    shard=shard,
+                    stream=stream,
+                )
+            except LisaException as identifier:
+                failures.append(f"shard {shard.index}: {identifier}")
+        stream.complete()
+        if failures:
+            raise LisaException("\n".join(failures))
 
     def _install_xfstests(self, node: Node) -> Xfstests:
         try:
@@ -2,8 +2,9 @@
 # Licensed under the MIT license.
 import re
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path, PurePath
-from typing import Any, Dict, List, Type, cast
+from typing import Any, Dict, List, Optional, Type, cast
 
 from assertpy import assert_that
 
@@ -19,8 +20,10 @@ from lisa.operating_system import (
     Ubuntu,
 )
 from lisa.testsuite import TestResult
-from lisa.tools import Cat, Chmod, Echo, Git, Make, Pgrep
+from lisa.tools import Cat, Chmod, Echo, Git, Make, Pgrep, Tail
 from lisa.util import LisaException, UnsupportedDistroException, find_patterns_in_lines
+from lisa.util.sharding import TestShard
+from lisa.util.sub_test_stream import SubTestStream
 
 
 @dataclass
@@ -139,6 +142,20 @@ class Xfstests(Tool):
         re.MULTILINE,
     )
 
+    # generic/001
+    __test_name_pattern = re.compile(r"^(\w+/\d+)\s*$", re.MULTILINE)
+    # generic/001 5
+    __duration_pattern = re.compile(r"^(\w+/\d+)\s+(\d+)\s*$", re.MULTILINE)
+    # lines of the console log, when each test completes.
+    # generic/001 5s ...  4s
+    # generic/002       [not run] this test requires a valid $SCRATCH_DEV
+    # generic/003       - output mismatch (see .../generic/003.out.bad)
+    # generic/004       [expunged]
+    __console_result_pattern = re.compile(r"^(?P<name>\w+/\d+)\s+(?P<result>.+)$")
+    __console_failure_pattern = re.compile(r"output mismatch|\[failed|_check_\w+")
+    __console_duration_pattern = re.compile(r"(?P<duration>\d+)s\s*$")
+    __ansi_escape_pattern = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+
     @property
     def command(self) -> str:
         # The command is not used
@@ -160,22 +177,87 @@ class Xfstests(Tool):
         result: TestResult,
         data_disk: str = "",
         timeout: int = 14400,
+        stream: Optional[SubTestStream] = None,
     ) -> None:
+        self.run_tests(test_type, timeout=timeout, stream=stream, data_disk=data_disk)
+
+        self.check_test_results(
+            log_path=log_path,
+            test_type=test_type,
+            result=result,
+            data_disk=data_disk,
+            stream=stream,
+        )
+
+    def run_tests(
+        self,
+        test_type: str,
+        timeout: int = 14400,
+        tests: Optional[List[str]] = None,
+        stream: Optional[SubTestStream] = None,
+        data_disk: str = "",
+        shard: Optional[TestShard] = None,
+    ) -> None:
+        """
+        Runs the quick group of the test type, or the specified tests. The
+        results are checked by check_test_results. If the stream is specified,
+        results are sent by it as soon as each test completes.
+        """
+        if tests:
+            parameters = f"-E exclude.txt {' '.join(tests)}"
+        else:
+            parameters = f"-g {test_type}/quick -E exclude.txt "
         self.run_async(
-            f"-g {test_type}/quick -E exclude.txt  > xfstest.log 2>&1",
+            f"{parameters} > xfstest.log 2>&1",
             sudo=True,
             shell=True,
             force_run=True,
             cwd=self.get_xfstests_path(),
         )
 
-        pgrep = self.node.tools[Pgrep]
         # this is the actual process name, when xfstests runs.
-        pgrep.wait_processes("check", timeout=timeout)
+        if stream:
+            information = self._get_information(test_type, data_disk, shard)
+            self.node.tools[Tail].follow(
+                [self.get_xfstests_path() / "xfstest.log"],
+                partial(self._handle_live_line, stream, information),
+                "check",
+                timeout=timeout,
+                sudo=True,
+            )
+        else:
+            pgrep = self.node.tools[Pgrep]
+            pgrep.wait_processes("check", timeout=timeout)
 
-        self.check_test_results(
-            log_path=log_path, test_type=test_type, result=result, data_disk=data_disk
+    def list_tests(self, test_type: str) -> List[str]:
+        """
+        Returns tests of the quick group, which are not excluded. The local
+        config should be set, because the check script validates it.
+        """
+        result = self.run(
+            f"-n -g {test_type}/quick -E exclude.txt",
+            sudo=True,
+            shell=True,
+            force_run=True,
+            cwd=self.get_xfstests_path(),
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to list xfstests",
         )
+        return self.__test_name_pattern.findall(result.stdout)
+
+    def get_test_durations(self) -> Dict[str, float]:
+        """
+        Returns durations in seconds of the last run of tests. The check script
+        saves them in results/check.time.
+        """
+        time_path = self.get_xfstests_path() / "results/check.time"
+        if not self.node.shell.exists(time_path):
+            return {}
+        content = self.node.tools[Cat].read(str(time_path), force_run=True, sudo=True)
+        return {
+            name: float(duration)
+            for name, duration in self.__duration_pattern.findall(content)
+        }
 
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         super()._initialize(*args, **kwargs)
@@ -344,6 +426,8 @@ class Xfstests(Tool):
         raw_message: str,
         test_type: str,
         data_disk: str,
+        shard: Optional[TestShard] = None,
+        stream: Optional[SubTestStream] = None,
     ) -> None:
         all_cases_match = self.__all_cases_pattern.match(raw_message)
         assert all_cases_match, "fail to find run cases from xfstests output"
@@ -366,12 +450,19 @@ class Xfstests(Tool):
             results.append(XfstestsResult(case, TestStatus.PASSED))
         for case in not_run_cases:
             results.append(XfstestsResult(case, TestStatus.SKIPPED))
+        durations = self.get_test_durations()
         for result in results:
+            information = self._get_information(test_type, data_disk, shard)
+            if result.name in durations:
+                information["duration"] = durations[result.name]
+            if stream:
+                # results sent by the live parser are skipped.
+                stream.send(result.name, result.status, information)
+                continue
+
             # create test result message
             info: Dict[str, Any] = {}
-            info["information"] = {}
-            info["information"]["test_type"] = test_type
-            info["information"]["data_disk"] = data_disk
+            info["information"] = information
             send_sub_test_result_message(
                 test_result=test_result,
                 test_case_name=result.name,
@@ -385,6 +476,8 @@ class Xfstests(Tool):
         test_type: str,
         result: TestResult,
         data_disk: str = "",
+        shard: Optional[TestShard] = None,
+        stream: Optional[SubTestStream] = None,
     ) -> None:
         xfstests_path = self.get_xfstests_path()
         console_log_results_path = xfstests_path / "xfstest.log"
@@ -397,9 +490,10 @@ class Xfstests(Tool):
             str(console_log_results_path), force_run=True, sudo=True
         )
         log_result.assert_exit_code()
-        ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-        raw_message = ansi_escape.sub("", log_result.stdout)
-        self.create_send_subtest_msg(result, raw_message, test_type, data_disk)
+        raw_message = self.__ansi_escape_pattern.sub("", log_result.stdout)
+        self.create_send_subtest_msg(
+            result, raw_message, test_type, data_disk, shard, stream
+        )
 
         results_path = xfstests_path / "results/check.log"
         if not self.node.shell.exists(results_path):
@@ -437,6 +531,42 @@ class Xfstests(Tool):
             f" {fail_cases}, details {fail_info}, please investigate."
         )
 
+    def _get_information(
+        self, test_type: str, data_disk: str, shard: Optional[TestShard]
+    ) -> Dict[str, Any]:
+        information: Dict[str, Any] = {"test_type": test_type, "data_disk": data_disk}
+        if shard:
+            information.update(shard.get_information())
+        return information
+
+    def _handle_live_line(
+        self,
+        stream: SubTestStream,
+        information: Dict[str, Any],
+        path: PurePath,
+        line: str,
+    ) -> None:
+        matched = self.__console_result_pattern.match(
+            self.__ansi_escape_pattern.sub("", line).strip()
+        )
+        if not matched:
+            return
+        result = matched.group("result")
+        information = dict(information)
+        if "[expunged]" in result:
+            return
+        elif "[not run]" in result:
+            status = TestStatus.SKIPPED
+        elif self.__console_failure_pattern.search(result):
+            status = TestStatus.FAILED
+        else:
+            duration_matched = self.__console_duration_pattern.search(result)
+            if not duration_matched:
+                return
+            status = TestStatus.PASSED
+            information["duration"] = float(duration_matched.group("duration"))
+        stream.send(matched.group("name"), status, information)
+
     def save_xfstests_log(
         self, fail_cases: List[str], log_path: Path, test_type: str
     ) -> None:
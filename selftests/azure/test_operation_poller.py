@@ -0,0 +1,177 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import threading
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Optional
+from unittest import TestCase
+
+from lisa.sut_orchestrator.azure import common, operation_poller
+from lisa.sut_orchestrator.azure.operation_poller import OperationPoller
+from lisa.util import LisaTimeoutException
+from lisa.util.perf_timer import create_timer
+
+
+class MockResult:
+    def __init__(self, value: Dict[str, Any]) -> None:
+        self._value = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._value
+
+
+class MockOperation:
+    """
+    A test double of the Azure SDK LROPoller. Like it, the operation runs in its
+    own thread, which calls the done callbacks before it exits. done() returns
+    True after the thread exits, and result() joins the thread.
+    """
+
+    def __init__(
+        self,
+        duration: float = 0,
+        result: Any = None,
+        error: Optional[Exception] = None,
+        call_back: bool = True,
+    ) -> None:
+        self._result = result
+        self._error = error
+        self._call_back = call_back
+        self._callbacks: List[Callable[[Any], None]] = []
+        self._is_finished = False
+        self._lock = threading.Lock()
+        self.done_count = 0
+        self._thread = threading.Thread(target=self._run, args=(duration,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add_done_callback(self, func: Callable[[Any], None]) -> None:
+        with self._lock:
+            if not self._is_finished:
+                self._callbacks.append(func)
+                return
+        func(self._result)
+
+    def done(self) -> bool:
+        self.done_count += 1
+        return not self._thread.is_alive()
+
+    def result(self) -> Any:
+        # like the SDK, it raises an error, if it's called in the callbacks.
+        self._thread.join()
+        if self._error:
+            raise self._error
+        return self._result
+
+    def _run(self, duration: float) -> None:
+        sleep(duration)
+        with self._lock:
+            self._is_finished = True
+            callbacks = self._callbacks if self._call_back else []
+        for callback in callbacks:
+            callback(self._result)
+
+
+class OperationPollerTestCase(TestCase):
+    def setUp(self) -> None:
+        self._poller = OperationPoller(min_interval=0.01, max_interval=0.05, backoff=2)
+
+    def tearDown(self) -> None:
+        self._poller.stop()
+
+    def test_complete_many_operations(self) -> None:
+        operations = [MockOperation(duration=0.1, result=index) for index in range(200)]
+        futures = [self._poller.submit(operation) for operation in operations]
+
+        results = [future.result(timeout=10) for future in futures]
+
+        self.assertListEqual(list(range(200)), results)
+        self.assertEqual(0, self._poller.pending_count)
+
+    def test_complete_by_callback(self) -> None:
+        poller = OperationPoller(max_interval=60)
+        try:
+            operation = MockOperation(duration=0.1, result=1)
+            future = poller.submit(operation)
+
+            # it's completed by the callback, not the fallback interval.
+            self.assertEqual(1, future.result(timeout=5))
+            self.assertEqual(0, operation.done_count)
+        finally:
+            poller.stop()
+
+    def test_complete_without_callback(self) -> None:
+        # the fallback interval completes it, if the SDK doesn't call back.
+        future = self._poller.submit(MockOperation(result=1, call_back=False))
+
+        self.assertEqual(1, future.result(timeout=10))
+
+    def test_raise_operation_error(self) -> None:
+        future = self._poller.submit(MockOperation(error=ValueError("failed")))
+
+        with self.assertRaises(ValueError):
+            future.result(timeout=10)
+
+    def test_same_operation_same_future(self) -> None:
+        operation = MockOperation(duration=0.2)
+
+        self.assertIs(self._poller.submit(operation), self._poller.submit(operation))
+
+    def test_adaptive_interval(self) -> None:
+        done_time = monotonic() + 0.5
+        check_count = 0
+
+        def check() -> bool:
+            nonlocal check_count
+            check_count += 1
+            return monotonic() >= done_time
+
+        self._poller.submit_check(check).result(timeout=10)
+
+        # the interval grows to 0.05, so it polls much less than the busy loop.
+        self.assertLess(check_count, 20)
+
+    def test_check_function(self) -> None:
+        values = iter([False, False, True])
+        future = self._poller.submit_check(lambda: next(values))
+
+        self.assertTrue(future.result(timeout=10))
+
+    def test_drop_cancelled_operation(self) -> None:
+        operation = MockOperation(duration=0.2, result=1)
+        future = self._poller.submit(operation)
+        self.assertTrue(future.cancel())
+
+        # a new future is created for the cancelled operation.
+        second_future = self._poller.submit(operation)
+        self.assertIsNot(future, second_future)
+        self.assertEqual(1, second_future.result(timeout=10))
+
+        # the poller thread is still alive after completing around cancelled
+        # futures, so later operations are completed.
+        self.assertEqual(2, self._poller.submit(MockOperation(result=2)).result(10))
+        self.assertEqual(0, self._poller.pending_count)
+
+
+class WaitOperationTestCase(TestCase):
+    def test_wait_operation_result(self) -> None:
+        operation = MockOperation(duration=0.1, result=MockResult({"name": "rg"}))
+
+        result = common.wait_operation(operation)
+
+        self.assertDictEqual({"name": "rg"}, result)
+
+    def test_wait_operation_timeout(self) -> None:
+        operation = MockOperation(duration=60)
+
+        with self.assertRaises(LisaTimeoutException):
+            common.wait_operation(operation, time_out=1)
+
+    def test_cancel_future_on_timeout(self) -> None:
+        future: "operation_poller.Future[Any]" = operation_poller.Future()
+
+        result = common._wait_future(future, 0.1, create_timer())
+
+        self.assertIs(common._WAIT_TIMEOUT, result)
+        # the poller drops cancelled futures, so they aren't polled anymore.
+        self.assertTrue(future.cancelled())
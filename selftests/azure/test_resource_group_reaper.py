@@ -0,0 +1,176 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+import socket
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from threading import Lock
+from typing import Any, List, Set
+from unittest import TestCase
+
+from lisa.sut_orchestrator.azure.operation_poller import OperationPoller
+from lisa.sut_orchestrator.azure.resource_group_reaper import (
+    RESOURCE_GROUP_STATE_CREATED,
+    RESOURCE_GROUP_STATE_DELETED,
+    ResourceGroupJournal,
+    ResourceGroupReaper,
+    ResourceGroupRecord,
+)
+from lisa.util import LisaException, constants
+from lisa.util.logger import Logger
+from selftests.azure.test_operation_poller import MockOperation
+
+SUBSCRIPTION_ID = "mock subscription id"
+
+
+class ResourceGroupReaperTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._journal = ResourceGroupJournal(
+            Path(self._temp_dir.name) / "resource_groups.jsonl"
+        )
+        self._poller = OperationPoller(min_interval=0.01, max_interval=0.05)
+        self._existing: Set[str] = set()
+        self._deleted: List[str] = []
+        self._lock = Lock()
+        self._reaper = ResourceGroupReaper(
+            subscription_id=SUBSCRIPTION_ID,
+            journal=self._journal,
+            exists_func=self._exists,
+            delete_func=self._begin_delete,
+            concurrency=2,
+            poller=self._poller,
+        )
+
+    def tearDown(self) -> None:
+        self._reaper.close()
+        self._poller.stop()
+        self._temp_dir.cleanup()
+
+    def test_delete_in_background(self) -> None:
+        names = [f"lisa-rg-{index}" for index in range(10)]
+        for name in names:
+            self._reaper.track(name)
+            self._existing.add(name)
+
+        futures = [self._reaper.delete(name) for name in names]
+        for future in futures:
+            future.result(timeout=10)
+
+        self.assertSetEqual(set(names), set(self._deleted))
+        records = self._journal.load()
+        self.assertTrue(
+            all(x.state == RESOURCE_GROUP_STATE_DELETED for x in records.values())
+        )
+
+    def test_skip_not_existing(self) -> None:
+        self._reaper.track("lisa-rg-0")
+
+        self._reaper.delete("lisa-rg-0").result(timeout=10)
+
+        self.assertListEqual([], self._deleted)
+
+    def test_reconcile_orphans(self) -> None:
+        # a run crashed on this host, its process doesn't exist anymore.
+        self._journal.append(
+            [
+                ResourceGroupRecord(
+                    name="lisa-crashed",
+                    subscription_id=SUBSCRIPTION_ID,
+                    run_id="crashed run",
+                    host=socket.gethostname(),
+                    pid=self._get_not_existing_pid(),
+                ),
+                ResourceGroupRecord(
+                    name="lisa-deleted",
+                    subscription_id=SUBSCRIPTION_ID,
+                    state=RESOURCE_GROUP_STATE_DELETED,
+                    run_id="finished run",
+                ),
+                ResourceGroupRecord(
+                    name="lisa-running",
+                    subscription_id=SUBSCRIPTION_ID,
+                    run_id="running run",
+                    host=socket.gethostname(),
+                    pid=os.getppid(),
+                ),
+                # a long run on another machine, which shares the cache.
+                ResourceGroupRecord(
+                    name="lisa-other-host",
+                    subscription_id=SUBSCRIPTION_ID,
+                    run_id="other run",
+                    host="other host",
+                    updated_time=(datetime.now() - timedelta(days=7)).isoformat(),
+                ),
+            ]
+        )
+        self._existing.update(["lisa-crashed", "lisa-running", "lisa-other-host"])
+
+        orphans = self._reaper.reconcile_orphans()
+        self._reaper.close()
+
+        self.assertListEqual(["lisa-crashed"], orphans)
+        records = self._journal.load()
+        self.assertNotIn((SUBSCRIPTION_ID, "lisa-deleted"), records)
+        for name in ["lisa-running", "lisa-other-host"]:
+            self.assertEqual(
+                RESOURCE_GROUP_STATE_CREATED, records[(SUBSCRIPTION_ID, name)].state
+            )
+
+    def test_keep_failed_deletion_in_journal(self) -> None:
+        self._reaper.track("lisa-failed")
+        self._existing.add("lisa-failed")
+        self._reaper._delete_func = self._fail_delete
+
+        with self.assertRaises(ValueError):
+            self._reaper.delete("lisa-failed").result(timeout=10)
+
+        record = self._journal.load()[(SUBSCRIPTION_ID, "lisa-failed")]
+        self.assertEqual(RESOURCE_GROUP_STATE_CREATED, record.state)
+        self.assertEqual(constants.RUN_ID, record.run_id)
+
+    def test_ignore_failure_to_begin_deletion(self) -> None:
+        self._reaper.track("lisa-failed")
+        self._existing.add("lisa-failed")
+        self._reaper._delete_func = self._fail_begin_delete
+
+        # like deleting in the runner thread, the caller isn't failed.
+        self._reaper.delete("lisa-failed").result(timeout=10)
+
+        record = self._journal.load()[(SUBSCRIPTION_ID, "lisa-failed")]
+        self.assertEqual(RESOURCE_GROUP_STATE_CREATED, record.state)
+
+    def test_delete_after_close(self) -> None:
+        self._reaper.close()
+
+        with self.assertRaises(LisaException):
+            self._reaper.delete("lisa-rg-0").result(timeout=10)
+
+    def _exists(self, name: str) -> bool:
+        with self._lock:
+            return name in self._existing
+
+    def _begin_delete(self, name: str, log: Logger) -> Any:
+        with self._lock:
+            self._existing.remove(name)
+            self._deleted.append(name)
+        return MockOperation(duration=0.05)
+
+    def _fail_delete(self, name: str, log: Logger) -> Any:
+        return MockOperation(error=ValueError("failed to delete"))
+
+    def _fail_begin_delete(self, name: str, log: Logger) -> Any:
+        raise ValueError("failed to begin deleting")
+
+    def _get_not_existing_pid(self) -> int:
+        pid = 4194304
+        while True:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return pid
+            except PermissionError:
+                pass
+            pid -= 1
@@ -0,0 +1,145 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock
+from types import SimpleNamespace
+from typing import Any, List, Optional, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+from lisa.sut_orchestrator.azure import common
+from lisa.sut_orchestrator.azure.common import VhdStagingPipeline
+from lisa.util.logger import Logger, get_logger
+
+
+class MockPlatform:
+    subscription_id = "mock subscription id"
+
+
+class VhdStagingPipelineTestCase(TestCase):
+    def setUp(self) -> None:
+        self._pipeline = VhdStagingPipeline(max_workers=4)
+        self._platform: Any = MockPlatform()
+        self._log = get_logger("vhd_staging")
+        self._calls: List[Tuple[str, str]] = []
+        self._lock = Lock()
+        self._release = Event()
+        self._fail = False
+
+    def test_share_copy_in_flight(self) -> None:
+        with patch.object(common, "_stage_vhd", self._stage_vhd):
+            futures = [
+                self._pipeline.stage(self._platform, "vhd", "westus2", self._log)
+                for _ in range(5)
+            ]
+            self._release.set()
+            results = {future.result(timeout=10) for future in futures}
+
+        self.assertSetEqual({"westus2/vhd"}, results)
+        self.assertListEqual([("vhd", "westus2")], self._calls)
+
+    def test_copy_locations_concurrently(self) -> None:
+        locations = ["westus2", "eastus2", "northeurope"]
+        with patch.object(common, "_stage_vhd", self._stage_vhd):
+            futures = self._pipeline.stage_all(
+                self._platform, "vhd", locations, self._log
+            )
+            self._release.set()
+            results = {
+                location: future.result(timeout=10)
+                for location, future in futures.items()
+            }
+
+        self.assertDictEqual({x: f"{x}/vhd" for x in locations}, results)
+        self.assertEqual(3, len(self._calls))
+
+    def test_retry_failed_copy(self) -> None:
+        self._release.set()
+        self._fail = True
+        with patch.object(common, "_stage_vhd", self._stage_vhd):
+            future = self._pipeline.stage(self._platform, "vhd", "westus2", self._log)
+            with self.assertRaises(ValueError):
+                future.result(timeout=10)
+
+            self._fail = False
+            result = self._pipeline.stage(
+                self._platform, "vhd", "westus2", self._log
+            ).result(timeout=10)
+
+        self.assertEqual("westus2/vhd", result)
+        self.assertEqual(2, len(self._calls))
+
+    def _stage_vhd(
+        self, platform: Any, vhd_path: str, location: str, log: Logger
+    ) -> str:
+        with self._lock:
+            self._calls.append((vhd_path, location))
+        self._release.wait(10)
+        if self._fail:
+            raise ValueError("failed to copy")
+        return f"{location}/{vhd_path}"
+
+
+class MockMarkerClient:
+    """
+    A test double of the marker blob. The marker is owned by another process,
+    which was modified at the last modified time.
+    """
+
+    blob_name = "vhd.lisa-copying"
+
+    def __init__(self, last_modified: Optional[datetime]) -> None:
+        self.last_modified = last_modified
+        self.upload_count = 0
+
+    def upload_blob(self, data: str) -> None:
+        self.upload_count += 1
+        if self.last_modified:
+            raise ResourceExistsError("exists")
+        self.last_modified = datetime.now(timezone.utc)
+
+    def get_blob_properties(self) -> Any:
+        if not self.last_modified:
+            raise ResourceNotFoundError("not found")
+        return SimpleNamespace(last_modified=self.last_modified)
+
+    def delete_blob(self) -> None:
+        self.last_modified = None
+
+
+class VhdCopyMarkerTestCase(TestCase):
+    def setUp(self) -> None:
+        self._log = get_logger("vhd_marker")
+
+    def test_wait_for_owner(self) -> None:
+        marker_client: Any = MockMarkerClient(datetime.now(timezone.utc))
+
+        self.assertFalse(common._acquire_vhd_copy_marker(marker_client, self._log))
+        self.assertEqual(1, marker_client.upload_count)
+
+    def test_take_over_stale_marker(self) -> None:
+        marker_client: Any = MockMarkerClient(
+            datetime.now(timezone.utc)
+            - timedelta(hours=common.BLOB_COPY_PENDING_TIMEOUT_HOURS + 1)
+        )
+
+        # the waiting returns at once, so the stale marker is taken over.
+        common._wait_vhd_copy_marker_released(marker_client, "vhd", timeout=10)
+
+        self.assertTrue(common._acquire_vhd_copy_marker(marker_client, self._log))
+        self.assertEqual(2, marker_client.upload_count)
+
+    def test_bounded_attempts(self) -> None:
+        marker_client: Any = MockMarkerClient(datetime.now(timezone.utc))
+        # the marker is always released, when it's checked, and recreated by
+        # another process, when it's uploaded.
+        marker_client.get_blob_properties = self._raise_not_found
+
+        self.assertFalse(common._acquire_vhd_copy_marker(marker_client, self._log))
+        self.assertEqual(common._VHD_COPY_MARKER_ATTEMPTS, marker_client.upload_count)
+
+    def _raise_not_found(self) -> Any:
+        raise ResourceNotFoundError("not found")
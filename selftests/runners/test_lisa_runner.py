@@ -14,6 +14,7 @@ from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.runner import RunnerResult
 from lisa.runners.lisa_runner import LisaRunner
 from lisa.testsuite import TestResult, simple_requirement
+from lisa.util.case_duration import DurationHistory
 from lisa.util.parallel import Task
 from selftests import test_platform, test_testsuite
 from selftests.test_environment import generate_runbook as generate_env_runbook
@@ -292,6 +293,124 @@ class RunnerTestCase(TestCase):
             test_results=test_results,
         )
 
+    def test_case_new_env_reset_customized(self) -> None:
+        # same as test_case_new_env_run_only_1_needed_customized, but the
+        # platform can reset the environment, so all cases run on it.
+        test_testsuite.generate_cases_metadata()
+        env_runbook = generate_env_runbook(is_single_env=True, local=True, remote=True)
+        runner = generate_runner(
+            env_runbook,
+            case_use_new_env=True,
+            platform_schema=test_platform.MockPlatformSchema(support_reset=True),
+        )
+        test_results = self._run_all_tests(runner)
+
+        self.verify_env_results(
+            expected_prepared=["customized_0"],
+            expected_deployed_envs=["customized_0"],
+            expected_deleted_envs=["customized_0"],
+            runner=runner,
+        )
+        platform = cast(test_platform.MockPlatform, runner.platform)
+        self.assertListEqual(
+            ["customized_0", "customized_0"], platform.test_data.reset_envs
+        )
+        self.verify_test_results(
+            expected_test_order=["mock_ut1", "mock_ut2", "mock_ut3"],
+            expected_envs=["customized_0", "customized_0", "customized_0"],
+            expected_status=[TestStatus.PASSED, TestStatus.PASSED, TestStatus.PASSED],
+            expected_message=["", "", ""],
+            test_results=test_results,
+        )
+
+    def test_case_new_env_snapshot_failed(self) -> None:
+        # the snapshot fails, so cases run, but the environment is deployed
+        # again, instead of being reset.
+        test_testsuite.generate_cases_metadata()
+        env_runbook = generate_env_runbook(is_single_env=True, local=True, remote=True)
+        runner = generate_runner(
+            env_runbook,
+            case_use_new_env=True,
+            platform_schema=test_platform.MockPlatformSchema(
+                support_reset=True, snapshot_success=False
+            ),
+        )
+        test_results = self._run_all_tests(runner)
+
+        platform = cast(test_platform.MockPlatform, runner.platform)
+        self.assertListEqual([], platform.test_data.reset_envs)
+        self.verify_test_results(
+            expected_test_order=["mock_ut1", "mock_ut2", "mock_ut3"],
+            expected_envs=["customized_0", "", ""],
+            expected_status=[TestStatus.PASSED, TestStatus.SKIPPED, TestStatus.SKIPPED],
+            expected_message=["", self.__skipped_no_env, self.__skipped_no_env],
+            test_results=test_results,
+        )
+
+    def test_sort_by_duration(self) -> None:
+        # in the same priority, suites with longer cases go first, and cases of
+        # a suite stay together, longer ones first.
+        test_testsuite.generate_cases_metadata()
+        env_runbook = generate_env_runbook(is_single_env=True, local=True, remote=True)
+        runner = generate_runner(env_runbook)
+        runner.initialize()
+        results = {x.runtime_data.metadata.name: x for x in runner.test_results}
+        for result in results.values():
+            result.runtime_data.metadata.priority = 1
+
+        for durations, expected_order in [
+            ({"mock_ut1": 10, "mock_ut2": 20, "mock_ut3": 30}, ["3", "2", "1"]),
+            ({"mock_ut1": 10, "mock_ut2": 40, "mock_ut3": 30}, ["2", "1", "3"]),
+        ]:
+            runner._duration_history = DurationHistory()
+            for name, duration in durations.items():
+                runner._duration_history.add_case_duration(
+                    results[name].runtime_data.metadata.full_name,
+                    runner._get_case_environment_type(results[name]),
+                    duration,
+                )
+
+            sorted_results = runner._sort_test_results(runner.test_results)
+
+            self.assertListEqual(
+                [f"mock_ut{x}" for x in expected_order],
+                [x.runtime_data.metadata.name for x in sorted_results],
+            )
+
+    def test_is_packable(self) -> None:
+        # a short case runs on the deployed environment, instead of deploying
+        # a new one.
+        test_testsuite.generate_cases_metadata()
+        env_runbook = generate_env_runbook(local=True, remote=True)
+        runner = generate_runner(env_runbook)
+        runner.initialize()
+        new_environment, deployed_environment = runner.environments
+        result = next(
+            x for x in runner.test_results if x.runtime_data.metadata.name == "mock_ut2"
+        )
+        case_name = result.runtime_data.metadata.full_name
+        case_type = runner._get_case_environment_type(result)
+        history = runner._duration_history
+        history.add_case_duration(case_name, case_type, 10)
+
+        # no history of deployments.
+        deployed_environment.status = EnvironmentStatus.Deployed
+        self.assertFalse(runner._is_packable(new_environment, result))
+
+        history.add_deployment_duration(
+            runner._get_environment_type(new_environment), 100
+        )
+        self.assertTrue(runner._is_packable(new_environment, result))
+
+        # no other environment is deployed.
+        deployed_environment.status = EnvironmentStatus.Prepared
+        self.assertFalse(runner._is_packable(new_environment, result))
+        deployed_environment.status = EnvironmentStatus.Deployed
+
+        # the case is longer than the deployment.
+        history.add_case_duration(case_name, case_type, 1000)
+        self.assertFalse(runner._is_packable(new_environment, result))
+
     def test_case_new_env_run_only_1_needed_generated(self) -> None:
         # same predefined env as test_fit_a_bigger_env,
         # but all case want to run on a new env
@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from lisa.notifiers.common import BufferedWriter, SnapshotWriter
+
+
+class BufferedWriterTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "messages.log"
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_write_on_close(self) -> None:
+        writer = BufferedWriter(self._path, flush_interval=60)
+        for index in range(10):
+            writer.write(f"line {index}\n")
+
+        # nothing is written before the interval.
+        self.assertFalse(self._path.exists())
+
+        writer.close()
+        self.assertEqual(
+            "".join(f"line {x}\n" for x in range(10)), self._path.read_text()
+        )
+
+    def test_coalesce_by_key(self) -> None:
+        writer = BufferedWriter(self._path, flush_interval=60)
+        writer.write("env1: deploying\n", key="env1")
+        writer.write("env2: deploying\n", key="env2")
+        writer.write("env1: deployed\n", key="env1")
+        writer.write("message\n")
+        writer.close()
+
+        self.assertEqual(
+            "env2: deploying\nenv1: deployed\nmessage\n", self._path.read_text()
+        )
+
+    def test_bound_pending(self) -> None:
+        writer = BufferedWriter(self._path, flush_interval=60, max_pending=5)
+        for index in range(7):
+            writer.write(f"line {index}\n")
+
+        # the first 5 lines are written, when the buffer is full.
+        self.assertEqual(5, len(self._path.read_text().splitlines()))
+        writer.close()
+        self.assertEqual(7, len(self._path.read_text().splitlines()))
+
+    def test_write_without_buffer(self) -> None:
+        writer = BufferedWriter(self._path, flush_interval=0)
+        writer.write("line\n")
+
+        self.assertEqual("line\n", self._path.read_text())
+        writer.close()
+
+    def test_write_after_close(self) -> None:
+        writer = BufferedWriter(self._path, flush_interval=60)
+        writer.write("line\n")
+        writer.close()
+
+        # a late message is written at once, and the file isn't left open.
+        writer.write("late\n")
+
+        self.assertEqual("line\nlate\n", self._path.read_text())
+        self.assertIsNone(writer._file)
+
+
+class SnapshotWriterTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "stats.log"
+        self._render_count = 0
+        self._state = ""
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_coalesce_updates(self) -> None:
+        writer = SnapshotWriter(self._path, render=self._render, flush_interval=60)
+        for index in range(100):
+            self._state = f"state {index}"
+            writer.update()
+        writer.close()
+
+        self.assertEqual("state 99", self._path.read_text())
+        self.assertEqual(1, self._render_count)
+
+    def test_skip_if_not_updated(self) -> None:
+        writer = SnapshotWriter(self._path, render=self._render, flush_interval=60)
+        writer.close()
+
+        self.assertFalse(self._path.exists())
+        self.assertEqual(0, self._render_count)
+
+    def _render(self) -> str:
+        self._render_count += 1
+        return self._state
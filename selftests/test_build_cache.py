@@ -0,0 +1,74 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from lisa.util import build_cache
+from lisa.util.build_cache import BUILD_CACHE_ENV_NAME, BuildCache
+
+
+class BuildCacheTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._parts = {
+            "tool": "fio",
+            "revision": "abc",
+            "distro": "Ubuntu",
+            "version": "22.4.0",
+            "arch": "x86_64",
+        }
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_key(self) -> None:
+        cache = BuildCache(self._path)
+        key = cache.get_key(self._parts)
+
+        self.assertTrue(key.startswith("fio_"))
+        # the order of parts doesn't matter.
+        reversed_parts = dict(reversed(list(self._parts.items())))
+        self.assertEqual(key, cache.get_key(reversed_parts))
+        self.assertNotEqual(key, cache.get_key({**self._parts, "arch": "aarch64"}))
+        self.assertIs(cache.lock(key), cache.lock(key))
+
+    def test_put_and_get(self) -> None:
+        cache = BuildCache(self._path / "cache")
+        key = cache.get_key(self._parts)
+        self.assertIsNone(cache.get(key))
+
+        file = self._path / "artifact.tar.gz"
+        file.write_bytes(b"content")
+        path = cache.put(key, self._parts, file)
+
+        self.assertEqual(path, cache.get(key))
+        self.assertFalse(file.exists())
+        self.assertEqual(b"content", path.read_bytes())
+        with open(path.with_name(f"{key}.json")) as f:
+            self.assertDictEqual(self._parts, json.load(f))
+
+        cache.remove(key)
+        self.assertIsNone(cache.get(key))
+
+    def test_get_build_cache_from_env(self) -> None:
+        with patch.object(build_cache, "_build_cache", None):
+            with patch.dict(os.environ, {BUILD_CACHE_ENV_NAME: str(self._path)}):
+                cache = build_cache.get_build_cache()
+            assert cache
+            self.assertEqual(self._path, cache.path)
+
+        with patch.object(build_cache, "_build_cache", None):
+            with patch.dict(os.environ, {BUILD_CACHE_ENV_NAME: ""}):
+                self.assertIsNone(build_cache.get_build_cache())
+
+        # it's opt-in, so it's disabled without the variable.
+        with patch.object(build_cache, "_build_cache", None):
+            with patch.dict(os.environ):
+                os.environ.pop(BUILD_CACHE_ENV_NAME, None)
+                self.assertIsNone(build_cache.get_build_cache())
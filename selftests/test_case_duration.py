@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from lisa.util.case_duration import DurationHistory, predict_makespan
+from lisa.util.sharding import DEFAULT_TEST_DURATION
+
+
+class DurationHistoryTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "case_durations.json"
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_estimate(self) -> None:
+        history = DurationHistory()
+        self.assertEqual(DEFAULT_TEST_DURATION, history.estimate_case_duration("a"))
+
+        history.add_case_duration("a", "ready_1", 100)
+        history.add_case_duration("a", "ready_1", 200)
+        history.add_case_duration("a", "ready_2", 400)
+        history.add_case_duration("b", "ready_1", 10)
+
+        # the moving average follows the latest duration partially.
+        self.assertEqual(130, history.estimate_case_duration("a", "ready_1"))
+        # the case ran on other types only.
+        self.assertEqual(265, history.estimate_case_duration("a", "azure_1"))
+        # unknown cases use the median of known durations.
+        self.assertEqual(130, history.estimate_case_duration("c", "ready_1"))
+
+    def test_save_and_load(self) -> None:
+        history = DurationHistory(self._path)
+        history.add_case_duration("a", "ready_1", 100)
+        history.add_deployment_duration("ready_1", 300)
+        history.save()
+
+        loaded = DurationHistory(self._path)
+
+        self.assertEqual(100, loaded.get_case_duration("a", "ready_1"))
+        self.assertEqual(300, loaded.get_deployment_duration("ready_1"))
+        self.assertIsNone(loaded.get_deployment_duration("ready_2"))
+
+    def test_broken_file(self) -> None:
+        self._path.write_text("{")
+        history = DurationHistory(self._path)
+        self.assertIsNone(history.get_case_duration("a"))
+
+    def test_predict_makespan(self) -> None:
+        self.assertEqual(0, predict_makespan([], 2))
+        self.assertEqual(60, predict_makespan([10, 20, 30], 1))
+        # the longest one runs alone, and others share the other worker.
+        self.assertEqual(60, predict_makespan([10, 20, 30, 60], 2))
+        # at least one worker runs them.
+        self.assertEqual(60, predict_makespan([10, 20, 30], 0))
@@ -0,0 +1,51 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from unittest import TestCase
+
+from lisa.util.process import CommandBatch, ExecutableResult, Process
+from lisa.util.shell import LocalShell
+
+
+class CommandBatchTestCase(TestCase):
+    def test_run_in_shell(self) -> None:
+        commands = [
+            "echo line1; echo line2",
+            "echo error >&2; exit 3",
+            "true",
+            # the comment doesn't break the script.
+            "cd /; pwd # comment",
+            "pwd",
+            # it cannot consume commands after it.
+            "cat",
+        ]
+        batch = CommandBatch(commands)
+        shell = LocalShell()
+        shell.initialize()
+        process = Process("0", shell)
+        process.start(batch.script, shell=True)
+
+        results = batch.split_result(process.wait_result(10))
+
+        self.assertListEqual(commands, [x.cmd for x in results])
+        self.assertListEqual([0, 3, 0, 0, 0, 0], [x.exit_code for x in results])
+        self.assertListEqual(
+            ["line1\nline2", "error", "", "/", results[4].stdout, ""],
+            [x.stdout for x in results],
+        )
+        # cd doesn't affect the next command.
+        self.assertNotEqual("/", results[4].stdout)
+
+    def test_split_pty_output(self) -> None:
+        batch = CommandBatch(["echo a", "sleep 100", "echo b"])
+        marker = batch._marker
+        # the remote pty ends lines with "\r\n", and the script is timed out.
+        stdout = f"{marker}:0\r\na\r\n\r\n{marker}:0:0\r\n{marker}:1\r\n"
+        result = ExecutableResult(stdout, "", 1, batch.script, 5, is_timeout=True)
+
+        results = batch.split_result(result)
+
+        self.assertListEqual(
+            [("a", 0, False), ("", None, True), ("", None, True)],
+            [(x.stdout, x.exit_code, x.is_timeout) for x in results],
+        )
@@ -0,0 +1,116 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+import xml.etree.ElementTree as ET  # noqa: N817
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+
+from lisa.messages import (
+    MessageBase,
+    SubTestMessage,
+    TestResultMessage,
+    TestRunMessage,
+    TestRunStatus,
+    TestStatus,
+)
+from lisa.notifiers.junit import JUnit, JUnitSchema
+from lisa.util import constants
+
+
+def _generate_messages() -> List[MessageBase]:
+    messages: List[MessageBase] = [
+        TestRunMessage(status=TestRunStatus.INITIALIZING, runbook_name="runbook")
+    ]
+    for suite_index in range(3):
+        for case_index in range(4):
+            id_ = f"{suite_index}_{case_index}"
+            name = f"case_{case_index}"
+            suite = f"lisa.suite_{suite_index}"
+            messages.append(
+                TestResultMessage(
+                    id_=id_,
+                    name=name,
+                    suite_full_name=suite,
+                    status=TestStatus.RUNNING,
+                )
+            )
+            messages.append(
+                SubTestMessage(id_=id_, name="sub", status=TestStatus.RUNNING)
+            )
+            messages.append(
+                SubTestMessage(
+                    id_=id_, name="sub", status=TestStatus.PASSED, elapsed=0.5
+                )
+            )
+            status = TestStatus.FAILED if case_index == 1 else TestStatus.PASSED
+            messages.append(
+                TestResultMessage(
+                    id_=id_,
+                    name=name,
+                    suite_full_name=suite,
+                    status=status,
+                    message='failed with "quotes" & <brackets>',
+                    stacktrace="line1\nline2",
+                    elapsed=1.5,
+                )
+            )
+    messages.append(TestRunMessage(status=TestRunStatus.SUCCESS, elapsed=20))
+    return messages
+
+
+class JUnitTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._original_log_path = constants.RUN_LOCAL_LOG_PATH
+        constants.RUN_LOCAL_LOG_PATH = Path(self._temp_dir.name)
+
+    def tearDown(self) -> None:
+        constants.RUN_LOCAL_LOG_PATH = self._original_log_path
+        self._temp_dir.cleanup()
+
+    def test_streaming_same_as_tree(self) -> None:
+        tree_path = self._run(JUnitSchema(type="junit", path="tree.xml"))
+        streaming_path = self._run(
+            JUnitSchema(type="junit", path="streaming.xml", streaming=True)
+        )
+
+        self.assertEqual(
+            ET.canonicalize(from_file=tree_path),
+            ET.canonicalize(from_file=streaming_path),
+        )
+        root = ET.parse(streaming_path).getroot()
+        self.assertEqual("24", root.attrib["tests"])
+        self.assertEqual("3", root.attrib["failures"])
+        # the spool is removed, when the report is assembled.
+        self.assertFalse(Path(f"{streaming_path}.spool").exists())
+
+    def test_streaming_checkpoint(self) -> None:
+        runbook = JUnitSchema(
+            type="junit", path="checkpoint.xml", streaming=True, checkpoint_interval=1
+        )
+        notifier = JUnit(runbook)
+        notifier.initialize()
+        # the report is not kept open, so it can be replaced on Windows.
+        self.assertIsNone(notifier._report_file)
+        root = ET.parse(notifier._report_path).getroot()
+        self.assertEqual(0, len(root.findall("./testsuite")))
+        for message in _generate_messages()[:5]:
+            # make the checkpoint due
+            notifier._checkpoint_timer.start -= 10
+            notifier._received_message(message)
+
+        # the run is not finished, but the report is complete.
+        root = ET.parse(notifier._report_path).getroot()
+        self.assertEqual("2", root.attrib["tests"])
+        self.assertEqual(2, len(root.findall("./testsuite/testcase")))
+        notifier.finalize()
+
+    def _run(self, runbook: JUnitSchema) -> Path:
+        notifier = JUnit(runbook)
+        notifier.initialize()
+        for message in _generate_messages():
+            notifier._received_message(message)
+        notifier.finalize()
+        return constants.RUN_LOCAL_LOG_PATH / runbook.path
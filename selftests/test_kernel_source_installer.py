@@ -0,0 +1,30 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from unittest import TestCase
+
+from lisa.transformers.kernel_source_installer import (
+    SourceInstallerSchema,
+    calculate_build_jobs,
+)
+
+
+class SourceInstallerTestCase(TestCase):
+    def test_build_jobs(self) -> None:
+        self.assertEqual(8, calculate_build_jobs(8, 16 * 1024))
+        # limited by memory
+        self.assertEqual(4, calculate_build_jobs(64, 2 * 1024))
+        self.assertEqual(1, calculate_build_jobs(2, 256))
+
+    def test_ccache_schema(self) -> None:
+        runbook = SourceInstallerSchema.schema().load(  # type: ignore
+            {
+                "type": "source",
+                "location": {"type": "repo", "path": "/tmp/code"},
+                "ccache": {"controller_path": "ccache"},
+            }
+        )
+
+        self.assertEqual("ccache", runbook.ccache.controller_path)
+        self.assertEqual("$HOME/.ccache", runbook.ccache.path)
+        self.assertEqual(0, runbook.build_jobs)
@@ -0,0 +1,79 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import random
+from unittest import TestCase
+
+from lisa.tools.lagscope import parse_lagscope_csv
+from lisa.tools.sockperf import parse_sockperf_full_log
+from lisa.util import LisaException
+from lisa.util import perf_statistics as stats
+from lisa.util.latency_histogram import LatencyHistogram, merge_histograms
+
+
+class LatencyHistogramTestCase(TestCase):
+    def test_percentiles(self) -> None:
+        generator = random.Random(0)
+        values = [generator.lognormvariate(5, 0.5) for _ in range(20000)]
+        histogram = LatencyHistogram()
+        histogram.record_many(values)
+
+        sorted_values = sorted(values)
+        for percent in [50, 90, 99, 99.9]:
+            expected = stats.percentile(sorted_values, percent)
+            self.assertAlmostEqual(
+                expected, histogram.get_percentile(percent), delta=expected * 0.01
+            )
+        self.assertEqual(min(values), histogram.get_percentile(0))
+        self.assertEqual(max(values), histogram.get_percentile(100))
+        # the size is bounded by the range of values, not the count.
+        self.assertLess(len(histogram.counts), 2000)
+
+    def test_merge(self) -> None:
+        first = LatencyHistogram()
+        first.record_many([100, 200, 300])
+        second = LatencyHistogram()
+        second.record_many([400, 500])
+
+        merged = merge_histograms([first, second])
+
+        self.assertEqual(5, merged.total_count)
+        self.assertEqual(300, merged.mean)
+        self.assertEqual(100, merged.min)
+        self.assertEqual(500, merged.max)
+        self.assertAlmostEqual(300, merged.get_percentile(50), delta=3)
+        with self.assertRaises(LisaException):
+            first.merge(LatencyHistogram(significant_bits=4))
+
+    def test_serialize(self) -> None:
+        histogram = LatencyHistogram()
+        histogram.record_many([1.5, 2.5, 1000.25])
+
+        restored = LatencyHistogram.from_dict(
+            json.loads(json.dumps(histogram.to_dict()))
+        )
+
+        self.assertDictEqual(histogram.get_statistics(), restored.get_statistics())
+        self.assertEqual(1.5, restored.get_statistics()["min"])
+
+    def test_parse_tool_logs(self) -> None:
+        histogram = parse_lagscope_csv(["Iteration,Latency(us)\n", "1, 295\n", "2,305"])
+        self.assertEqual(2, histogram.total_count)
+        self.assertEqual(300, histogram.mean)
+
+        histogram, lost_count = parse_sockperf_full_log(
+            [
+                "------------------------------\n",
+                "packet, txTime(sec), rxTime(sec)\n",
+                "1, 1658925451.123456789, 1658925451.123756789\n",
+                "2, 1658925451.200000000, 1658925451.200100500\n",
+                # lost packets
+                "3, 1658925451.300000000, 0.000000000\n",
+                "4, 1658925451.400000000, 1658925451.399999999\n",
+            ]
+        )
+        self.assertEqual(2, histogram.total_count)
+        self.assertEqual(2, lost_count)
+        self.assertAlmostEqual(100.5, histogram.min)
+        self.assertAlmostEqual(300, histogram.max)
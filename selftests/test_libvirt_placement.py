@@ -0,0 +1,82 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from unittest import TestCase
+
+from lisa.sut_orchestrator.libvirt.placement import HostCapacity, HostLedger
+from lisa.sut_orchestrator.libvirt.schema import (
+    PLACEMENT_POLICY_PACK,
+    PLACEMENT_POLICY_SPREAD,
+)
+from lisa.util import LisaException
+
+
+class HostLedgerTestCase(TestCase):
+    def setUp(self) -> None:
+        self._ledger = HostLedger()
+        self._hosts = ["host1", "host2"]
+        for host in self._hosts:
+            self._ledger.update_capacity(
+                host, HostCapacity(core_count=8, memory_mib=8192)
+            )
+
+    def test_spread(self) -> None:
+        demand = HostCapacity(core_count=2, memory_mib=2048)
+
+        reservations = [
+            self._ledger.reserve(self._hosts, demand, PLACEMENT_POLICY_SPREAD)
+            for _ in range(3)
+        ]
+
+        self.assertListEqual(
+            ["host1", "host2", "host1"], [x.host for x in reservations if x]
+        )
+        self.assertEqual(4096, self._ledger.get_reserved("host1").memory_mib)
+
+    def test_pack(self) -> None:
+        demand = HostCapacity(core_count=2, memory_mib=3072)
+
+        reservations = [
+            self._ledger.reserve(self._hosts, demand, PLACEMENT_POLICY_PACK)
+            for _ in range(3)
+        ]
+
+        # the third one doesn't fit the first host, so it goes to the next.
+        self.assertListEqual(
+            ["host1", "host1", "host2"], [x.host for x in reservations if x]
+        )
+
+    def test_wait_and_release(self) -> None:
+        demand = HostCapacity(core_count=1, memory_mib=6144)
+        first = self._ledger.reserve(self._hosts, demand)
+        second = self._ledger.reserve(self._hosts, demand)
+        assert first and second
+
+        self.assertIsNone(self._ledger.reserve(self._hosts, demand))
+        # the free memory is taken by reservations, so it's not updated.
+        self._ledger.update_capacity(
+            "host1", HostCapacity(core_count=8, memory_mib=2048)
+        )
+        self.assertTrue(self._ledger.can_fit("host1", demand))
+
+        self._ledger.release(first)
+        self._ledger.release(first)
+
+        third = self._ledger.reserve(self._hosts, demand)
+        assert third
+        self.assertEqual("host1", third.host)
+        self.assertEqual(6144, self._ledger.get_reserved("host1").memory_mib)
+
+    def test_cpu_limit(self) -> None:
+        demand = HostCapacity(core_count=6, memory_mib=1024)
+        self.assertIsNotNone(self._ledger.reserve(["host1"], demand))
+        self.assertIsNone(self._ledger.reserve(["host1"], demand))
+        self.assertFalse(
+            self._ledger.can_fit("host1", HostCapacity(core_count=9, memory_mib=1))
+        )
+        # unknown hosts have no capacity.
+        self.assertIsNone(self._ledger.reserve(["host3"], demand))
+
+    def test_unknown_policy(self) -> None:
+        with self.assertRaises(LisaException):
+            self._ledger.reserve(self._hosts, HostCapacity(), "random")
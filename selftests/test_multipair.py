@@ -0,0 +1,75 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from threading import Lock
+from typing import Any, List
+from unittest import TestCase
+
+from lisa import SkippedException
+from lisa.util.logger import get_logger
+from microsoft.testsuites.performance.multipair import (
+    TOPOLOGY_INCAST,
+    TOPOLOGY_PAIRS,
+    NodePair,
+    get_node_pairs,
+    get_topology,
+    run_pairs,
+)
+
+
+class _Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+def _create_nodes(count: int) -> List[Any]:
+    return [_Node(f"node{x}") for x in range(count)]
+
+
+class MultiPairTestCase(TestCase):
+    def test_pairs(self) -> None:
+        pairs = get_node_pairs(_create_nodes(5), TOPOLOGY_PAIRS)
+
+        self.assertListEqual(
+            ["0:node0->node1", "1:node2->node3"], [x.name for x in pairs]
+        )
+        self.assertEqual(1, len(get_node_pairs(_create_nodes(4), pair_count=1)))
+        with self.assertRaises(SkippedException):
+            get_node_pairs(_create_nodes(4), pair_count=3)
+
+    def test_incast(self) -> None:
+        pairs = get_node_pairs(_create_nodes(4), TOPOLOGY_INCAST)
+
+        self.assertListEqual(
+            ["0:node0->node1", "1:node2->node1", "2:node3->node1"],
+            [x.name for x in pairs],
+        )
+        self.assertDictEqual(
+            {"kind": TOPOLOGY_INCAST, "pair_count": 3, "pair": 1},
+            get_topology(pairs, TOPOLOGY_INCAST, pairs[1]),
+        )
+        self.assertEqual("aggregate", get_topology(pairs, TOPOLOGY_INCAST)["pair"])
+
+    def test_run_pairs(self) -> None:
+        pairs = get_node_pairs(_create_nodes(6), TOPOLOGY_PAIRS)
+        lock = Lock()
+        events: List[str] = []
+
+        def _start_server(pair: NodePair) -> str:
+            with lock:
+                events.append("server")
+            return pair.server.name
+
+        def _run_client(pair: NodePair) -> str:
+            with lock:
+                events.append("client")
+            return pair.client.name
+
+        servers, clients = run_pairs(
+            pairs, _start_server, _run_client, get_logger("multipair")
+        )
+
+        self.assertListEqual(["node1", "node3", "node5"], servers)
+        self.assertListEqual(["node0", "node2", "node4"], clients)
+        # all servers are started before clients.
+        self.assertListEqual(["server"] * 3 + ["client"] * 3, events)
@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from typing import Any, Dict, Iterator, List
+from unittest import TestCase
+
+from lisa.util import LisaException
+from lisa.util.perf_harness import RepetitionSettings, get_repetition_settings, measure
+
+
+class _Runner:
+    def __init__(self, values: List[float]) -> None:
+        self._values: Iterator[float] = iter(values)
+        self.count = 0
+
+    def run(self) -> Dict[str, Any]:
+        self.count += 1
+        return {"throughput": next(self._values)}
+
+
+def _get_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+    return result
+
+
+class PerfHarnessTestCase(TestCase):
+    def test_run_once_by_default(self) -> None:
+        runner = _Runner([10.0])
+
+        measurement = measure(runner.run, _get_metrics)
+
+        self.assertEqual(1, runner.count)
+        self.assertEqual({"throughput": 10.0}, measurement.representative)
+        self.assertEqual([10.0], measurement.get_raw_samples()["throughput"])
+
+    def test_warmup_is_dropped(self) -> None:
+        runner = _Runner([1.0, 10.0, 10.0, 10.0])
+        settings = RepetitionSettings(warmup=1, min_samples=3, max_samples=10)
+
+        measurement = measure(runner.run, _get_metrics, settings)
+
+        self.assertEqual(4, runner.count)
+        self.assertEqual([10.0] * 3, measurement.get_raw_samples()["throughput"])
+        self.assertTrue(measurement.is_converged)
+
+    def test_repeat_until_converged(self) -> None:
+        values = [10.0, 14.0, 7.0, 10.1, 9.9, 10.0, 10.1, 9.9, 10.0, 10.1]
+        runner = _Runner(values + [10.0] * 20)
+        settings = RepetitionSettings(
+            min_samples=3, max_samples=30, target_relative_ci=0.05
+        )
+
+        measurement = measure(runner.run, _get_metrics, settings)
+
+        self.assertTrue(measurement.is_converged)
+        self.assertLess(runner.count, 30)
+        statistics = measurement.statistics["throughput"]
+        self.assertAlmostEqual(10.0, statistics.median, places=1)
+        self.assertLessEqual(statistics.relative_ci, 0.05)
+
+    def test_reject_outliers(self) -> None:
+        runner = _Runner([10.0, 10.1, 9.9, 10.0, 100.0])
+        settings = RepetitionSettings(
+            min_samples=5, max_samples=5, target_relative_ci=0
+        )
+
+        measurement = measure(runner.run, _get_metrics, settings)
+
+        statistics = measurement.get_statistics()["throughput"]
+        self.assertEqual(4, statistics["count"])
+        self.assertEqual(1, statistics["outliers"])
+        self.assertEqual(10.0, statistics["median"])
+        # raw samples keep outliers, and the representative is the median.
+        self.assertIn(100.0, measurement.get_raw_samples()["throughput"])
+        self.assertEqual({"throughput": 10.0}, measurement.representative)
+
+    def test_stop_by_max_samples(self) -> None:
+        runner = _Runner([1.0, 10.0] * 10)
+        settings = RepetitionSettings(min_samples=2, max_samples=6)
+
+        measurement = measure(runner.run, _get_metrics, settings)
+
+        self.assertEqual(6, runner.count)
+        self.assertFalse(measurement.is_converged)
+
+    def test_settings_from_variables(self) -> None:
+        settings = get_repetition_settings(
+            {"perf_repetition_max_samples": "10", "perf_repetition_warmup": 1}
+        )
+
+        self.assertEqual(10, settings.max_samples)
+        self.assertEqual(3, settings.min_samples)
+        self.assertEqual(1, settings.warmup)
+        self.assertTrue(settings.is_repeated)
+        self.assertFalse(get_repetition_settings({}).is_repeated)
+
+        with self.assertRaises(LisaException):
+            RepetitionSettings(min_samples=5, max_samples=2)
@@ -0,0 +1,127 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from lisa.messages import (
+    NetworkTCPPerformanceMessage,
+    SubTestMessage,
+    TestResultMessage,
+    TestStatus,
+)
+from lisa.notifiers.perf_regression import (
+    PerfRegression,
+    PerfRegressionSchema,
+    get_metric_direction,
+    get_perf_samples,
+)
+from lisa.util import perf_statistics as stats
+
+
+def _create_tcp_perf(throughput: float, latency: float, connections: int = 64) -> Any:
+    return NetworkTCPPerformanceMessage(
+        tool="ntttcp",
+        test_case_name="perf_tcp_ntttcp",
+        vmsize="Standard_D8_v5",
+        kernel_version="6.1",
+        test_result_id="result_id",
+        connections_num=connections,
+        throughput_in_gbps=Decimal(throughput),
+        latency_us=Decimal(latency),
+    )
+
+
+class PerfStatisticsTestCase(TestCase):
+    def test_median_and_mad(self) -> None:
+        values = [10.0, 11.0, 9.0, 10.0, 100.0]
+
+        self.assertEqual(10, stats.median(values))
+        self.assertAlmostEqual(stats.MAD_SCALE, stats.mad(values))
+        self.assertListEqual([10.0, 11.0, 9.0, 10.0], stats.remove_outliers(values))
+
+    def test_bootstrap_ci(self) -> None:
+        values = [float(x) for x in range(100)]
+
+        lower, upper = stats.bootstrap_ci(values, seed=1)
+
+        self.assertLess(lower, 49.5)
+        self.assertGreater(upper, 49.5)
+
+    def test_compare(self) -> None:
+        baseline = [10.0, 10.2, 9.8, 10.1, 9.9, 10.0, 10.3, 9.7]
+
+        worse = stats.compare(baseline, [8.0, 8.1], higher_is_better=True, seed=1)
+        self.assertTrue(worse.is_regression)
+        self.assertAlmostEqual(-0.195, worse.change, places=3)
+
+        better = stats.compare(baseline, [8.0, 8.1], higher_is_better=False, seed=1)
+        self.assertFalse(better.is_regression)
+        self.assertTrue(better.is_improvement)
+
+        # noise in the range of baseline is not a regression.
+        noise = stats.compare(baseline, [9.8], higher_is_better=True, seed=1)
+        self.assertFalse(noise.is_regression)
+
+
+class PerfRegressionTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        runbook = PerfRegressionSchema(
+            type="perf_regression",
+            path=str(Path(self._temp_dir.name) / "baseline.db"),
+        )
+        self._notifier = PerfRegression(runbook)
+        self._notifier.initialize()
+        self._sent: List[Any] = []
+
+    def tearDown(self) -> None:
+        self._notifier.finalize()
+        self._temp_dir.cleanup()
+
+    def test_metric_direction(self) -> None:
+        self.assertTrue(get_metric_direction("throughput_in_gbps"))
+        self.assertTrue(get_metric_direction("randread_iops"))
+        self.assertFalse(get_metric_direction("read_lat_usec"))
+        self.assertIsNone(get_metric_direction("connections_num"))
+        self.assertIsNone(get_metric_direction("tx_packets"))
+
+    def test_variant_in_key(self) -> None:
+        samples_1 = get_perf_samples(_create_tcp_perf(10, 5, connections=1))
+        samples_64 = get_perf_samples(_create_tcp_perf(10, 5, connections=64))
+
+        self.assertSetEqual(
+            {"throughput_in_gbps", "latency_us"}, {x.metric for x in samples_1}
+        )
+        self.assertTrue(set(samples_1).isdisjoint(samples_64))
+
+    def test_report_regression(self) -> None:
+        for index in range(10):
+            self._run_case([_create_tcp_perf(10 + index % 3 * 0.1, 5)])
+        self.assertListEqual([], self._sent)
+
+        self._run_case([_create_tcp_perf(7, 5.1), _create_tcp_perf(7.1, 5)])
+
+        self.assertEqual(1, len(self._sent))
+        sub_message: SubTestMessage = self._sent[0]
+        self.assertEqual(TestStatus.FAILED, sub_message.status)
+        self.assertEqual("result_id", sub_message.id_)
+        self.assertIn("throughput_in_gbps", sub_message.name)
+
+    def test_skip_without_baseline(self) -> None:
+        self._run_case([_create_tcp_perf(1, 100)])
+
+        self.assertListEqual([], self._sent)
+
+    def _run_case(self, perf_messages: List[Any]) -> None:
+        for message in perf_messages:
+            self._notifier._received_message(message)
+        result = TestResultMessage(
+            id_="result_id", name="perf_tcp_ntttcp", status=TestStatus.PASSED
+        )
+        with patch("lisa.notifier.notify", self._sent.append):
+            self._notifier.update_test_result_message(result)
@@ -29,6 +29,8 @@ class MockPlatformTestData:
     prepared_envs: List[str] = field(default_factory=list)
     deployed_envs: List[str] = field(default_factory=list)
     deleted_envs: List[str] = field(default_factory=list)
+    snapshot_envs: List[str] = field(default_factory=list)
+    reset_envs: List[str] = field(default_factory=list)
 
 
 @dataclass_json()
@@ -39,6 +41,8 @@ class MockPlatformSchema:
     deploy_success: bool = True
     deployed_status: EnvironmentStatus = EnvironmentStatus.Deployed
     wait_more_resource_error: bool = False
+    support_reset: bool = False
+    snapshot_success: bool = True
 
 
 class MockPlatform(Platform):
@@ -110,6 +114,18 @@ class MockPlatform(Platform):
         self.test_data.deleted_envs.append(environment.name)
         self.delete_called = True
 
+    def _snapshot_environment(self, environment: Environment, log: Logger) -> None:
+        if self._mock_runbook.support_reset:
+            self.test_data.snapshot_envs.append(environment.name)
+        if not self._mock_runbook.snapshot_success:
+            raise LisaException("mock snapshot failed")
+
+    def _is_environment_resettable(self, environment: Environment) -> bool:
+        return environment.name in self.test_data.snapshot_envs
+
+    def _reset_environment(self, environment: Environment, log: Logger) -> None:
+        self.test_data.reset_envs.append(environment.name)
+
 
 def generate_platform(
     keep_environment: Optional[Union[str, bool]] = False,
@@ -0,0 +1,95 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import io
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+from unittest import TestCase
+
+from lisa.util import agent_server
+from lisa.util.agent import AgentUnavailableException, RemoteAgent
+from lisa.util.logger import get_logger
+
+
+class RemoteAgentTestCase(TestCase):
+    def setUp(self) -> None:
+        # the agent runs locally, and it's connected by pipes instead of ssh.
+        self._process = subprocess.Popen(
+            [sys.executable, "-u", agent_server.__file__],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        assert self._process.stdout and self._process.stdin
+        self._agent = RemoteAgent(
+            reader=self._process.stdout,
+            writer=self._process.stdin,
+            log=get_logger("agent_test"),
+            timeout=10,
+        )
+
+    def tearDown(self) -> None:
+        self._agent.close()
+        self._process.wait(10)
+        assert self._process.stdout
+        self._process.stdout.close()
+
+    def test_run_commands(self) -> None:
+        stdout: Any = io.StringIO()
+        processes = [
+            self._agent.spawn(
+                ["sh", "-c", "echo $VALUE; pwd; echo error >&2; exit 3"],
+                update_env={"VALUE": "hello"},
+                cwd=str(Path("/")),
+                stdout=stdout,
+            ),
+            self._agent.spawn(["sh", "-c", "echo other"]),
+        ]
+
+        results = [x.wait_for_result() for x in processes]
+
+        self.assertEqual(3, results[0].return_code)
+        # stderr is merged like the pty.
+        self.assertEqual("hello\n/\nerror\n", results[0].output)
+        self.assertEqual(results[0].output, stdout.getvalue())
+        self.assertEqual((0, "other\n"), (results[1].return_code, results[1].output))
+
+    def test_separated_stderr(self) -> None:
+        process = self._agent.spawn(
+            ["sh", "-c", "echo out; echo error >&2"], merge_stderr=False
+        )
+
+        result = process.wait_for_result()
+
+        self.assertEqual(("out\n", "error\n"), (result.output, result.stderr_output))
+
+    def test_not_found_command(self) -> None:
+        with self.assertRaises(FileNotFoundError):
+            self._agent.spawn(["lisa_not_existing_command"])
+
+    def test_input_and_kill(self) -> None:
+        process = self._agent.spawn(["sh", "-c", "read line; echo got $line"])
+        process.stdin_write("password\n")
+        self.assertEqual("got password\n", process.wait_for_result().output)
+
+        process = self._agent.spawn(["sleep", "100"])
+        self.assertTrue(process.is_running())
+        process.send_signal(9)
+        self.assertEqual(137, process.wait_for_result().return_code)
+
+    def test_agent_exited(self) -> None:
+        process = self._agent.spawn(["sleep", "3"])
+        self._process.kill()
+        self._process.wait(10)
+
+        # running processes are completed without exit code.
+        self.assertIsNone(process.wait_for_result().return_code)
+        for _ in range(100):
+            if not self._agent.is_alive:
+                break
+            time.sleep(0.1)
+        self.assertFalse(self._agent.is_alive)
+        with self.assertRaises(AgentUnavailableException):
+            self._agent.spawn(["true"])
@@ -0,0 +1,186 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import random
+from typing import Any, Callable, List, Tuple
+from unittest import TestCase
+
+from lisa import schema, search_space
+from lisa.search_space import (
+    IntRange,
+    RequirementCache,
+    RequirementMixin,
+    SetSpace,
+    get_canonical_key,
+)
+
+# the count of random pairs. The seed is fixed, so failures are reproducible.
+_PAIR_COUNT = 300
+_SEED = 20230901
+
+_FEATURE_TYPES = ["Gpu", "Hibernation", "Infiniband", "SerialConsole", "StartStop"]
+
+
+def _generate_count_space(rand: random.Random, min_value: int = 0) -> Any:
+    kind = rand.randint(0, 3)
+    if kind == 0:
+        return rand.randint(min_value, 8)
+    elif kind == 1:
+        low = rand.randint(min_value, 8)
+        return IntRange(min=low, max=low + rand.randint(1, 8))
+    elif kind == 2:
+        return IntRange(min=rand.randint(min_value, 8))
+    else:
+        return [
+            IntRange(min=low, max=low + rand.randint(0, 4))
+            for low in rand.sample(range(min_value, 16), rand.randint(1, 3))
+        ]
+
+
+def _generate_set_space(rand: random.Random, items: List[Any]) -> Any:
+    if rand.randint(0, 3) == 0:
+        return rand.choice(items)
+    return SetSpace(
+        is_allow_set=True, items=rand.sample(items, rand.randint(1, min(3, len(items))))
+    )
+
+
+def _generate_disk(rand: random.Random) -> schema.DiskOptionSettings:
+    return schema.DiskOptionSettings(
+        os_disk_type=_generate_set_space(rand, schema.os_disk_types),
+        data_disk_type=_generate_set_space(rand, schema.data_disk_types),
+        data_disk_count=_generate_count_space(rand),
+        data_disk_iops=_generate_count_space(rand),
+        max_data_disk_count=rand.choice([None, _generate_count_space(rand)]),
+    )
+
+
+def _generate_network_interface(
+    rand: random.Random,
+) -> schema.NetworkInterfaceOptionSettings:
+    return schema.NetworkInterfaceOptionSettings(
+        data_path=_generate_set_space(rand, list(schema.NetworkDataPath)),
+        nic_count=_generate_count_space(rand, min_value=1),
+        max_nic_count=_generate_count_space(rand, min_value=1),
+    )
+
+
+def _generate_node_space(rand: random.Random) -> schema.NodeSpace:
+    node = schema.NodeSpace(
+        node_count=_generate_count_space(rand, min_value=1),
+        core_count=_generate_count_space(rand, min_value=1),
+        memory_mb=_generate_count_space(rand, min_value=1),
+        gpu_count=_generate_count_space(rand),
+    )
+    if rand.randint(0, 1):
+        node.disk = _generate_disk(rand)
+    if rand.randint(0, 1):
+        node.network_interface = _generate_network_interface(rand)
+    if rand.randint(0, 1):
+        node.features = SetSpace[schema.FeatureSettings](
+            is_allow_set=True,
+            items=[
+                schema.FeatureSettings.create(x)
+                for x in rand.sample(_FEATURE_TYPES, rand.randint(0, 3))
+            ],
+        )
+    if rand.randint(0, 3) == 0:
+        node.excluded_features = SetSpace[schema.FeatureSettings](
+            is_allow_set=False,
+            items=[schema.FeatureSettings.create(rand.choice(_FEATURE_TYPES))],
+        )
+    return node
+
+
+def _generate_pairs(count: int) -> List[Tuple[schema.NodeSpace, schema.NodeSpace]]:
+    rand = random.Random(_SEED)
+    pairs: List[Tuple[schema.NodeSpace, schema.NodeSpace]] = []
+    while len(pairs) < count:
+        requirement = _generate_node_space(rand)
+        capability = _generate_node_space(rand)
+        # a capability has all features, which requirements may use.
+        capability.disk = capability.disk or _generate_disk(rand)
+        capability.network_interface = (
+            capability.network_interface or _generate_network_interface(rand)
+        )
+        pairs.append((requirement, capability))
+        # a matched pair, so min capabilities are covered, too.
+        pairs.append((requirement, requirement))
+    return pairs
+
+
+def _call(func: Callable[[], Any]) -> Tuple[Any, str]:
+    try:
+        return func(), ""
+    except Exception as identifier:
+        return None, f"{type(identifier).__name__}: {identifier}"
+
+
+class RequirementCacheTestCase(TestCase):
+    def setUp(self) -> None:
+        search_space.get_requirement_cache().clear()
+
+    def test_min_capability_same_as_uncached(self) -> None:
+        met_count = 0
+        for requirement, capability in _generate_pairs(_PAIR_COUNT):
+            expected = _call(
+                lambda: RequirementMixin.generate_min_capability(
+                    requirement, capability
+                )
+            )
+            # the first call is missed, the second one is hit.
+            for _ in range(2):
+                actual = _call(lambda: requirement.generate_min_capability(capability))
+                self.assertEqual(expected[1], actual[1])
+                self.assertEqual(expected[0], actual[0])
+            if not expected[1]:
+                met_count += 1
+        self.assertGreater(met_count, 0)
+        self.assertGreater(search_space.get_requirement_cache().hits, 0)
+
+    def test_canonical_key(self) -> None:
+        rand = random.Random(_SEED)
+        for _ in range(_PAIR_COUNT):
+            state = rand.getstate()
+            node = _generate_node_space(rand)
+            rand.setstate(state)
+            same_node = _generate_node_space(rand)
+            self.assertIsNot(node, same_node)
+            self.assertEqual(get_canonical_key(node), get_canonical_key(same_node))
+            hash(get_canonical_key(node))
+
+        node = schema.NodeSpace(core_count=4)
+        key = get_canonical_key(node)
+        node.core_count = IntRange(min=4)
+        self.assertNotEqual(key, get_canonical_key(node))
+        # the type is a part of the key.
+        self.assertNotEqual(get_canonical_key(1), get_canonical_key(True))
+
+    def test_result_is_copied(self) -> None:
+        requirement = schema.NodeSpace(core_count=2, memory_mb=1024)
+        capability = schema.NodeSpace(core_count=IntRange(min=1, max=8))
+        min_capability = requirement.generate_min_capability(capability)
+        min_capability.core_count = 100
+
+        self.assertEqual(2, requirement.generate_min_capability(capability).core_count)
+
+    def test_lru_eviction(self) -> None:
+        cache = RequirementCache(max_size=2)
+        values = [IntRange(min=x) for x in range(3)]
+        for value in values:
+            cache.call("check", value, 5, value.check)
+        self.assertEqual(3, cache.misses)
+
+        # the first one is evicted, and the last one is hit.
+        cache.call("check", values[2], 5, values[2].check)
+        cache.call("check", values[0], 5, values[0].check)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(4, cache.misses)
+
+    def test_uncacheable_value(self) -> None:
+        cache = RequirementCache()
+        requirement = schema.NodeSpace()
+        requirement.extended_schemas = {"unknown": object()}
+        result = cache.call("check", requirement, requirement, requirement.check)
+        self.assertTrue(result.result)
+        self.assertEqual(0, cache.hits + cache.misses)
@@ -0,0 +1,195 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from lisa.messages import (
+    DiskPerformanceMessage,
+    NetworkTCPPerformanceMessage,
+    SubTestMessage,
+    TestResultMessage,
+    TestResultMessageBase,
+    TestRunMessage,
+    TestRunStatus,
+    TestStatus,
+)
+from lisa.notifiers.result_store import (
+    ResultStore,
+    ResultStoreNotifier,
+    ResultStoreSchema,
+)
+from lisa.util import LisaException, constants
+
+
+def _create_result(
+    name: str, status: TestStatus, kernel_version: str
+) -> TestResultMessage:
+    return TestResultMessage(
+        id_=f"{name}_id",
+        name=name,
+        status=status,
+        information={
+            "platform": "azure",
+            "vmsize": "Standard_DS2_v2",
+            "kernel_version": kernel_version,
+        },
+    )
+
+
+def _create_tcp_perf(throughput: float, kernel_version: str) -> Any:
+    return NetworkTCPPerformanceMessage(
+        test_case_name="perf_tcp_ntttcp",
+        tool="ntttcp",
+        platform="azure",
+        vmsize="Standard_DS2_v2",
+        kernel_version=kernel_version,
+        connections_num=64,
+        throughput_in_gbps=Decimal(throughput),
+    )
+
+
+class ResultStoreTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "results.db"
+        self._store = ResultStore(self._path)
+
+    def tearDown(self) -> None:
+        self._store.close()
+        self._temp_dir.cleanup()
+
+    def test_query_results(self) -> None:
+        self._store.write(
+            run_id="run1",
+            results=[
+                _create_result("case1", TestStatus.PASSED, "5.15"),
+                _create_result("case2", TestStatus.FAILED, "5.15"),
+            ],
+        )
+        self._store.write(
+            run_id="run2",
+            results=[_create_result("case2", TestStatus.PASSED, "6.1")],
+        )
+
+        rows = self._store.query_results(name="case2")
+        self.assertEqual(2, len(rows))
+
+        rows = self._store.query_results(name="case2", kernel_version="5.%")
+        self.assertEqual(1, len(rows))
+        self.assertEqual("FAILED", rows[0]["status"])
+        self.assertEqual("run1", rows[0]["run_id"])
+
+    def test_replace_same_result(self) -> None:
+        # the same result can be sent again, like a retried case.
+        result = _create_result("case1", TestStatus.FAILED, "5.15")
+        self._store.write(run_id="run1", results=[result])
+        result.status = TestStatus.PASSED
+        self._store.write(run_id="run1", results=[result])
+
+        rows = self._store.query_results(run_id="run1")
+
+        self.assertEqual(1, len(rows))
+        self.assertEqual("PASSED", rows[0]["status"])
+
+    def test_compare_perf_among_runs(self) -> None:
+        self._store.write(
+            run_id="run1",
+            perf_messages=[
+                _create_tcp_perf(10, "5.15"),
+                _create_tcp_perf(12, "5.15"),
+            ],
+        )
+        self._store.write(run_id="run2", perf_messages=[_create_tcp_perf(8, "6.1")])
+
+        rows = self._store.query_perf(metric="throughput_in_gbps")
+
+        by_run: Dict[str, Dict[str, Any]] = {x["run_id"]: x for x in rows}
+        self.assertEqual(2, len(by_run))
+        self.assertEqual(11, by_run["run1"]["average"])
+        self.assertEqual(2, by_run["run1"]["count"])
+        self.assertEqual(8, by_run["run2"]["maximum"])
+        self.assertEqual("6.1", by_run["run2"]["kernel_version"])
+
+    def test_perf_attributes(self) -> None:
+        self._store.write(
+            run_id="run1",
+            perf_messages=[DiskPerformanceMessage(block_size=4, read_iops=Decimal(9))],
+        )
+
+        rows = self._store.query_perf(metric="read_iops")
+
+        self.assertEqual(1, len(rows))
+        self.assertEqual(9, rows[0]["average"])
+        # the enum fields are attributes, not metrics.
+        self.assertListEqual([], self._store.query_perf(metric="disk_type"))
+
+    def test_query_durations(self) -> None:
+        durations: List[Any] = [10, 3.5, ""]
+        messages: List[TestResultMessageBase] = []
+        for index, duration in enumerate(durations):
+            information: Dict[str, Any] = {"duration": duration}
+            messages.append(
+                SubTestMessage(
+                    id_="case1_id",
+                    name=f"sub{index}",
+                    status=TestStatus.PASSED,
+                    parent_test="case1",
+                    information=information,
+                )
+            )
+        self._store.write(run_id="run1", results=messages)
+        information = {"duration": 20}
+        messages[0].information = information
+        self._store.write(run_id="run2", results=messages[:1])
+
+        # the average of runs, and invalid durations are skipped.
+        self.assertDictEqual(
+            {"sub0": 15, "sub1": 3.5}, self._store.query_durations("case1")
+        )
+        self.assertDictEqual({}, self._store.query_durations("case2"))
+
+    def test_unsupported_filter(self) -> None:
+        with self.assertRaises(LisaException):
+            self._store.query_results(metric="throughput_in_gbps")
+
+
+class ResultStoreNotifierTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "results.db"
+        runbook = ResultStoreSchema(
+            type="result_store", path=str(self._path), batch_size=2
+        )
+        self._notifier = ResultStoreNotifier(runbook)
+        self._notifier.initialize()
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_write_in_batches(self) -> None:
+        messages: List[Any] = [
+            TestRunMessage(status=TestRunStatus.RUNNING),
+            _create_result("case1", TestStatus.RUNNING, "5.15"),
+            _create_result("case1", TestStatus.PASSED, "5.15"),
+            SubTestMessage(id_="case1_id", name="sub1", status=TestStatus.PASSED),
+        ]
+        for message in messages:
+            self._notifier._received_message(message)
+
+        # the batch size is reached, the results are written before finalize.
+        store = ResultStore(self._path)
+        try:
+            rows = store.query_results(run_id=constants.RUN_ID)
+            self.assertSetEqual({"case1", "sub1"}, {x["name"] for x in rows})
+
+            self._notifier._received_message(_create_tcp_perf(10, "5.15"))
+            self.assertEqual(0, len(store.query_perf()))
+
+            self._notifier.finalize()
+            self.assertEqual(1, len(store.query_perf(metric="throughput_in_gbps")))
+        finally:
+            store.close()
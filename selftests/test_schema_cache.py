@@ -0,0 +1,94 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from timeit import timeit
+from typing import Any, Dict
+from unittest import TestCase
+from unittest.mock import patch
+
+from lisa import schema
+from lisa.util import get_schema
+from lisa.util.logger import get_logger
+
+# a runbook with common parts, which are resolved on every run.
+_RUNBOOK: Dict[str, Any] = {
+    "name": "benchmark",
+    "environment": {
+        "environments": [
+            {
+                "nodes": [
+                    {
+                        "type": "requirement",
+                        "core_count": {"min": 4},
+                        "memory_mb": {"min": 2048},
+                        "disk": {"data_disk_count": 2},
+                    }
+                ]
+            }
+        ]
+    },
+    "notifier": [{"type": "console"}, {"type": "html", "path": "./report.html"}],
+    "platform": [{"type": "ready"}],
+    "testcase": [{"criteria": {"area": "network", "priority": [0, 1, 2]}}],
+}
+
+
+def _load_without_cache() -> None:
+    # the previous behavior, which builds schemas on every call.
+    runbook = schema.Runbook.schema().load(_RUNBOOK)  # type: ignore
+    for notifier in runbook.notifier:
+        schema.Notifier.schema().load(notifier.to_dict())  # type: ignore
+
+
+def _load_with_cache() -> None:
+    runbook = schema.load_by_type(schema.Runbook, _RUNBOOK)
+    assert runbook.notifier
+    for notifier in runbook.notifier:
+        schema.load_by_type(schema.Notifier, notifier)
+
+
+class SchemaCacheTestCase(TestCase):
+    def test_schema_is_cached(self) -> None:
+        self.assertIs(get_schema(schema.Notifier), get_schema(schema.Notifier))
+        self.assertIsNot(get_schema(schema.Notifier), get_schema(schema.Platform))
+
+    def test_load_by_type(self) -> None:
+        notifiers = schema.load_by_type_many(
+            schema.Notifier, [{"type": "console"}, {"type": "html"}]
+        )
+        self.assertListEqual(["console", "html"], [x.type for x in notifiers])
+
+        # typed objects, including subclasses, are returned without converting.
+        node = schema.RemoteNode(address="127.0.0.1")
+        self.assertIs(node, schema.load_by_type(schema.RemoteNode, node))
+        self.assertIs(node, schema.load_by_type(schema.Node, node))
+
+        # the base type is converted to the subclass by dict.
+        base_node = schema.load_by_type(schema.Node, {"type": "remote"})
+        remote_node = schema.load_by_type(schema.RemoteNode, base_node)
+        self.assertIsInstance(remote_node, schema.RemoteNode)
+
+    def test_benchmark_runbook_resolution(self) -> None:
+        # the timing is logged only, because it varies on loaded machines.
+        _load_with_cache()
+        _load_without_cache()
+        count = 20
+        uncached = timeit(_load_without_cache, number=count)
+        cached = timeit(_load_with_cache, number=count)
+
+        get_logger("schema").debug(
+            f"runbook resolution of {count} times: uncached {uncached:.3f}s, "
+            f"cached {cached:.3f}s, {uncached / cached:.1f}x faster"
+        )
+
+        # loaded notifiers are resolved without the round trip of to_dict, and
+        # schemas are built once.
+        runbook = schema.load_by_type(schema.Runbook, _RUNBOOK)
+        assert runbook.notifier
+        notifier_schema = get_schema(schema.Notifier)
+        for notifier in runbook.notifier:
+            with patch.object(
+                type(notifier), "to_dict", side_effect=AssertionError("to_dict")
+            ):
+                self.assertIs(notifier, schema.load_by_type(schema.Notifier, notifier))
+        self.assertIs(notifier_schema, get_schema(schema.Notifier))
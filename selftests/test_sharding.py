@@ -0,0 +1,69 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import random
+from typing import List
+from unittest import TestCase
+
+from lisa.util import LisaException
+from lisa.util.logger import get_logger
+from lisa.util.sharding import DEFAULT_TEST_DURATION, TestShard, run_shards, split_tests
+
+
+class ShardingTestCase(TestCase):
+    def test_split_balanced(self) -> None:
+        rand = random.Random(20230901)
+        tests = [f"test{x}" for x in range(200)]
+        durations = {x: rand.uniform(1, 600) for x in tests}
+
+        shards = split_tests(tests, 4, durations)
+
+        self.assertEqual(4, len(shards))
+        loads = [x.estimated_duration for x in shards]
+        # the longest processing time first is within 4/3 of the optimum.
+        self.assertLess(max(loads), sum(loads) / 4 * 4 / 3)
+        self.assertEqual(sorted(tests), sorted(sum([x.tests for x in shards], [])))
+        self.assertListEqual([0, 1, 2, 3], [x.index for x in shards])
+
+    def test_split_keeps_order(self) -> None:
+        tests = ["c", "a", "b", "e", "d", "a"]
+        durations = {"a": 1.0, "b": 5.0, "c": 2.0, "d": 4.0, "e": 3.0}
+
+        shards = split_tests(tests, 2, durations)
+
+        for shard in shards:
+            self.assertListEqual(sorted(shard.tests, key=tests.index), shard.tests)
+        # the duplicated test is run once.
+        self.assertEqual(5, sum(len(x.tests) for x in shards))
+
+    def test_split_unknown_durations(self) -> None:
+        shards = split_tests(["a", "b", "c", "d"], 2, {"a": 10.0, "b": 20.0, "c": 30.0})
+        # d is estimated by the median.
+        self.assertEqual(80, sum(x.estimated_duration for x in shards))
+
+        shards = split_tests(["a", "b", "c"], 3)
+        self.assertListEqual(
+            [DEFAULT_TEST_DURATION] * 3, [x.estimated_duration for x in shards]
+        )
+
+    def test_split_count(self) -> None:
+        self.assertEqual(2, len(split_tests(["a", "b"], 5)))
+        self.assertListEqual([], split_tests([], 2))
+        with self.assertRaises(LisaException):
+            split_tests(["a"], 0)
+
+    def test_run_shards(self) -> None:
+        shards = split_tests(["a", "b", "c"], 3)
+        nodes = ["node0", "node1", "node2"]
+
+        def _run_shard(shard: TestShard, node: str) -> List[str]:
+            return [f"{node}:{x}" for x in shard.tests]
+
+        results = run_shards(shards, nodes, _run_shard, get_logger("sharding"))
+
+        self.assertListEqual([["node0:a"], ["node1:b"], ["node2:c"]], results)
+        for shard in shards:
+            self.assertGreater(shard.elapsed, 0)
+            self.assertEqual(shard.index, shard.get_information()["shard"])
+        with self.assertRaises(LisaException):
+            run_shards(shards, nodes[:2], _run_shard, get_logger("sharding"))
@@ -0,0 +1,205 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import logging
+import tempfile
+import time
+from pathlib import Path, PurePath
+from typing import Any, List, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from lisa.messages import SubTestMessage, TestStatus
+from lisa.tools.tail import _TailReader
+from lisa.util import LisaException, create_timer
+from lisa.util.logger import LogWriter, get_logger
+from lisa.util.process import Process, _LineWriter
+from lisa.util.shell import LocalShell
+from lisa.util.sub_test_stream import SubTestStream
+from selftests.test_testsuite import cleanup_cases_metadata, generate_cases_result
+
+
+class _Process:
+    def __init__(self, outputs: List[List[str]]) -> None:
+        self._outputs = outputs
+
+    def read_output_lines(self) -> List[str]:
+        return self._outputs.pop(0) if self._outputs else []
+
+
+class SubTestStreamTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "checkpoint.jsonl"
+        self._result = generate_cases_result()[0]
+        # it's collected from the environment in real runs.
+        self._result._environment_information = {"platform": "ready"}
+        self._sent: List[SubTestMessage] = []
+        self._patch = patch("lisa.notifier.notify", self._sent.append)
+        self._patch.start()
+
+    def tearDown(self) -> None:
+        self._patch.stop()
+        cleanup_cases_metadata()
+        self._temp_dir.cleanup()
+
+    def test_send_once(self) -> None:
+        stream = SubTestStream(self._result, path=self._path)
+        self.assertTrue(stream.send("test1", TestStatus.PASSED, {"duration": 1}))
+        # the final parser sends it again.
+        self.assertFalse(stream.send("test1", TestStatus.PASSED, {"duration": 1}))
+        self.assertTrue(stream.send("test2", TestStatus.FAILED))
+        # the status is corrected by the final parser.
+        self.assertTrue(stream.send("test1", TestStatus.FAILED))
+
+        self.assertListEqual(
+            [("test1", TestStatus.PASSED), ("test2", TestStatus.FAILED)]
+            + [("test1", TestStatus.FAILED)],
+            [(x.name, x.status) for x in self._sent],
+        )
+        self.assertEqual(1, self._sent[0].information["duration"])
+        self.assertListEqual(["test1", "test2"], stream.failed_tests)
+
+    def test_resume(self) -> None:
+        stream = SubTestStream(self._result, path=self._path)
+        stream.send("test1", TestStatus.PASSED, {"duration": 1})
+        stream.send("test2", TestStatus.FAILED)
+        # the run crashed, so the last line is partially written.
+        with open(self._path, "a") as f:
+            f.write('{"name": "test3", "sta')
+        self._sent.clear()
+
+        resumed = SubTestStream(self._result, resume=True, path=self._path)
+
+        self.assertListEqual(["test1", "test2"], resumed.completed_tests)
+        self.assertListEqual(
+            [("test1", TestStatus.PASSED, True), ("test2", TestStatus.FAILED, True)],
+            [(x.name, x.status, x.information["resumed"]) for x in self._sent],
+        )
+        self.assertListEqual(["test2"], resumed.failed_tests)
+        # results of skipped tests are ignored.
+        self.assertFalse(resumed.send("test1", TestStatus.SKIPPED))
+        resumed.send("test3", TestStatus.PASSED)
+        resumed.complete()
+        self.assertFalse(self._path.exists())
+
+    def test_not_resume(self) -> None:
+        SubTestStream(self._result, path=self._path).send("test1", TestStatus.PASSED)
+
+        stream = SubTestStream(self._result, path=self._path)
+
+        self.assertListEqual([], stream.completed_tests)
+        self.assertFalse(self._path.exists())
+
+
+class TailReaderTestCase(TestCase):
+    def test_read_files(self) -> None:
+        files = [PurePath("/a.log"), PurePath("/b.log")]
+        handled: List[Tuple[str, str]] = []
+        reader = _TailReader(
+            files, lambda path, line: handled.append((path.name, line))
+        )
+        outputs: List[List[str]] = [
+            ["==> /a.log <==", "a1", "a2", "", "==> /b.log <==", "b1"],
+            [],
+            ["b2", "", "==> /a.log <==", "a3"],
+        ]
+        process: Any = _Process(outputs)
+
+        results = [reader.read(process) for _ in range(3)]
+
+        self.assertListEqual([True, False, True], results)
+        self.assertListEqual(
+            [("a.log", "a1"), ("a.log", "a2"), ("b.log", "b1")]
+            + [("b.log", "b2"), ("a.log", "a3")],
+            handled,
+        )
+
+    def test_restart(self) -> None:
+        files = [PurePath("/a.log"), PurePath("/b.log")]
+        handled: List[str] = []
+        reader = _TailReader(files, lambda path, line: handled.append(line))
+        process: Any = _Process(
+            [
+                ["==> /a.log <==", "a1", "", "==> /b.log <==", "b1"],
+                # the new tail process outputs from the beginning.
+                ["==> /a.log <==", "a1", "a2", "", "==> /b.log <==", "b1", "b2"],
+            ]
+        )
+
+        reader.read(process)
+        reader.restart()
+        reader.read(process)
+
+        self.assertListEqual(["a1", "b1", "a2", "b2"], handled)
+
+    def test_restart_twice(self) -> None:
+        files = [PurePath("/a.log")]
+        handled: List[str] = []
+        reader = _TailReader(files, lambda path, line: handled.append(line))
+        process: Any = _Process(
+            [
+                ["==> /a.log <==", "a1", "a2", "a3"],
+                # it restarts again, before catching up handled lines.
+                ["==> /a.log <==", "a1"],
+                ["==> /a.log <==", "a1", "a2", "a3", "a4"],
+            ]
+        )
+
+        reader.read(process)
+        reader.restart()
+        reader.read(process)
+        reader.restart()
+        reader.read(process)
+
+        self.assertListEqual(["a1", "a2", "a3", "a4"], handled)
+
+
+class ProcessOutputTestCase(TestCase):
+    def test_read_output_lines(self) -> None:
+        shell = LocalShell()
+        shell.initialize()
+        process = Process("0", shell)
+        process.start(
+            "echo line1; sleep 2; printf 'line2\\nline3'",
+            shell=True,
+            buffer_lines=True,
+        )
+        lines: List[str] = []
+        timer = create_timer()
+        while not lines and timer.elapsed(False) < 10:
+            lines = process.read_output_lines()
+            time.sleep(0.1)
+
+        # the line is read before the process exits.
+        self.assertListEqual(["line1"], lines)
+        self.assertTrue(process.is_running())
+        process.wait_result(10)
+        self.assertListEqual(["line2", "line3"], process.read_output_lines())
+        self.assertListEqual([], process.read_output_lines())
+
+    def test_read_lines_by_characters(self) -> None:
+        writer = _LineWriter(
+            LogWriter(logger=get_logger("line_writer"), level=logging.DEBUG),
+            buffer_lines=True,
+        )
+        # spur writes the output by characters.
+        for char in "line1\r\nline2\nli":
+            writer.write(char)
+
+        self.assertListEqual(["line1", "line2"], writer.read_lines())
+        writer.write("ne3")
+        self.assertListEqual([], writer.read_lines())
+        writer.close()
+        self.assertListEqual(["line3"], writer.read_lines())
+
+    def test_lines_not_buffered(self) -> None:
+        shell = LocalShell()
+        shell.initialize()
+        process = Process("0", shell)
+        process.start("echo line1", shell=True)
+        process.wait_result(10)
+
+        # the output isn't kept by default.
+        with self.assertRaises(LisaException):
+            process.read_output_lines()
@@ -0,0 +1,105 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+from decimal import Decimal
+from typing import Any, Dict
+from unittest import TestCase
+
+from lisa.messages import NetworkPPSPerformanceMessage
+from lisa.tools.sar import Sar, parse_sadf_json
+from lisa.util import perf_statistics as stats
+from lisa.util.process import ExecutableResult
+
+SAR_OUTPUT = """
+06:37:41        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil
+06:37:42           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00
+06:37:42         eth0   2856.00   2857.00    186.86    187.28      0.00      0.00      0.00      0.00
+
+06:37:42        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil
+06:37:43           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00
+06:37:43         eth0   3195.00   3194.00    209.04    209.33      0.00      0.00      0.00      0.00
+"""  # noqa: E501
+
+
+def _create_sample(index: int) -> Dict[str, Any]:
+    return {
+        "timestamp": {"date": "2023-01-01", "time": f"06:37:{index:02}"},
+        "cpu-load-all": [
+            {"cpu": "all", "usr": float(index), "sys": 1.0},
+            {"cpu": "0", "usr": float(index), "sys": 1.0},
+        ],
+        "network": {
+            "net-dev": [{"iface": "eth0", "rxpck": 100.0 * index, "txpck": 10}],
+            "net-tcp": {"active": 1.0, "iseg": float(index)},
+            "softnet": [{"cpu": "all", "total": 5.0, "dropd": 0.0}],
+        },
+        "disk": [{"disk-device": "sda", "tps": 2.0, "util": 0.5}],
+        "interrupts": [{"intr": "sum", "value": 1000.0}],
+    }
+
+
+class SysstatTestCase(TestCase):
+    def setUp(self) -> None:
+        content = {
+            "sysstat": {
+                "hosts": [
+                    {
+                        "nodename": "node",
+                        "statistics": [_create_sample(x) for x in range(1, 11)] + [{}],
+                    }
+                ]
+            }
+        }
+        self._data = parse_sadf_json(json.dumps(content))
+
+    def test_parse(self) -> None:
+        self.assertEqual(10, len(self._data.timestamps))
+        self.assertEqual("2023-01-01 06:37:01", self._data.timestamps[0])
+        self.assertListEqual(
+            [100.0 * x for x in range(1, 11)],
+            self._data.series["network.net-dev.eth0.rxpck"],
+        )
+        self.assertIn("cpu-load-all.0.usr", self._data.series)
+        self.assertIn("disk.sda.util", self._data.series)
+
+    def test_summarize_default_groups(self) -> None:
+        summary = self._data.summarize()
+
+        self.assertIn("cpu-load-all.all.usr", summary)
+        self.assertIn("network.softnet.all.total", summary)
+        self.assertIn("network.net-tcp.iseg", summary)
+        self.assertIn("disk.sda.tps", summary)
+        # per cpu and interrupt series are not summarized by default.
+        self.assertNotIn("cpu-load-all.0.usr", summary)
+        self.assertNotIn("interrupts.sum.value", summary)
+
+        rxpck = summary["network.net-dev.eth0.rxpck"]
+        self.assertEqual(10, rxpck["count"])
+        self.assertEqual(100, rxpck["min"])
+        self.assertEqual(1000, rxpck["max"])
+        self.assertEqual(550, rxpck["mean"])
+        self.assertEqual(550, rxpck["p50"])
+        self.assertAlmostEqual(991, rxpck["p99"])
+
+    def test_add_statistics(self) -> None:
+        message = NetworkPPSPerformanceMessage()
+        Sar.add_statistics(Sar.__new__(Sar), message, self._data)
+
+        assert message.statistics
+        self.assertIn("sysstat.network.net-dev.eth0.txpck", message.statistics)
+
+    def test_percentile(self) -> None:
+        self.assertEqual(5, stats.percentile([5.0], 99))
+        self.assertEqual(2.5, stats.percentile([1.0, 2.0, 3.0, 4.0], 50))
+
+    def test_get_data(self) -> None:
+        result = ExecutableResult(
+            stdout=SAR_OUTPUT, stderr="", exit_code=0, cmd="sar", elapsed=0
+        )
+
+        data = Sar.get_data(Sar.__new__(Sar), "eth0", result)
+
+        self.assertListEqual([Decimal(2856), Decimal(3195)], data["rx_pps"])
+        self.assertListEqual([Decimal(2857), Decimal(3194)], data["tx_pps"])
+        self.assertListEqual([Decimal(5713), Decimal(6389)], data["tx_rx_pps"])
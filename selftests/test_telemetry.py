@@ -0,0 +1,134 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import csv
+import sys
+import tempfile
+from pathlib import Path
+from time import sleep
+from unittest import TestCase, skipIf
+
+from lisa.node import local_node_connect
+from lisa.telemetry import (
+    TelemetryBuffer,
+    TelemetryParser,
+    TelemetrySample,
+    TelemetrySampler,
+)
+from lisa.util.perf_timer import create_timer
+
+
+def _create_frame(
+    remote_time: float, cpu_busy: int, cpu_idle: int, rx_packets: int, io_ms: int
+) -> str:
+    return "\r\n".join(
+        [
+            f"@ {remote_time}",
+            f"cpu  {cpu_busy} 0 0 {cpu_idle} 0 0 0 0 0 0",
+            f"ctxt {remote_time * 1000:.0f}",
+            "intr 1000",
+            "MemTotal:        8000000 kB",
+            "MemAvailable:    6000000 kB",
+            "0.52 0.58 0.59 2/1187 12345",
+            f"  eth0: 2048 {rx_packets} 0 0 0 0 0 0 1024 10 0 0 0 0 0 0",
+            f"   8       0 sda 10 0 80 0 20 0 160 0 0 {io_ms} 0 0 0 0 0 0 0",
+            "   8       1 sda1 10 0 80 0 20 0 160 0 0 10 0 0 0 0 0 0 0",
+            "@@",
+            "",
+        ]
+    )
+
+
+class TelemetryParserTestCase(TestCase):
+    def test_parse_rates(self) -> None:
+        parser = TelemetryParser()
+        parser.write(_create_frame(100, 100, 300, 1000, 0))
+        # the frame is written in pieces, and it's parsed when completed.
+        content = _create_frame(102, 300, 500, 3000, 500)
+        parser.write(content[:50])
+        self.assertEqual(1, len(parser.samples))
+        parser.write(content[50:])
+
+        samples = parser.pop_samples()
+        self.assertEqual(2, len(samples))
+        # the first sample has gauges only.
+        self.assertNotIn("cpu_percent", samples[0].values)
+        self.assertEqual(0.52, samples[0].values["load_1m"])
+
+        values = samples[1].values
+        self.assertEqual(50, values["cpu_percent"])
+        self.assertEqual(1000, values["ctxt_per_sec"])
+        self.assertEqual(0, values["intr_per_sec"])
+        self.assertEqual(1000, values["net.eth0.rx_packets_per_sec"])
+        self.assertEqual(25, values["disk.sda.util_percent"])
+        self.assertEqual(6000000, values["mem_available_kb"])
+        # partitions are not sampled.
+        self.assertNotIn("disk.sda1.reads_per_sec", values)
+
+    def test_ignore_unexpected_lines(self) -> None:
+        parser = TelemetryParser()
+        parser.write("sh: 1: date: not found\n@ abc\ncpu x y\n@@\n")
+
+        self.assertEqual(1, len(parser.samples))
+
+    def test_write_by_characters(self) -> None:
+        parser = TelemetryParser()
+        for char in _create_frame(100, 100, 300, 1000, 0):
+            parser.write(char)
+
+        self.assertEqual(1, len(parser.samples))
+        self.assertEqual(0.52, parser.samples[0].values["load_1m"])
+
+
+class TelemetrySamplerTestCase(TestCase):
+    @skipIf(sys.platform == "win32", "the sampler supports posix nodes only")
+    def test_sample_local_node(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # logs of the node are saved in the temp folder.
+            node = local_node_connect(base_part_path=Path(temp_dir))
+            sampler = TelemetrySampler(node, interval=0.1, capacity=2)
+            sampler.start()
+            try:
+                timer = create_timer()
+                while (
+                    len(sampler.buffer.get_samples()) < 2 and timer.elapsed(False) < 10
+                ):
+                    sleep(0.1)
+            finally:
+                sampler.stop()
+                node.close()
+
+        self.assertFalse(sampler.is_running)
+        samples = sampler.buffer.get_samples()
+        # the buffer keeps samples up to the capacity.
+        self.assertEqual(2, len(samples))
+        self.assertIn("cpu_percent", samples[-1].values)
+
+
+class TelemetryBufferTestCase(TestCase):
+    def test_ring_buffer(self) -> None:
+        buffer = TelemetryBuffer(capacity=3)
+        buffer.add([TelemetrySample(time=x, values={"a": x}) for x in range(5)])
+
+        self.assertListEqual([2, 3, 4], [x.time for x in buffer.get_samples()])
+        self.assertListEqual([3, 4], [x.time for x in buffer.get_samples(start=3)])
+
+    def test_export_case_window(self) -> None:
+        buffer = TelemetryBuffer(capacity=100)
+        buffer.add(
+            [
+                TelemetrySample(time=10, values={"cpu_percent": 1.5}),
+                TelemetrySample(time=11, values={"cpu_percent": 2, "load_1m": 0.5}),
+                TelemetrySample(time=20, values={"cpu_percent": 3}),
+            ]
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "telemetry.csv"
+            count = buffer.export(path, start=9.5, end=15)
+            with open(path) as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(2, count)
+        self.assertListEqual(["time", "offset", "cpu_percent", "load_1m"], rows[0])
+        self.assertListEqual(["0.500", "1.5", ""], rows[1][1:])
+        self.assertListEqual(["1.500", "2", "0.5"], rows[2][1:])
@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import io
+import subprocess
+import tarfile
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from lisa.util import LisaException
+from lisa.util.shell import LocalShell
+from lisa.util.transfer import (
+    extract_tar,
+    get_changed_files,
+    get_checksum_command,
+    get_file_checksum,
+    get_tar_command,
+    list_local_files,
+    parse_checksums,
+    write_tar,
+)
+
+
+class TransferTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._temp_dir.name)
+        self._source = self._root / "source"
+        (self._source / "sub").mkdir(parents=True)
+        (self._source / "a.txt").write_text("a" * 1000)
+        (self._source / "sub" / "b.txt").write_text("b")
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_tar_stream(self) -> None:
+        local_files = list_local_files(self._source)
+        self.assertListEqual(["a.txt", "sub/b.txt"], list(local_files.keys()))
+        for compress in [False, True]:
+            stream = io.BytesIO()
+            size = write_tar(stream, local_files, compress=compress)
+            stream.seek(0)
+            target = self._root / f"target_{compress}"
+
+            count, extracted_size = extract_tar(stream, target, compress=compress)
+
+            self.assertEqual((2, 1001), (count, extracted_size))
+            self.assertEqual(1001, size)
+            self.assertEqual("b", (target / "sub" / "b.txt").read_text())
+
+    def test_reject_unsafe_paths(self) -> None:
+        for name, link_name in [
+            ("/etc/a.txt", ""),
+            ("sub/../../a.txt", ""),
+            ("sub/link", "../../a.txt"),
+        ]:
+            stream = io.BytesIO()
+            with tarfile.open(fileobj=stream, mode="w|") as tar:
+                member = tarfile.TarInfo(name)
+                if link_name:
+                    member.type = tarfile.SYMTYPE
+                    member.linkname = link_name
+                tar.addfile(member, io.BytesIO())
+            stream.seek(0)
+
+            with self.assertRaises(LisaException):
+                extract_tar(stream, self._root / "target")
+
+    def test_commands(self) -> None:
+        # the commands run on nodes, so run them by the local shell.
+        stream = io.BytesIO()
+        write_tar(stream, list_local_files(self._source), compress=True)
+        target = self._root / "target dir"
+        subprocess.run(
+            get_tar_command(str(target), extract=True, compress=True),
+            shell=True,
+            input=stream.getvalue(),
+            check=True,
+        )
+        output = subprocess.run(
+            get_checksum_command(str(target), is_directory=True),
+            shell=True,
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout.decode()
+
+        checksums = parse_checksums(output)
+
+        self.assertEqual(
+            get_file_checksum(self._source / "sub" / "b.txt"), checksums["sub/b.txt"]
+        )
+        (self._source / "a.txt").write_text("changed")
+        self.assertListEqual(
+            ["a.txt"], get_changed_files(list_local_files(self._source), checksums)
+        )
+
+    def test_local_copy_directory(self) -> None:
+        shell = LocalShell()
+        target = self._root / "target"
+        statistics = shell.copy_directory(self._source, target, skip_unchanged=True)
+        self.assertEqual(
+            (2, 0, 1001),
+            (statistics.file_count, statistics.skipped_count, statistics.size),
+        )
+
+        (self._source / "sub" / "b.txt").write_text("changed")
+        statistics = shell.copy_directory(self._source, target, skip_unchanged=True)
+
+        self.assertEqual((1, 1), (statistics.file_count, statistics.skipped_count))
+        self.assertEqual("changed", (target / "sub" / "b.txt").read_text())